@@ -0,0 +1,987 @@
+# OpenAPI description of the ACORD API, served by the stack at /swagger
+# and used to generate the typed models (tools/generate_models.py).
+SWAGGER_DEFINITION = {
+  "openapi": "3.0.1",
+  "info": {
+    "title": "ACORD Insurance API",
+    "description": "API for ACORD insurance transactions",
+    "version": "1.0.0"
+  },
+  "paths": {
+    "/acord/103": {
+      "post": {
+        "summary": "Submit ACORD 103 New Business Submission for a Policy",
+        "operationId": "submitAcord103",
+        "parameters": [
+          {
+            "name": "fields",
+            "in": "query",
+            "required": False,
+            "description": "Comma-separated TXLifeResponse element paths to return, e.g. TransResult.ResultCode,OLifE.Holding.Policy.PolNumber",
+            "schema": {
+              "type": "string"
+            }
+          }
+        ],
+        "requestBody": {
+          "content": {
+            "application/xml": {
+              "schema": {
+                "$ref": "#/components/schemas/ACORD103Request"
+              }
+            },
+            "application/json": {
+              "schema": {
+                "$ref": "#/components/schemas/ACORD103RequestJSON"
+              }
+            }
+          },
+          "required": True
+        },
+        "responses": {
+          "200": {
+            "description": "Successful response",
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ACORD103Response"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ACORD103ResponseJSON"
+                }
+              }
+            }
+          },
+          "400": {
+            "description": "Bad request",
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponse"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          },
+          "500": {
+            "description": "Internal server error",
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponse"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          },
+          "503": {
+            "description": "Shed while the downstream system is slow, or out of time; retry after the given delay",
+            "headers": {
+              "Retry-After": {
+                "description": "Seconds to wait before retrying",
+                "schema": {
+                  "type": "integer"
+                }
+              }
+            },
+            "content": {
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          }
+        }
+      }
+    },
+    "/acord/1125": {
+      "put": {
+        "summary": "Submit ACORD 1125 Policy Change",
+        "operationId": "submitAcord1125",
+        "parameters": [
+          {
+            "name": "fields",
+            "in": "query",
+            "required": False,
+            "description": "Comma-separated TXLifeResponse element paths to return, e.g. TransResult.ResultCode,OLifE.Holding.Policy.PolNumber",
+            "schema": {
+              "type": "string"
+            }
+          }
+        ],
+        "requestBody": {
+          "content": {
+            "application/xml": {
+              "schema": {
+                "$ref": "#/components/schemas/ACORD1125Request"
+              }
+            },
+            "application/json": {
+              "schema": {
+                "$ref": "#/components/schemas/ACORD1125RequestJSON"
+              }
+            }
+          },
+          "required": True
+        },
+        "responses": {
+          "200": {
+            "description": "Successful response",
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ACORD1125Response"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ACORD1125ResponseJSON"
+                }
+              }
+            }
+          },
+          "400": {
+            "description": "Bad request",
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponse"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          },
+          "500": {
+            "description": "Internal server error",
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponse"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          },
+          "503": {
+            "description": "Shed while the downstream system is slow, or out of time; retry after the given delay",
+            "headers": {
+              "Retry-After": {
+                "description": "Seconds to wait before retrying",
+                "schema": {
+                  "type": "integer"
+                }
+              }
+            },
+            "content": {
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          }
+        }
+      }
+    },
+    "/acord/203": {
+      "post": {
+        "summary": "Submit ACORD 203 Pending Case Status Inquiry",
+        "operationId": "submitAcord203",
+        "parameters": [
+          {
+            "name": "fields",
+            "in": "query",
+            "required": False,
+            "description": "Comma-separated TXLifeResponse element paths to return, e.g. TransResult.ResultCode,OLifE.Holding.Policy.PolNumber",
+            "schema": {
+              "type": "string"
+            }
+          },
+          {
+            "name": "If-None-Match",
+            "in": "header",
+            "required": False,
+            "description": "ETag of a previous response; an unchanged status is answered with 304",
+            "schema": {
+              "type": "string"
+            }
+          }
+        ],
+        "requestBody": {
+          "content": {
+            "application/xml": {
+              "schema": {
+                "$ref": "#/components/schemas/ACORD203Request"
+              }
+            },
+            "application/json": {
+              "schema": {
+                "$ref": "#/components/schemas/ACORD203RequestJSON"
+              }
+            }
+          },
+          "required": True
+        },
+        "responses": {
+          "200": {
+            "description": "Successful response",
+            "headers": {
+              "ETag": {
+                "description": "Weak validator for the case status",
+                "schema": {
+                  "type": "string"
+                }
+              }
+            },
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ACORD203Response"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ACORD203ResponseJSON"
+                }
+              }
+            }
+          },
+          "304": {
+            "description": "Case status unchanged since the ETag in If-None-Match",
+            "headers": {
+              "ETag": {
+                "schema": {
+                  "type": "string"
+                }
+              }
+            }
+          },
+          "400": {
+            "description": "Bad request",
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponse"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          },
+          "500": {
+            "description": "Internal server error",
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponse"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          },
+          "503": {
+            "description": "Shed while the downstream system is slow, or out of time; retry after the given delay",
+            "headers": {
+              "Retry-After": {
+                "description": "Seconds to wait before retrying",
+                "schema": {
+                  "type": "integer"
+                }
+              }
+            },
+            "content": {
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          }
+        }
+      }
+    },
+    "/acord/302": {
+      "post": {
+        "summary": "Submit ACORD 302 Pending Case Status Update",
+        "operationId": "submitAcord302",
+        "parameters": [
+          {
+            "name": "fields",
+            "in": "query",
+            "required": False,
+            "description": "Comma-separated TXLifeResponse element paths to return, e.g. TransResult.ResultCode,OLifE.Holding.Policy.PolNumber",
+            "schema": {
+              "type": "string"
+            }
+          }
+        ],
+        "requestBody": {
+          "content": {
+            "application/xml": {
+              "schema": {
+                "$ref": "#/components/schemas/ACORD302Request"
+              }
+            },
+            "application/json": {
+              "schema": {
+                "$ref": "#/components/schemas/ACORD302RequestJSON"
+              }
+            }
+          },
+          "required": True
+        },
+        "responses": {
+          "200": {
+            "description": "Successful response",
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ACORD302Response"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ACORD302ResponseJSON"
+                }
+              }
+            }
+          },
+          "400": {
+            "description": "Bad request",
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponse"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          },
+          "500": {
+            "description": "Internal server error",
+            "content": {
+              "application/xml": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponse"
+                }
+              },
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          },
+          "503": {
+            "description": "Shed while the downstream system is slow, or out of time; retry after the given delay",
+            "headers": {
+              "Retry-After": {
+                "description": "Seconds to wait before retrying",
+                "schema": {
+                  "type": "integer"
+                }
+              }
+            },
+            "content": {
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          }
+        }
+      }
+    },
+    "/acord/claimcheck": {
+      "post": {
+        "summary": "Reserve an upload slot for a payload over the API size limit",
+        "description": "Upload the payload with a multipart/form-data POST to UploadUrl carrying UploadFields, then submit {\"ClaimCheck\": {\"Key\": ...}} to the transaction endpoint in its place",
+        "operationId": "createAcordClaimCheck",
+        "responses": {
+          "201": {
+            "description": "Presigned upload URL and the claim-check reference to submit",
+            "content": {
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ClaimCheckUploadJSON"
+                }
+              }
+            }
+          }
+        }
+      }
+    },
+    "/acord/batch": {
+      "post": {
+        "summary": "Submit a batch of ACORD transactions",
+        "operationId": "submitAcordBatch",
+        "requestBody": {
+          "content": {
+            "application/json": {
+              "schema": {
+                "$ref": "#/components/schemas/ACORDBatchRequestJSON"
+              }
+            }
+          },
+          "required": True
+        },
+        "responses": {
+          "207": {
+            "description": "One result per submitted transaction, in input order",
+            "content": {
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ACORDBatchResponseJSON"
+                }
+              }
+            }
+          },
+          "400": {
+            "description": "Bad request",
+            "content": {
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          },
+          "413": {
+            "description": "Too many transactions in one batch",
+            "content": {
+              "application/json": {
+                "schema": {
+                  "$ref": "#/components/schemas/ErrorResponseJSON"
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  },
+  "components": {
+    "schemas": {
+      "ClaimCheckUploadJSON": {
+        "type": "object",
+        "properties": {
+          "UploadUrl": {
+            "type": "string"
+          },
+          "UploadFields": {
+            "type": "object",
+            "additionalProperties": {
+              "type": "string"
+            }
+          },
+          "ClaimCheck": {
+            "type": "object",
+            "properties": {
+              "Key": {
+                "type": "string"
+              }
+            }
+          }
+        }
+      },
+      "ACORDBatchRequestJSON": {
+        "type": "array",
+        "items": {
+          "$ref": "#/components/schemas/ACORD1125RequestJSON"
+        }
+      },
+      "ACORDBatchResponseJSON": {
+        "type": "object",
+        "properties": {
+          "results": {
+            "type": "array",
+            "items": {
+              "type": "object",
+              "properties": {
+                "index": {
+                  "type": "integer"
+                },
+                "status": {
+                  "type": "integer"
+                },
+                "retryAfter": {
+                  "type": "integer",
+                  "description": "Seconds to wait before resubmitting a shed element"
+                },
+                "TransRefGUID": {
+                  "type": "string"
+                },
+                "body": {
+                  "type": "object"
+                }
+              }
+            }
+          }
+        }
+      },
+      "ACORD1125Request": {
+        "type": "object",
+        "xml": {
+          "name": "TXLife"
+        },
+        "properties": {
+          "UserAuthRequest": {
+            "$ref": "#/components/schemas/UserAuthRequest"
+          },
+          "TXLifeRequest": {
+            "$ref": "#/components/schemas/TXLifeRequest"
+          }
+        }
+      },
+      "ACORD1125RequestJSON": {
+        "type": "object",
+        "properties": {
+          "TXLife": {
+            "type": "object",
+            "properties": {
+              "UserAuthRequest": {
+                "$ref": "#/components/schemas/UserAuthRequestJSON"
+              },
+              "TXLifeRequest": {
+                "$ref": "#/components/schemas/TXLifeRequestJSON"
+              }
+            }
+          }
+        }
+      },
+      "ACORD1125Response": {
+        "type": "object",
+        "xml": {
+          "name": "TXLife"
+        },
+        "properties": {
+          "UserAuthResponse": {
+            "$ref": "#/components/schemas/UserAuthResponse"
+          },
+          "TXLifeResponse": {
+            "$ref": "#/components/schemas/TXLifeResponse"
+          }
+        }
+      },
+      "ACORD1125ResponseJSON": {
+        "type": "object",
+        "properties": {
+          "TXLife": {
+            "type": "object",
+            "properties": {
+              "UserAuthResponse": {
+                "$ref": "#/components/schemas/UserAuthResponseJSON"
+              },
+              "TXLifeResponse": {
+                "$ref": "#/components/schemas/TXLifeResponseJSON"
+              }
+            }
+          }
+        }
+      },
+      "UserAuthRequest": {
+        "type": "object",
+        "properties": {
+          "UserLoginName": {
+            "type": "string"
+          },
+          "UserPswd": {
+            "type": "string"
+          },
+          "VendorApp": {
+            "type": "object",
+            "properties": {
+              "VendorName": {
+                "type": "string"
+              },
+              "AppName": {
+                "type": "string"
+              },
+              "AppVer": {
+                "type": "string"
+              }
+            }
+          }
+        }
+      },
+      "UserAuthRequestJSON": {
+        "type": "object",
+        "properties": {
+          "UserLoginName": {
+            "type": "string"
+          },
+          "UserPswd": {
+            "type": "string"
+          },
+          "VendorApp": {
+            "type": "object",
+            "properties": {
+              "VendorName": {
+                "type": "string"
+              },
+              "AppName": {
+                "type": "string"
+              },
+              "AppVer": {
+                "type": "string"
+              }
+            }
+          }
+        }
+      },
+      "TXLifeRequest": {
+        "type": "object",
+        "properties": {
+          "TransRefGUID": {
+            "type": "string"
+          },
+          "TransType": {
+            "$ref": "#/components/schemas/TransType"
+          },
+          "TransExeDate": {
+            "type": "string",
+            "format": "date"
+          },
+          "TransExeTime": {
+            "type": "string",
+            "format": "time"
+          },
+          "OLifE": {
+            "$ref": "#/components/schemas/OLifE"
+          }
+        }
+      },
+      "TXLifeRequestJSON": {
+        "type": "object",
+        "properties": {
+          "TransRefGUID": {
+            "type": "string"
+          },
+          "TransType": {
+            "$ref": "#/components/schemas/TransTypeJSON"
+          },
+          "TransExeDate": {
+            "type": "string",
+            "format": "date"
+          },
+          "TransExeTime": {
+            "type": "string",
+            "format": "time"
+          },
+          "OLifE": {
+            "$ref": "#/components/schemas/OLifEJSON"
+          }
+        }
+      },
+      "UserAuthResponse": {
+        "type": "object",
+        "properties": {
+          "TransResult": {
+            "$ref": "#/components/schemas/TransResult"
+          },
+          "SvrDate": {
+            "type": "string",
+            "format": "date"
+          },
+          "SvrTime": {
+            "type": "string",
+            "format": "time"
+          }
+        }
+      },
+      "UserAuthResponseJSON": {
+        "type": "object",
+        "properties": {
+          "TransResult": {
+            "$ref": "#/components/schemas/TransResultJSON"
+          },
+          "SvrDate": {
+            "type": "string",
+            "format": "date"
+          },
+          "SvrTime": {
+            "type": "string",
+            "format": "time"
+          }
+        }
+      },
+      "TXLifeResponse": {
+        "type": "object",
+        "properties": {
+          "TransRefGUID": {
+            "type": "string"
+          },
+          "TransType": {
+            "$ref": "#/components/schemas/TransType"
+          },
+          "TransExeDate": {
+            "type": "string",
+            "format": "date"
+          },
+          "TransExeTime": {
+            "type": "string",
+            "format": "time"
+          },
+          "TransResult": {
+            "$ref": "#/components/schemas/TransResult"
+          },
+          "OLifE": {
+            "$ref": "#/components/schemas/OLifE"
+          }
+        }
+      },
+      "TXLifeResponseJSON": {
+        "type": "object",
+        "properties": {
+          "TransRefGUID": {
+            "type": "string"
+          },
+          "TransType": {
+            "$ref": "#/components/schemas/TransTypeJSON"
+          },
+          "TransExeDate": {
+            "type": "string",
+            "format": "date"
+          },
+          "TransExeTime": {
+            "type": "string",
+            "format": "time"
+          },
+          "TransResult": {
+            "$ref": "#/components/schemas/TransResultJSON"
+          },
+          "OLifE": {
+            "$ref": "#/components/schemas/OLifEJSON"
+          }
+        }
+      },
+      "TransType": {
+        "type": "object",
+        "properties": {
+          "@tc": {
+            "type": "string"
+          },
+          "#text": {
+            "type": "string"
+          }
+        }
+      },
+      "TransTypeJSON": {
+        "type": "object",
+        "properties": {
+          "tc": {
+            "type": "string"
+          },
+          "value": {
+            "type": "string"
+          }
+        }
+      },
+      "TransResult": {
+        "type": "object",
+        "properties": {
+          "ResultCode": {
+            "$ref": "#/components/schemas/TransType"
+          },
+          "ResultInfo": {
+            "type": "object",
+            "properties": {
+              "ResultInfoCode": {
+                "$ref": "#/components/schemas/TransType"
+              },
+              "ResultInfoDesc": {
+                "type": "string"
+              }
+            }
+          }
+        }
+      },
+      "TransResultJSON": {
+        "type": "object",
+        "properties": {
+          "ResultCode": {
+            "$ref": "#/components/schemas/TransTypeJSON"
+          },
+          "ResultInfo": {
+            "type": "object",
+            "properties": {
+              "ResultInfoCode": {
+                "$ref": "#/components/schemas/TransTypeJSON"
+              },
+              "ResultInfoDesc": {
+                "type": "string"
+              }
+            }
+          }
+        }
+      },
+      "OLifE": {
+        "type": "object",
+        "properties": {
+          "Holding": {
+            "$ref": "#/components/schemas/Holding"
+          }
+        }
+      },
+      "OLifEJSON": {
+        "type": "object",
+        "properties": {
+          "Holding": {
+            "$ref": "#/components/schemas/HoldingJSON"
+          }
+        }
+      },
+      "Holding": {
+        "type": "object",
+        "properties": {
+          "Policy": {
+            "$ref": "#/components/schemas/Policy"
+          }
+        }
+      },
+      "HoldingJSON": {
+        "type": "object",
+        "properties": {
+          "Policy": {
+            "$ref": "#/components/schemas/PolicyJSON"
+          }
+        }
+      },
+      "Policy": {
+        "type": "object",
+        "properties": {
+          "PolNumber": {
+            "type": "string"
+          },
+          "LineOfBusiness": {
+            "$ref": "#/components/schemas/TransType"
+          },
+          "ProductType": {
+            "$ref": "#/components/schemas/TransType"
+          },
+          "PolicyStatus": {
+            "$ref": "#/components/schemas/TransType"
+          },
+          "ChangeInfo": {
+            "$ref": "#/components/schemas/ChangeInfo"
+          }
+        }
+      },
+      "PolicyJSON": {
+        "type": "object",
+        "properties": {
+          "PolNumber": {
+            "type": "string"
+          },
+          "LineOfBusiness": {
+            "$ref": "#/components/schemas/TransTypeJSON"
+          },
+          "ProductType": {
+            "$ref": "#/components/schemas/TransTypeJSON"
+          },
+          "PolicyStatus": {
+            "$ref": "#/components/schemas/TransTypeJSON"
+          },
+          "ChangeInfo": {
+            "$ref": "#/components/schemas/ChangeInfoJSON"
+          }
+        }
+      },
+      "ChangeInfo": {
+        "type": "object",
+        "properties": {
+          "ChangeType": {
+            "$ref": "#/components/schemas/TransType"
+          },
+          "ChangeSubType": {
+            "$ref": "#/components/schemas/TransType"
+          },
+          "ChangeEffDate": {
+            "type": "string",
+            "format": "date"
+          }
+        }
+      },
+      "ChangeInfoJSON": {
+        "type": "object",
+        "properties": {
+          "ChangeType": {
+            "$ref": "#/components/schemas/TransTypeJSON"
+          },
+          "ChangeSubType": {
+            "$ref": "#/components/schemas/TransTypeJSON"
+          },
+          "ChangeEffDate": {
+            "type": "string",
+            "format": "date"
+          }
+        }
+      },
+      "ErrorResponse": {
+        "type": "object",
+        "properties": {
+          "error": {
+            "type": "string"
+          },
+          "message": {
+            "type": "string"
+          }
+        }
+      },
+      "ErrorResponseJSON": {
+        "type": "object",
+        "properties": {
+          "error": {
+            "type": "string"
+          },
+          "message": {
+            "type": "string"
+          }
+        }
+      }
+    },
+    "securitySchemes": {
+      "CognitoAuth": {
+        "type": "apiKey",
+        "name": "Authorization",
+        "in": "header"
+      }
+    }
+  },
+  "security": [
+    {
+      "CognitoAuth": []
+    }
+  ]
+}
@@ -3,22 +3,36 @@ from aws_cdk import (
     aws_apigateway as apigateway,
     aws_lambda as _lambda,
     aws_sqs as sqs,
+    aws_s3 as s3,
     aws_lambda_event_sources as event_sources,
     aws_cognito as cognito,
+    aws_dynamodb as dynamodb,
     CfnOutput,
+    Duration,
+    RemovalPolicy,
+    Size,
 )
 from constructs import Construct
 import json
 
+from acord_swagger import SWAGGER_DEFINITION
+
 class ApiGatewayWithAcordSchemaStack(Stack):
 
-    def __init__(self, scope: Construct, id: str, **kwargs) -> None:
+    def __init__(self, scope: Construct, id: str, attachment_spool_size: Size = None, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
-        # Create a new Cognito User Pool
+        # Ephemeral /tmp storage the 103 function spools attachments to; set
+        # with attachment_spool_size or the acordAttachmentSpoolMiB context value
+        if attachment_spool_size is None:
+            attachment_spool_size = Size.mebibytes(int(self.node.try_get_context("acordAttachmentSpoolMiB") or 2048))
+
+        # Create a new Cognito User Pool; producer_id is the CompanyProducerID
+        # whose cases a user's delta inquiries read, set by administrators
         user_pool = cognito.UserPool(self, "UserPool",
                                      self_sign_up_enabled=True,
-                                     auto_verify=cognito.AutoVerifiedAttrs(email=True))
+                                     auto_verify=cognito.AutoVerifiedAttrs(email=True),
+                                     custom_attributes={"producer_id": cognito.StringAttribute(mutable=True)})
 
         # Create a Cognito User Pool Client
         user_pool_client = cognito.UserPoolClient(self, "UserPoolClient",
@@ -28,7 +42,9 @@ class ApiGatewayWithAcordSchemaStack(Stack):
                 user_password=True,
                 user_srp=True
             ),
-            supported_identity_providers=[cognito.UserPoolClientIdentityProvider.COGNITO]
+            supported_identity_providers=[cognito.UserPoolClientIdentityProvider.COGNITO],
+            # Users may not name their own producer
+            write_attributes=cognito.ClientAttributes().with_standard_attributes(email=True)
         )
 
 
@@ -42,45 +58,174 @@ class ApiGatewayWithAcordSchemaStack(Stack):
 
 
 
+        # Claim-check bucket for payloads too large for API Gateway or SQS
+        claim_check_bucket = s3.Bucket(self, "AcordClaimCheckBucket",
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            enforce_ssl=True,
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True,
+            lifecycle_rules=[s3.LifecycleRule(expiration=Duration.days(7))]
+        )
+        # Pending cases written by 302 updates and read by 203 inquiries, with an
+        # index per attribute inquiries select on, newest update first
+        case_table = dynamodb.Table(self, "AcordPendingCaseTable",
+            partition_key=dynamodb.Attribute(name="PolNumber", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            point_in_time_recovery=True,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+        # Documents and the materialized 203 views (JsonView, XmlView) are
+        # only read by key, so the indexes leave them out and their items
+        # stay small; Removed marks the removals a case moved to another
+        # producer leaves in the old producer's feed
+        case_attributes = ("Producer", "CarrierCode", "Status")
+        for attribute in case_attributes:
+            case_table.add_global_secondary_index(
+                index_name=f"{attribute}Index",
+                partition_key=dynamodb.Attribute(name=attribute, type=dynamodb.AttributeType.STRING),
+                sort_key=dynamodb.Attribute(name="UpdatedAt", type=dynamodb.AttributeType.STRING),
+                projection_type=dynamodb.ProjectionType.INCLUDE,
+                non_key_attributes=["Version", "Removed"] + [name for name in case_attributes if name != attribute]
+            )
+        # PolNumbers written per day, which the policy filter catches up from
+        # instead of scanning the table
+        case_table.add_global_secondary_index(
+            index_name="UpdatedDayIndex",
+            partition_key=dynamodb.Attribute(name="UpdatedDay", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="UpdatedAt", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.KEYS_ONLY
+        )
+
+        # Responses at least this large are compressed, by the functions or the gateway
+        compression_threshold = Size.kibibytes(1)
+        # Compressed request and response bodies travel base64 encoded; the
+        # functions compress only for clients that Accept one of these
+        binary_media_types = ["application/json", "application/xml", "text/xml", "application/gzip",
+                              "application/octet-stream"]
+
+        acord_environment = {
+            "ACORD_CLAIM_CHECK_BUCKET": claim_check_bucket.bucket_name,
+            "ACORD_MIN_COMPRESSION_SIZE": str(compression_threshold.to_bytes()),
+            "ACORD_BINARY_MEDIA_TYPES": ",".join(binary_media_types),
+            "ACORD_CASE_TABLE": case_table.table_name
+        }
+        # Policy administration service every transaction calls, from the
+        # acordPolicyAdminUrl context value
+        policy_admin_url = self.node.try_get_context("acordPolicyAdminUrl")
+        if policy_admin_url:
+            acord_environment["ACORD_POLICY_ADMIN_URL"] = policy_admin_url
+        # Snapshot of the PolNumber filter (s3://bucket/key) written by
+        # tools/build_policy_filter.py, from the acordPolicyFilterSnapshot
+        # context value; without one the filter is left out
+        policy_filter_snapshot = self.node.try_get_context("acordPolicyFilterSnapshot")
+        if policy_filter_snapshot:
+            acord_environment["ACORD_POLICY_FILTER_SNAPSHOT"] = policy_filter_snapshot
+
+        # Shared request handling code used by every ACORD Lambda
+        acord_core_layer = _lambda.LayerVersion(self, "AcordCoreLayer",
+            code=_lambda.Code.from_asset("lambda/common"),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_8],
+            description="Shared ACORD request handling (acord_core)"
+        )
+
         # Lambda functions for each ACORD code
         lambda_103 = _lambda.Function(self, "Acord103Function",
             runtime=_lambda.Runtime.PYTHON_3_8,
             handler="handler_acord_103.handler",
-            code=_lambda.Code.from_asset("lambda/acord_103")
+            code=_lambda.Code.from_asset("lambda/acord_103"),
+            layers=[acord_core_layer],
+            ephemeral_storage_size=attachment_spool_size,
+            environment={
+                "ACORD_SPOOL_DIR": "/tmp/acord-spool",
+                **acord_environment
+            }
         )
         
         lambda_1125 = _lambda.Function(self, "Acord1125Function",
             runtime=_lambda.Runtime.PYTHON_3_8,
             handler="handler_acord_1125.handler",
-            code=_lambda.Code.from_asset("lambda/acord_1125")
+            code=_lambda.Code.from_asset("lambda/acord_1125"),
+            layers=[acord_core_layer],
+            environment=acord_environment
         )
         
+        # Back ends a 203 inquiry fans out to, as a JSON list of
+        # {"name", "url", "timeout", "hedge"} in the acord203Sources context value
+        status_sources = self.node.try_get_context("acord203Sources")
+        status_environment = dict(acord_environment)
+        if status_sources:
+            status_environment["ACORD_203_SOURCES"] = (
+                status_sources if isinstance(status_sources, str) else json.dumps(status_sources))
+
         lambda_203 = _lambda.Function(self, "Acord203Function",
             runtime=_lambda.Runtime.PYTHON_3_8,
             handler="handler_acord_203.handler",
-            code=_lambda.Code.from_asset("lambda/acord_203")
+            code=_lambda.Code.from_asset("lambda/acord_203"),
+            layers=[acord_core_layer],
+            environment=status_environment
         )
         
         # Add Lambda function for ACORD 302
         lambda_302 = _lambda.Function(self, "Acord302Function",
             runtime=_lambda.Runtime.PYTHON_3_8,
             handler="handler_acord_302.handler",
-            code=_lambda.Code.from_asset("lambda/acord_302")
+            code=_lambda.Code.from_asset("lambda/acord_302"),
+            layers=[acord_core_layer],
+            environment=acord_environment
         )
 
+        # Lambda function for bulk submissions of mixed ACORD transactions
+        lambda_batch = _lambda.Function(self, "AcordBatchFunction",
+            runtime=_lambda.Runtime.PYTHON_3_8,
+            handler="handler_acord_batch.handler",
+            code=_lambda.Code.from_asset("lambda/acord_batch"),
+            layers=[acord_core_layer],
+            timeout=Duration.seconds(29),
+            memory_size=1024,
+            environment={
+                "ACORD_BATCH_MAX_SIZE": "500",
+                "ACORD_BATCH_WORKERS": "16",
+                **acord_environment
+            }
+        )
+
+        # Lambda function handing out upload slots for oversized payloads
+        lambda_claim_check = _lambda.Function(self, "AcordClaimCheckFunction",
+            runtime=_lambda.Runtime.PYTHON_3_8,
+            handler="handler_acord_claimcheck.handler",
+            code=_lambda.Code.from_asset("lambda/acord_claimcheck"),
+            layers=[acord_core_layer],
+            environment=acord_environment
+        )
 
+        for function in (lambda_103, lambda_1125, lambda_203, lambda_302, lambda_batch):
+            claim_check_bucket.grant_read_write(function)
+        claim_check_bucket.grant_put(lambda_claim_check)
+        # 103 and 302 record cases; 203 reads them
+        case_table.grant_read_data(lambda_203)
+        for function in (lambda_103, lambda_302, lambda_batch):
+            case_table.grant_read_write_data(function)
+        if policy_filter_snapshot:
+            bucket, _, key = policy_filter_snapshot[len("s3://"):].partition("/")
+            snapshot_bucket = s3.Bucket.from_bucket_name(self, "AcordPolicyFilterBucket", bucket)
+            for function in (lambda_103, lambda_203, lambda_302, lambda_batch):
+                snapshot_bucket.grant_read(function, key)
 
-        # Attach SQS as Event Source
-        lambda_103.add_event_source(event_sources.SqsEventSource(sqs_queue_103))
-        lambda_1125.add_event_source(event_sources.SqsEventSource(sqs_queue_1125))
-        lambda_203.add_event_source(event_sources.SqsEventSource(sqs_queue_203))
+
+
+        # Attach SQS as Event Source; handlers report the messages they did not
+        # get to (batchItemFailures) so only those are redelivered
+        lambda_103.add_event_source(event_sources.SqsEventSource(sqs_queue_103, report_batch_item_failures=True))
+        lambda_1125.add_event_source(event_sources.SqsEventSource(sqs_queue_1125, report_batch_item_failures=True))
+        lambda_203.add_event_source(event_sources.SqsEventSource(sqs_queue_203, report_batch_item_failures=True))
         # Attach SQS as Event Source for ACORD 302
         # Check if the event source already exists before adding it
         existing_event_sources = lambda_302.node.children
         sqs_event_source_exists = any(isinstance(child, event_sources.SqsEventSource) for child in existing_event_sources)
         
         if not sqs_event_source_exists:
-            lambda_302.add_event_source(event_sources.SqsEventSource(sqs_queue_302))
+            lambda_302.add_event_source(event_sources.SqsEventSource(sqs_queue_302, report_batch_item_failures=True))
 
 
         
@@ -91,10 +236,14 @@ class ApiGatewayWithAcordSchemaStack(Stack):
             deploy_options=apigateway.StageOptions(stage_name="dev"),
             endpoint_types=[apigateway.EndpointType.REGIONAL],
             description="API for ACORD insurance application processing",
+            min_compression_size=compression_threshold,
+            binary_media_types=binary_media_types,
             default_cors_preflight_options=apigateway.CorsOptions(
                 allow_origins=["*"],
                 allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-                allow_headers=["Content-Type", "X-Amz-Date", "Authorization", "X-Api-Key", "X-Amz-Security-Token"]
+                allow_headers=["Content-Type", "X-Amz-Date", "Authorization", "X-Api-Key", "X-Amz-Security-Token",
+                               "If-None-Match", "Content-Encoding"],
+                expose_headers=["ETag"]
             )
         )
 
@@ -113,733 +262,51 @@ class ApiGatewayWithAcordSchemaStack(Stack):
         
         # ACORD 203 endpoint
         applications_203 = acord_resource.add_resource("203")
-        applications_203.add_method("POST", apigateway.LambdaIntegration(lambda_203, proxy=True))
+        # Status polls are conditional: 200 carries an ETag, a matching If-None-Match gets 304
+        conditional_headers = {
+            "method.response.header.ETag": True,
+            "method.response.header.Cache-Control": True,
+            "method.response.header.Vary": True,
+            "method.response.header.Access-Control-Expose-Headers": True,
+        }
+        # Inquiries answer with whole cases: callers sign in, and delta
+        # inquiries only read the producer of their producer_id claim
+        status_authorizer = apigateway.CognitoUserPoolsAuthorizer(self, "Acord203Authorizer",
+                                                                  cognito_user_pools=[user_pool])
+        applications_203.add_method(
+            "POST",
+            apigateway.LambdaIntegration(lambda_203, proxy=True),
+            authorizer=status_authorizer,
+            authorization_type=apigateway.AuthorizationType.COGNITO,
+            request_parameters={"method.request.header.If-None-Match": False},
+            method_responses=[
+                apigateway.MethodResponse(status_code="200", response_parameters=conditional_headers),
+                apigateway.MethodResponse(status_code="304", response_parameters=conditional_headers),
+                apigateway.MethodResponse(status_code="400"),
+                apigateway.MethodResponse(status_code="403"),
+                apigateway.MethodResponse(status_code="500"),
+                apigateway.MethodResponse(status_code="503",
+                                          response_parameters={"method.response.header.Retry-After": True}),
+                apigateway.MethodResponse(status_code="504"),
+            ]
+        )
         
         # Add ACORD 302 endpoint
         applications_302 = acord_resource.add_resource("302")
         applications_302.add_method("POST", apigateway.LambdaIntegration(lambda_302, proxy=True))
+
+        # Batch endpoint accepting an array of TXLife requests
+        applications_batch = acord_resource.add_resource("batch")
+        applications_batch.add_method("POST", apigateway.LambdaIntegration(lambda_batch, proxy=True))
+
+        # Claim-check upload endpoint for payloads over the API size limit
+        applications_claim_check = acord_resource.add_resource("claimcheck")
+        applications_claim_check.add_method("POST", apigateway.LambdaIntegration(lambda_claim_check, proxy=True))
         
 
 
         # Swagger integration
-        swagger_definition = {
- "openapi": "3.0.1",
-  "info": {
-    "title": "ACORD Insurance API",
-    "description": "API for ACORD insurance transactions",
-    "version": "1.0.0"
-  },
-  "paths": {
-    "/acord/103": {
-      "post": {
-        "summary": "Submit ACORD 103 New Business Submission for a Policy",
-        "operationId": "submitAcord103",
-        "requestBody": {
-          "content": {
-            "application/xml": {
-              "schema": {
-                "$ref": "#/components/schemas/ACORD103Request"
-              }
-            },
-            "application/json": {
-              "schema": {
-                "$ref": "#/components/schemas/ACORD103RequestJSON"
-              }
-            }
-          },
-          "required": True
-        },
-        "responses": {
-          "200": {
-            "description": "Successful response",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ACORD103Response"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ACORD103ResponseJSON"
-                }
-              }
-            }
-          },
-          "400": {
-            "description": "Bad request",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponse"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponseJSON"
-                }
-              }
-            }
-          },
-          "500": {
-            "description": "Internal server error",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponse"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponseJSON"
-                }
-              }
-            }
-          }
-        }
-      }
-    },
-    "/acord/1125": {
-      "put": {
-        "summary": "Submit ACORD 1125 Policy Change",
-        "operationId": "submitAcord1125",
-        "requestBody": {
-          "content": {
-            "application/xml": {
-              "schema": {
-                "$ref": "#/components/schemas/ACORD1125Request"
-              }
-            },
-            "application/json": {
-              "schema": {
-                "$ref": "#/components/schemas/ACORD1125RequestJSON"
-              }
-            }
-          },
-          "required": True
-        },
-        "responses": {
-          "200": {
-            "description": "Successful response",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ACORD1125Response"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ACORD1125ResponseJSON"
-                }
-              }
-            }
-          },
-          "400": {
-            "description": "Bad request",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponse"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponseJSON"
-                }
-              }
-            }
-          },
-          "500": {
-            "description": "Internal server error",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponse"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponseJSON"
-                }
-              }
-            }
-          }
-        }
-      }
-    },
-    "/acord/203": {
-      "post": {
-        "summary": "Submit ACORD 203 Pending Case Status Inquiry",
-        "operationId": "submitAcord203",
-        "requestBody": {
-          "content": {
-            "application/xml": {
-              "schema": {
-                "$ref": "#/components/schemas/ACORD203Request"
-              }
-            },
-            "application/json": {
-              "schema": {
-                "$ref": "#/components/schemas/ACORD203RequestJSON"
-              }
-            }
-          },
-          "required": True
-        },
-        "responses": {
-          "200": {
-            "description": "Successful response",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ACORD203Response"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ACORD203ResponseJSON"
-                }
-              }
-            }
-          },
-          "400": {
-            "description": "Bad request",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponse"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponseJSON"
-                }
-              }
-            }
-          },
-          "500": {
-            "description": "Internal server error",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponse"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponseJSON"
-                }
-              }
-            }
-          }
-        }
-      }
-    },
-    "/acord/302": {
-      "post": {
-        "summary": "Submit ACORD 302 Pending Case Status Update",
-        "operationId": "submitAcord302",
-        "requestBody": {
-          "content": {
-            "application/xml": {
-              "schema": {
-                "$ref": "#/components/schemas/ACORD302Request"
-              }
-            },
-            "application/json": {
-              "schema": {
-                "$ref": "#/components/schemas/ACORD302RequestJSON"
-              }
-            }
-          },
-          "required": True
-        },
-        "responses": {
-          "200": {
-            "description": "Successful response",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ACORD302Response"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ACORD302ResponseJSON"
-                }
-              }
-            }
-          },
-          "400": {
-            "description": "Bad request",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponse"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponseJSON"
-                }
-              }
-            }
-          },
-          "500": {
-            "description": "Internal server error",
-            "content": {
-              "application/xml": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponse"
-                }
-              },
-              "application/json": {
-                "schema": {
-                  "$ref": "#/components/schemas/ErrorResponseJSON"
-                }
-              }
-            }
-          }
-        }
-      }
-    }
-  },
-  "components": {
-    "schemas": {
-      "ACORD1125Request": {
-        "type": "object",
-        "xml": {
-          "name": "TXLife"
-        },
-        "properties": {
-          "UserAuthRequest": {
-            "$ref": "#/components/schemas/UserAuthRequest"
-          },
-          "TXLifeRequest": {
-            "$ref": "#/components/schemas/TXLifeRequest"
-          }
-        }
-      },
-      "ACORD1125RequestJSON": {
-        "type": "object",
-        "properties": {
-          "TXLife": {
-            "type": "object",
-            "properties": {
-              "UserAuthRequest": {
-                "$ref": "#/components/schemas/UserAuthRequestJSON"
-              },
-              "TXLifeRequest": {
-                "$ref": "#/components/schemas/TXLifeRequestJSON"
-              }
-            }
-          }
-        }
-      },
-      "ACORD1125Response": {
-        "type": "object",
-        "xml": {
-          "name": "TXLife"
-        },
-        "properties": {
-          "UserAuthResponse": {
-            "$ref": "#/components/schemas/UserAuthResponse"
-          },
-          "TXLifeResponse": {
-            "$ref": "#/components/schemas/TXLifeResponse"
-          }
-        }
-      },
-      "ACORD1125ResponseJSON": {
-        "type": "object",
-        "properties": {
-          "TXLife": {
-            "type": "object",
-            "properties": {
-              "UserAuthResponse": {
-                "$ref": "#/components/schemas/UserAuthResponseJSON"
-              },
-              "TXLifeResponse": {
-                "$ref": "#/components/schemas/TXLifeResponseJSON"
-              }
-            }
-          }
-        }
-      },
-      "UserAuthRequest": {
-        "type": "object",
-        "properties": {
-          "UserLoginName": {
-            "type": "string"
-          },
-          "UserPswd": {
-            "type": "string"
-          },
-          "VendorApp": {
-            "type": "object",
-            "properties": {
-              "VendorName": {
-                "type": "string"
-              },
-              "AppName": {
-                "type": "string"
-              },
-              "AppVer": {
-                "type": "string"
-              }
-            }
-          }
-        }
-      },
-      "UserAuthRequestJSON": {
-        "type": "object",
-        "properties": {
-          "UserLoginName": {
-            "type": "string"
-          },
-          "UserPswd": {
-            "type": "string"
-          },
-          "VendorApp": {
-            "type": "object",
-            "properties": {
-              "VendorName": {
-                "type": "string"
-              },
-              "AppName": {
-                "type": "string"
-              },
-              "AppVer": {
-                "type": "string"
-              }
-            }
-          }
-        }
-      },
-      "TXLifeRequest": {
-        "type": "object",
-        "properties": {
-          "TransRefGUID": {
-            "type": "string"
-          },
-          "TransType": {
-            "$ref": "#/components/schemas/TransType"
-          },
-          "TransExeDate": {
-            "type": "string",
-            "format": "date"
-          },
-          "TransExeTime": {
-            "type": "string",
-            "format": "time"
-          },
-          "OLifE": {
-            "$ref": "#/components/schemas/OLifE"
-          }
-        }
-      },
-      "TXLifeRequestJSON": {
-        "type": "object",
-        "properties": {
-          "TransRefGUID": {
-            "type": "string"
-          },
-          "TransType": {
-            "$ref": "#/components/schemas/TransTypeJSON"
-          },
-          "TransExeDate": {
-            "type": "string",
-            "format": "date"
-          },
-          "TransExeTime": {
-            "type": "string",
-            "format": "time"
-          },
-          "OLifE": {
-            "$ref": "#/components/schemas/OLifEJSON"
-          }
-        }
-      },
-      "UserAuthResponse": {
-        "type": "object",
-        "properties": {
-          "TransResult": {
-            "$ref": "#/components/schemas/TransResult"
-          },
-          "SvrDate": {
-            "type": "string",
-            "format": "date"
-          },
-          "SvrTime": {
-            "type": "string",
-            "format": "time"
-          }
-        }
-      },
-      "UserAuthResponseJSON": {
-        "type": "object",
-        "properties": {
-          "TransResult": {
-            "$ref": "#/components/schemas/TransResultJSON"
-          },
-          "SvrDate": {
-            "type": "string",
-            "format": "date"
-          },
-          "SvrTime": {
-            "type": "string",
-            "format": "time"
-          }
-        }
-      },
-      "TXLifeResponse": {
-        "type": "object",
-        "properties": {
-          "TransRefGUID": {
-            "type": "string"
-          },
-          "TransType": {
-            "$ref": "#/components/schemas/TransType"
-          },
-          "TransExeDate": {
-            "type": "string",
-            "format": "date"
-          },
-          "TransExeTime": {
-            "type": "string",
-            "format": "time"
-          },
-          "TransResult": {
-            "$ref": "#/components/schemas/TransResult"
-          },
-          "OLifE": {
-            "$ref": "#/components/schemas/OLifE"
-          }
-        }
-      },
-      "TXLifeResponseJSON": {
-        "type": "object",
-        "properties": {
-          "TransRefGUID": {
-            "type": "string"
-          },
-          "TransType": {
-            "$ref": "#/components/schemas/TransTypeJSON"
-          },
-          "TransExeDate": {
-            "type": "string",
-            "format": "date"
-          },
-          "TransExeTime": {
-            "type": "string",
-            "format": "time"
-          },
-          "TransResult": {
-            "$ref": "#/components/schemas/TransResultJSON"
-          },
-          "OLifE": {
-            "$ref": "#/components/schemas/OLifEJSON"
-          }
-        }
-      },
-      "TransType": {
-        "type": "object",
-        "properties": {
-          "@tc": {
-            "type": "string"
-          },
-          "#text": {
-            "type": "string"
-          }
-        }
-      },
-      "TransTypeJSON": {
-        "type": "object",
-        "properties": {
-          "tc": {
-            "type": "string"
-          },
-          "value": {
-            "type": "string"
-          }
-        }
-      },
-      "TransResult": {
-        "type": "object",
-        "properties": {
-          "ResultCode": {
-            "$ref": "#/components/schemas/TransType"
-          },
-          "ResultInfo": {
-            "type": "object",
-            "properties": {
-              "ResultInfoCode": {
-                "$ref": "#/components/schemas/TransType"
-              },
-              "ResultInfoDesc": {
-                "type": "string"
-              }
-            }
-          }
-        }
-      },
-      "TransResultJSON": {
-        "type": "object",
-        "properties": {
-          "ResultCode": {
-            "$ref": "#/components/schemas/TransTypeJSON"
-          },
-          "ResultInfo": {
-            "type": "object",
-            "properties": {
-              "ResultInfoCode": {
-                "$ref": "#/components/schemas/TransTypeJSON"
-              },
-              "ResultInfoDesc": {
-                "type": "string"
-              }
-            }
-          }
-        }
-      },
-      "OLifE": {
-        "type": "object",
-        "properties": {
-          "Holding": {
-            "$ref": "#/components/schemas/Holding"
-          }
-        }
-      },
-      "OLifEJSON": {
-        "type": "object",
-        "properties": {
-          "Holding": {
-            "$ref": "#/components/schemas/HoldingJSON"
-          }
-        }
-      },
-      "Holding": {
-        "type": "object",
-        "properties": {
-          "Policy": {
-            "$ref": "#/components/schemas/Policy"
-          }
-        }
-      },
-      "HoldingJSON": {
-        "type": "object",
-        "properties": {
-          "Policy": {
-            "$ref": "#/components/schemas/PolicyJSON"
-          }
-        }
-      },
-      "Policy": {
-        "type": "object",
-        "properties": {
-          "PolNumber": {
-            "type": "string"
-          },
-          "LineOfBusiness": {
-            "$ref": "#/components/schemas/TransType"
-          },
-          "ProductType": {
-            "$ref": "#/components/schemas/TransType"
-          },
-          "PolicyStatus": {
-            "$ref": "#/components/schemas/TransType"
-          },
-          "ChangeInfo": {
-            "$ref": "#/components/schemas/ChangeInfo"
-          }
-        }
-      },
-      "PolicyJSON": {
-        "type": "object",
-        "properties": {
-          "PolNumber": {
-            "type": "string"
-          },
-          "LineOfBusiness": {
-            "$ref": "#/components/schemas/TransTypeJSON"
-          },
-          "ProductType": {
-            "$ref": "#/components/schemas/TransTypeJSON"
-          },
-          "PolicyStatus": {
-            "$ref": "#/components/schemas/TransTypeJSON"
-          },
-          "ChangeInfo": {
-            "$ref": "#/components/schemas/ChangeInfoJSON"
-          }
-        }
-      },
-      "ChangeInfo": {
-        "type": "object",
-        "properties": {
-          "ChangeType": {
-            "$ref": "#/components/schemas/TransType"
-          },
-          "ChangeSubType": {
-            "$ref": "#/components/schemas/TransType"
-          },
-          "ChangeEffDate": {
-            "type": "string",
-            "format": "date"
-          }
-        }
-      },
-      "ChangeInfoJSON": {
-        "type": "object",
-        "properties": {
-          "ChangeType": {
-            "$ref": "#/components/schemas/TransTypeJSON"
-          },
-          "ChangeSubType": {
-            "$ref": "#/components/schemas/TransTypeJSON"
-          },
-          "ChangeEffDate": {
-            "type": "string",
-            "format": "date"
-          }
-        }
-      },
-      "ErrorResponse": {
-        "type": "object",
-        "properties": {
-          "error": {
-            "type": "string"
-          },
-          "message": {
-            "type": "string"
-          }
-        }
-      },
-      "ErrorResponseJSON": {
-        "type": "object",
-        "properties": {
-          "error": {
-            "type": "string"
-          },
-          "message": {
-            "type": "string"
-          }
-        }
-      }
-    },
-    "securitySchemes": {
-      "CognitoAuth": {
-        "type": "apiKey",
-        "name": "Authorization",
-        "in": "header"
-      }
-    }
-  },
-  "security": [
-    {
-      "CognitoAuth": []
-    }
-  ]
-}
+        swagger_definition = SWAGGER_DEFINITION
 
         # Update the Swagger definition
         swagger_definition_str = json.dumps(swagger_definition)
@@ -849,10 +316,14 @@ class ApiGatewayWithAcordSchemaStack(Stack):
         
         # Swagger integration
         swagger_resource = api.root.add_resource("swagger")
+        # application/json is a binary media type, so the mock's request and
+        # response templates need their payloads converted to text
         swagger_resource.add_method("GET", apigateway.MockIntegration(
+            content_handling=apigateway.ContentHandling.CONVERT_TO_TEXT,
             integration_responses=[
                 {
                     "statusCode": "200",
+                    "contentHandling": apigateway.ContentHandling.CONVERT_TO_TEXT,
                     "responseParameters": {
                         "method.response.header.Content-Type": "'application/json'"
                     },
@@ -879,3 +350,4 @@ class ApiGatewayWithAcordSchemaStack(Stack):
         CfnOutput(self, "ApiUrl", value=api.url)
         CfnOutput(self, "UserPoolId", value=user_pool.user_pool_id)
         CfnOutput(self, "UserPoolClientId", value=user_pool_client.user_pool_client_id)
+        CfnOutput(self, "ClaimCheckBucketName", value=claim_check_bucket.bucket_name)
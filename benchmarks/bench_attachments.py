@@ -0,0 +1,49 @@
+"""Memory held by a parsed 103 with large attachments, spooled or not.
+
+Parses a submission carrying four 5 MB PDFs with json.loads and with
+attachments.load, and reports the traced peak and what the parsed
+document keeps alive afterwards.
+
+Run from the repository root: python benchmarks/bench_attachments.py
+"""
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda", "common", "python"))
+
+from acord_core import attachments
+
+PDFS = 4
+PDF_SIZE = 5 * 1024 * 1024
+
+
+def main():
+    attachments.SPOOL_DIR = tempfile.mkdtemp()
+    raw = json.dumps({"TXLife": {"TXLifeRequest": {
+        "TransRefGUID": "guid-1",
+        "TransType": {"tc": "103"},
+        "OLifE": {"Attachment": [
+            {"AttachmentKey": str(n), "AttachmentData": base64.b64encode(os.urandom(PDF_SIZE)).decode("ascii")}
+            for n in range(PDFS)]},
+    }}})
+    print(f"request body {len(raw) / 2 ** 20:.1f} MiB")
+    for name, parse in (("json.loads", lambda: (json.loads(raw), [])), ("spooled", lambda: attachments.load(raw))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        document, handles = parse()
+        elapsed = time.perf_counter() - start
+        held, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<11} held {held / 2 ** 20:6.1f} MiB  peak {peak / 2 ** 20:6.1f} MiB  {elapsed * 1e3:6.1f} ms")
+        for handle in handles:
+            handle.close()
+        del document, handles
+
+
+if __name__ == "__main__":
+    main()
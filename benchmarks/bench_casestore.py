@@ -0,0 +1,88 @@
+"""203 inquiry latency against a pending case store of 1M cases.
+
+Seeds SQLiteCaseStore and MemoryCaseStore with synthetic cases spread over
+1,000 producers, 50 carriers and 8 statuses, then times the inquiries a
+203 makes: a key lookup by PolNumber, and the 20 most recently updated
+cases of a producer through its index. The scan column is the same
+producer query without the index, i.e. what a store with only the
+PolNumber key would have to do. A 302 upsert is timed as well.
+
+Run from the repository root: python benchmarks/bench_casestore.py [cases]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "lambda", "common", "python"))
+
+from acord_core.casestore import MemoryCaseStore, SQLiteCaseStore, case_from_olife
+
+CASES = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+SAMPLES = 2000
+
+
+def olife(n):
+    return {
+        "Holding": {"id": "Holding_1", "Policy": {"PolNumber": f"POL{n:08d}", "CarrierCode": f"C{n % 50:02d}",
+                                                  "PolicyStatus": {"tc": str(n % 8 + 1)}}},
+        "Party": {"id": "Party_1", "Producer": {"CarrierAppointment": {"CompanyProducerID": f"AG-{n % 1000:04d}"}}},
+    }
+
+
+def seed(store):
+    started = time.perf_counter()
+    if isinstance(store, SQLiteCaseStore):
+        chunk = 50_000
+        for start in range(0, CASES, chunk):
+            store.put_many(case_from_olife(olife(n)) for n in range(start, min(start + chunk, CASES)))
+    else:
+        for n in range(CASES):
+            store.put(case_from_olife(olife(n)))
+    return time.perf_counter() - started
+
+
+def latencies(function, arguments):
+    timings = []
+    for argument in arguments:
+        started = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1e3, timings[int(len(timings) * 0.99)] * 1e3
+
+
+def sqlite_scan(store, producer):
+    # Bypass the index the way a key-only store would have to
+    with store._lock:
+        rows = store._connection.execute(
+            f"{store._SELECT} NOT INDEXED WHERE producer = ? ORDER BY updated_at DESC LIMIT 20", (producer,)).fetchall()
+    return [store._case(row) for row in rows]
+
+
+def memory_scan(store, producer):
+    return sorted((case for case in (store.get(key) for key in list(store._cases)) if case["Producer"] == producer),
+                  key=lambda case: case["UpdatedAt"], reverse=True)[:20]
+
+
+def main():
+    rng = random.Random(7)
+    keys = [f"POL{rng.randrange(CASES):08d}" for _ in range(SAMPLES)]
+    producers = [f"AG-{rng.randrange(1000):04d}" for _ in range(SAMPLES)]
+    print(f"{CASES:,} cases; latencies in ms as p50 / p99")
+    print(f"{'store':>8} {'seed s':>8} {'get':>18} {'producer':>18} {'scan':>18} {'upsert':>18}")
+    for name, store, scan, scans in (("sqlite", SQLiteCaseStore(), sqlite_scan, 20),
+                                     ("memory", MemoryCaseStore(), memory_scan, 3)):
+        seeded = seed(store)
+        get = latencies(store.get, keys)
+        query = latencies(lambda producer: store.query("producer", producer, limit=20), producers)
+        scanned = latencies(lambda producer: scan(store, producer), producers[:scans])
+        upsert = latencies(lambda key: store.put(case_from_olife(olife(int(key[3:])))), keys[:500])
+        print(f"{name:>8} {seeded:>8.1f} " + " ".join(f"{p50:>8.3f} / {p99:<8.3f}"
+                                                     for p50, p99 in (get, query, scanned, upsert)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Wire size and encoding cost of compressed ACORD payloads.
+
+Compares the base64 body API Gateway receives with and without gzip for a
+large batch response in JSON and XML, and a large 103 upload.
+
+Run from the repository root: python benchmarks/bench_compression.py
+"""
+import base64
+import gzip
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda", "common", "python"))
+
+from acord_core import batch, compression, core
+
+
+def request(n):
+    return {
+        "TXLife": {
+            "TXLifeRequest": {
+                "TransRefGUID": f"3f2b7c1e-0000-4000-8000-{n:012d}",
+                "TransType": {"tc": "203", "value": "Pending Case Status Inquiry"},
+                "OLifE": {"Holding": {"Policy": {"PolNumber": f"POL{n:08d}"}}},
+            }
+        }
+    }
+
+
+def main():
+    documents = [request(n) for n in range(500)]
+    for accept in ("application/json", "application/xml"):
+        event = {"body": json.dumps(documents), "headers": {"Accept": accept}}
+        plain = batch.handle_batch_event(event, None)["body"]
+        event["headers"]["Accept-Encoding"] = "gzip"
+        seconds = timeit.timeit(lambda: batch.handle_batch_event(event, None), number=5) / 5
+        compressed = batch.handle_batch_event(event, None)["body"]
+        print(f"batch response {accept:<17} {len(plain):9d} -> {len(compressed):8d} bytes "
+              f"({len(plain) / len(compressed):4.1f}x, handler {seconds * 1e3:6.1f} ms)")
+
+    upload = request(0)
+    upload["TXLife"]["TXLifeRequest"]["OLifE"]["Attachment"] = [
+        {"AttachmentKey": str(n), "Description": "Signed application form page", "MimeTypeTC": {"tc": "17"}}
+        for n in range(20000)]
+    body = json.dumps(upload).encode("utf-8")
+    encoded = base64.b64encode(gzip.compress(body)).decode("ascii")
+    event = {"body": encoded, "isBase64Encoded": True, "headers": {"Content-Encoding": "gzip"}}
+    seconds = timeit.timeit(lambda: compression.request_body(event), number=10) / 10
+    print(f"103 upload                        {len(body):9d} -> {len(encoded):8d} bytes "
+          f"({len(body) / len(encoded):4.1f}x, decode {seconds * 1e3:6.1f} ms)")
+    assert core.handle_event(event, None, "103")["statusCode"] == 200
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Full-portfolio against delta 203 inquiries for one agency.
+
+Seeds a SQLite case store with one producer's book of growing size, then
+asks the 203 handler for the whole book (no cursor) and, after 10 cases
+changed, for the changes since the cursor the first answer returned.
+Reports handler time and response size of each; the delta's should stay
+flat as the book grows.
+
+Run from the repository root: python benchmarks/bench_delta.py
+"""
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "lambda", "common", "python"))
+
+from acord_core import casestore, core, polfilter
+from acord_core.casestore import SQLiteCaseStore, case_from_olife
+
+BOOKS = (1_000, 10_000, 100_000)
+CHANGES = 10
+
+
+def olife(n, status="12"):
+    return {
+        "Holding": {"id": "Holding_1", "Policy": {"PolNumber": f"POL{n:08d}", "CarrierCode": "C01",
+                                                  "PolicyStatus": {"tc": status}}},
+        "Party": {"id": "Party_1", "Producer": {"CarrierAppointment": {"CompanyProducerID": "AG-0001"}}},
+    }
+
+
+def inquiry(cursor=None):
+    body = {"TXLife": {"TXLifeRequest": {"TransRefGUID": "guid-1", "TransType": {"tc": "203"}}}}
+    parameters = {"producer": "AG-0001"}
+    if cursor is not None:
+        parameters["cursor"] = cursor
+    event = {"body": json.dumps(body), "headers": {}, "queryStringParameters": parameters,
+             "requestContext": {"authorizer": {"claims": {core.PRODUCER_CLAIM: "AG-0001"}}}}
+    started = time.perf_counter()
+    response = core.handle_event(event, None, "203")
+    assert response["statusCode"] == 200
+    return time.perf_counter() - started, response
+
+
+def main():
+    polfilter._default_policies = None
+    print(f"{'book':>8} {'full ms':>9} {'full KB':>9} {'delta ms':>9} {'delta KB':>9}")
+    for book in BOOKS:
+        store = casestore._default_store = SQLiteCaseStore()
+        store.put_many(case_from_olife(olife(n)) for n in range(book))
+        core.CHANGES_LIMIT = book
+        core.TRANSACTIONS["203"] = core.status_inquiry()
+        full_time, full = inquiry()
+        cursor = full["headers"][core.CURSOR_HEADER]
+        for n in range(0, book, book // CHANGES):
+            store.put(case_from_olife(olife(n, status="21")))
+        delta_time, delta = inquiry(cursor)
+        assert len(json.loads(delta["body"])["TXLife"]["TXLifeResponse"]) == CHANGES
+        print(f"{book:>8} {full_time * 1e3:>9.1f} {len(full['body']) / 1024:>9.1f} "
+              f"{delta_time * 1e3:>9.2f} {len(delta['body']) / 1024:>9.1f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
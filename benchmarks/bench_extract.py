@@ -0,0 +1,48 @@
+"""Compare partial routing-field extraction with a full json.loads.
+
+Run from the repository root: python benchmarks/bench_extract.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda", "common", "python"))
+
+from acord_core.extract import extract_routing_fields
+
+
+def make_submission(parties, attachment_bytes, holding_last=False):
+    olife = {
+        "Holding": {"Policy": {"PolNumber": "POL0001"}},
+        "Party": [{"id": f"Party_{n}", "FullName": f"Party {n}", "Address": {"Line1": "1 Main St"}}
+                  for n in range(parties)],
+        "Attachment": {"AttachmentData": "QUJD" * (attachment_bytes // 4)},
+    }
+    if holding_last:
+        # Worst case: every other OLifE subtree sits in front of the policy
+        olife["Holding"] = olife.pop("Holding")
+    return json.dumps({
+        "TXLife": {
+            "TXLifeRequest": {
+                "TransRefGUID": "3f2b7c1e-0000-4000-8000-000000000001",
+                "TransType": {"tc": "103", "value": "New Business Submission"},
+                "OLifE": olife,
+            }
+        }
+    })
+
+
+def main():
+    cases = [(10, 0, False), (1000, 0, False), (100, 5_000_000, False), (1000, 0, True), (100, 5_000_000, True)]
+    for parties, attachment_bytes, holding_last in cases:
+        body = make_submission(parties, attachment_bytes, holding_last)
+        number = 20
+        full = timeit.timeit(lambda: json.loads(body), number=number) / number
+        partial = timeit.timeit(lambda: extract_routing_fields(body), number=number) / number
+        print(f"{len(body):>10} bytes  {parties:>5} parties  holding_last={holding_last!s:<5}  full={full * 1e3:8.3f} ms  "
+              f"partial={partial * 1e3:8.3f} ms  ratio={partial / full:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Relation traversal on large 103 submissions: list scans against ObjectGraph.
+
+Builds synthetic OLifE documents where each holding has an insured, an
+owner and two beneficiaries, then resolves the insured and owners of
+every holding. The scan does what business logic without an index would:
+walk the Relation list for each holding and the Party list for each match.
+
+Run from the repository root: python benchmarks/bench_graph.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "lambda", "common", "python"))
+
+from acord_core.graph import BENEFICIARY, INSURED, OWNER, ObjectGraph
+
+SIZES = (250, 1000, 2500)
+
+
+def olife(holdings):
+    document = {"Holding": [], "Party": [], "Relation": []}
+    for n in range(holdings):
+        document["Holding"].append({"id": f"Holding_{n}", "Policy": {"PolNumber": f"POL{n:08d}"}})
+        for role in (INSURED, OWNER, BENEFICIARY, BENEFICIARY):
+            party = f"Party_{len(document['Party'])}"
+            document["Party"].append({"id": party, "FullName": party})
+            document["Relation"].append({"OriginatingObjectID": f"Holding_{n}", "RelatedObjectID": party,
+                                         "RelationRoleCode": {"tc": role}})
+    return document
+
+
+def scan(document):
+    found = []
+    for holding in document["Holding"]:
+        for role in (INSURED, OWNER):
+            for relation in document["Relation"]:
+                if relation["OriginatingObjectID"] == holding["id"] and relation["RelationRoleCode"]["tc"] == role:
+                    found.extend(party for party in document["Party"] if party["id"] == relation["RelatedObjectID"])
+    return found
+
+
+def indexed(document):
+    graph = ObjectGraph.from_olife(document)
+    found = []
+    for holding in document["Holding"]:
+        found.extend(graph.parties(holding["id"], INSURED))
+        found.extend(graph.parties(holding["id"], OWNER))
+    return found
+
+
+def timed(function, document, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(document)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    print(f"{'objects':>8} {'relations':>10} {'scan ms':>10} {'graph ms':>10} {'build ms':>10} {'speedup':>8}")
+    for holdings in SIZES:
+        document = olife(holdings)
+        scan_time, expected = timed(scan, document, 1)
+        graph_time, result = timed(indexed, document, 5)
+        assert result == expected
+        build_time, _ = timed(ObjectGraph.from_olife, document, 5)
+        objects = len(document["Holding"]) + len(document["Party"])
+        print(f"{objects:>8} {len(document['Relation']):>10} {scan_time * 1e3:>10.1f} {graph_time * 1e3:>10.2f} "
+              f"{build_time * 1e3:>10.2f} {scan_time / graph_time:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Memory and access time of the slotted models against plain dicts.
+
+Holds 1,000 parsed transactions in flight in each representation and
+reports the traced allocation size and the time for a deep attribute walk.
+
+Run from the repository root: python benchmarks/bench_models.py
+"""
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from generate_models import load
+
+TXLifeRequest = load().TXLifeRequest
+
+IN_FLIGHT = 1000
+
+
+def payload(n):
+    return json.dumps({
+        "TransRefGUID": f"guid-{n:08d}",
+        "TransType": {"tc": "1125", "value": "Policy Change"},
+        "TransExeDate": "2024-01-31",
+        "TransExeTime": "10:00:00",
+        "OLifE": {
+            "Holding": {
+                "Policy": {
+                    "PolNumber": f"POL{n:08d}",
+                    "LineOfBusiness": {"tc": "1", "value": "Life"},
+                    "PolicyStatus": {"tc": "1", "value": "Active"},
+                    "ChangeInfo": {"ChangeType": {"tc": "5"}, "ChangeEffDate": "2024-02-01"},
+                }
+            }
+        },
+    })
+
+
+def measure(build):
+    """Return the built objects and the bytes they keep alive."""
+    raws = [payload(n) for n in range(IN_FLIGHT)]
+    tracemalloc.start()
+    # Parsed intermediates are freed as they go, so only retained objects count
+    objects = [build(json.loads(raw)) for raw in raws]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objects, size
+
+
+def main():
+    dicts, dict_size = measure(lambda document: document)
+    models, model_size = measure(TXLifeRequest.from_json)
+
+    dict_walk = timeit.timeit(
+        lambda: [d["OLifE"]["Holding"]["Policy"]["PolicyStatus"]["tc"] for d in dicts], number=200)
+    model_walk = timeit.timeit(
+        lambda: [m.OLifE.Holding.Policy.PolicyStatus.tc for m in models], number=200)
+
+    print(f"{IN_FLIGHT} in-flight transactions")
+    print(f"  dicts:  {dict_size / 1024:8.1f} KB  walk {dict_walk / 200 * 1e6:7.1f} us")
+    print(f"  models: {model_size / 1024:8.1f} KB  walk {model_walk / 200 * 1e6:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Size, accuracy and speed of the PolNumber Bloom filter at 1M policies.
+
+For each configured false-positive rate, builds the filter over 1M
+synthetic PolNumbers, then checks 200k PolNumbers that are not in it and
+reports the measured false-positive rate, the memory per million policies
+and the time per check. A check that says "unknown" is all an inquiry for
+a policy we do not administer then costs; compare the case store lookups
+of bench_casestore.py.
+
+Run from the repository root: python benchmarks/bench_polfilter.py [policies]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "lambda", "common", "python"))
+
+from acord_core.polfilter import BloomFilter
+
+POLICIES = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+UNKNOWN = 200_000
+RATES = (0.1, 0.01, 0.001)
+
+
+def main():
+    known = [f"POL{n:09d}" for n in range(POLICIES)]
+    unknown = [f"XPL{n:09d}" for n in range(UNKNOWN)]
+    print(f"{POLICIES:,} policies, {UNKNOWN:,} unknown PolNumbers checked")
+    print(f"{'target':>7} {'hashes':>6} {'MB/1M':>6} {'build s':>8} {'measured':>9} {'check us':>9}")
+    for rate in RATES:
+        bloom = BloomFilter(capacity=POLICIES, error_rate=rate)
+        started = time.perf_counter()
+        bloom.update(known)
+        built = time.perf_counter() - started
+        started = time.perf_counter()
+        false_positives = sum(1 for pol_number in unknown if pol_number in bloom)
+        check = (time.perf_counter() - started) / UNKNOWN
+        assert all(pol_number in bloom for pol_number in known[::1000])
+        print(f"{rate:>7.3f} {bloom.hashes:>6} {bloom.size / POLICIES:>6.2f} {built:>8.2f} "
+              f"{false_positives / UNKNOWN:>9.4f} {check * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
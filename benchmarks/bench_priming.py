@@ -0,0 +1,52 @@
+"""Compare first-request latency of a fresh container with and without priming.
+
+Each run starts a new interpreter, so module imports and caches are cold
+as after a Lambda INIT.
+
+Run from the repository root: python benchmarks/bench_priming.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PYTHON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda", "common", "python")
+
+CONTAINER = """
+import json, sys, time
+from acord_core import core, priming
+if sys.argv[1] == "primed":
+    priming.prime("103")
+event = {"body": json.dumps({"TXLife": {"TXLifeRequest": {"TransRefGUID": "g", "TransType": {"tc": "103"},
+         "OLifE": {"Holding": {"Policy": {"PolNumber": "P"}}}}}}), "headers": {"Accept": sys.argv[2]}}
+samples = []
+for _ in range(200):
+    started = time.perf_counter()
+    core.handle_event(event, None, "103")
+    samples.append((time.perf_counter() - started) * 1e6)
+print(json.dumps(samples))
+"""
+
+
+def run(mode, accept):
+    env = dict(os.environ, PYTHONPATH=PYTHON_PATH)
+    output = subprocess.run([sys.executable, "-c", CONTAINER, mode, accept], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    for accept in ("application/json", "application/xml"):
+        for mode in ("cold", "primed"):
+            firsts, steady = [], []
+            for _ in range(5):
+                samples = run(mode, accept)
+                firsts.append(samples[0])
+                steady.extend(samples[10:])
+            print(f"{accept:<17} {mode:<6} first request={statistics.median(firsts):9.1f} us  "
+                  f"steady median={statistics.median(steady):7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Payload size and handler time for a status poll with and without ``fields``.
+
+Run from the repository root: python benchmarks/bench_projection.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda", "common", "python"))
+
+from acord_core import core
+
+BODY = json.dumps({
+    "TXLife": {
+        "TXLifeRequest": {
+            "TransRefGUID": "3f2b7c1e-0000-4000-8000-000000000001",
+            "TransType": {"tc": "203", "value": "Pending Case Status Inquiry"},
+            "OLifE": {"Holding": {"Policy": {"PolNumber": "POL0001"}}},
+        }
+    }
+})
+
+
+def event(accept, selector=None):
+    event = {"body": BODY, "headers": {"Accept": accept}}
+    if selector:
+        event["queryStringParameters"] = {"fields": selector}
+    return event
+
+
+def main():
+    number = 20000
+    for accept in ("application/json", "application/xml"):
+        for selector in (None, "TransResult.ResultCode"):
+            e = event(accept, selector)
+            size = len(core.handle_event(e, None, "203")["body"])
+            seconds = timeit.timeit(lambda: core.handle_event(e, None, "203"), number=number)
+            label = f"fields={selector}" if selector else "full response"
+            print(f"{accept:<17} {label:<30} {size:5d} bytes  {seconds / number * 1e6:7.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Compare template rendering with building and serializing the response.
+
+Run from the repository root: python benchmarks/bench_templates.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda", "common", "python"))
+
+from dicttoxml import dicttoxml
+
+from acord_core import core
+
+
+class Request:
+    trans_exe_date = "2026-10-19"
+    trans_exe_time = "08:15:00"
+    fields = {
+        "TransRefGUID": "3f2b7c1e-0000-4000-8000-000000000001",
+        "TransType": {"tc": "103", "value": "New Business Submission"},
+        "PolNumber": "POL0001",
+    }
+
+
+def main():
+    transaction = core.TRANSACTIONS["103"]
+    request = Request()
+    number = 20000
+    for fmt in ("json", "xml"):
+        template = core.response_template(transaction, fmt)
+        build = timeit.timeit(
+            lambda: core.serialize(core.build_txlife("103", transaction.process(request)), fmt), number=number)
+        render = timeit.timeit(lambda: template.render(core.slot_values(request)), number=number)
+        print(f"{fmt:<5} build+serialize={build / number * 1e6:8.2f} us  template={render / number * 1e6:8.2f} us")
+
+    number = 200
+    document = core.build_txlife("103", transaction.process(request))
+    legacy = timeit.timeit(lambda: dicttoxml(document, custom_root='TXLife', attr_type=False), number=number)
+    print(f"xml   dicttoxml (previous serializer)={legacy / number * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
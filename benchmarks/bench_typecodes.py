@@ -0,0 +1,84 @@
+"""Cold start and RSS of the mmap typecode registry against a dict loader.
+
+Builds a synthetic set of typecode lists the size of the full ACORD
+lookup tables, then measures each loader in a fresh interpreter.
+
+Run from the repository root: python benchmarks/bench_typecodes.py
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "lambda", "common", "python"))
+
+from acord_core.typecodes import build_index
+
+LISTS = 600
+CODES_PER_LIST = 150
+
+PROBE = r"""
+import json, resource, sys, time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+{load}
+for n in range(0, {lists}, 7):
+    for tc in ("1", "42", "149"):
+        assert lookup("OLI_LU_%d" % n, tc)
+elapsed = time.perf_counter() - start
+status = open("/proc/self/status").read()
+kb = lambda field: int(status.split(field + ":")[1].split()[0])
+print(json.dumps({{"seconds": elapsed, "anon_kb": kb("RssAnon"), "file_kb": kb("RssFile")}}))
+"""
+
+DICT_LOADER = """
+with open({source!r}) as f:
+    lists = json.load(f)["lists"]
+lookup = lambda name, tc: lists[name].get(tc)
+"""
+
+MMAP_LOADER = """
+from acord_core.typecodes import TypeCodeRegistry
+registry = TypeCodeRegistry.open({index!r})
+lookup = registry.description
+"""
+
+BASELINE_LOADER = """
+lookup = lambda name, tc: True
+"""
+
+
+def run(load):
+    code = PROBE.format(path=os.path.join(ROOT, "lambda", "common", "python"), load=load, lists=LISTS)
+    results = [json.loads(subprocess.check_output([sys.executable, "-c", code])) for _ in range(5)]
+    return (min(r["seconds"] for r in results), min(r["anon_kb"] for r in results),
+            min(r["file_kb"] for r in results))
+
+
+def main():
+    source = {"lists": {f"OLI_LU_{n}": {str(tc): f"Typecode {tc} of list {n}" for tc in range(1, CODES_PER_LIST + 1)}
+                        for n in range(LISTS)}}
+    with tempfile.TemporaryDirectory() as tmp:
+        source_path = os.path.join(tmp, "typecodes.json")
+        index_path = os.path.join(tmp, "typecodes.bin")
+        with open(source_path, "w") as f:
+            json.dump(source, f)
+        with open(index_path, "wb") as f:
+            f.write(build_index(source))
+
+        print(f"{LISTS} lists x {CODES_PER_LIST} codes; json {os.path.getsize(source_path)} bytes, "
+              f"index {os.path.getsize(index_path)} bytes")
+        _, baseline_anon, baseline_file = run(BASELINE_LOADER)
+        for name, load in (("dict", DICT_LOADER.format(source=source_path)),
+                           ("mmap", MMAP_LOADER.format(index=index_path))):
+            seconds, anon, file = run(load)
+            # Anonymous memory is the private heap cost; file-backed pages are
+            # shared page cache the kernel can drop under pressure
+            print(f"{name:<5} load+lookups={seconds * 1e3:8.2f} ms  "
+                  f"anon RSS +{anon - baseline_anon:6d} KB  file RSS +{file - baseline_file:6d} KB")
+
+
+if __name__ == "__main__":
+    main()
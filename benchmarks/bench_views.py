@@ -0,0 +1,66 @@
+"""203 inquiries answered from materialized views against building the response.
+
+Records pending cases of growing size through the 302 handler, then times
+203 inquiries through the 203 handler twice: as configured, answered from
+the case's view, and with views switched off so each inquiry queries the
+case store and builds and serializes the response.
+
+Run from the repository root: python benchmarks/bench_views.py
+"""
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "lambda", "common", "python"))
+
+from acord_core import casestore, core
+
+PARTIES = (1, 50, 500)
+REPEAT = 300
+
+
+def olife(pol_number, parties):
+    return {
+        "Holding": {"id": "Holding_1", "Policy": {"PolNumber": pol_number, "CarrierCode": "C01",
+                                                  "PolicyStatus": {"tc": "12"}}},
+        "Party": [{"id": f"Party_{n}", "FullName": f"Party {n}", "GovtID": f"{n:09d}",
+                   "Address": {"Line1": f"{n} Main Street", "City": "Hartford", "Zip": "06101"}}
+                  for n in range(parties)],
+    }
+
+
+def event(code, olife, fmt):
+    body = {"TXLife": {"TXLifeRequest": {"TransRefGUID": "guid-1", "TransType": {"tc": code}, "OLifE": olife}}}
+    return {"body": json.dumps(body), "headers": {"Accept": f"application/{fmt}"}}
+
+
+def timed(request):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        response = core.handle_event(request, None, "203")
+        assert response["statusCode"] == 200
+    return (time.perf_counter() - started) / REPEAT
+
+
+def main():
+    store = casestore._default_store = casestore.MemoryCaseStore()
+    core.TRANSACTIONS["302"] = core.make_transaction("302", "Pending Case Status Update")
+    inquiry = core.TRANSACTIONS["203"] = core.status_inquiry()
+    print(f"{'parties':>8} {'format':>7} {'built ms':>9} {'view ms':>9} {'speedup':>8}")
+    for parties in PARTIES:
+        pol_number = f"POL{parties:08d}"
+        assert core.handle_event(event("302", olife(pol_number, parties), "json"), None, "302")["statusCode"] == 200
+        for fmt in ("json", "xml"):
+            request = event("203", {"Holding": {"Policy": {"PolNumber": pol_number}}}, fmt)
+            from_view = timed(request)
+            store.view = lambda pol_number, fmt: None
+            built = timed(request)
+            del store.view
+            print(f"{parties:>8} {fmt:>7} {built * 1e3:>9.3f} {from_view * 1e3:>9.3f} {built / from_view:>7.1f}x")
+    assert isinstance(inquiry, core.CaseViewInquiry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import boto3
+import logging
+
+from acord_core.batch import handle_batch_event
+from acord_core.priming import prime
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Build the per-container caches during INIT rather than on the first request
+prime("batch")
+
+def handler(event, context):
+    return handle_batch_event(event, context)
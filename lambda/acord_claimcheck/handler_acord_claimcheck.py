@@ -0,0 +1,11 @@
+import boto3
+import logging
+
+from acord_core.claimcheck import handle_upload_event
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def handler(event, context):
+    return handle_upload_event(event, context)
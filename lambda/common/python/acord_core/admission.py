@@ -0,0 +1,114 @@
+"""Admission control and load shedding for downstream work.
+
+Each container tracks the latency of its recent downstream calls (an
+exponentially weighted moving average) and how many are in flight. Its
+load is the larger of latency over ``LATENCY_SLO_MS`` and in-flight calls
+over ``MAX_IN_FLIGHT``. A transaction type is shed, with
+``Overloaded`` and a ``Retry-After`` hint, once the load reaches its
+``SHED_AT`` level. Status polls (203) go first and new business (103)
+last.
+
+While a type is being shed, one request per ``PROBE_INTERVAL`` is still
+let through so that the latency estimate keeps following the downstream
+system and admission resumes once it recovers.
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_SLO_MS = int(os.environ.get('ACORD_LATENCY_SLO_MS', '2000'))
+MAX_IN_FLIGHT = int(os.environ.get('ACORD_MAX_IN_FLIGHT', '32'))
+PROBE_INTERVAL = float(os.environ.get('ACORD_PROBE_INTERVAL', '1'))
+
+# Load at which each transaction type starts being shed, lowest priority first
+SHED_AT = {
+    '203': 0.75,
+    '302': 1.0,
+    '1125': 1.0,
+    '103': 1.5,
+}
+DEFAULT_SHED_AT = 1.0
+
+# Weight of the newest sample in the latency average
+SMOOTHING = 0.3
+MAX_RETRY_AFTER = 60
+
+
+class Overloaded(Exception):
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+
+    def __init__(self, slo=None, max_in_flight=None, shed_at=None, probe_interval=None, clock=time.monotonic):
+        self.slo = LATENCY_SLO_MS / 1000 if slo is None else slo
+        self.max_in_flight = MAX_IN_FLIGHT if max_in_flight is None else max_in_flight
+        self.shed_at = dict(SHED_AT, **(shed_at or {}))
+        self.probe_interval = PROBE_INTERVAL if probe_interval is None else probe_interval
+        self.clock = clock
+        self.latency = 0.0
+        self.in_flight = 0
+        self._probes = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        return max(self.latency / self.slo, self.in_flight / self.max_in_flight)
+
+    def retry_after(self):
+        """Seconds a shed client should wait, from the current latency estimate."""
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(self.latency), math.ceil(self.probe_interval)))
+
+    def _admit(self, code):
+        load = self.load()
+        if load < self.shed_at.get(code, DEFAULT_SHED_AT):
+            self._probes.pop(code, None)
+            return True
+        # The first probe goes out an interval after shedding starts
+        now = self.clock()
+        if now - self._probes.setdefault(code, now) >= self.probe_interval:
+            self._probes[code] = now
+            return True
+        return False
+
+    @contextmanager
+    def admit(self, code):
+        """Count the block as in flight, or raise ``Overloaded`` to shed it."""
+        with self._lock:
+            if not self._admit(code):
+                raise Overloaded(f"ACORD {code} requests are being shed at load {self.load():.2f}",
+                                 self.retry_after())
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def observe(self, seconds):
+        with self._lock:
+            self.latency += SMOOTHING * (seconds - self.latency)
+
+    @contextmanager
+    def timed(self):
+        """Record how long the block takes as a downstream latency sample."""
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.observe(self.clock() - started)
+
+
+_default_controller = None
+
+
+def default_controller():
+    """The per-container controller."""
+    global _default_controller
+    if _default_controller is None:
+        _default_controller = AdmissionController()
+    return _default_controller
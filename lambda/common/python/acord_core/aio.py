@@ -0,0 +1,72 @@
+"""Persistent asyncio event loop for the handlers of a container.
+
+The Lambda entry points stay synchronous. Coroutines are handed to
+``run``, which executes them on one event loop that lives, in a daemon
+thread, for the life of the container, so connections opened by
+``httpclient`` stay pooled across warm invocations. Any thread may call
+``run``; batch workers and the request executor share the same loop.
+
+Blocking calls such as boto3 go through ``run_blocking`` so that they
+wait in an executor thread rather than on the loop.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BLOCKING_WORKERS = int(os.environ.get('ACORD_BLOCKING_WORKERS', '8'))
+
+_loop = None
+_lock = threading.Lock()
+_blocking_executor = None
+
+
+def get_loop():
+    """The container's event loop, started on first use."""
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='acord-event-loop', daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run(coroutine, timeout=None):
+    """Run ``coroutine`` on the container loop and return its result.
+
+    Must not be called from the loop itself; coroutines there await instead.
+    """
+    loop = get_loop()
+    future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def _get_blocking_executor():
+    global _blocking_executor
+    if _blocking_executor is None:
+        _blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix='acord-blocking')
+    return _blocking_executor
+
+
+def carry_context(func):
+    """``func`` to be run on another thread with the caller's context variables.
+
+    Executors run their work in the worker thread's own context; each call
+    of the returned function runs in a copy of the caller's instead.
+    """
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(func, *args)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Await ``func(*args, **kwargs)`` run in the blocking-call executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_blocking_executor(), functools.partial(func, *args, **kwargs))
@@ -0,0 +1,222 @@
+"""Spooling of large base64 attachments to local storage.
+
+103 submissions carry ``Attachment/AttachmentData`` as base64 text, often
+several megabytes per document. When a request body is parsed, each large
+``AttachmentData`` value is located in the raw text, decoded a chunk at a
+time straight into a spool file under ``SPOOL_DIR`` and replaced in the
+parsed document by a ``SpooledAttachment`` handle, so the decoded bytes
+never sit in memory and the document holds no large strings.
+
+Handles serialize as a small reference (``to_dict``) rather than the
+attachment bytes, and their spool files are removed when the request is
+closed or the handle is garbage collected. A document sent on downstream
+goes out as a ``JSONBody``, which reads each attachment back from its
+spool file as base64 while the body is written.
+"""
+import binascii
+import json
+import os
+import re
+import tempfile
+import uuid
+import weakref
+
+from acord_core.errors import BadRequest, PayloadTooLarge
+from acord_core.extract import _skip_string
+
+SPOOL_DIR = os.environ.get('ACORD_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'acord-spool'))
+SPOOL_THRESHOLD = int(os.environ.get('ACORD_SPOOL_THRESHOLD', str(64 * 1024)))
+
+_KEY = '"AttachmentData"'
+_VALUE_START = re.compile(r'\s*:\s*"')
+
+# Base64 characters decoded per write; a multiple of 4
+_CHUNK = 256 * 1024
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SpooledAttachment:
+    """Handle to a decoded attachment in a spool file."""
+
+    __slots__ = ('path', 'size', '_finalizer', '__weakref__')
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._finalizer = weakref.finalize(self, _remove, path)
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def read(self):
+        with self.open() as f:
+            return f.read()
+
+    def iter_base64(self, chunk_size=_CHUNK // 4 * 3):
+        """Yield the attachment as base64 text, one chunk at a time."""
+        with self.open() as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield binascii.b2a_base64(chunk, newline=False).decode('ascii')
+
+    @property
+    def encoded_size(self):
+        """Length of the attachment as base64 text."""
+        return (self.size + 2) // 3 * 4
+
+    def to_dict(self):
+        return {'SpooledAttachment': {'Size': self.size}}
+
+    def close(self):
+        self._finalizer()
+
+    def __repr__(self):
+        return f"SpooledAttachment({self.path!r}, size={self.size})"
+
+
+def _spool(raw, start, end):
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=SPOOL_DIR, suffix='.bin')
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if raw.find('\\', start, end) == -1:
+                for chunk_start in range(start, end, _CHUNK):
+                    chunk = raw[chunk_start:min(chunk_start + _CHUNK, end)]
+                    data = binascii.a2b_base64(chunk)
+                    # a2b_base64 skips characters outside the alphabet, which
+                    # shows up as fewer bytes than the chunk length implies
+                    if len(data) != len(chunk) // 4 * 3 - chunk[-2:].count('='):
+                        raise ValueError("invalid base64 characters")
+                    f.write(data)
+                    size += len(data)
+            else:
+                # Escaped slashes or line breaks: decode the unescaped value in one go
+                data = binascii.a2b_base64(json.loads(raw[start - 1:end + 1]))
+                f.write(data)
+                size = len(data)
+    except (binascii.Error, ValueError) as e:
+        _remove(path)
+        raise BadRequest(f"Malformed AttachmentData: {e}")
+    except OSError as e:
+        _remove(path)
+        raise PayloadTooLarge(f"Attachments exceed the spool storage: {e}")
+    return SpooledAttachment(path, size)
+
+
+def spool(raw):
+    """Spool large AttachmentData values in ``raw``.
+
+    Returns the JSON text with each spooled value replaced by a placeholder
+    and the handles, in order of appearance.
+    """
+    token = uuid.uuid4().hex
+    handles = []
+    parts = []
+    position = 0
+    index = raw.find(_KEY)
+    try:
+        while index != -1:
+            match = _VALUE_START.match(raw, index + len(_KEY))
+            if match is None or raw[index - 1] == '\\':
+                index = raw.find(_KEY, index + len(_KEY))
+                continue
+            start = match.end()
+            try:
+                end = _skip_string(raw, start - 1) - 1
+            except ValueError as e:
+                raise BadRequest(f"Malformed JSON body: {e}")
+            if end - start >= SPOOL_THRESHOLD:
+                handles.append(_spool(raw, start, end))
+                parts.append(raw[position:start - 1])
+                parts.append('{"$spool": "%s:%d"}' % (token, len(handles) - 1))
+                position = end + 1
+            index = raw.find(_KEY, end + 1)
+    except BadRequest:
+        for handle in handles:
+            handle.close()
+        raise
+    parts.append(raw[position:])
+    return ''.join(parts), token, handles
+
+
+def load(raw):
+    """Parse a JSON body, spooling large attachments. Returns ``(document, handles)``."""
+    if not isinstance(raw, str) or len(raw) < SPOOL_THRESHOLD or _KEY not in raw:
+        return json.loads(raw), []
+    text, token, handles = spool(raw)
+    if not handles:
+        return json.loads(raw), []
+    prefix = token + ':'
+
+    def restore(obj):
+        reference = obj.get('$spool')
+        if len(obj) == 1 and isinstance(reference, str) and reference.startswith(prefix):
+            return handles[int(reference[len(prefix):])]
+        return obj
+    try:
+        return json.loads(text, object_hook=restore), handles
+    except ValueError:
+        for handle in handles:
+            handle.close()
+        raise
+
+
+def without_spooled(document):
+    """A copy of ``document`` with every spooled ``AttachmentData`` left out.
+
+    For documents kept past the request: the handles point at spool files
+    of this container that are removed when the request is closed.
+    """
+    if isinstance(document, dict):
+        return {key: without_spooled(value) for key, value in document.items()
+                if not isinstance(value, SpooledAttachment)}
+    if isinstance(document, list):
+        return [without_spooled(item) for item in document if not isinstance(item, SpooledAttachment)]
+    return document
+
+
+class JSONBody:
+    """A document as a JSON request body, with spooled attachments inlined again.
+
+    Iterating yields the body as bytes chunks, each attachment streamed
+    from its spool file as base64 text; it can be iterated again for a
+    retry. ``len()`` is the body's length in bytes, known up front.
+    ``default`` serializes anything else JSON cannot, as in ``json.dumps``.
+    """
+
+    def __init__(self, document, default=None):
+        token = uuid.uuid4().hex
+        self.handles = []
+
+        def placeholder(value):
+            if isinstance(value, SpooledAttachment):
+                self.handles.append(value)
+                return '%s:%d' % (token, len(self.handles) - 1)
+            if default is None:
+                raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+            return default(value)
+
+        text = json.dumps(document, default=placeholder)
+        # Alternating text between attachments and attachment indexes
+        self._parts = re.split(r'"%s:(\d+)"' % token, text)
+        self._length = len(text.encode('utf-8')) + sum(
+            handle.encoded_size + 2 - len('"%s:%d"' % (token, index)) for index, handle in enumerate(self.handles))
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for index, part in enumerate(self._parts):
+            if index % 2 == 0:
+                yield part.encode('utf-8')
+                continue
+            yield b'"'
+            for chunk in self.handles[int(part)].iter_base64():
+                yield chunk.encode('ascii')
+            yield b'"'
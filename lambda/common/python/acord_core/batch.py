@@ -0,0 +1,139 @@
+"""Bulk submission of ACORD transactions through ``/acord/batch``.
+
+The request body is a JSON array of ``TXLife`` documents, which may mix
+transaction types. Each element is routed on its ``TransType`` to the same
+``Transaction`` logic used by the single-transaction endpoints and the
+elements run concurrently on a bounded thread pool. The response is a 207
+multi-status document with one result per element, in input order.
+
+Elements not started before the invocation deadline, or shed by
+admission control, are answered with a 503 result, so a client can
+resubmit just those rather than the whole batch. Elements started but not
+finished by then are answered with a 504: their outcome is unknown, and
+the client checks on them before resubmitting.
+"""
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from acord_core import admission, aio, priming
+from acord_core.compression import encode_response, request_body
+from acord_core.core import (
+    AcordRequest,
+    BadRequest,
+    error_response,
+    get_header,
+    respond,
+    response_format,
+    serialize,
+)
+from acord_core.deadline import Deadline, DeadlineExceeded, OutcomeUnknown
+from acord_core.limits import Limits, check_text
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = int(os.environ.get('ACORD_BATCH_MAX_SIZE', '500'))
+MAX_WORKERS = int(os.environ.get('ACORD_BATCH_WORKERS', '16'))
+
+LIMITS = Limits.for_type('batch')
+
+# Reused across warm invocations of the container
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='acord-batch')
+    return _executor
+
+
+def unprocessed_result(index):
+    return {'index': index, 'status': 503,
+            'body': {'error': 'Service Unavailable', 'message': "Not processed before the invocation deadline"}}
+
+
+def outcome_unknown_result(index):
+    return {'index': index, 'status': 504,
+            'body': {'error': 'Gateway Timeout',
+                     'message': "Not finished before the invocation deadline; outcome unknown"}}
+
+
+def process_element(index, document, deadline=None):
+    if deadline is not None and deadline.expired():
+        return unprocessed_result(index)
+    try:
+        request = AcordRequest.from_document(document)
+        # Elements already run on the batch pool, so any TXLifeRequest list
+        # inside one is processed in turn rather than on a nested pool.
+        with admission.default_controller().admit(request.trans_type_code):
+            body = respond(request, deadline=deadline)
+        result = {'index': index, 'status': 200}
+        if 'TransRefGUID' in request.fields:
+            result['TransRefGUID'] = request.fields['TransRefGUID']
+        result['body'] = body
+        return result
+    except BadRequest as e:
+        return {'index': index, 'status': 400, 'body': {'error': 'Bad Request', 'message': str(e)}}
+    except OutcomeUnknown:
+        return outcome_unknown_result(index)
+    except DeadlineExceeded:
+        return unprocessed_result(index)
+    except admission.Overloaded as e:
+        return {'index': index, 'status': 503, 'retryAfter': e.retry_after,
+                'body': {'error': 'Service Unavailable', 'message': str(e)}}
+    except Exception as e:
+        logger.error(f"Error processing batch element {index}: {str(e)}")
+        return {'index': index, 'status': 500, 'body': {'error': 'Internal Server Error'}}
+
+
+def process_batch(documents, deadline=None):
+    deadline = deadline or Deadline()
+    executor = _get_executor()
+    process = aio.carry_context(process_element)
+    futures = [executor.submit(process, index, document, deadline) for index, document in enumerate(documents)]
+    # Elements still queued or running at the deadline are reported, not awaited
+    wait(futures, timeout=deadline.timeout())
+    results = []
+    for index, future in enumerate(futures):
+        if future.cancel():
+            results.append(unprocessed_result(index))
+        elif future.done():
+            results.append(future.result())
+        else:
+            results.append(outcome_unknown_result(index))
+    return results
+
+
+def handle_batch_event(event, context):
+    if priming.is_warmup(event):
+        return priming.warm_up_response('batch')
+    try:
+        body = request_body(event, LIMITS.max_body_size)
+        check_text(body, LIMITS)
+        documents = json.loads(body)
+    except BadRequest as e:
+        return error_response(e.status_code, e.error, str(e))
+    except ValueError as e:
+        return error_response(400, 'Bad Request', f"Malformed JSON body: {e}")
+    if not isinstance(documents, list):
+        return error_response(400, 'Bad Request', "Batch body must be a JSON array of TXLife documents")
+    if len(documents) > MAX_BATCH_SIZE:
+        return error_response(413, 'Payload Too Large', f"Batch exceeds {MAX_BATCH_SIZE} elements")
+
+    logger.info(f"Received ACORD batch of {len(documents)} requests")
+    results = process_batch(documents, Deadline.from_context(context))
+    failed = sum(1 for result in results if result['status'] != 200)
+    logger.info(f"Processed ACORD batch: {len(results) - failed} succeeded, {failed} failed")
+
+    accept_header = get_header(event, 'Accept', 'application/json')
+    response_body, content_type = serialize({'results': results}, response_format(accept_header), root='MultiStatus',
+                                            max_nodes=LIMITS.max_nodes)
+    return encode_response({
+        'statusCode': 207,
+        'headers': {
+            'Content-Type': content_type
+        },
+        'body': response_body
+    }, get_header(event, 'Accept-Encoding'), accept=get_header(event, 'Accept'))
@@ -0,0 +1,865 @@
+"""Store of pending cases written by 103 and 302 requests and read by 203 inquiries.
+
+A case is keyed by its PolNumber and carries the attributes inquiries
+select on: the producer (``CompanyProducerID``), the ``CarrierCode`` and
+the ``PolicyStatus`` tc, each with a secondary index. A 103 records the
+case; a 302 usually carries only what changed, so ``update()`` merges it
+into the stored case (see ``merge_case``) and writes the result back only
+if no other write came in between, incrementing its ``Version``. A 203 is
+a key lookup, and the listing of a producer's, carrier's or status's cases
+an indexed query, most recently updated first. Nothing scans the cases.
+
+A case may also carry ``Views``: its 203 response pre-serialized per
+output format (see ``core.case_views``). They are written in the same
+upsert as the case, so a view always belongs to the ``Version`` stored
+with it, and ``view()`` reads one back by key without the case itself.
+
+Every upsert also moves the case to the end of its producer's change feed,
+which ``changes()`` reads on from a position: the producer's cases in
+update order, so a delta costs the number of cases changed rather than
+the size of the producer's book. A case moved to another producer leaves
+a removal (see ``removal``) in the feed of the one it had, so a client
+following that feed drops it. Positions are store specific;
+``encode_cursor`` turns them into the opaque cursors clients hold.
+
+``pol_numbers(since)`` lists the cases written since an ``UpdatedAt``,
+the incremental feed of the policy filter (see ``polfilter``).
+
+``DynamoCaseStore`` is the store in AWS: the table the stack provisions,
+with a global secondary index per attribute and one on the day of the
+update (``UpdatedDay``) for that feed. ``SQLiteCaseStore`` and
+``MemoryCaseStore`` stand in for it locally and in tests.
+"""
+import base64
+import binascii
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import date, datetime, timedelta, timezone
+
+from acord_core.graph import ObjectGraph
+
+logger = logging.getLogger(__name__)
+
+TABLE = os.environ.get('ACORD_CASE_TABLE')
+DATABASE = os.environ.get('ACORD_CASE_DATABASE')
+DYNAMODB_TIMEOUT = int(os.environ.get('ACORD_DYNAMODB_TIMEOUT', '3'))
+# DynamoDB change feeds only return updates at least this many seconds old
+CHANGE_SETTLE = float(os.environ.get('ACORD_CHANGE_SETTLE', '2'))
+
+# Secondary index -> case attribute
+INDEXES = {
+    'producer': 'Producer',
+    'carrier': 'CarrierCode',
+    'status': 'Status',
+}
+ATTRIBUTES = tuple(INDEXES.values())
+
+VIEW_FORMATS = ('json', 'xml')
+
+# DynamoDB items are at most 400 KB: documents larger than
+# COMPRESS_DOCUMENT_SIZE are stored compressed, and a case whose item would
+# still be over MAX_ITEM_SIZE is stored without its views
+COMPRESS_DOCUMENT_SIZE = int(os.environ.get('ACORD_CASE_COMPRESS_SIZE', str(16 * 1024)))
+MAX_ITEM_SIZE = int(os.environ.get('ACORD_CASE_MAX_ITEM_SIZE', str(380 * 1024)))
+
+# Read-modify-write attempts of ``update()`` before a conflict is raised
+UPDATE_ATTEMPTS = int(os.environ.get('ACORD_CASE_UPDATE_ATTEMPTS', '5'))
+
+# Partitions per day of the DynamoDB UpdatedDay index, so a day's writes
+# are not all on one partition
+FEED_SHARDS = 4
+
+
+class UnknownIndex(ValueError):
+    pass
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class VersionConflict(Exception):
+    """The case was written by someone else since it was read."""
+
+
+class CaseTooLarge(ValueError):
+    """The case is too large for the store."""
+
+
+def encode_cursor(position):
+    """The opaque cursor for a change feed ``position``."""
+    return base64.urlsafe_b64encode(json.dumps([position]).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        position, = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor(f"Invalid cursor {cursor!r}")
+    if not isinstance(position, (int, str)) or isinstance(position, bool):
+        raise InvalidCursor(f"Invalid cursor {cursor!r}")
+    return position
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _text(value):
+    if isinstance(value, dict):
+        value = value.get('tc')
+    return str(value) if isinstance(value, (str, int)) and value != '' else None
+
+
+def case_from_olife(olife, graph=None):
+    """The case a 302's OLifE describes, or None without a PolNumber.
+
+    ``graph`` is the OLifE's ``ObjectGraph`` if the request already built
+    one. The Producer is that of a party related to the policy's Holding,
+    or failing one, of any party.
+    """
+    graph = ObjectGraph.from_olife(olife) if graph is None else graph
+    holdings = graph.aggregates('Holding')
+    policy = holdings[0].get('Policy') if holdings else None
+    if not isinstance(policy, dict) or _text(policy.get('PolNumber')) is None:
+        return None
+    case = {
+        'PolNumber': _text(policy['PolNumber']),
+        'Producer': None,
+        'CarrierCode': _text(policy.get('CarrierCode')),
+        'Status': _text(policy.get('PolicyStatus')),
+        'OLifE': olife,
+    }
+    holding_id = holdings[0].get('id')
+    related = graph.parties(holding_id) if isinstance(holding_id, str) else []
+    for party in itertools.chain(related, graph.aggregates('Party')):
+        producer = party.get('Producer')
+        if isinstance(producer, dict):
+            for appointment in _as_list(producer.get('CarrierAppointment')):
+                if isinstance(appointment, dict) and _text(appointment.get('CompanyProducerID')):
+                    case['Producer'] = _text(appointment['CompanyProducerID'])
+                    return case
+    return case
+
+
+def _pol_number(holding):
+    policy = holding.get('Policy')
+    return _text(policy.get('PolNumber')) if isinstance(policy, dict) else None
+
+
+def _merge(stored, update):
+    # Nested objects merge; anything else in ``update`` replaces what is stored
+    merged = dict(stored)
+    for name, value in update.items():
+        current = merged.get(name)
+        merged[name] = _merge(current, value) if isinstance(current, dict) and isinstance(value, dict) else value
+    return merged
+
+
+def _matching(aggregates, aggregate):
+    # The stored aggregate ``aggregate`` updates: the one with its id, else
+    # the Holding with its PolNumber, else the only one stored
+    object_id = aggregate.get('id')
+    if object_id is not None:
+        return next((n for n, item in enumerate(aggregates) if isinstance(item, dict) and item.get('id') == object_id),
+                    None)
+    pol_number = _pol_number(aggregate)
+    if pol_number is not None:
+        for n, item in enumerate(aggregates):
+            if isinstance(item, dict) and _pol_number(item) == pol_number:
+                return n
+    if len(aggregates) == 1 and isinstance(aggregates[0], dict):
+        return 0
+    return None
+
+
+def merge_olife(stored, update):
+    """``stored`` with what ``update`` carries merged in; what it leaves out is kept.
+
+    Aggregates (Party, Holding, Relation, ...) are matched by id, a Holding
+    without one by PolNumber; matched ones are merged, others added.
+    """
+    merged = dict(stored)
+    for name, value in update.items():
+        current = merged.get(name)
+        if not isinstance(current, (dict, list)) or not isinstance(value, (dict, list)):
+            merged[name] = value
+            continue
+        aggregates = list(_as_list(current))
+        for aggregate in _as_list(value):
+            match = _matching(aggregates, aggregate) if isinstance(aggregate, dict) else None
+            if match is None:
+                aggregates.append(aggregate)
+            else:
+                aggregates[match] = _merge(aggregates[match], aggregate)
+        single = len(aggregates) == 1 and not isinstance(current, list) and not isinstance(value, list)
+        merged[name] = aggregates[0] if single else aggregates
+    return merged
+
+
+def merge_case(stored, update):
+    """The case ``stored`` becomes with the 302 ``update`` applied.
+
+    Its attributes are those of the merged OLifE, so one the update does
+    not carry (such as the producer's party) keeps its stored value.
+    """
+    return case_from_olife(merge_olife(stored['OLifE'], update['OLifE']))
+
+
+def _item_size(attributes):
+    # What DynamoDB counts of an item: attribute names and values, in bytes
+    return sum(len(name) + len(value.encode('utf-8') if isinstance(value, str) else value)
+               for name, value in attributes if value is not None)
+
+
+def removal(pol_number, producer, version, updated_at):
+    """The entry a feed has for a case moved away from ``producer`` at ``Version`` ``version``."""
+    return {'PolNumber': pol_number, 'Producer': producer, 'Version': version, 'UpdatedAt': updated_at,
+            'Removed': True}
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='microseconds')
+
+
+def feed_partition(pol_number, updated_at, shard=None):
+    """The ``UpdatedDay`` of a case: the UTC day of ``updated_at`` and a shard of its PolNumber."""
+    if shard is None:
+        shard = zlib.crc32(pol_number.encode('utf-8')) % FEED_SHARDS
+    return f"{updated_at[:10]}#{shard}"
+
+
+def _attribute(index):
+    attribute = INDEXES.get(index)
+    if attribute is None:
+        raise UnknownIndex(f"No case index {index!r}; use one of {', '.join(INDEXES)}")
+    return attribute
+
+
+class CaseStore:
+    """Interface of the stores; cases are dicts as built by ``case_from_olife``."""
+
+    def get(self, pol_number):
+        """The case for ``pol_number`` with its ``Version`` and ``UpdatedAt``, or None."""
+        raise NotImplementedError
+
+    def put(self, case, version=None):
+        """Upsert ``case`` and its ``Views``; return it as stored, with its new ``Version``.
+
+        With ``version`` it is only written if the stored case is still at
+        that ``Version`` (0: not stored at all); ``VersionConflict`` otherwise.
+        """
+        raise NotImplementedError
+
+    def update(self, case, merge=True, views=None, attempts=None):
+        """Write ``case`` over the stored one, merged into it unless not ``merge``.
+
+        ``views(case)`` gives the ``Views`` of the case to be written. The
+        stored case is read, the result written if it is still at the
+        ``Version`` read, and the whole retried when another write got in
+        between, up to ``attempts`` times.
+        """
+        attempts = UPDATE_ATTEMPTS if attempts is None else attempts
+        for attempt in range(1, attempts + 1):
+            stored = self.get(case['PolNumber'])
+            written = merge_case(stored, case) if merge and stored is not None else dict(case)
+            if views is not None:
+                written['Views'] = views(written)
+            try:
+                return self.put(written, stored['Version'] if stored is not None else 0)
+            except VersionConflict:
+                if attempt == attempts:
+                    raise
+
+    def view(self, pol_number, fmt):
+        """``(version, view)`` of the case's view in ``fmt``, or None."""
+        raise NotImplementedError
+
+    def pol_numbers(self, since=None):
+        """PolNumbers of every case, or of those updated after the ``since`` UpdatedAt.
+
+        Listing every case reads the whole store; containers only ask for
+        the recent ones.
+        """
+        raise NotImplementedError
+
+    def changes(self, producer, after=None, limit=None):
+        """``(cases, position, more)``: the producer's cases changed after ``after``.
+
+        Cases come oldest change first, at most ``limit`` of them; reading
+        on from ``position`` returns the rest (``more``) and later changes.
+        With ``after`` None the whole feed is read. Cases since moved to
+        another producer come as their ``removal``.
+        """
+        raise NotImplementedError
+
+    def query(self, index, value, limit=None):
+        """Cases whose ``index`` attribute is ``value``, most recently updated first."""
+        raise NotImplementedError
+
+
+class MemoryCaseStore(CaseStore):
+
+    def __init__(self):
+        # PolNumber -> (producer, carrier, status, version, updated at, OLifE JSON, views)
+        self._cases = {}
+        self._indexes = {attribute: {} for attribute in ATTRIBUTES}
+        # Producer -> {PolNumber: (sequence, removal or None)} in sequence order, the change feeds
+        self._sequence = 0
+        self._changes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _case(pol_number, record):
+        producer, carrier, status, version, updated_at, document, _ = record
+        return {'PolNumber': pol_number, 'Producer': producer, 'CarrierCode': carrier, 'Status': status,
+                'Version': version, 'UpdatedAt': updated_at, 'OLifE': json.loads(document)}
+
+    def get(self, pol_number):
+        record = self._cases.get(pol_number)
+        return None if record is None else self._case(pol_number, record)
+
+    def put(self, case, version=None):
+        pol_number = case['PolNumber']
+        values = tuple(case.get(attribute) for attribute in ATTRIBUTES)
+        document = json.dumps(case.get('OLifE') or {})
+        with self._lock:
+            previous = self._cases.get(pol_number)
+            stored_version = previous[3] if previous else 0
+            if version is not None and version != stored_version:
+                raise VersionConflict(f"Case {pol_number} is at version {stored_version}, not {version}")
+            version = stored_version + 1
+            for attribute, old, new in zip(ATTRIBUTES, previous or (None,) * 3, values):
+                if old == new:
+                    continue
+                index = self._indexes[attribute]
+                if old is not None:
+                    index[old].discard(pol_number)
+                if new is not None:
+                    index.setdefault(new, set()).add(pol_number)
+            self._sequence += 1
+            now = _now()
+            if previous is not None and previous[0] is not None:
+                feed = self._changes[previous[0]]
+                feed.pop(pol_number, None)
+                if previous[0] != values[0]:
+                    feed[pol_number] = (self._sequence, removal(pol_number, previous[0], version, now))
+            if values[0] is not None:
+                feed = self._changes.setdefault(values[0], {})
+                feed.pop(pol_number, None)
+                feed[pol_number] = (self._sequence, None)
+            record = self._cases[pol_number] = values + (version, now, document, dict(case.get('Views') or {}))
+        return self._case(pol_number, record)
+
+    def view(self, pol_number, fmt):
+        record = self._cases.get(pol_number)
+        view = None if record is None else record[6].get(fmt)
+        return None if view is None else (record[3], view)
+
+    def pol_numbers(self, since=None):
+        return [key for key, record in list(self._cases.items()) if since is None or record[4] > since]
+
+    def changes(self, producer, after=None, limit=None):
+        changed = []
+        with self._lock:
+            # Newest first, back to the position
+            for pol_number, (sequence, removed) in reversed(self._changes.get(producer, {}).items()):
+                if after is not None and sequence <= after:
+                    break
+                changed.append((sequence, pol_number, removed))
+        changed.reverse()
+        more = limit is not None and len(changed) > limit
+        changed = changed[:limit]
+        cases = [removed or self.get(pol_number) for _, pol_number, removed in changed]
+        return cases, changed[-1][0] if changed else after, more
+
+    def query(self, index, value, limit=None):
+        keys = self._indexes[_attribute(index)].get(value, ())
+        records = sorted(((key, self._cases[key]) for key in list(keys)), key=lambda item: item[1][4], reverse=True)
+        return [self._case(key, record) for key, record in records[:limit]]
+
+    def __len__(self):
+        return len(self._cases)
+
+
+class SQLiteCaseStore(CaseStore):
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.executescript('''
+                CREATE TABLE IF NOT EXISTS cases (
+                    pol_number TEXT PRIMARY KEY,
+                    producer TEXT,
+                    carrier TEXT,
+                    status TEXT,
+                    version INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    document TEXT NOT NULL,
+                    json_view TEXT,
+                    xml_view TEXT,
+                    sequence INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS cases_producer ON cases (producer, updated_at);
+                CREATE INDEX IF NOT EXISTS cases_carrier ON cases (carrier, updated_at);
+                CREATE INDEX IF NOT EXISTS cases_status ON cases (status, updated_at);
+                CREATE INDEX IF NOT EXISTS cases_sequence ON cases (sequence);
+                CREATE INDEX IF NOT EXISTS cases_updated ON cases (updated_at);
+                CREATE INDEX IF NOT EXISTS cases_changes ON cases (producer, sequence);
+                CREATE TABLE IF NOT EXISTS removals (
+                    producer TEXT NOT NULL,
+                    pol_number TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    sequence INTEGER NOT NULL,
+                    PRIMARY KEY (producer, pol_number)
+                );
+                CREATE INDEX IF NOT EXISTS removals_changes ON removals (producer, sequence);
+            ''')
+
+    _COLUMNS = 'pol_number, producer, carrier, status, version, updated_at, document'
+    _SELECT = f'SELECT {_COLUMNS} FROM cases'
+
+    @staticmethod
+    def _case(row):
+        pol_number, producer, carrier, status, version, updated_at, document = row
+        return {'PolNumber': pol_number, 'Producer': producer, 'CarrierCode': carrier, 'Status': status,
+                'Version': version, 'UpdatedAt': updated_at, 'OLifE': json.loads(document)}
+
+    def get(self, pol_number):
+        with self._lock:
+            row = self._connection.execute(f'{self._SELECT} WHERE pol_number = ?', (pol_number,)).fetchone()
+        return None if row is None else self._case(row)
+
+    @staticmethod
+    def _row(case, now):
+        views = case.get('Views') or {}
+        return (case['PolNumber'],) + tuple(case.get(attribute) for attribute in ATTRIBUTES) + (
+            now, json.dumps(case.get('OLifE') or {})) + tuple(views.get(fmt) for fmt in VIEW_FORMATS)
+
+    # Cases and removals are numbered in one sequence
+    _LAST_SEQUENCE = '''
+        SELECT MAX(COALESCE((SELECT MAX(sequence) FROM cases), 0),
+                   COALESCE((SELECT MAX(sequence) FROM removals), 0))
+    '''
+
+    def put(self, case, version=None):
+        pol_number, producer = case['PolNumber'], case.get('Producer')
+        now = _now()
+        row = self._row(case, now)
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                previous = self._connection.execute(
+                    'SELECT producer, version FROM cases WHERE pol_number = ?', (pol_number,)).fetchone()
+                stored_version = previous[1] if previous else 0
+                if version is not None and version != stored_version:
+                    raise VersionConflict(f"Case {pol_number} is at version {stored_version}, not {version}")
+                last, = self._connection.execute(self._LAST_SEQUENCE).fetchone()
+                sequence = last + 1
+                self._connection.execute('''
+                    INSERT INTO cases (pol_number, producer, carrier, status, updated_at, document,
+                                       json_view, xml_view, version, sequence)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (pol_number) DO UPDATE SET
+                        producer = excluded.producer, carrier = excluded.carrier, status = excluded.status,
+                        version = excluded.version, updated_at = excluded.updated_at, document = excluded.document,
+                        json_view = excluded.json_view, xml_view = excluded.xml_view, sequence = excluded.sequence
+                ''', row + (stored_version + 1, sequence))
+                if previous is not None and previous[0] is not None and previous[0] != producer:
+                    self._connection.execute(
+                        'INSERT OR REPLACE INTO removals VALUES (?, ?, ?, ?, ?)',
+                        (previous[0], pol_number, stored_version + 1, now, sequence))
+                if producer is not None:
+                    self._connection.execute('DELETE FROM removals WHERE producer = ? AND pol_number = ?',
+                                             (producer, pol_number))
+                self._connection.execute('COMMIT')
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            row = self._connection.execute(f'{self._SELECT} WHERE pol_number = ?', (pol_number,)).fetchone()
+        return self._case(row)
+
+    def put_many(self, cases):
+        """Bulk load new cases in one transaction, e.g. to seed a local store."""
+        now = _now()
+        with self._lock:
+            self._connection.execute('BEGIN')
+            last, = self._connection.execute(self._LAST_SEQUENCE).fetchone()
+            rows = (self._row(case, now) + (sequence,) for sequence, case in enumerate(cases, last + 1))
+            self._connection.executemany('INSERT INTO cases VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?)', rows)
+            self._connection.execute('COMMIT')
+
+    def query(self, index, value, limit=None):
+        # Index names are the column names
+        _attribute(index)
+        sql = f'{self._SELECT} WHERE {index} = ? ORDER BY updated_at DESC'
+        parameters = (value,)
+        if limit is not None:
+            sql += ' LIMIT ?'
+            parameters += (limit,)
+        with self._lock:
+            rows = self._connection.execute(sql, parameters).fetchall()
+        return [self._case(row) for row in rows]
+
+    def view(self, pol_number, fmt):
+        if fmt not in VIEW_FORMATS:
+            return None
+        with self._lock:
+            row = self._connection.execute(f'SELECT version, {fmt}_view FROM cases WHERE pol_number = ?',
+                                           (pol_number,)).fetchone()
+        return None if row is None or row[1] is None else (row[0], row[1])
+
+    def pol_numbers(self, since=None):
+        with self._lock:
+            if since is None:
+                rows = self._connection.execute('SELECT pol_number FROM cases').fetchall()
+            else:
+                rows = self._connection.execute('SELECT pol_number FROM cases WHERE updated_at > ?',
+                                                (since,)).fetchall()
+        return [row[0] for row in rows]
+
+    # Removals are the rows without a document
+    _CHANGES = f'''
+        SELECT {_COLUMNS}, sequence FROM cases WHERE producer = ? AND sequence > ?
+        UNION ALL
+        SELECT pol_number, producer, NULL, NULL, version, updated_at, NULL, sequence FROM removals
+        WHERE producer = ? AND sequence > ?
+        ORDER BY sequence
+    '''
+
+    def changes(self, producer, after=None, limit=None):
+        sql, parameters = self._CHANGES, (producer, after or 0) * 2
+        if limit is not None:
+            sql += ' LIMIT ?'
+            parameters += (limit + 1,)
+        with self._lock:
+            rows = self._connection.execute(sql, parameters).fetchall()
+        more = limit is not None and len(rows) > limit
+        rows = rows[:limit]
+        cases = [self._case(row[:-1]) if row[6] is not None else removal(*row[:2], row[4], row[5]) for row in rows]
+        return cases, rows[-1][-1] if rows else after, more
+
+    def explain(self, index):
+        """SQLite's query plan for ``query(index, ...)``, to check it uses the index.
+
+        ``explain('changes')`` is the plan of ``changes()``.
+        """
+        if index == 'changes':
+            sql, parameters = self._CHANGES, ('', 0) * 2
+        else:
+            _attribute(index)
+            sql, parameters = f'{self._SELECT} WHERE {index} = ? ORDER BY updated_at DESC', ('',)
+        with self._lock:
+            rows = self._connection.execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+        return ' '.join(row[-1] for row in rows)
+
+    def close(self):
+        self._connection.close()
+
+
+class DynamoCaseStore(CaseStore):
+    """Cases in a DynamoDB table keyed by PolNumber with one GSI per index.
+
+    Index ``<attribute>Index`` has the attribute as partition key and
+    ``UpdatedAt`` as sort key, and projects the other attributes but not the
+    document or views, which queries read from the table by key: index
+    items stay small however large the cases. Cases without the attribute
+    are left out of that index. The document is stored compressed when
+    large (see ``COMPRESS_DOCUMENT_SIZE``), and the views left out of an
+    item that would otherwise exceed ``MAX_ITEM_SIZE``. ``UpdatedDayIndex``
+    has ``UpdatedDay`` (see ``feed_partition``) and ``UpdatedAt`` as keys
+    and projects only them, for ``pol_numbers(since)``.
+
+    A case moving to another producer puts a removal item, keyed by
+    ``removed_key``, with the old ``Producer`` and the case's PolNumber in
+    ``Removed``, in the same transaction: ``ProducerIndex`` is then that
+    producer's feed with the removal in it. Queries leave removals out.
+    """
+
+    FEED_INDEX = 'UpdatedDayIndex'
+    REMOVED_PREFIX = '#removed#'
+
+    def __init__(self, table, dynamodb=None, timeout=DYNAMODB_TIMEOUT):
+        self.table = table
+        self.timeout = timeout
+        self._dynamodb = dynamodb
+
+    @property
+    def dynamodb(self):
+        if self._dynamodb is None:
+            import boto3
+            from botocore.config import Config
+            self._dynamodb = boto3.client('dynamodb', config=Config(connect_timeout=self.timeout,
+                                                                  read_timeout=self.timeout))
+        return self._dynamodb
+
+    @staticmethod
+    def index_name(attribute):
+        return f'{attribute}Index'
+
+    @staticmethod
+    def view_attribute(fmt):
+        return f'{fmt.capitalize()}View'
+
+    @classmethod
+    def removed_key(cls, producer, pol_number):
+        return {'PolNumber': {'S': f'{cls.REMOVED_PREFIX}{producer}#{pol_number}'}}
+
+    @staticmethod
+    def _case(item):
+        if 'Removed' in item:
+            return removal(item['Removed']['S'], item['Producer']['S'], int(item['Version']['N']),
+                           item['UpdatedAt']['S'])
+        case = {'PolNumber': item['PolNumber']['S']}
+        for attribute in ATTRIBUTES:
+            case[attribute] = item[attribute]['S'] if attribute in item else None
+        case['Version'] = int(item['Version']['N'])
+        case['UpdatedAt'] = item['UpdatedAt']['S']
+        document = item['Document']
+        case['OLifE'] = json.loads(zlib.decompress(document['B']) if 'B' in document else document['S'])
+        return case
+
+    def _with_documents(self, items):
+        # Cases of index items, with their documents read from the table
+        keys = [{'PolNumber': item['PolNumber']} for item in items if 'Removed' not in item]
+        documents = {}
+        for start in range(0, len(keys), 100):
+            request = {self.table: {'Keys': keys[start:start + 100], 'ProjectionExpression': 'PolNumber, #document',
+                                    'ExpressionAttributeNames': {'#document': 'Document'}}}
+            while request:
+                answer = self.dynamodb.batch_get_item(RequestItems=request)
+                for item in answer['Responses'].get(self.table, ()):
+                    documents[item['PolNumber']['S']] = item['Document']
+                request = answer.get('UnprocessedKeys')
+        return [self._case(item if 'Removed' in item else dict(item, Document=documents[item['PolNumber']['S']]))
+                for item in items if 'Removed' in item or item['PolNumber']['S'] in documents]
+
+    def get(self, pol_number):
+        item = self.dynamodb.get_item(TableName=self.table, Key={'PolNumber': {'S': pol_number}},
+                                      ConsistentRead=True).get('Item')
+        return None if item is None else self._case(item)
+
+    def view(self, pol_number, fmt):
+        if fmt not in VIEW_FORMATS:
+            return None
+        item = self.dynamodb.get_item(
+            TableName=self.table, Key={'PolNumber': {'S': pol_number}}, ConsistentRead=True,
+            ProjectionExpression='#version, #view',
+            ExpressionAttributeNames={'#version': 'Version', '#view': self.view_attribute(fmt)}).get('Item')
+        if item is None or self.view_attribute(fmt) not in item:
+            return None
+        return int(item['Version']['N']), item[self.view_attribute(fmt)]['S']
+
+    def pol_numbers(self, since=None):
+        if since is None:
+            # A scan: it reads (and is billed for) whole items, however few
+            # attributes it returns. Only for building snapshots offline
+            yield from self._pages('scan', {'TableName': self.table, 'ProjectionExpression': 'PolNumber',
+                                            'FilterExpression': 'attribute_not_exists(#removed)',
+                                            'ExpressionAttributeNames': {'#removed': 'Removed'}})
+            return
+        # One query per day and shard of UpdatedDayIndex, reading only the keys written since
+        day = date.fromisoformat(since[:10])
+        today = datetime.now(timezone.utc).date()
+        while day <= today:
+            for shard in range(FEED_SHARDS):
+                yield from self._pages('query', {
+                    'TableName': self.table,
+                    'IndexName': self.FEED_INDEX,
+                    'KeyConditionExpression': '#day = :day AND #updated > :since',
+                    'ExpressionAttributeNames': {'#day': 'UpdatedDay', '#updated': 'UpdatedAt'},
+                    'ExpressionAttributeValues': {':day': {'S': feed_partition(None, day.isoformat(), shard)},
+                                                  ':since': {'S': since}},
+                })
+            day += timedelta(days=1)
+
+    def _pages(self, operation, parameters):
+        # PolNumbers of every page of a scan or query
+        while True:
+            page = getattr(self.dynamodb, operation)(**parameters)
+            for item in page['Items']:
+                yield item['PolNumber']['S']
+            if 'LastEvaluatedKey' not in page:
+                return
+            parameters['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+    def _stored(self, pol_number):
+        # ``(Version, Producer)`` of the stored case, (0, None) without one
+        item = self.dynamodb.get_item(TableName=self.table, Key={'PolNumber': {'S': pol_number}},
+                                      ProjectionExpression='Version, Producer', ConsistentRead=True).get('Item')
+        if item is None:
+            return 0, None
+        return int(item['Version']['N']), item['Producer']['S'] if 'Producer' in item else None
+
+    def put(self, case, version=None):
+        if version is None:
+            # Nothing is read back from the write: the Version it replaces is
+            # read first, and the write retried if another got in between
+            while True:
+                try:
+                    return self.put(case, self._stored(case['PolNumber'])[0])
+                except VersionConflict:
+                    pass
+        stored_version, previous = self._stored(case['PolNumber'])
+        if stored_version != version:
+            raise VersionConflict(f"Case {case['PolNumber']} is at version {stored_version}, not {version}")
+        now = _now()
+        document = json.dumps(case.get('OLifE') or {}).encode('utf-8')
+        if len(document) > COMPRESS_DOCUMENT_SIZE:
+            document = {'B': zlib.compress(document)}
+        else:
+            document = {'S': document.decode('utf-8')}
+        names = {'#document': 'Document', '#updated': 'UpdatedAt', '#day': 'UpdatedDay', '#version': 'Version'}
+        values = {':document': document, ':updated': {'S': now},
+                  ':day': {'S': feed_partition(case['PolNumber'], now)}, ':version': {'N': str(version + 1)}}
+        assignments = ['#document = :document', '#updated = :updated', '#day = :day', '#version = :version']
+        if version == 0:
+            condition = 'attribute_not_exists(#version)'
+        else:
+            condition = '#version = :expected'
+            values[':expected'] = {'N': str(version)}
+        removals = []
+        views = case.get('Views') or {}
+        written = [('PolNumber', case['PolNumber']), ('Document', next(iter(document.values()))),
+                   ('UpdatedAt', now), ('UpdatedDay', values[':day']['S']), ('Version', str(version + 1))]
+        size = _item_size(written + [(attribute, case.get(attribute)) for attribute in ATTRIBUTES])
+        if size > MAX_ITEM_SIZE:
+            raise CaseTooLarge(f"Case {case['PolNumber']} is {size} bytes, over the {MAX_ITEM_SIZE} byte limit")
+        size += _item_size((self.view_attribute(fmt), view) for fmt, view in views.items())
+        if size > MAX_ITEM_SIZE:
+            # Inquiries for the case are then answered by the fan-out
+            logger.warning(f"Case {case['PolNumber']} stored without its views: {size} bytes with them")
+            views = {}
+        current = [(attribute, case.get(attribute)) for attribute in ATTRIBUTES]
+        current += [(self.view_attribute(fmt), views.get(fmt)) for fmt in VIEW_FORMATS]
+        for n, (attribute, value) in enumerate(current):
+            names[f'#a{n}'] = attribute
+            if value is None:
+                removals.append(f'#a{n}')
+            else:
+                values[f':a{n}'] = {'S': value}
+                assignments.append(f'#a{n} = :a{n}')
+        expression = f"SET {', '.join(assignments)}"
+        if removals:
+            expression += f" REMOVE {', '.join(removals)}"
+        update = {'TableName': self.table, 'Key': {'PolNumber': {'S': case['PolNumber']}},
+                  'UpdateExpression': expression, 'ConditionExpression': condition,
+                  'ExpressionAttributeNames': names, 'ExpressionAttributeValues': values}
+        producer = case.get('Producer')
+        conflict = VersionConflict(f"Case {case['PolNumber']} is no longer at version {version}")
+        if previous is None or previous == producer:
+            try:
+                self.dynamodb.update_item(**update)
+            except self.dynamodb.exceptions.ConditionalCheckFailedException:
+                raise conflict
+        else:
+            # Moved: the old producer's feed gets a removal, and a removal
+            # left in the new one by an earlier move is deleted
+            items = [{'Update': update}, {'Put': {'TableName': self.table, 'Item': {
+                **self.removed_key(previous, case['PolNumber']), 'Producer': {'S': previous},
+                'Removed': {'S': case['PolNumber']}, 'Version': {'N': str(version + 1)}, 'UpdatedAt': {'S': now}}}}]
+            if producer is not None:
+                items.append({'Delete': {'TableName': self.table, 'Key': self.removed_key(producer, case['PolNumber'])}})
+            try:
+                self.dynamodb.transact_write_items(TransactItems=items)
+            except self.dynamodb.exceptions.TransactionCanceledException as e:
+                reasons = e.response.get('CancellationReasons') or [{}]
+                if reasons[0].get('Code') == 'ConditionalCheckFailed':
+                    raise conflict
+                raise
+        stored = {attribute: case.get(attribute) for attribute in ('PolNumber',) + ATTRIBUTES}
+        stored.update(Version=version + 1, UpdatedAt=now, OLifE=case.get('OLifE') or {})
+        return stored
+
+    def query(self, index, value, limit=None):
+        attribute = _attribute(index)
+        parameters = {
+            'TableName': self.table,
+            'IndexName': self.index_name(attribute),
+            'KeyConditionExpression': '#key = :value',
+            'ExpressionAttributeNames': {'#key': attribute, '#removed': 'Removed'},
+            'ExpressionAttributeValues': {':value': {'S': value}},
+            'ScanIndexForward': False,
+            'FilterExpression': 'attribute_not_exists(#removed)',
+        }
+        items = []
+        while True:
+            if limit is not None:
+                parameters['Limit'] = limit - len(items)
+            page = self.dynamodb.query(**parameters)
+            items.extend(page['Items'])
+            if 'LastEvaluatedKey' not in page or (limit is not None and len(items) >= limit):
+                return self._with_documents(items)
+            parameters['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+    def changes(self, producer, after=None, limit=None):
+        # The producer index in UpdatedAt order is the change feed. Clocks and
+        # writes in flight mean a later commit can carry an earlier UpdatedAt,
+        # so only updates older than CHANGE_SETTLE are read: the feed lags a
+        # little rather than skipping any.
+        settled = (datetime.now(timezone.utc) - timedelta(seconds=CHANGE_SETTLE)).isoformat(timespec='microseconds')
+        condition = '#key = :value'
+        names = {'#key': 'Producer'}
+        values = {':value': {'S': producer}}
+        if after is not None:
+            condition += ' AND #updated > :after'
+            names['#updated'] = 'UpdatedAt'
+            values[':after'] = {'S': after}
+        parameters = {
+            'TableName': self.table,
+            'IndexName': self.index_name('Producer'),
+            'KeyConditionExpression': condition,
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values,
+            'ScanIndexForward': True,
+        }
+        if limit is not None:
+            parameters['Limit'] = limit + 1
+
+        def items():
+            while True:
+                page = self.dynamodb.query(**parameters)
+                yield from page['Items']
+                if 'LastEvaluatedKey' not in page:
+                    return
+                parameters['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+        changed = []
+        following = None
+        for item in items():
+            if item['UpdatedAt']['S'] > settled:
+                break
+            if limit is not None and len(changed) == limit:
+                following = item['UpdatedAt']['S']
+                break
+            changed.append(item)
+        more = following is not None
+        if more and following == changed[-1]['UpdatedAt']['S'] and changed[0]['UpdatedAt']['S'] != following:
+            # Positions are UpdatedAt values: end the page between two of them,
+            # so that cases updated in the same microsecond are not split
+            changed = [item for item in changed if item['UpdatedAt']['S'] != following]
+        return self._with_documents(changed), changed[-1]['UpdatedAt']['S'] if changed else after, more
+
+
+_default_store = None
+
+
+def default_store():
+    """The per-container store for ``ACORD_CASE_TABLE`` or ``ACORD_CASE_DATABASE``, or None."""
+    global _default_store
+    if _default_store is None:
+        if TABLE:
+            _default_store = DynamoCaseStore(TABLE)
+        elif DATABASE:
+            _default_store = SQLiteCaseStore(DATABASE)
+    return _default_store
@@ -0,0 +1,252 @@
+"""Claim-check offload of oversized ACORD payloads to S3.
+
+API Gateway and Lambda cap payloads at a few MB and the FIFO queues at
+256 KB, which 103 submissions with attachments exceed. Instead of the
+payload, a small reference document travels through the API or queue:
+
+    {"ClaimCheck": {"Key": "incoming/<uuid>", "Encoding": "gzip",
+                    "Fields": {"TransRefGUID": ..., "TransType": ..., "PolNumber": ...}}}
+
+Medium-sized messages are gzip-compressed inline (``"Data"`` holds the
+base64 text) and only those that are still too large are stored in the
+claim-check bucket. ``Fields`` carries the routing fields so consumers of
+the service's own queues can route and validate without fetching; fields
+on references clients send are only a claim, checked against the payload
+(see ``core.open_request``). The payload itself is only fetched and
+decompressed when business logic asks for the document, and never past
+the transaction's body size limit: stored objects are checked by size
+before they are read, and decompression stops at the limit.
+"""
+import base64
+import binascii
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import uuid
+
+from acord_core import compression
+from acord_core.errors import PayloadTooLarge
+from acord_core.limits import Limits
+
+logger = logging.getLogger(__name__)
+
+BUCKET = os.environ.get('ACORD_CLAIM_CHECK_BUCKET')
+COMPRESS_THRESHOLD = int(os.environ.get('ACORD_COMPRESS_THRESHOLD', str(64 * 1024)))
+OFFLOAD_THRESHOLD = int(os.environ.get('ACORD_CLAIM_CHECK_THRESHOLD', str(200 * 1024)))
+RESPONSE_OFFLOAD_THRESHOLD = int(os.environ.get('ACORD_RESPONSE_OFFLOAD_THRESHOLD', str(5 * 1024 * 1024)))
+URL_EXPIRY = int(os.environ.get('ACORD_CLAIM_CHECK_URL_EXPIRY', '900'))
+# Largest client upload a slot accepts: the largest body any transaction takes
+MAX_UPLOAD_SIZE = Limits.largest_body_size()
+# Connect and read timeout of S3 calls, shortened to what is left of a deadline
+S3_TIMEOUT = int(os.environ.get('ACORD_S3_TIMEOUT', '10'))
+
+_REFERENCE = re.compile(r'\s*\{\s*"ClaimCheck"\s*:')
+# Only keys the store generated itself may be referenced by callers
+_KEY = re.compile(r'(incoming|outgoing|messages)/[0-9a-f]{32}\Z')
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+class InvalidReference(ValueError):
+    pass
+
+
+def is_reference(body):
+    return isinstance(body, str) and _REFERENCE.match(body) is not None
+
+
+def parse_reference(body):
+    try:
+        reference = json.loads(body)['ClaimCheck']
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidReference(f"Malformed claim-check reference: {e}")
+    if not isinstance(reference, dict):
+        raise InvalidReference("Malformed claim-check reference")
+    if 'Data' not in reference and not _KEY.match(str(reference.get('Key', ''))):
+        raise InvalidReference("Claim-check reference has no valid Key or Data")
+    return reference
+
+
+def _decode(data, limit=None):
+    if data[:2] == _GZIP_MAGIC:
+        return compression.decompress(data, 'gzip', limit).decode('utf-8')
+    if limit is not None and len(data) > limit:
+        raise PayloadTooLarge(f"Claim-checked payload exceeds {limit} bytes")
+    return data.decode('utf-8')
+
+
+class ClaimCheckStore:
+
+    def __init__(self, bucket, s3=None, compress_threshold=COMPRESS_THRESHOLD,
+                 offload_threshold=OFFLOAD_THRESHOLD, url_expiry=URL_EXPIRY, timeout=S3_TIMEOUT,
+                 max_upload_size=MAX_UPLOAD_SIZE):
+        self.bucket = bucket
+        self.compress_threshold = compress_threshold
+        self.offload_threshold = offload_threshold
+        self.url_expiry = url_expiry
+        self.max_upload_size = max_upload_size
+        self.timeout = timeout
+        self._s3 = s3
+        # Clients are only built here, with timeouts, when none was passed in
+        self._owns_client = s3 is None
+        self._capped = {}
+
+    def _client(self, timeout, max_attempts=None):
+        import boto3
+        from botocore.config import Config
+        retries = {'max_attempts': max_attempts} if max_attempts else None
+        return boto3.client('s3', config=Config(connect_timeout=timeout, read_timeout=timeout, retries=retries))
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            self._s3 = self._client(self.timeout)
+        return self._s3
+
+    def client(self, deadline=None):
+        """The S3 client to use with whatever is left of ``deadline``.
+
+        Raises ``DeadlineExceeded`` once it has passed. With less time left
+        than the usual timeout, the call goes through a client whose
+        timeouts (whole seconds, no retries) fit in the remainder.
+        """
+        if deadline is None:
+            return self.s3
+        deadline.check()
+        timeout = deadline.timeout(self.timeout)
+        if timeout >= self.timeout or not self._owns_client:
+            return self.s3
+        seconds = max(1, math.floor(timeout))
+        client = self._capped.get(seconds)
+        if client is None:
+            client = self._capped[seconds] = self._client(seconds, max_attempts=1)
+        return client
+
+    def put(self, data, prefix, content_type='application/octet-stream', deadline=None):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        key = f"{prefix}/{uuid.uuid4().hex}"
+        self.client(deadline).put_object(Bucket=self.bucket, Key=key, Body=gzip.compress(data),
+                                         ContentEncoding='gzip', ContentType=content_type)
+        return key
+
+    def fetch(self, reference, deadline=None, limit=None):
+        """The payload text; ``PayloadTooLarge`` if it is, or expands to, over ``limit`` bytes."""
+        if 'Data' in reference:
+            try:
+                data = base64.b64decode(reference['Data'])
+            except (TypeError, binascii.Error) as e:
+                raise InvalidReference(f"Claim-check reference Data is not base64: {e}")
+            return _decode(data, limit)
+        logger.info(f"Fetching claim-checked payload {reference['Key']}")
+        s3 = self.client(deadline)
+        try:
+            obj = s3.get_object(Bucket=self.bucket, Key=reference['Key'])
+        except s3.exceptions.NoSuchKey:
+            raise InvalidReference(f"Claim-checked payload {reference['Key']} not found")
+        if limit is not None and obj['ContentLength'] > limit:
+            obj['Body'].close()
+            raise PayloadTooLarge(f"Claim-checked payload of {obj['ContentLength']} bytes exceeds {limit}")
+        # Uploads through a presigned URL may or may not be compressed
+        return _decode(obj['Body'].read(), limit)
+
+    def check_in(self, payload, fields=None):
+        """Return the text to send in place of ``payload``.
+
+        Small payloads are returned unchanged, larger ones are compressed
+        inline and anything still over the offload threshold is stored.
+        """
+        data = payload.encode('utf-8') if isinstance(payload, str) else payload
+        if len(data) <= self.compress_threshold:
+            return payload if isinstance(payload, str) else data.decode('utf-8')
+        reference = {'Encoding': 'gzip', 'Size': len(data)}
+        if fields:
+            reference['Fields'] = fields
+        compressed = gzip.compress(data)
+        inline = base64.b64encode(compressed).decode('ascii')
+        if len(inline) <= self.offload_threshold:
+            reference['Data'] = inline
+        else:
+            reference['Key'] = self.put(data, 'messages', 'application/json')
+        return json.dumps({'ClaimCheck': reference})
+
+    def send_message(self, sqs, queue_url, body, fields=None, **kwargs):
+        return sqs.send_message(QueueUrl=queue_url, MessageBody=self.check_in(body, fields), **kwargs)
+
+    def create_upload(self):
+        """Reserve a key for a client upload and presign a POST for it.
+
+        The POST policy caps the upload at ``max_upload_size`` bytes, which
+        a presigned PUT cannot.
+        """
+        key = f"incoming/{uuid.uuid4().hex}"
+        post = self.s3.generate_presigned_post(
+            self.bucket, key, Conditions=[['content-length-range', 1, self.max_upload_size]],
+            ExpiresIn=self.url_expiry)
+        return {'UploadUrl': post['url'], 'UploadFields': post['fields'], 'ClaimCheck': {'Key': key}}
+
+    def offload_response(self, body, content_type, deadline=None):
+        key = self.put(body, 'outgoing', content_type, deadline)
+        url = self.s3.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': key}, ExpiresIn=self.url_expiry)
+        logger.info(f"Response of {len(body)} bytes offloaded to {key}")
+        return {
+            'statusCode': 303,
+            'headers': {
+                'Location': url,
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'ClaimCheck': {'Key': key, 'Encoding': 'gzip', 'Url': url}})
+        }
+
+
+_default_store = None
+
+
+def default_store():
+    """The per-container store for the stack's bucket, or None if unset."""
+    global _default_store
+    if _default_store is None and BUCKET:
+        _default_store = ClaimCheckStore(BUCKET)
+    return _default_store
+
+
+def resolve(body, store=None, deadline=None, limit=None):
+    """Return ``(loader, fields)`` for a claim-check body, or None.
+
+    ``loader`` fetches and decompresses the payload when called, within
+    ``deadline`` if given and refusing payloads over ``limit`` bytes;
+    ``fields`` holds the routing fields carried on the reference, if any:
+    whoever wrote the reference chose them.
+    """
+    if not is_reference(body):
+        return None
+    reference = parse_reference(body)
+    store = store or default_store()
+    if store is None and 'Data' not in reference:
+        raise InvalidReference("Claim-check storage is not configured")
+    store = store or ClaimCheckStore(None)
+    return (lambda: store.fetch(reference, deadline, limit)), reference.get('Fields')
+
+
+def handle_upload_event(event, context):
+    """Reserve an upload slot for a payload too large to send through the API."""
+    store = default_store()
+    if store is None:
+        return {
+            'statusCode': 503,
+            'headers': {
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': 'Service Unavailable', 'message': 'Claim-check storage is not configured'})
+        }
+    return {
+        'statusCode': 201,
+        'headers': {
+            'Content-Type': 'application/json'
+        },
+        'body': json.dumps(store.create_upload())
+    }
@@ -0,0 +1,204 @@
+"""Content-Encoding support for API requests and responses.
+
+ACORD XML compresses 10-20x, so responses over ``MIN_COMPRESSION_SIZE`` are
+gzip- or deflate-encoded for clients that accept it and returned base64
+encoded for API Gateway to send as binary. Compressing in the function
+rather than only at the gateway also keeps large responses under the
+Lambda payload limit. API Gateway only decodes the base64 when the
+request's Accept header names one of the API's binary media types
+(``BINARY_MEDIA_TYPES``), so other clients get the text uncompressed
+rather than base64.
+
+Request bodies sent with ``Content-Encoding: gzip`` or ``deflate`` arrive
+base64 encoded and are decompressed here. Output is capped at the
+transaction's ``max_body_size`` (see ``limits``) so a small compressed body
+cannot expand without bound.
+
+Base64 bodies are decoded chunk by chunk into a buffer kept per thread
+across invocations, and a memoryview of it goes to the decompressor or the
+UTF-8 decoder, so a request allocates only its final text rather than an
+ASCII copy of the base64, the decoded bytes and then the text. Responses
+are compressed in chunks straight from the serialized text.
+"""
+import binascii
+import os
+import threading
+import zlib
+
+from acord_core.errors import BadRequest, PayloadTooLarge, UnsupportedMediaType
+from acord_core.limits import Limits
+
+MIN_COMPRESSION_SIZE = int(os.environ.get('ACORD_MIN_COMPRESSION_SIZE', '1024'))
+# Without a transaction to take the limit from, the most any of them accepts
+MAX_DECOMPRESSED_SIZE = Limits.largest_body_size()
+COMPRESSION_LEVEL = int(os.environ.get('ACORD_COMPRESSION_LEVEL', '6'))
+# The API's binaryMediaTypes, set by the stack
+BINARY_MEDIA_TYPES = tuple(media_type.strip().lower() for media_type in os.environ.get(
+    'ACORD_BINARY_MEDIA_TYPES', 'application/json,application/xml,text/xml,application/gzip,'
+    'application/octet-stream').split(',') if media_type.strip())
+
+# zlib window bits selecting the container format of each coding
+_WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'x-gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+# Codings offered for responses, most preferred first
+_PREFERRED = ('gzip', 'deflate')
+
+# Characters of base64 or text handled per step; a multiple of 4
+_CHUNK = 256 * 1024
+
+# Decode buffers reused across invocations
+_local = threading.local()
+
+
+def _decode_buffer(size):
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None or len(buffer) < size:
+        # Replaced rather than resized, as views of the old one may be alive
+        buffer = _local.buffer = bytearray(size)
+    return buffer
+
+
+def b64decode_view(text):
+    """Decode base64 ``text`` into the reusable buffer and return a view of the bytes.
+
+    The view is only valid until the next call on the same thread.
+    """
+    if len(text) % 4:
+        raise BadRequest("Malformed base64 request body: length is not a multiple of 4")
+    view = memoryview(_decode_buffer(len(text) // 4 * 3))
+    end = 0
+    try:
+        for start in range(0, len(text), _CHUNK):
+            chunk = binascii.a2b_base64(text[start:start + _CHUNK])
+            view[end:end + len(chunk)] = chunk
+            end += len(chunk)
+    except (binascii.Error, ValueError) as e:
+        raise BadRequest(f"Malformed base64 request body: {e}")
+    return view[:end]
+
+
+def _is_zlib(data):
+    return len(data) >= 2 and data[0] & 0x0f == 8 and ((data[0] << 8) | data[1]) % 31 == 0
+
+
+def decompress(data, coding, limit=None):
+    """Decode ``data`` in ``coding``, refusing output over ``limit`` bytes."""
+    limit = MAX_DECOMPRESSED_SIZE if limit is None else limit
+    wbits = _WBITS.get(coding)
+    if wbits is None:
+        raise UnsupportedMediaType(f"Unsupported Content-Encoding: {coding}")
+    if coding == 'deflate' and not _is_zlib(data):
+        # Some clients send raw deflate streams without the zlib header
+        wbits = -zlib.MAX_WBITS
+    decompressor = zlib.decompressobj(wbits)
+    try:
+        output = decompressor.decompress(data, limit + 1)
+    except zlib.error as e:
+        raise BadRequest(f"Corrupt {coding} request body: {e}")
+    if len(output) > limit:
+        raise PayloadTooLarge(f"Request body expands beyond {limit} bytes")
+    if not decompressor.eof:
+        raise BadRequest(f"Truncated {coding} request body")
+    return output
+
+
+def request_body(event, max_size=None):
+    """The request body as text, undoing base64 and any Content-Encoding.
+
+    Bodies over ``max_size`` bytes, decoded, raise ``PayloadTooLarge``.
+    """
+    body = event.get('body') or ''
+    limit = MAX_DECOMPRESSED_SIZE if max_size is None else max_size
+    # Reject oversized bodies before spending anything on decoding them
+    size = len(body) // 4 * 3 if event.get('isBase64Encoded') else len(body)
+    if size > limit:
+        raise PayloadTooLarge(f"Request body exceeds {limit} bytes")
+    headers = event.get('headers') or {}
+    encoding = next((value for key, value in headers.items() if key.lower() == 'content-encoding'), '')
+    codings = [coding.strip().lower() for coding in encoding.split(',')]
+    codings = [coding for coding in codings if coding and coding != 'identity']
+    if not codings and not event.get('isBase64Encoded'):
+        return body
+    data = b64decode_view(body) if event.get('isBase64Encoded') else body.encode('utf-8')
+    # Codings are listed in the order they were applied
+    for coding in reversed(codings):
+        data = decompress(data, coding, limit)
+    try:
+        return str(data, 'utf-8')
+    except UnicodeDecodeError as e:
+        raise BadRequest(f"Request body is not UTF-8: {e}")
+
+
+def negotiate(accept_encoding):
+    """The coding to answer with for an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        weight = 1.0
+        params = params.strip().lower()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    for coding in _PREFERRED:
+        if weights.get(coding, weights.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+
+def binary_accepted(accept):
+    """Whether API Gateway sends a base64 body as binary to a client with this Accept header.
+
+    It goes by the first media type listed, against ``BINARY_MEDIA_TYPES``.
+    """
+    media_type = (accept or '').split(',')[0].split(';')[0].strip().lower()
+    if not media_type:
+        return False
+    kind = media_type.split('/')[0]
+    return any(binary in (media_type, f'{kind}/*', '*/*') for binary in BINARY_MEDIA_TYPES)
+
+
+def compress(data, coding, level=COMPRESSION_LEVEL):
+    """Compress text or bytes; text is encoded a chunk at a time."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[coding])
+    if isinstance(data, str):
+        parts = [compressor.compress(data[start:start + _CHUNK].encode('utf-8'))
+                 for start in range(0, len(data), _CHUNK)]
+    else:
+        parts = [compressor.compress(memoryview(data))]
+    parts.append(compressor.flush())
+    return b''.join(parts)
+
+
+def encode_response(response, accept_encoding, min_size=None, accept=None):
+    """Return ``response`` with its body compressed if worthwhile and accepted.
+
+    Only for requests whose ``accept`` header API Gateway answers in
+    binary (see ``binary_accepted``).
+    """
+    min_size = MIN_COMPRESSION_SIZE if min_size is None else min_size
+    body = response.get('body')
+    if not body or response.get('isBase64Encoded') or not binary_accepted(accept):
+        return response
+    # For text the character count stands in for the encoded size
+    if len(body) < min_size:
+        return response
+    coding = negotiate(accept_encoding)
+    if coding is None:
+        return response
+    headers = dict(response.get('headers') or {})
+    headers['Content-Encoding'] = coding
+    headers['Vary'] = headers['Vary'] + ', Accept-Encoding' if 'Vary' in headers else 'Accept-Encoding'
+    encoded = dict(response)
+    encoded['headers'] = headers
+    encoded['body'] = binascii.b2a_base64(compress(body, coding), newline=False).decode('ascii')
+    encoded['isBase64Encoded'] = True
+    return encoded
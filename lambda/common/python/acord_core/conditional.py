@@ -0,0 +1,64 @@
+"""ETags and If-None-Match handling for status polling.
+
+Responses carry the execution date and time and echo the client's
+TransRefGUID, which is new on every poll, so two answers to the same
+inquiry are never byte-identical; ETags are therefore weak and computed
+from a canonical form that leaves those values out. When the inputs fully
+determine the response (a precompiled template, or a version the
+transaction reports for its data) the ETag is computed from the inputs and
+a matching poll is answered before the response is built.
+"""
+import hashlib
+import json
+
+# Values that change on every response without changing its meaning
+VOLATILE_FIELDS = frozenset(('TransRefGUID', 'TransExeDate', 'TransExeTime'))
+
+# Browsers only let scripts read the ETag when it is exposed
+HEADERS = {
+    'Cache-Control': 'no-cache',
+    'Vary': 'Accept',
+    'Access-Control-Expose-Headers': 'ETag',
+}
+
+
+def make_etag(*parts):
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return 'W/"%s"' % hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def canonical(document):
+    """Return ``document`` without the volatile fields, at any depth."""
+    if isinstance(document, dict):
+        return {key: canonical(value) for key, value in document.items() if key not in VOLATILE_FIELDS}
+    if isinstance(document, list):
+        return [canonical(item) for item in document]
+    return document
+
+
+def matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(etag):
+    # 203 is a read-only inquiry even though it is POSTed, so a matching
+    # poll gets 304 as a GET would rather than 412
+    headers = {'ETag': etag}
+    headers.update(HEADERS)
+    return {
+        'statusCode': 304,
+        'headers': headers,
+        'body': ''
+    }
@@ -0,0 +1,1008 @@
+"""Request handling shared by the ACORD transaction Lambdas.
+
+Each handler module delegates to ``handle_event`` with its transaction code.
+Requests are wrapped in ``AcordRequest``, which exposes the routing fields
+from a partial scan of the raw body and only parses the full document when
+business logic asks for it.
+"""
+import concurrent.futures
+import inspect
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from acord_core import (admission, aio, attachments, casestore, claimcheck, compression, conditional, downstream,
+                        fanout, loader, polfilter, priming)
+from acord_core.deadline import Deadline, DeadlineExceeded, OutcomeUnknown
+from acord_core.errors import BadRequest, Forbidden
+from acord_core.extract import ROUTING_EXTRACTOR
+from acord_core.graph import ObjectGraph
+from acord_core.limits import Limits, check_text
+from acord_core.projection import InvalidSelector, compile_selector
+from acord_core.templates import ResponseTemplate
+from acord_core.typecodes import registry
+from acord_core.xmlwriter import to_xml
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = int(os.environ.get('ACORD_MAX_WORKERS', '8'))
+# Cases returned by one delta inquiry; the rest follow from its cursor
+CHANGES_LIMIT = int(os.environ.get('ACORD_203_CHANGES_LIMIT', '500'))
+
+# Reused across warm invocations of the container
+_executor = None
+
+REQUIRED_FIELDS = ("TransRefGUID", "TransType", "PolNumber")
+
+# Delta inquiries name no single policy
+CHANGES_FIELDS = ("TransRefGUID", "TransType")
+CURSOR_HEADER = 'X-Acord-Cursor'
+MORE_CHANGES_HEADER = 'X-Acord-More-Changes'
+# Claim of the API's Cognito authorizer naming the caller's CompanyProducerID
+PRODUCER_CLAIM = os.environ.get('ACORD_PRODUCER_CLAIM', 'custom:producer_id')
+
+
+def _field_value(value):
+    # Typecodes compare by their tc alone
+    return value.get('tc') if isinstance(value, dict) else value
+
+
+class AcordRequest:
+
+    def __init__(self, raw, loader=None, fields=None, limits=None, claimed_fields=None):
+        self._raw = raw
+        self._loader = loader
+        self._fields = fields
+        # Routing fields a client's claim-check reference names, which the
+        # payload must carry too
+        self._claimed_fields = claimed_fields
+        # Checked before anything scans or parses the raw body
+        self.limits = limits
+        self._checked = limits is None
+        self._document = None
+        self._graph = None
+        # Attachments spooled to local storage while parsing the document
+        self.attachments = []
+        self.received_at = datetime.now()
+        # Invocation deadline, for business logic that bounds downstream calls
+        self.deadline = None
+        # Per-invocation state of the business logic, such as lookup loaders;
+        # shared with the parts of a multi-request document
+        self.state = {}
+
+    @property
+    def trans_exe_date(self):
+        return self.received_at.strftime('%Y-%m-%d')
+
+    @property
+    def trans_exe_time(self):
+        return self.received_at.strftime('%H:%M:%S')
+
+    @property
+    def raw(self):
+        # Claim-checked payloads are only fetched once something needs them
+        if self._raw is None and self._loader is not None:
+            try:
+                self._raw = self._loader()
+            except claimcheck.InvalidReference as e:
+                raise BadRequest(str(e))
+        if not self._checked and isinstance(self._raw, str):
+            check_text(self._raw, self.limits)
+            self._checked = True
+        return self._raw
+
+    @classmethod
+    def from_document(cls, document):
+        request = cls(None)
+        request._document = document
+        request._fields = ROUTING_EXTRACTOR.extract_document(document)
+        return request
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            try:
+                fields = ROUTING_EXTRACTOR.extract(self.raw)
+            except ValueError as e:
+                raise BadRequest(f"Malformed JSON body: {e}")
+            for name, value in (self._claimed_fields or {}).items():
+                if name in REQUIRED_FIELDS and _field_value(value) != _field_value(fields.get(name)):
+                    raise BadRequest(f"Claim-check reference {name} does not match its payload")
+            self._fields = fields
+        return self._fields
+
+    @property
+    def document(self):
+        if self._document is None:
+            try:
+                self._document, self.attachments = attachments.load(self.raw)
+            except ValueError as e:
+                raise BadRequest(f"Malformed JSON body: {e}")
+            # A routing key repeated after the partial scan stopped would
+            # leave the document disagreeing with the fields it was routed by
+            if self._fields is not None and ROUTING_EXTRACTOR.extract_document(self._document) != self._fields:
+                raise BadRequest("Malformed JSON body: duplicate routing fields")
+        return self._document
+
+    def close(self):
+        """Remove any spooled attachments."""
+        for attachment in self.attachments:
+            attachment.close()
+
+    @property
+    def olife(self):
+        """The OLifE of a single TXLifeRequest, or None."""
+        txlife = self.document.get("TXLife") if isinstance(self.document, dict) else None
+        request = txlife.get("TXLifeRequest") if isinstance(txlife, dict) else None
+        olife = request.get("OLifE") if isinstance(request, dict) else None
+        return olife if isinstance(olife, dict) else None
+
+    @property
+    def graph(self):
+        """The OLifE's Party, Holding and Relation objects indexed as an ``ObjectGraph``."""
+        if self._graph is None:
+            self._graph = ObjectGraph.from_olife(self.olife or {})
+        return self._graph
+
+    @property
+    def trans_type_code(self):
+        trans_type = self.fields.get("TransType")
+        if isinstance(trans_type, dict):
+            return trans_type.get("tc")
+        return trans_type
+
+    def split(self):
+        """Return one request per element when TXLifeRequest is a list.
+
+        Returns None for the usual single-request document. The partial scan
+        cannot see inside a TXLifeRequest list, so the full document is only
+        parsed when the routing fields were not found.
+        """
+        if all(name in self.fields for name in REQUIRED_FIELDS):
+            return None
+        txlife = self.document.get("TXLife") if isinstance(self.document, dict) else None
+        requests = txlife.get("TXLifeRequest") if isinstance(txlife, dict) else None
+        if not isinstance(requests, list):
+            return None
+        if not requests:
+            raise BadRequest("TXLifeRequest list is empty")
+        parts = [AcordRequest.from_document({"TXLife": {"TXLifeRequest": item}}) for item in requests]
+        for part in parts:
+            part.state = self.state
+        return parts
+
+    def validate(self):
+        missing = [name for name in REQUIRED_FIELDS if name not in self.fields]
+        if missing:
+            raise BadRequest(f"Missing required fields: {', '.join(missing)}")
+
+
+class Transaction:
+
+    def __init__(self, code, name, conditional=False, limits=None):
+        self.code = code
+        self.name = name
+        self.limits = limits or Limits.for_type(code)
+        # Conditional transactions answer with ETags and honour If-None-Match
+        self.conditional = conditional
+
+    def version(self, request):
+        """Version of the data the response is built from, or None.
+
+        Returning a version lets a matching If-None-Match be answered without
+        processing the request at all.
+        """
+        return None
+
+    def view(self, request, fmt):
+        """``(version, template)`` of a response stored ahead of the request, or None.
+
+        The template is rendered with the request's slot values instead of
+        processing it, and the version makes its ETag.
+        """
+        return None
+
+    def changes(self, producer, after=None, limit=None):
+        """``casestore.CaseStore.changes()`` for delta inquiries, or None without a change feed."""
+        return None
+
+    def process(self, request):
+        # This is a placeholder for the actual business logic; it only needs
+        # the routing fields, so the full document is never parsed here.
+        # Implementations calling downstream systems may be ``async def``:
+        # they then run on the container's event loop (see ``aio``), use
+        # ``httpclient.default_client()`` for HTTP and ``aio.run_blocking``
+        # for boto3, and can await independent calls concurrently.
+        fields = request.fields
+        return {
+            "TransRefGUID": fields['TransRefGUID'],
+            "TransType": trans_type(fields),
+            "TransExeDate": request.trans_exe_date,
+            "TransExeTime": request.trans_exe_time,
+            "TransResult": success_result(self.code),
+            "OLifE": {
+                "Holding": {
+                    "Policy": {
+                        "PolNumber": fields['PolNumber'],
+                    }
+                }
+            }
+        }
+
+
+class PolicyAdminTransaction(Transaction):
+    """A transaction whose business logic calls the policy administration service."""
+
+    def __init__(self, code, name, policy_admin, conditional=False, limits=None):
+        super().__init__(code, name, conditional, limits)
+        self.policy_admin = policy_admin
+        self.endpoint = downstream.TRANSACTION_ENDPOINTS[code]
+
+    async def process(self, request):
+        response = Transaction.process(self, request)
+        body = None
+        if self.policy_admin.endpoints[self.endpoint].method != 'GET':
+            # Spooled attachments are streamed back out of their spool files
+            body = attachments.JSONBody(request.document, default=_json_default)
+        answer = await self.policy_admin.call(self.endpoint, request.fields, body, request.deadline)
+        # The service's own TransResult is not passed on
+        fanout.merge(response, {key: value for key, value in answer.items() if key != "TransResult"})
+        return response
+
+
+class NewBusinessSubmission(PolicyAdminTransaction):
+    """A 103 whose parties and holdings are resolved before it is submitted.
+
+    Client, policy and licensing lookups are batched per back end and
+    memoized for the invocation (see ``loader``). They are read off the
+    request's ``graph``, which ``CaseUpdate`` then records the case from.
+    """
+
+    async def process(self, request):
+        loaders = request.state.get('lookups')
+        if loaders is None:
+            loaders = request.state['lookups'] = self.policy_admin.lookup_loaders(request.deadline)
+        if request.olife is not None:
+            await loader.resolve(request.graph, loaders)
+        return await super().process(request)
+
+
+class CaseUpdate(Transaction):
+    """A 103 or 302 that runs ``base``, then records the case in the pending case store.
+
+    A 103 records the whole case; a 302 is merged into the stored one (see
+    ``casestore.merge_case``).
+
+    Only requests ``base`` accepted are recorded, and without the bytes of
+    spooled attachments. The PolNumber is added to the container's filter
+    of known ``policies``. Once ``base`` has submitted the request to the
+    policy administration service, a failure to record the case is logged
+    rather than failing a request that was carried out.
+    """
+
+    def __init__(self, base, store, policies=None):
+        super().__init__(base.code, base.name, base.conditional, base.limits)
+        self.base = base
+        self.store = store
+        self.policies = policies
+
+    async def process(self, request):
+        olife = request.olife or {}
+        if request.attachments:
+            olife = attachments.without_spooled(olife)
+        case = casestore.case_from_olife(olife, request.graph)
+        if case is None:
+            raise BadRequest("Pending case update has no Holding/Policy/PolNumber")
+        result = self.base.process(request)
+        if inspect.isawaitable(result):
+            result = await result
+        # A 302 carries what changed and is merged into the stored case; its
+        # views are built from the merged case and stored in the same write,
+        # so a view is never newer or older than its case
+        try:
+            case = await aio.run_blocking(self.store.update, case, merge=self.code == '302', views=case_views)
+        except Exception as e:
+            if not isinstance(self.base, PolicyAdminTransaction):
+                raise
+            logger.error(f"ACORD {self.code} for {case['PolNumber']} was submitted but not recorded: {e!r}")
+            return result
+        if self.policies is not None:
+            self.policies.add(case['PolNumber'])
+        return result
+
+
+class StatusInquiry(Transaction):
+    """A 203 answered from several back ends queried concurrently (see ``fanout``).
+
+    With the pending case store among them, ``cases``, delta inquiries read
+    its change feed.
+    """
+
+    def __init__(self, code, name, fan_out, conditional=False, limits=None, cases=None):
+        super().__init__(code, name, conditional, limits)
+        self.fan_out = fan_out
+        self.cases = cases
+
+    def changes(self, producer, after=None, limit=None):
+        return None if self.cases is None else priming.case_store(self.cases).changes(producer, after, limit)
+
+    async def process(self, request):
+        response = Transaction.process(self, request)
+        outcomes = await self.fan_out.query(request, request.deadline)
+        return self.fan_out.respond(response, outcomes)
+
+
+class CaseViewInquiry(Transaction):
+    """A 203 answered with the materialized view of the case, when it has one.
+
+    302 updates store the pre-serialized inquiry response with each case
+    (see ``case_views``), so an inquiry is one key lookup whose bytes are
+    returned with only the request's own values filled in, and the case
+    ``Version`` is its ETag. What a view cannot answer (projections,
+    several TXLifeRequests, cases without one) is processed by ``base``.
+    """
+
+    def __init__(self, base, store):
+        super().__init__(base.code, base.name, base.conditional, base.limits)
+        self.base = base
+        self.store = store
+
+    def view(self, request, fmt):
+        pol_number = request.fields['PolNumber']
+        if not isinstance(pol_number, str):
+            return None
+        try:
+            stored = priming.case_store(self.store).view(pol_number, fmt)
+        except Exception as e:
+            logger.warning(f"No materialized view for {pol_number}, processing the inquiry: {e!r}")
+            return None
+        if stored is None:
+            return None
+        version, view = stored
+        view_format, _, view = view.partition('\n')
+        if view_format != VIEW_FORMAT:
+            # Built by an older release; the inquiry is answered as without one
+            return None
+        return (pol_number, version), ResponseTemplate.loads(view)
+
+    def changes(self, producer, after=None, limit=None):
+        return priming.case_store(self.store).changes(producer, after, limit)
+
+    def process(self, request):
+        return self.base.process(request)
+
+
+class KnownPolicyCheck(Transaction):
+    """Answers requests for PolNumbers we do not know without running ``base``.
+
+    ``policies`` is the container's Bloom filter of the pending case store
+    (see ``polfilter``); a PolNumber it has never seen is reported unknown
+    without any lookup. Only for a ``base`` answered by the case store
+    alone: other back ends know policies the store has never seen.
+    """
+
+    def __init__(self, base, policies):
+        super().__init__(base.code, base.name, base.conditional, base.limits)
+        self.base = base
+        self.policies = policies
+
+    def unknown(self, request):
+        pol_number = request.fields['PolNumber']
+        if not isinstance(pol_number, str):
+            return False
+        # Asked once per PolNumber and invocation, for the view and then processing
+        known = request.state.setdefault('known_policies', {})
+        if pol_number not in known:
+            known[pol_number] = priming.known_policies(self.policies).known(pol_number)
+        return not known[pol_number]
+
+    def version(self, request):
+        return None if self.unknown(request) else self.base.version(request)
+
+    def view(self, request, fmt):
+        return None if self.unknown(request) else self.base.view(request, fmt)
+
+    def changes(self, producer, after=None, limit=None):
+        return self.base.changes(producer, after, limit)
+
+    def process(self, request):
+        if self.unknown(request):
+            return failure_response(request, f"Unknown policy {request.fields['PolNumber']}")
+        return self.base.process(request)
+
+
+class _SlotRequest:
+    # Stands in for a request when compiling response templates
+
+    def __init__(self, values):
+        self.fields = values
+        self.trans_exe_date = values['TransExeDate']
+        self.trans_exe_time = values['TransExeTime']
+
+
+TEMPLATE_SLOTS = REQUIRED_FIELDS + ('TransExeDate', 'TransExeTime')
+
+_PLACEHOLDER_PROCESS = Transaction.process
+
+# Compiled once per container for each (transaction, format)
+_templates = {}
+
+
+def response_template(transaction, fmt, projection=None):
+    """The precompiled success response, or None if process() is customised.
+
+    With a ``projection`` the template is compiled from the pruned document,
+    so the unselected parts are never rendered per request.
+    """
+    if getattr(transaction.process, '__func__', None) is not _PLACEHOLDER_PROCESS:
+        return None
+    key = (transaction.code, fmt, projection.key if projection else None)
+    template = _templates.get(key)
+    if template is None:
+        def build(values):
+            document = build_txlife(transaction.code, transaction.process(_SlotRequest(values)))
+            return projection.apply(document) if projection else document
+        template = ResponseTemplate(build, TEMPLATE_SLOTS, fmt, lambda document: serialize(document, fmt)[0])
+        _templates[key] = template
+    return template
+
+
+# Slots of a materialized 203 view: everything but the PolNumber comes from the inquiry
+VIEW_SLOTS = ('TransRefGUID', 'TransType', 'TransExeDate', 'TransExeTime')
+# Stored views start with the format they were built in; bump it whenever
+# case_response or the template encoding changes, and views stored before
+# are processed instead until the case is next updated
+VIEW_FORMAT = '2'
+
+
+def case_response(values, case):
+    """The TXLifeResponse a fan-out to the case store alone answers ``case`` with.
+
+    ``values`` are the inquiry's ``VIEW_SLOTS``.
+    """
+    source = fanout.CaseStoreSource(None)
+    response = Transaction.process(_CASE_INQUIRY, _SlotRequest(dict(values, PolNumber=case['PolNumber'])))
+    return fanout.FanOut([source]).respond(response, {source.name: (fanout.ANSWERED, {"OLifE": case["OLifE"]})})
+
+
+def removal_response(values, removal):
+    """The TXLifeResponse a delta inquiry answers a case moved to another producer with.
+
+    It names only the PolNumber, with ResultInfoSysMessageCode ``removed``.
+    """
+    response = Transaction.process(_CASE_INQUIRY, _SlotRequest(dict(values, PolNumber=removal['PolNumber'])))
+    typecodes = registry()
+    response["OLifE"] = {"Holding": {"Policy": {"PolNumber": removal['PolNumber']}}}
+    response["TransResult"] = {
+        "ResultCode": typecodes.typecode("ResultCode", "1"),
+        "ResultInfo": {
+            "ResultInfoCode": typecodes.typecode("ResultInfoCode", "1"),
+            "ResultInfoDesc": f"Case {removal['PolNumber']} moved to another producer",
+            "ResultInfoSysMessageCode": "removed",
+        }
+    }
+    return response
+
+
+def case_views(case):
+    """The 203 response for ``case`` compiled in each format, as stored text after ``VIEW_FORMAT``."""
+    def build(values):
+        return build_txlife(_CASE_INQUIRY.code, case_response(values, case))
+
+    def stored(fmt):
+        template = ResponseTemplate(build, VIEW_SLOTS, fmt, lambda document: serialize(document, fmt)[0])
+        return f'{VIEW_FORMAT}\n{template.dumps()}'
+
+    return {fmt: stored(fmt) for fmt in casestore.VIEW_FORMATS}
+
+
+def trans_type(fields):
+    # Requests may send only the tc; the response always carries the value
+    return registry().fill("TransType", fields['TransType'])
+
+
+def slot_values(request):
+    values = {name: request.fields[name] for name in REQUIRED_FIELDS}
+    values['TransType'] = trans_type(request.fields)
+    values['TransExeDate'] = request.trans_exe_date
+    values['TransExeTime'] = request.trans_exe_time
+    return values
+
+
+def make_transaction(code, name, conditional=False):
+    # Without a policy administration service the templated placeholder is kept
+    policy_admin = downstream.default_client()
+    if policy_admin is None:
+        transaction = Transaction(code, name, conditional)
+    elif code == "103":
+        transaction = NewBusinessSubmission(code, name, policy_admin, conditional)
+    else:
+        transaction = PolicyAdminTransaction(code, name, policy_admin, conditional)
+    cases = casestore.default_store()
+    if cases is None:
+        return transaction
+    # New and updated pending cases are recorded for inquiries
+    if code in ("103", "302"):
+        return CaseUpdate(transaction, cases, polfilter.default_policies())
+    return transaction
+
+
+def status_inquiry():
+    # Without configured back ends 203 keeps the templated placeholder response
+    sources = fanout.sources_from_environment()
+    policy_admin = downstream.default_client()
+    if policy_admin is not None:
+        sources.insert(0, fanout.PolicyAdminSource(policy_admin))
+    cases = casestore.default_store()
+    if cases is not None:
+        sources.insert(0, fanout.CaseStoreSource(cases))
+    if not sources:
+        return Transaction("203", "Pending Case Status Inquiry", conditional=True)
+    inquiry = StatusInquiry("203", "Pending Case Status Inquiry", fanout.FanOut(sources), conditional=True,
+                            cases=cases)
+    if cases is None or len(sources) > 1:
+        return inquiry
+    # With the case store the only back end, cases recorded by 302 updates
+    # are answered from their materialized view, and inquiries for
+    # PolNumbers it has never seen without any lookup; a view or the filter
+    # knows nothing of what other back ends would answer
+    inquiry = CaseViewInquiry(inquiry, cases)
+    policies = polfilter.default_policies()
+    return inquiry if policies is None else KnownPolicyCheck(inquiry, policies)
+
+
+_CASE_INQUIRY = Transaction("203", "Pending Case Status Inquiry")
+
+TRANSACTIONS = {
+    "103": make_transaction("103", "New Business Submission"),
+    "1125": make_transaction("1125", "Policy Change"),
+    "203": status_inquiry(),
+    "302": make_transaction("302", "Pending Case Status Update"),
+}
+
+
+def request_etag(transaction, request, fmt, projection, template, view=None):
+    """The ETag computed from the request alone, or None if it needs the response."""
+    selector = projection.key if projection else None
+    if view is not None:
+        return conditional.make_etag(transaction.code, fmt, selector, view[0])
+    version = transaction.version(request)
+    if version is not None:
+        return conditional.make_etag(transaction.code, fmt, selector, version)
+    if template is not None:
+        values = slot_values(request)
+        return conditional.make_etag(transaction.code, fmt, selector, conditional.canonical(values))
+    return None
+
+
+def transaction_for(request):
+    transaction = TRANSACTIONS.get(request.trans_type_code)
+    if transaction is None:
+        raise BadRequest(f"Unsupported TransType: {request.trans_type_code}")
+    return transaction
+
+
+def open_request(body, limits=None, deadline=None, trusted=False):
+    """Wrap a request body, resolving claim-check references lazily.
+
+    The routing fields on a reference are only used in place of the
+    payload's when it is ``trusted``: the service wrote it to its own
+    queue. Those of references clients send are checked against the
+    payload once it is fetched.
+    """
+    try:
+        resolved = claimcheck.resolve(body, deadline=deadline, limit=limits.max_body_size if limits else None)
+    except claimcheck.InvalidReference as e:
+        raise BadRequest(str(e))
+    if resolved is None:
+        return AcordRequest(body, limits=limits)
+    loader, fields = resolved
+    if not isinstance(fields, dict):
+        fields = None
+    if not trusted:
+        return AcordRequest(None, loader=loader, limits=limits, claimed_fields=fields)
+    if fields is not None and not all(name in fields for name in REQUIRED_FIELDS):
+        fields = None
+    return AcordRequest(None, loader=loader, fields=fields, limits=limits)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='acord-request')
+    return _executor
+
+
+def success_result(code):
+    typecodes = registry()
+    return {
+        "ResultCode": typecodes.typecode("ResultCode", "1"),
+        "ResultInfo": {
+            "ResultInfoCode": typecodes.typecode("ResultInfoCode", "1"),
+            "ResultInfoDesc": f"ACORD {code} request processed successfully"
+        }
+    }
+
+
+def failure_response(request, message):
+    fields = request.fields
+    response = {key: fields[key] for key in ("TransRefGUID", "TransType") if key in fields}
+    if "TransType" in response:
+        response["TransType"] = trans_type(fields)
+    typecodes = registry()
+    response["TransResult"] = {
+        "ResultCode": typecodes.typecode("ResultCode", "5"),
+        "ResultInfo": {
+            "ResultInfoCode": typecodes.typecode("ResultInfoCode", "5"),
+            "ResultInfoDesc": message
+        }
+    }
+    return response
+
+
+def build_txlife(code, responses):
+    """The TXLife response document, with every typecode's value filled in from its tc.
+
+    Every response is built here, so responses, templates and stored views
+    all carry the values.
+    """
+    registry().fill_document(responses)
+    return {
+        "TXLife": {
+            "UserAuthResponse": {
+                "TransResult": success_result(code)
+            },
+            "TXLifeResponse": responses
+        }
+    }
+
+
+def _process(transaction, request, deadline=None):
+    if priming.warming():
+        # Warm-up requests run everything around the business logic, not it
+        return Transaction.process(transaction, request)
+    if deadline is not None:
+        request.deadline = deadline
+    # Business logic is where downstream systems are called, so its latency
+    # drives admission control
+    with admission.default_controller().timed():
+        result = transaction.process(request)
+        if inspect.isawaitable(result):
+            try:
+                result = aio.run(result, deadline.timeout() if deadline is not None else None)
+            except concurrent.futures.TimeoutError:
+                raise OutcomeUnknown(f"ACORD {transaction.code} processing did not finish before the deadline; "
+                                     f"outcome unknown")
+        return result
+
+
+def _process_part(transaction, request, deadline=None, partial=True):
+    # Without ``partial`` only invalid parts are answered with a failure;
+    # parts left unprocessed or failing with an error raise
+    if deadline is not None and deadline.expired():
+        if not partial:
+            raise DeadlineExceeded("TXLifeRequest not processed before the invocation deadline")
+        return failure_response(request, "Not processed before the invocation deadline")
+    try:
+        request.validate()
+        return _process(transaction or transaction_for(request), request, deadline)
+    except BadRequest as e:
+        return failure_response(request, str(e))
+    except OutcomeUnknown:
+        if not partial:
+            raise
+        return failure_response(request, "Not finished before the invocation deadline; outcome unknown")
+    except DeadlineExceeded:
+        if not partial:
+            raise
+        return failure_response(request, "Not processed before the invocation deadline")
+    except Exception as e:
+        logger.error(f"Error processing TXLifeRequest {request.fields.get('TransRefGUID')}: {str(e)}")
+        if not partial:
+            raise
+        return failure_response(request, "Internal error processing request")
+
+
+def respond(request, transaction=None, executor=None, deadline=None, partial=True):
+    """Process request and return the TXLife response document.
+
+    ``transaction`` defaults to routing on the request's TransType. A single
+    TXLifeRequest that fails validation raises ``BadRequest``; when the
+    document holds a list of TXLifeRequest elements they are fanned out over
+    ``executor`` (or run in turn without one) and each failure is reported in
+    its own TXLifeResponse, with the responses kept in request order.
+    Elements not started before ``deadline`` are reported as failures.
+
+    Without ``partial`` an element that was not processed before the
+    deadline or failed with an error raises instead, as a single request
+    would, so a queued document is redelivered rather than half done.
+    """
+    parts = request.split()
+    if parts is None:
+        request.validate()
+        transaction = transaction or transaction_for(request)
+        return build_txlife(transaction.code, _process(transaction, request, deadline))
+
+    code = transaction.code if transaction else parts[0].trans_type_code
+    work = [transaction] * len(parts)
+    deadlines = [deadline] * len(parts)
+    partials = [partial] * len(parts)
+    if executor is None or len(parts) == 1:
+        responses = list(map(_process_part, work, parts, deadlines, partials))
+    else:
+        responses = list(executor.map(aio.carry_context(_process_part), work, parts, deadlines, partials))
+    return build_txlife(code, responses)
+
+
+def get_header(event, name, default=None):
+    headers = event.get('headers') or {}
+    if name in headers:
+        return headers[name]
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return default
+
+
+def response_projection(event):
+    """The compiled ``fields`` selector from the query string, or None."""
+    selector = (event.get('queryStringParameters') or {}).get('fields')
+    if not selector:
+        return None
+    try:
+        return compile_selector(selector)
+    except InvalidSelector as e:
+        raise BadRequest(str(e))
+
+
+def authenticated_producer(event):
+    """The CompanyProducerID the API's authorizer vouches for, or None."""
+    authorizer = (event.get('requestContext') or {}).get('authorizer') or {}
+    return (authorizer.get('claims') or {}).get(PRODUCER_CLAIM) or None
+
+
+def change_request(event):
+    """``(producer, position)`` of a delta inquiry, or None for any other request.
+
+    A 203 asks for the cases of ``producer`` (its CompanyProducerID) that
+    changed since ``cursor``, both query string parameters; without a
+    cursor it asks for all of them. The feed carries whole cases, so a
+    producer only reads its own: that of ``authenticated_producer``.
+    """
+    parameters = event.get('queryStringParameters') or {}
+    producer = parameters.get('producer')
+    if producer is None:
+        return None
+    if not producer:
+        raise BadRequest("Delta inquiries need a producer")
+    authenticated = authenticated_producer(event)
+    if authenticated is None:
+        raise Forbidden("Delta inquiries need an authenticated producer")
+    if producer != authenticated:
+        raise Forbidden(f"Delta inquiries only read the cases of producer {authenticated}")
+    cursor = parameters.get('cursor')
+    try:
+        return producer, casestore.decode_cursor(cursor) if cursor else None
+    except casestore.InvalidCursor as e:
+        raise BadRequest(str(e))
+
+
+def respond_changes(request, transaction, producer, after):
+    """The TXLife of cases changed after ``after``, one TXLifeResponse each, and the headers.
+
+    Headers carry the cursor to ask from next time and whether more
+    changes are waiting already. Only the changed cases are read and
+    built, so the work is proportional to the changes, not the book.
+    Cases moved to another producer since are answered with their
+    ``removal_response``.
+    """
+    missing = [name for name in CHANGES_FIELDS if name not in request.fields]
+    if missing:
+        raise BadRequest(f"Missing required fields: {', '.join(missing)}")
+    changed = transaction.changes(producer, after, CHANGES_LIMIT)
+    if changed is None:
+        raise BadRequest(f"ACORD {transaction.code} has no delta inquiries")
+    cases, position, more = changed
+    values = {'TransRefGUID': request.fields['TransRefGUID'], 'TransType': trans_type(request.fields),
+              'TransExeDate': request.trans_exe_date, 'TransExeTime': request.trans_exe_time}
+    headers = {MORE_CHANGES_HEADER: 'true' if more else 'false',
+               'Access-Control-Expose-Headers': f'{CURSOR_HEADER}, {MORE_CHANGES_HEADER}'}
+    if position is not None:
+        headers[CURSOR_HEADER] = casestore.encode_cursor(position)
+    responses = [removal_response(values, case) if case.get('Removed') else case_response(values, case)
+                 for case in cases]
+    return build_txlife(transaction.code, responses), headers
+
+
+def response_format(accept_header):
+    return 'xml' if 'xml' in (accept_header or '').lower() else 'json'
+
+
+def _json_default(value):
+    # Models and spooled attachments serialize through their to_dict()
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def serialize(response_data, fmt, root='TXLife', max_nodes=None):
+    if fmt == 'xml':
+        return to_xml(response_data, root=root, max_nodes=max_nodes), 'application/xml'
+    return json.dumps(response_data, default=_json_default), 'application/json'
+
+
+def error_response(status_code, error, message=None):
+    body = {'error': error}
+    if message is not None:
+        body['message'] = message
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json'
+        },
+        'body': json.dumps(body)
+    }
+
+
+def overloaded_response(e):
+    response = error_response(503, 'Service Unavailable', str(e))
+    response['headers']['Retry-After'] = str(e.retry_after)
+    return response
+
+
+def handle_api_event(event, context, transaction, deadline=None):
+    request = None
+    try:
+        body = compression.request_body(event, transaction.limits.max_body_size)
+        request = open_request(body, transaction.limits, deadline)
+        fields = request.fields
+        logger.info(f"Received ACORD {transaction.code} request: TransRefGUID={fields.get('TransRefGUID')} "
+                    f"TransType={request.trans_type_code} PolNumber={fields.get('PolNumber')}")
+
+        fmt = response_format(get_header(event, 'Accept', 'application/json'))
+        projection = response_projection(event)
+        if_none_match = get_header(event, 'If-None-Match')
+        etag = None
+        response_body = None
+        change_headers = {}
+        changes = change_request(event)
+        if changes is not None:
+            # Delta inquiries answer with what changed since the cursor they carry
+            response_data, change_headers = respond_changes(request, transaction, *changes)
+            if projection is not None:
+                response_data = projection.apply(response_data)
+            response_body, content_type = serialize(response_data, fmt, max_nodes=transaction.limits.max_nodes)
+        elif request.split() is None:
+            # Standard success responses are rendered from a precompiled template
+            request.validate()
+            template = response_template(transaction, fmt, projection)
+            # Otherwise the response may have been materialized ahead of the request
+            view = transaction.view(request, fmt) if template is None and projection is None else None
+            if transaction.conditional:
+                etag = request_etag(transaction, request, fmt, projection, template, view)
+                if etag is not None and conditional.matches(if_none_match, etag):
+                    return conditional.not_modified(etag)
+            if view is not None:
+                template = view[1]
+            if template is not None:
+                response_body = template.render(slot_values(request))
+                content_type = 'application/xml' if fmt == 'xml' else 'application/json'
+        if response_body is None:
+            response_data = respond(request, transaction, get_executor(), deadline)
+            if projection is not None:
+                response_data = projection.apply(response_data)
+            if transaction.conditional and etag is None:
+                selector = projection.key if projection else None
+                etag = conditional.make_etag(transaction.code, fmt, selector, conditional.canonical(response_data))
+                if conditional.matches(if_none_match, etag):
+                    return conditional.not_modified(etag)
+            response_body, content_type = serialize(response_data, fmt, max_nodes=transaction.limits.max_nodes)
+        logger.info(f"Returning {content_type} response for TransRefGUID={fields.get('TransRefGUID')}")
+
+        headers = {
+            'Content-Type': content_type
+        }
+        if etag is not None:
+            headers['ETag'] = etag
+            headers.update(conditional.HEADERS)
+        headers.update(change_headers)
+        response = compression.encode_response({
+            'statusCode': 200,
+            'headers': headers,
+            'body': response_body
+        }, get_header(event, 'Accept-Encoding'), accept=get_header(event, 'Accept'))
+
+        # Offload whatever is still too large after compression
+        store = claimcheck.default_store()
+        if store is not None and len(response['body']) > claimcheck.RESPONSE_OFFLOAD_THRESHOLD:
+            offloaded = store.offload_response(response_body, content_type, deadline)
+            offloaded['headers'].update(change_headers)
+            return offloaded
+        return response
+
+    except BadRequest as e:
+        logger.warning(f"Rejected ACORD {transaction.code} request: {e}")
+        return error_response(e.status_code, e.error, str(e))
+    except OutcomeUnknown as e:
+        logger.warning(f"ACORD {transaction.code} request ran out of time: {e}")
+        return error_response(504, 'Gateway Timeout', str(e))
+    except DeadlineExceeded as e:
+        logger.warning(f"ACORD {transaction.code} request ran out of time: {e}")
+        return error_response(503, 'Service Unavailable', str(e))
+    except Exception as e:
+        logger.error(f"Error processing ACORD {transaction.code} request: {str(e)}")
+        return error_response(500, 'Internal Server Error')
+    finally:
+        if request is not None:
+            request.close()
+
+
+def handle_sqs_event(event, context, transaction, deadline=None):
+    """Process queued requests, returning the SQS partial batch response.
+
+    Records are routed on their own TransType so a message that landed on
+    the wrong queue is still processed by the matching transaction logic.
+    Invalid messages are logged and dropped. Once a record fails, is shed by
+    admission control or there is no longer time for one more record before
+    ``deadline``, it and every later record are reported in
+    ``batchItemFailures`` so that only they are redelivered, in their
+    original order on the FIFO queues.
+    """
+    deadline = deadline or Deadline()
+    failures = []
+    # Longest record so far, as the estimate of what the next one needs
+    longest = 0.0
+    for record in event['Records']:
+        message_id = record.get('messageId')
+        if failures or deadline.remaining() <= longest:
+            failures.append({'itemIdentifier': message_id})
+            continue
+        started = time.monotonic()
+        try:
+            # Queue messages are the service's own, references included (see claimcheck)
+            request = open_request(record.get('body') or '', transaction.limits, deadline, trusted=True)
+            target = TRANSACTIONS.get(request.trans_type_code, transaction)
+            if target is not transaction:
+                logger.info(f"Routing SQS message {message_id} to ACORD {target.code}")
+            try:
+                with admission.default_controller().admit(target.code):
+                    # Every TXLifeRequest of the record is processed, or it is redelivered
+                    respond(request, target, get_executor(), deadline, partial=False)
+            finally:
+                request.close()
+        except BadRequest as e:
+            logger.error(f"Dropping invalid SQS message {message_id}: {e}")
+            continue
+        except admission.Overloaded as e:
+            logger.warning(f"Shedding SQS message {message_id}, returning it to the queue: {e}")
+            failures.append({'itemIdentifier': message_id})
+            continue
+        except Exception as e:
+            logger.error(f"Error processing SQS message {message_id}, returning it to the queue: {e}")
+            failures.append({'itemIdentifier': message_id})
+            continue
+        finally:
+            longest = max(longest, time.monotonic() - started)
+        logger.info(f"Processed SQS message {message_id}: TransRefGUID={request.fields.get('TransRefGUID')}")
+    if failures:
+        logger.warning(f"Returning {len(failures)} of {len(event['Records'])} SQS messages to the queue")
+    return {'batchItemFailures': failures}
+
+
+def handle_event(event, context, code):
+    if priming.is_warmup(event):
+        return priming.warm_up_response(code)
+    transaction = TRANSACTIONS[code]
+    deadline = Deadline.from_context(context)
+    if 'Records' in event:
+        return handle_sqs_event(event, context, transaction, deadline)
+    try:
+        with admission.default_controller().admit(code):
+            return handle_api_event(event, context, transaction, deadline)
+    except admission.Overloaded as e:
+        logger.warning(f"Shedding ACORD {code} request: {e}")
+        return overloaded_response(e)
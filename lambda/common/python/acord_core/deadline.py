@@ -0,0 +1,74 @@
+"""Deadlines derived from the Lambda invocation's remaining time.
+
+``Deadline.from_context`` turns ``context.get_remaining_time_in_millis()``
+into an absolute point on the monotonic clock, less ``RESERVE_MS`` kept
+back to serialize the response and report the work left undone. The
+handlers pass it down so that batch and queue loops stop starting new
+items once it has passed, and downstream calls are given no more time
+than is left.
+
+A context without ``get_remaining_time_in_millis`` (local runs, most
+tests) gives a deadline that never expires.
+
+Work the deadline stopped before it started raises ``DeadlineExceeded``
+and is reported "not processed" (503); work it cut short raises
+``OutcomeUnknown`` and is reported "outcome unknown" (504), since what it
+had already sent downstream may or may not have taken effect.
+"""
+import os
+import time
+
+# Time kept back from the invocation for the response and failure reports
+RESERVE_MS = int(os.environ.get('ACORD_DEADLINE_RESERVE_MS', '500'))
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class OutcomeUnknown(DeadlineExceeded):
+    """Processing started but did not finish before the deadline."""
+
+
+class Deadline:
+
+    __slots__ = ('expires_at', '_clock')
+
+    def __init__(self, expires_at=None, clock=time.monotonic):
+        self.expires_at = expires_at
+        self._clock = clock
+
+    @classmethod
+    def from_context(cls, context, reserve_ms=None, clock=time.monotonic):
+        remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+        if remaining_ms is None:
+            return cls(clock=clock)
+        reserve_ms = RESERVE_MS if reserve_ms is None else reserve_ms
+        return cls(clock() + (remaining_ms() - reserve_ms) / 1000, clock)
+
+    @classmethod
+    def after(cls, seconds, clock=time.monotonic):
+        return cls(clock() + seconds, clock)
+
+    def remaining(self):
+        """Seconds left, or ``float('inf')`` for an unbounded deadline."""
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, default=None):
+        """``default`` capped to the time left; None only if both are unbounded."""
+        if self.expires_at is None:
+            return default
+        remaining = self.remaining()
+        return remaining if default is None else min(default, remaining)
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded("Invocation deadline reached")
+
+    def __repr__(self):
+        return f"Deadline(remaining={self.remaining():.3f}s)"
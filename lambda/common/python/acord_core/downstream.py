@@ -0,0 +1,129 @@
+"""Client for the policy administration service behind every transaction.
+
+All four transaction types call the same policy administration service,
+so they share one ``PolicyAdminClient`` per container, built on the
+pooled ``httpclient.default_client()``. A warm container therefore keeps
+its connections to the service alive across invocations and transaction
+types instead of paying for TCP and TLS setup on every call.
+
+Each endpoint has its own timeout and retry budget, and no call outlasts
+the invocation deadline. Reads and idempotent updates are retried with
+jittered backoff; a new-business submission is not, since repeating it
+could open a second case. The defaults can be changed per endpoint with
+``ACORD_POLICY_ADMIN_<ENDPOINT>_TIMEOUT`` and ``..._RETRIES``.
+
+The client, policy and licensing lookups of a 103 go to bulk endpoints
+through the per-invocation loaders of ``lookup_loaders``.
+"""
+import os
+from urllib.parse import quote
+
+from acord_core import httpclient
+from acord_core.loader import DataLoader, Loaders
+
+URL = os.environ.get('ACORD_POLICY_ADMIN_URL')
+
+
+class PolicyAdminError(Exception):
+    pass
+
+
+class Endpoint:
+
+    __slots__ = ('name', 'method', 'path', 'timeout', 'retries')
+
+    def __init__(self, name, method, path, timeout, retries=0):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.timeout = timeout
+        self.retries = retries
+
+    @classmethod
+    def configured(cls, name, method, path, timeout, retries=0):
+        """The endpoint with any environment overrides of its timeout and retries."""
+        prefix = f'ACORD_POLICY_ADMIN_{name.upper()}'
+        timeout = float(os.environ.get(f'{prefix}_TIMEOUT', timeout))
+        retries = int(os.environ.get(f'{prefix}_RETRIES', retries))
+        return cls(name, method, path, timeout, retries)
+
+    def url(self, base_url, fields):
+        values = {name: quote(str(value), safe='') for name, value in fields.items() if isinstance(value, (str, int))}
+        return base_url.rstrip('/') + self.path.format(**values)
+
+    def __repr__(self):
+        return f"Endpoint({self.name!r}, {self.method} {self.path}, timeout={self.timeout}, retries={self.retries})"
+
+
+ENDPOINTS = {
+    'submit': Endpoint.configured('submit', 'POST', '/cases', 10),
+    'change': Endpoint.configured('change', 'PUT', '/policies/{PolNumber}', 5, retries=2),
+    'status': Endpoint.configured('status', 'GET', '/cases/{PolNumber}/status', 2, retries=2),
+    'status_update': Endpoint.configured('status_update', 'PUT', '/cases/{PolNumber}/status', 5, retries=2),
+    # Bulk lookups: existing clients, existing policies and producer licensing
+    'parties': Endpoint.configured('parties', 'POST', '/parties/lookup', 2, retries=2),
+    'holdings': Endpoint.configured('holdings', 'POST', '/policies/lookup', 2, retries=2),
+    'licensing': Endpoint.configured('licensing', 'POST', '/producers/licensing', 2, retries=2),
+}
+
+# The endpoint each transaction's business logic calls
+TRANSACTION_ENDPOINTS = {
+    '103': 'submit',
+    '1125': 'change',
+    '203': 'status',
+    '302': 'status_update',
+}
+
+
+class PolicyAdminClient:
+
+    def __init__(self, base_url, endpoints=None, http=None):
+        self.base_url = base_url
+        self.endpoints = ENDPOINTS if endpoints is None else endpoints
+        self._http = http
+
+    @property
+    def http(self):
+        return self._http or httpclient.default_client()
+
+    async def call(self, endpoint, fields, body=None, deadline=None):
+        """Call ``endpoint`` for the request's routing ``fields``; returns the JSON answer.
+
+        Raises ``PolicyAdminError`` for error statuses and ``httpclient.HTTPError``
+        when the service could not be reached in time.
+        """
+        endpoint = self.endpoints[endpoint]
+        headers = {'Accept': 'application/json'}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        response = await self.http.request(endpoint.method, endpoint.url(self.base_url, fields), body, headers,
+                                           timeout=endpoint.timeout, retries=endpoint.retries, deadline=deadline)
+        if not response.ok:
+            raise PolicyAdminError(f"Policy administration {endpoint.name} answered {response.status}")
+        return response.json() if response.body else {}
+
+    async def lookup(self, endpoint, keys, deadline=None):
+        """Bulk lookup of ``keys``; returns ``{key: answer}`` for the keys the service knows."""
+        answer = await self.call(endpoint, {}, {'keys': list(keys)}, deadline)
+        return answer.get('results') or {}
+
+    def lookup_loaders(self, deadline=None):
+        """Loaders for the bulk lookup endpoints, for one invocation."""
+        def factory(endpoint):
+            return DataLoader(lambda keys: self.lookup(endpoint, keys, deadline))
+        return Loaders(factory)
+
+    def metrics(self):
+        """Connection pool metrics of the shared client (see ``AsyncHTTPClient.metrics``)."""
+        return self.http.metrics()
+
+
+_default_client = None
+
+
+def default_client():
+    """The per-container client for the configured service, or None if unset."""
+    global _default_client
+    if _default_client is None and URL:
+        _default_client = PolicyAdminClient(URL)
+    return _default_client
@@ -0,0 +1,24 @@
+"""Client errors raised while handling ACORD requests.
+
+Each carries the HTTP status and error name the API handlers answer with.
+"""
+
+
+class BadRequest(Exception):
+    status_code = 400
+    error = 'Bad Request'
+
+
+class Forbidden(BadRequest):
+    status_code = 403
+    error = 'Forbidden'
+
+
+class PayloadTooLarge(BadRequest):
+    status_code = 413
+    error = 'Payload Too Large'
+
+
+class UnsupportedMediaType(BadRequest):
+    status_code = 415
+    error = 'Unsupported Media Type'
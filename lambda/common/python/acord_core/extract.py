@@ -0,0 +1,167 @@
+"""Partial extraction of fields from raw ACORD JSON bodies.
+
+Routing, idempotency and logging only need a handful of values such as
+``TransRefGUID``, ``TransType`` and ``PolNumber``. ``PathExtractor`` walks the
+raw text, decodes only the values on the requested paths and stops as soon as
+all of them have been found, so large 103 submissions never have to be fully
+parsed just to be routed.
+
+Skipped strings (typically base64 attachments) are stepped over with
+``str.find`` and never copied; skipped objects and arrays are handed to the C
+JSON scanner.
+
+A key on one of the paths that occurs twice in the same object is rejected:
+the scan would take the first value where ``json.loads`` keeps the last.
+Duplicates after the point where the scan stops are left to whoever parses
+the whole document (see ``AcordRequest.document``).
+"""
+import json
+import re
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR_END = re.compile(r'[,}\]\s]|$')
+
+_decoder = json.JSONDecoder()
+
+
+class _Done(Exception):
+    pass
+
+
+class PathExtractor:
+
+    def __init__(self, paths):
+        # paths maps a result name to a tuple of object keys, e.g.
+        # {"PolNumber": ("TXLife", "TXLifeRequest", "OLifE", ...)}
+        self.paths = dict(paths)
+        self._trie = {}
+        for name, path in self.paths.items():
+            node = self._trie
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+                if not isinstance(node, dict):
+                    raise ValueError(f"Path for {name} passes through another path's leaf")
+            node[path[-1]] = name
+
+    def extract(self, raw):
+        """Return a dict of the requested values found in ``raw``.
+
+        Names whose path is missing from the document are left out of the
+        result. Raises ``ValueError`` if the scanned part of ``raw`` is not
+        valid JSON or repeats a key on one of the paths.
+        """
+        if isinstance(raw, (bytes, bytearray)):
+            raw = raw.decode('utf-8')
+        state = {'found': {}, 'remaining': len(self.paths)}
+        try:
+            end = self._value(raw, self._skip_ws(raw, 0), self._trie, state)
+            if self._skip_ws(raw, end) != len(raw):
+                raise ValueError("Extra data after JSON document")
+        except _Done:
+            pass
+        except IndexError:
+            raise ValueError("Unexpected end of JSON document")
+        return state['found']
+
+    def extract_document(self, document):
+        """Same as ``extract`` for a document that is already parsed."""
+        found = {}
+        for name, path in self.paths.items():
+            node = document
+            for key in path:
+                if not isinstance(node, dict) or key not in node:
+                    break
+                node = node[key]
+            else:
+                found[name] = node
+        return found
+
+    @staticmethod
+    def _skip_ws(s, i):
+        return _WHITESPACE.match(s, i).end()
+
+    def _value(self, s, i, node, state):
+        if isinstance(node, str):
+            try:
+                value, end = _decoder.raw_decode(s, i)
+            except json.JSONDecodeError as e:
+                raise ValueError(str(e))
+            state['found'][node] = value
+            state['remaining'] -= 1
+            if state['remaining'] == 0:
+                raise _Done()
+            return end
+        if s[i] != '{':
+            return self._skip(s, i)
+        i = self._skip_ws(s, i + 1)
+        if s[i] == '}':
+            return i + 1
+        seen = None
+        while True:
+            match = _STRING.match(s, i)
+            if match is None:
+                raise ValueError(f"Expecting property name at char {i}")
+            key = match.group()
+            key = json.loads(key) if '\\' in key else key[1:-1]
+            i = self._skip_ws(s, match.end())
+            if s[i] != ':':
+                raise ValueError(f"Expecting ':' delimiter at char {i}")
+            i = self._skip_ws(s, i + 1)
+            child = node.get(key)
+            if child is None:
+                i = self._skip(s, i)
+            else:
+                if seen is None:
+                    seen = set()
+                elif key in seen:
+                    raise ValueError(f"Duplicate key {key!r} at char {match.start()}")
+                seen.add(key)
+                i = self._value(s, i, child, state)
+            i = self._skip_ws(s, i)
+            if s[i] == '}':
+                return i + 1
+            if s[i] != ',':
+                raise ValueError(f"Expecting ',' delimiter at char {i}")
+            i = self._skip_ws(s, i + 1)
+
+    @staticmethod
+    def _skip(s, i):
+        # Skip one JSON value starting at i without building it where possible
+        first = s[i]
+        if first == '"':
+            return _skip_string(s, i)
+        if first in '{[':
+            try:
+                return _decoder.raw_decode(s, i)[1]
+            except json.JSONDecodeError as e:
+                raise ValueError(str(e))
+        return _SCALAR_END.search(s, i).start()
+
+
+def _skip_string(s, i):
+    j = i + 1
+    while True:
+        j = s.find('"', j)
+        if j < 0:
+            raise ValueError(f"Unterminated string starting at char {i}")
+        # The quote is escaped only if preceded by an odd number of backslashes
+        k = j - 1
+        while s[k] == '\\':
+            k -= 1
+        if (j - k) % 2 == 1:
+            return j + 1
+        j += 1
+
+
+ROUTING_PATHS = {
+    "TransRefGUID": ("TXLife", "TXLifeRequest", "TransRefGUID"),
+    "TransType": ("TXLife", "TXLifeRequest", "TransType"),
+    "PolNumber": ("TXLife", "TXLifeRequest", "OLifE", "Holding", "Policy", "PolNumber"),
+}
+
+ROUTING_EXTRACTOR = PathExtractor(ROUTING_PATHS)
+
+
+def extract_routing_fields(raw):
+    return ROUTING_EXTRACTOR.extract(raw)
@@ -0,0 +1,288 @@
+"""Concurrent fan-out of 203 inquiries to several back ends.
+
+A pending-case status is assembled from several systems (new-business
+workbench, underwriting, requirements vendors), each a ``Source``. All
+sources are queried at once, each under its own timeout and never past
+the request's deadline. A source whose answer takes longer than its
+recent p95 latency is sent a second, hedged request and the first answer
+to arrive wins. Hedges are limited to ``HEDGE_BUDGET`` of a source's
+requests, so a source that slows down as a whole does not get double the
+load. A request cut short by its timeout or by a winning hedge still
+counts towards the latencies, as at least as long as it ran; leaving it
+out would hide the slow tail the p95 is there to find.
+
+With a ``quorum``, once that many sources have answered the rest get at
+most ``grace`` seconds more, so an inquiry waits for the fastest quorum
+rather than the slowest system. Each answer is a fragment of
+TXLifeResponse merged into the response. ``TransResult`` then carries a
+``ResultInfo`` per source, with ResultCode Success when every source
+answered, Success with Information for a partial response and Failure
+when none did.
+
+Sources are configured with ``ACORD_203_SOURCES``, a JSON list of
+``{"name": ..., "url": ..., "timeout": seconds, "hedge": true}``. The
+pending case store and the policy administration service, when
+configured, come first.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+
+from acord_core import aio, httpclient
+from acord_core.typecodes import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = float(os.environ.get('ACORD_SOURCE_TIMEOUT', '2'))
+QUORUM = int(os.environ.get('ACORD_203_QUORUM', '0')) or None
+QUORUM_GRACE = float(os.environ.get('ACORD_203_QUORUM_GRACE', '0.1'))
+
+# Samples kept per source, and needed before hedging starts
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+
+# Fraction of a source's requests that may be hedged, and how many unused
+# hedges can be saved up for a burst
+HEDGE_BUDGET = float(os.environ.get('ACORD_HEDGE_BUDGET', '0.05'))
+HEDGE_BURST = 5
+
+# Kept back from the deadline so a partial response can still be built
+DEADLINE_MARGIN = 0.05
+
+ANSWERED = 'answered'
+TIMED_OUT = 'timed out'
+FAILED = 'failed'
+
+
+class SourceError(Exception):
+    pass
+
+
+class LatencyTracker:
+    """Recent latencies of one source."""
+
+    __slots__ = ('samples',)
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def p95(self):
+        """The 95th percentile, or None until there are enough samples."""
+        if len(self.samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class Source:
+    """A back end answering inquiries through the ``fetch`` coroutine.
+
+    ``fetch(request)`` returns a dict fragment of TXLifeResponse.
+    """
+
+    def __init__(self, name, fetch=None, timeout=DEFAULT_TIMEOUT, hedge=True):
+        self.name = name
+        if fetch is not None:
+            self.fetch = fetch
+        self.timeout = timeout
+        self.hedge = hedge
+        self.latency = LatencyTracker()
+        self.hedged = 0
+        self.hedge_wins = 0
+        # Each request earns HEDGE_BUDGET of a hedge; the first is free
+        self.hedge_tokens = 1.0
+
+    async def fetch(self, request):
+        raise NotImplementedError
+
+    async def _attempt(self, request, censored=True):
+        """Fetch, recording the latency; with ``censored`` also when cancelled before answering.
+
+        A hedge that loses the race says nothing about how long the source
+        takes, so the hedge attempt is not recorded when cancelled.
+        """
+        started = time.monotonic()
+        try:
+            result = await self.fetch(request)
+        except asyncio.CancelledError:
+            if censored:
+                self.latency.record(time.monotonic() - started)
+            raise
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    def _take_hedge(self):
+        if self.hedge_tokens < 1:
+            return False
+        self.hedge_tokens -= 1
+        return True
+
+    async def call(self, request):
+        """Fetch, sending a hedged request once the first passes the p95 latency."""
+        self.hedge_tokens = min(HEDGE_BURST, self.hedge_tokens + HEDGE_BUDGET)
+        first = asyncio.ensure_future(self._attempt(request))
+        attempts = [first]
+        try:
+            delay = self.latency.p95() if self.hedge else None
+            if delay is None:
+                return await first
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                if not self._take_hedge():
+                    return await first
+                self.hedged += 1
+                attempts.append(asyncio.ensure_future(self._attempt(request, censored=False)))
+            error = None
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not first:
+                            self.hedge_wins += 1
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+
+class HTTPSource(Source):
+    """A source answering a POST of the routing fields with a JSON fragment."""
+
+    def __init__(self, name, url, timeout=DEFAULT_TIMEOUT, hedge=True):
+        super().__init__(name, timeout=timeout, hedge=hedge)
+        self.url = url
+
+    async def fetch(self, request):
+        fields = {name: request.fields[name] for name in ('TransRefGUID', 'PolNumber') if name in request.fields}
+        response = await httpclient.default_client().post(self.url, fields, timeout=self.timeout)
+        if not response.ok:
+            raise SourceError(f"{self.name} answered {response.status}")
+        return response.json()
+
+
+class PolicyAdminSource(Source):
+    """The case status from the policy administration service (see ``downstream``)."""
+
+    def __init__(self, client, name='policyadmin', hedge=True):
+        super().__init__(name, timeout=client.endpoints['status'].timeout, hedge=hedge)
+        self.client = client
+
+    async def fetch(self, request):
+        return await self.client.call('status', request.fields, deadline=request.deadline)
+
+
+class CaseStoreSource(Source):
+    """The pending case as last recorded by a 302 (see ``casestore``)."""
+
+    def __init__(self, store, name='casestore', timeout=DEFAULT_TIMEOUT):
+        # A single key lookup: there is nothing for a hedge to win
+        super().__init__(name, timeout=timeout, hedge=False)
+        self.store = store
+
+    async def fetch(self, request):
+        case = await aio.run_blocking(self.store.get, request.fields['PolNumber'])
+        if case is None:
+            raise SourceError(f"No pending case {request.fields['PolNumber']}")
+        return {"OLifE": case["OLifE"]}
+
+
+def sources_from_environment():
+    config = os.environ.get('ACORD_203_SOURCES')
+    if not config:
+        return []
+    return [HTTPSource(item['name'], item['url'], float(item.get('timeout', DEFAULT_TIMEOUT)),
+                       item.get('hedge', True)) for item in json.loads(config)]
+
+
+def merge(target, fragment):
+    """Merge ``fragment`` into ``target``; values already present win, lists are joined."""
+    for key, value in fragment.items():
+        current = target.get(key)
+        if isinstance(current, dict) and isinstance(value, dict):
+            merge(current, value)
+        elif isinstance(current, list):
+            current.extend(value if isinstance(value, list) else [value])
+        elif key not in target:
+            target[key] = value
+    return target
+
+
+class FanOut:
+    """Queries ``sources`` for each inquiry and merges their answers."""
+
+    def __init__(self, sources, quorum=QUORUM, grace=QUORUM_GRACE):
+        self.sources = list(sources)
+        self.quorum = quorum
+        self.grace = grace
+
+    async def query(self, request, deadline=None):
+        """Query every source; returns ``{name: (outcome, fragment or message)}``."""
+        budget = deadline.timeout() if deadline is not None else None
+        if budget is not None:
+            budget -= DEADLINE_MARGIN
+        if budget is not None and budget <= 0:
+            return {source.name: (TIMED_OUT, "Not queried before the deadline") for source in self.sources}
+        tasks = {}
+        for source in self.sources:
+            timeout = source.timeout if budget is None else min(source.timeout, budget)
+            tasks[asyncio.ensure_future(asyncio.wait_for(source.call(request), timeout))] = source
+        pending = set(tasks)
+        answered = 0
+        grace_until = None
+        while pending:
+            timeout = None if grace_until is None else max(0.0, grace_until - time.monotonic())
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            answered += sum(1 for task in done if task.exception() is None)
+            if grace_until is None and self.quorum and answered >= self.quorum:
+                grace_until = time.monotonic() + self.grace
+        for task in pending:
+            task.cancel()
+
+        outcomes = {}
+        for task, source in tasks.items():
+            if task in pending or isinstance(task.exception(), (asyncio.TimeoutError, httpclient.HTTPTimeout)):
+                outcomes[source.name] = (TIMED_OUT, f"No answer within {source.timeout}s")
+            elif task.exception() is not None:
+                logger.warning(f"Inquiry source {source.name} failed: {task.exception()!r}")
+                outcomes[source.name] = (FAILED, str(task.exception()) or type(task.exception()).__name__)
+            else:
+                outcomes[source.name] = (ANSWERED, task.result())
+        return outcomes
+
+    def respond(self, response, outcomes):
+        """Merge the answers into ``response`` and report each source in TransResult."""
+        typecodes = registry()
+        infos = []
+        for source in self.sources:
+            outcome, value = outcomes[source.name]
+            if outcome == ANSWERED:
+                # Each source's own TransResult is replaced by the per-source report
+                merge(response, {key: item for key, item in value.items() if key != "TransResult"})
+                infos.append({"ResultInfoCode": typecodes.typecode("ResultInfoCode", "1"),
+                              "ResultInfoDesc": f"{source.name}: answered",
+                              "ResultInfoSysMessageCode": source.name})
+            else:
+                infos.append({"ResultInfoCode": typecodes.typecode("ResultInfoCode", "5"),
+                              "ResultInfoDesc": f"{source.name}: {outcome}: {value}",
+                              "ResultInfoSysMessageCode": source.name})
+        answered = sum(1 for outcome, _ in outcomes.values() if outcome == ANSWERED)
+        result_code = "1" if answered == len(self.sources) else "2" if answered else "5"
+        response["TransResult"] = {
+            "ResultCode": typecodes.typecode("ResultCode", result_code),
+            "ResultInfo": infos,
+        }
+        return response
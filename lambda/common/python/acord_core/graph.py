@@ -0,0 +1,143 @@
+"""Indexed Party, Holding and Relation objects of an OLifE.
+
+ACORD links objects indirectly: a ``Relation`` names its two ends by the
+``id`` of a Party or Holding in ``OriginatingObjectID`` and
+``RelatedObjectID``. Finding the insured of a policy by scanning the
+Relation list and then the Party list for each match is quadratic in a
+large 103 submission.
+
+``ObjectGraph`` is built in one pass over the OLifE. It indexes every
+Party and Holding by id and every Holding by PolNumber, and keeps
+adjacency lists keyed by ``(object id, RelationRoleCode tc)`` in both
+directions. Looking up an object or the ends of a role is then a dict
+access, and traversals cost only the number of objects they return.
+
+``AcordRequest.graph`` builds it once per request; the 103's lookups and
+the pending case record both read the OLifE through it.
+"""
+
+# RelationRoleCode tc values of the roles business logic asks about most
+OWNER = '8'
+INSURED = '32'
+BENEFICIARY = '34'
+
+ANY_ROLE = None
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _role(code):
+    if isinstance(code, dict):
+        code = code.get('tc')
+    return str(code) if isinstance(code, (str, int)) else None
+
+
+class ObjectGraph:
+
+    __slots__ = ('objects', 'kinds', 'relations', '_aggregates', '_forward', '_reverse', '_policies')
+
+    def __init__(self):
+        # id -> Party or Holding aggregate, and id -> 'Party' or 'Holding'
+        self.objects = {}
+        self.kinds = {}
+        self.relations = []
+        # 'Party' or 'Holding' -> every aggregate in document order, with or without an id
+        self._aggregates = {'Party': [], 'Holding': []}
+        # (originating id, role) -> related ids, and the reverse; role None is any
+        self._forward = {}
+        self._reverse = {}
+        # PolNumber -> Holding id
+        self._policies = {}
+
+    @classmethod
+    def from_olife(cls, olife):
+        graph = cls()
+        objects, kinds, policies = graph.objects, graph.kinds, graph._policies
+        for kind in ('Party', 'Holding'):
+            aggregates = graph._aggregates[kind]
+            for aggregate in _as_list(olife.get(kind)):
+                if not isinstance(aggregate, dict):
+                    continue
+                aggregates.append(aggregate)
+                object_id = aggregate.get('id')
+                if not isinstance(object_id, str):
+                    continue
+                objects[object_id] = aggregate
+                kinds[object_id] = kind
+                if kind == 'Holding':
+                    policy = aggregate.get('Policy')
+                    pol_number = policy.get('PolNumber') if isinstance(policy, dict) else None
+                    if isinstance(pol_number, str):
+                        policies.setdefault(pol_number, object_id)
+
+        forward, reverse = graph._forward, graph._reverse
+        for relation in _as_list(olife.get('Relation')):
+            if not isinstance(relation, dict):
+                continue
+            originating = relation.get('OriginatingObjectID')
+            related = relation.get('RelatedObjectID')
+            if not isinstance(originating, str) or not isinstance(related, str):
+                continue
+            graph.relations.append(relation)
+            role = _role(relation.get('RelationRoleCode'))
+            for key in ((originating, role), (originating, ANY_ROLE)):
+                ends = forward.get(key)
+                if ends is None:
+                    forward[key] = [related]
+                else:
+                    ends.append(related)
+            for key in ((related, role), (related, ANY_ROLE)):
+                ends = reverse.get(key)
+                if ends is None:
+                    reverse[key] = [originating]
+                else:
+                    ends.append(originating)
+        return graph
+
+    def get(self, object_id):
+        return self.objects.get(object_id)
+
+    def aggregates(self, kind):
+        """Every ``'Party'`` or ``'Holding'`` aggregate in document order, including any without an id."""
+        return self._aggregates[kind]
+
+    def holding(self, pol_number):
+        """The Holding whose Policy has ``pol_number``, or None."""
+        object_id = self._policies.get(pol_number)
+        return None if object_id is None else self.objects[object_id]
+
+    def _ends(self, index, object_id, role, kind):
+        objects, kinds = self.objects, self.kinds
+        return [objects[end] for end in index.get((object_id, _role(role)), ())
+                if end in objects and (kind is None or kinds[end] == kind)]
+
+    def related(self, object_id, role=ANY_ROLE, kind=None):
+        """Objects ``object_id`` originates relations to, optionally of one role and kind."""
+        return self._ends(self._forward, object_id, role, kind)
+
+    def originating(self, object_id, role=ANY_ROLE, kind=None):
+        """Objects with relations to ``object_id``, optionally of one role and kind."""
+        return self._ends(self._reverse, object_id, role, kind)
+
+    def parties(self, holding_id, role=ANY_ROLE):
+        """Parties related to a Holding, e.g. ``parties(id, INSURED)``."""
+        return self.related(holding_id, role, 'Party')
+
+    def holdings(self, party_id, role=ANY_ROLE):
+        """Holdings relating to a Party, e.g. ``holdings(id, OWNER)``."""
+        return self.originating(party_id, role, 'Holding')
+
+    def policy_parties(self, pol_number, role=ANY_ROLE):
+        """Parties in ``role`` for the policy ``pol_number``, e.g. its insured."""
+        object_id = self._policies.get(pol_number)
+        return [] if object_id is None else self.parties(object_id, role)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __repr__(self):
+        return f"ObjectGraph({len(self.objects)} objects, {len(self.relations)} relations)"
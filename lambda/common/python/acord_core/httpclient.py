@@ -0,0 +1,341 @@
+"""Asynchronous HTTP/1.1 client with per-container connection pooling.
+
+Downstream systems are called from coroutines on the ``aio`` loop. The
+client keeps the idle keep-alive connections of each origin (scheme,
+host and port) and hands them out again before opening new ones, so a
+warm container pays for TCP and TLS setup once per connection rather
+than once per call. At most ``POOL_SIZE`` connections per origin are in
+use at a time; further requests wait for one to be returned.
+
+Idle connections older than ``KEEPALIVE_TIMEOUT`` are discarded rather
+than reused, since the container may have been frozen in between. An
+idempotent request that finds its reused connection closed by the server
+is retried once on a new connection.
+
+Callers may also ask for bounded retries of failed attempts: connection
+errors, timeouts and 502, 503 and 504 answers are retried after a
+randomised ("full jitter") exponential backoff, so callers that failed
+together do not retry in lockstep. Only requests that are safe to repeat
+should be retried. ``metrics()`` reports how often connections were
+reused and how long requests waited for a free one.
+
+It is written on asyncio streams so the layer needs no third-party
+packages, and handles the parts of HTTP/1.1 the downstream services use:
+Content-Length and chunked bodies, keep-alive and ``Connection: close``.
+Request bodies may be streamed from an iterable of chunks of known length.
+"""
+import asyncio
+import json
+import os
+import random
+import ssl
+import time
+from urllib.parse import urlsplit
+
+POOL_SIZE = int(os.environ.get('ACORD_HTTP_POOL_SIZE', '10'))
+KEEPALIVE_TIMEOUT = float(os.environ.get('ACORD_HTTP_KEEPALIVE_TIMEOUT', '30'))
+DEFAULT_TIMEOUT = float(os.environ.get('ACORD_HTTP_TIMEOUT', '10'))
+RETRY_BASE = float(os.environ.get('ACORD_HTTP_RETRY_BASE', '0.05'))
+RETRY_CAP = float(os.environ.get('ACORD_HTTP_RETRY_CAP', '1'))
+
+_IDEMPOTENT = frozenset(('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'))
+_NO_BODY_STATUS = frozenset((204, 304))
+RETRY_STATUS = frozenset((502, 503, 504))
+
+
+class HTTPError(Exception):
+    pass
+
+
+class HTTPTimeout(HTTPError):
+    pass
+
+
+class _ConnectionClosed(ConnectionError):
+    # The server closed the connection before sending a status line
+    pass
+
+
+class HTTPResponse:
+
+    __slots__ = ('status', 'headers', 'body')
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    def json(self):
+        return json.loads(self.body)
+
+    def __repr__(self):
+        return f"HTTPResponse(status={self.status}, body={len(self.body)} bytes)"
+
+
+class _Connection:
+
+    __slots__ = ('reader', 'writer', 'idle_since')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = None
+
+    def close(self):
+        self.writer.close()
+
+
+class _Pool:
+
+    __slots__ = ('idle', 'slots', 'requests', 'opened', 'reused', 'wait_time', 'max_wait')
+
+    def __init__(self, size):
+        self.idle = []
+        self.slots = asyncio.Semaphore(size)
+        self.requests = 0
+        self.opened = 0
+        self.reused = 0
+        # Seconds spent waiting for a free connection slot
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+
+def backoff(attempt, base=None, cap=None):
+    """Seconds to wait before retry ``attempt`` (from 1), with full jitter."""
+    base = RETRY_BASE if base is None else base
+    cap = RETRY_CAP if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+async def _read_headers(reader):
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        value = value.strip()
+        headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+
+async def _read_chunked(reader):
+    chunks = []
+    while True:
+        size = int((await reader.readline()).split(b';', 1)[0].strip() or b'0', 16)
+        if size == 0:
+            await _read_headers(reader)
+            return b''.join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readline()
+
+
+class AsyncHTTPClient:
+
+    def __init__(self, pool_size=None, keepalive_timeout=None, timeout=None, ssl_context=None):
+        self.pool_size = POOL_SIZE if pool_size is None else pool_size
+        self.keepalive_timeout = KEEPALIVE_TIMEOUT if keepalive_timeout is None else keepalive_timeout
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        self._ssl_context = ssl_context
+        self._pools = {}
+        self.retries = 0
+
+    def _ssl(self, scheme):
+        if scheme != 'https':
+            return None
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    async def _acquire(self, pool, scheme, host, port):
+        now = time.monotonic()
+        while pool.idle:
+            connection = pool.idle.pop()
+            if now - connection.idle_since < self.keepalive_timeout and not connection.reader.at_eof():
+                pool.reused += 1
+                return connection, True
+            connection.close()
+        reader, writer = await asyncio.open_connection(host, port, ssl=self._ssl(scheme))
+        pool.opened += 1
+        return _Connection(reader, writer), False
+
+    async def _exchange(self, connection, method, host, path, headers, body):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if body is not None or method in ('POST', 'PUT', 'PATCH'):
+            lines.append(f"Content-Length: {len(body or b'')}")
+        head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        if body is None or isinstance(body, bytes):
+            connection.writer.write(head + (body or b''))
+        else:
+            # Streamed: written a chunk at a time, never held whole
+            connection.writer.write(head)
+            for chunk in body:
+                connection.writer.write(chunk)
+                await connection.writer.drain()
+        await connection.writer.drain()
+
+        reader = connection.reader
+        while True:
+            status_line = await reader.readline()
+            if not status_line:
+                raise _ConnectionClosed("Connection closed before a response")
+            version, status = status_line.decode('latin-1').split(None, 2)[:2]
+            status = int(status)
+            response_headers = await _read_headers(reader)
+            # Interim responses (100 Continue) precede the real one
+            if not 100 <= status < 200:
+                break
+
+        keep_alive = version == 'HTTP/1.1' and response_headers.get('connection', '').lower() != 'close'
+        if method == 'HEAD' or status in _NO_BODY_STATUS:
+            data = b''
+        elif 'chunked' in response_headers.get('transfer-encoding', '').lower():
+            data = await _read_chunked(reader)
+        elif 'content-length' in response_headers:
+            data = await reader.readexactly(int(response_headers['content-length']))
+        else:
+            # Delimited by the server closing the connection
+            data = await reader.read()
+            keep_alive = False
+        return HTTPResponse(status, response_headers, data), keep_alive
+
+    async def _send(self, method, url, headers, body):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https') or not parts.hostname:
+            raise HTTPError(f"Unsupported URL: {url}")
+        port = parts.port or (443 if scheme == 'https' else 80)
+        host = parts.netloc.rpartition('@')[2]
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+
+        key = (scheme, parts.hostname, port)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _Pool(self.pool_size)
+        pool.requests += 1
+        waiting = time.monotonic()
+        async with pool.slots:
+            waited = time.monotonic() - waiting
+            pool.wait_time += waited
+            pool.max_wait = max(pool.max_wait, waited)
+            for attempt in range(2):
+                connection, reused = await self._acquire(pool, scheme, parts.hostname, port)
+                try:
+                    response, keep_alive = await self._exchange(connection, method, host, path, headers, body)
+                except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+                    connection.close()
+                    if reused and attempt == 0 and method in _IDEMPOTENT:
+                        continue
+                    raise HTTPError(f"{method} {url} failed: {e!r}") from e
+                except BaseException:
+                    # Timed out or cancelled mid-exchange: the connection state is unknown
+                    connection.close()
+                    raise
+                if keep_alive:
+                    connection.idle_since = time.monotonic()
+                    pool.idle.append(connection)
+                else:
+                    connection.close()
+                return response
+
+    async def _attempt(self, method, url, headers, body, timeout):
+        try:
+            return await asyncio.wait_for(self._send(method, url, headers, body), timeout)
+        except asyncio.TimeoutError:
+            raise HTTPTimeout(f"{method} {url} timed out after {timeout}s")
+
+    async def request(self, method, url, body=None, headers=None, timeout=None, retries=0, deadline=None):
+        """Send a request and return the ``HTTPResponse``.
+
+        ``body`` may be bytes, text or a JSON-serializable dict or list, or
+        a streamed body: an iterable of bytes chunks with a ``len()``, such
+        as ``attachments.JSONBody``, that can be iterated once per attempt.
+        Raises ``HTTPTimeout`` after ``timeout`` seconds (default
+        ``self.timeout``) and ``HTTPError`` for connection failures; HTTP
+        error statuses are returned, not raised. Up to ``retries`` failed
+        attempts are repeated after a jittered backoff, and the caller sees
+        the last one. With a ``deadline`` no attempt outlasts it and no
+        retry is started that it would cut short.
+        """
+        method = method.upper()
+        headers = dict(headers or {})
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+            headers.setdefault('Content-Type', 'application/json')
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+        timeout = self.timeout if timeout is None else timeout
+        attempt = 0
+        while True:
+            attempt_timeout = timeout if deadline is None else deadline.timeout(timeout)
+            try:
+                response = await self._attempt(method, url, headers, body, attempt_timeout)
+                if response.status not in RETRY_STATUS or attempt >= retries:
+                    return response
+                failure = None
+            except HTTPError as e:
+                if attempt >= retries:
+                    raise
+                failure = e
+            attempt += 1
+            delay = backoff(attempt)
+            if deadline is not None and deadline.remaining() <= delay:
+                if failure is not None:
+                    raise failure
+                return response
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, body=None, **kwargs):
+        return await self.request('POST', url, body=body, **kwargs)
+
+    def idle_connections(self):
+        return sum(len(pool.idle) for pool in self._pools.values())
+
+    def metrics(self):
+        """Pool counters of this container, summed over every origin.
+
+        ``reuse_ratio`` is the share of connections handed out that were
+        kept-alive ones; ``mean_wait`` and ``max_wait`` are the seconds
+        requests waited for a connection slot.
+        """
+        pools = list(self._pools.values())
+        requests = sum(pool.requests for pool in pools)
+        opened = sum(pool.opened for pool in pools)
+        reused = sum(pool.reused for pool in pools)
+        wait_time = sum(pool.wait_time for pool in pools)
+        return {
+            'requests': requests,
+            'opened': opened,
+            'reused': reused,
+            'reuse_ratio': reused / (opened + reused) if opened + reused else 0.0,
+            'retries': self.retries,
+            'mean_wait': wait_time / requests if requests else 0.0,
+            'max_wait': max((pool.max_wait for pool in pools), default=0.0),
+            'idle': self.idle_connections(),
+        }
+
+    def close(self):
+        for pool in self._pools.values():
+            for connection in pool.idle:
+                connection.close()
+            pool.idle.clear()
+
+
+_default_client = None
+
+
+def default_client():
+    """The per-container client; use it from coroutines on the ``aio`` loop."""
+    global _default_client
+    if _default_client is None:
+        _default_client = AsyncHTTPClient()
+    return _default_client
@@ -0,0 +1,132 @@
+"""Resource limits on the work a single request can cause.
+
+Before a body is parsed, ``check_text`` scans its structure against the
+transaction's ``Limits``: body size, nesting depth, total nodes (objects,
+arrays and strings), string length and keys per object. The scan visits
+only brackets and quotes, steps over string contents with ``str.find`` and
+stops at the first limit exceeded, so a pathological body is rejected in
+time proportional to the limit rather than to the body.
+
+Limits default per transaction type and can be overridden from the
+environment, per type (``ACORD_103_MAX_DEPTH``) or for all types
+(``ACORD_MAX_DEPTH``). ``max_body_size`` is the one setting for how large a
+body may get: it also bounds decompression (``compression.request_body``)
+and claim-checked payloads, and the largest of them caps client uploads.
+"""
+import os
+import re
+
+from acord_core.errors import BadRequest, PayloadTooLarge
+from acord_core.extract import _skip_string
+
+DEFAULTS = {
+    'max_body_size': 1024 * 1024,
+    'max_depth': 32,
+    'max_nodes': 10000,
+    'max_string_length': 64 * 1024,
+    'max_attributes': 256,
+}
+
+# Per transaction type; 103 bodies carry attachments and batches many documents
+OVERRIDES = {
+    '103': {'max_body_size': 64 * 1024 * 1024, 'max_nodes': 50000},
+    'batch': {'max_body_size': 6 * 1024 * 1024, 'max_depth': 34, 'max_nodes': 500000},
+}
+
+# Attachment data is bounded by the body size rather than the string limit
+EXEMPT_KEYS = frozenset(('AttachmentData',))
+
+_STRUCTURE = re.compile(r'["{}\[\]]')
+_BODY_SIZE_SETTING = re.compile(r'ACORD_(\w+)_MAX_BODY_SIZE\Z')
+_KEY_SEPARATOR = re.compile(r'[ \t\n\r]*:')
+
+
+class Limits:
+
+    __slots__ = tuple(DEFAULTS)
+
+    def __init__(self, **limits):
+        unknown = set(limits) - set(DEFAULTS)
+        if unknown:
+            raise TypeError(f"Unknown limits: {', '.join(sorted(unknown))}")
+        for name, default in DEFAULTS.items():
+            setattr(self, name, limits.get(name, default))
+
+    @classmethod
+    def for_type(cls, code):
+        """The limits for a transaction type, with environment overrides applied."""
+        limits = dict(DEFAULTS, **OVERRIDES.get(code, {}))
+        for name in DEFAULTS:
+            value = os.environ.get(f'ACORD_{code.upper()}_{name.upper()}', os.environ.get(f'ACORD_{name.upper()}'))
+            if value is not None:
+                limits[name] = int(value)
+        return cls(**limits)
+
+    @classmethod
+    def largest_body_size(cls):
+        """The largest ``max_body_size`` of any transaction type."""
+        codes = set(OVERRIDES)
+        codes.update(match.group(1).lower() for match in map(_BODY_SIZE_SETTING.match, os.environ) if match)
+        base = int(os.environ.get('ACORD_MAX_BODY_SIZE', DEFAULTS['max_body_size']))
+        return max([base] + [cls.for_type(code).max_body_size for code in codes])
+
+    def __repr__(self):
+        return 'Limits(%s)' % ', '.join(f'{name}={getattr(self, name)}' for name in DEFAULTS)
+
+
+def check_size(size, limits):
+    if size > limits.max_body_size:
+        raise PayloadTooLarge(f"Request body of {size} bytes exceeds {limits.max_body_size}")
+
+
+def check_text(raw, limits):
+    """Raise ``BadRequest`` or ``PayloadTooLarge`` if ``raw`` exceeds ``limits``.
+
+    Malformed JSON is left for the parser to report.
+    """
+    check_size(len(raw), limits)
+    max_depth = limits.max_depth
+    max_nodes = limits.max_nodes
+    max_string = limits.max_string_length + 2
+    max_attributes = limits.max_attributes
+    # Keys seen in each open container; None for arrays
+    keys = []
+    nodes = 0
+    exempt = False
+    search = _STRUCTURE.search
+    match = search(raw)
+    while match is not None:
+        i = match.start()
+        c = raw[i]
+        if c == '"':
+            try:
+                end = _skip_string(raw, i)
+            except ValueError:
+                return
+            is_key = _KEY_SEPARATOR.match(raw, end) is not None
+            if end - i > max_string and not (exempt and not is_key):
+                raise PayloadTooLarge(f"String exceeds {limits.max_string_length} characters")
+            if is_key:
+                if keys and keys[-1] is not None:
+                    keys[-1] += 1
+                    if keys[-1] > max_attributes:
+                        raise BadRequest(f"Object has more than {max_attributes} keys")
+                exempt = raw[i + 1:end - 1] in EXEMPT_KEYS
+            else:
+                exempt = False
+            nodes += 1
+            position = end
+        elif c == '{' or c == '[':
+            keys.append(0 if c == '{' else None)
+            if len(keys) > max_depth:
+                raise BadRequest(f"Document nesting exceeds depth {max_depth}")
+            nodes += 1
+            exempt = False
+            position = i + 1
+        else:
+            if keys:
+                keys.pop()
+            position = i + 1
+        if nodes > max_nodes:
+            raise PayloadTooLarge(f"Document exceeds {max_nodes} nodes")
+        match = search(raw, position)
@@ -0,0 +1,139 @@
+"""Batched, memoized downstream lookups for one invocation.
+
+A 103 submission can carry dozens of Party and Holding aggregates, each
+needing a lookup: is the party an existing client, is the holding an
+existing policy, is the producer licensed. Made one at a time that is N
+sequential round trips. A ``DataLoader`` instead collects the keys asked
+for during one turn of the event loop and fetches them with a single
+bulk call, so a submission costs one call per back end however many
+aggregates it holds.
+
+Each key's result is memoized for the life of the loader, which is one
+invocation: ``Loaders`` are kept on the request (and shared with the parts
+of a multi-request document), never across invocations, so nothing stale
+outlives the request that fetched it. Failed lookups are not memoized.
+"""
+import asyncio
+import os
+
+from acord_core.fanout import merge
+
+MAX_BATCH_SIZE = int(os.environ.get('ACORD_LOOKUP_BATCH_SIZE', '100'))
+
+
+class DataLoader:
+    """Coalesces ``load(key)`` calls into calls of ``batch(keys)``.
+
+    ``batch`` is a coroutine function returning a mapping of the keys it
+    found to their values; keys it leaves out load as None.
+    """
+
+    def __init__(self, batch, max_batch_size=MAX_BATCH_SIZE):
+        self._batch = batch
+        self.max_batch_size = max_batch_size
+        self._futures = {}
+        self._queue = []
+        # Bulk calls made, and keys fetched by them
+        self.calls = 0
+        self.fetched = 0
+
+    def load(self, key):
+        """Awaitable value for ``key``; must be called on the event loop.
+
+        Cancelling the awaitable does not cancel the shared lookup.
+        """
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            if not self._queue:
+                # Runs after every load already scheduled for this turn
+                loop.call_soon(self._dispatch)
+            self._queue.append(key)
+        return asyncio.shield(future)
+
+    async def load_many(self, keys):
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), self.max_batch_size):
+            asyncio.ensure_future(self._fetch(keys[start:start + self.max_batch_size]))
+
+    async def _fetch(self, keys):
+        self.calls += 1
+        self.fetched += len(keys)
+        try:
+            results = await self._batch(keys)
+        except Exception as e:
+            for key in keys:
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(results.get(key))
+
+
+class Loaders(dict):
+    """The loaders of one invocation, created by ``factory(name)`` on first use."""
+
+    def __init__(self, factory):
+        super().__init__()
+        self.factory = factory
+
+    def __missing__(self, name):
+        loader = self[name] = self.factory(name)
+        return loader
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _key(value):
+    return str(value) if isinstance(value, (str, int)) and value != '' else None
+
+
+def lookups(graph):
+    """Yield ``(back end, key, aggregate)`` for each lookup an OLifE needs.
+
+    ``graph`` is the OLifE's ``graph.ObjectGraph``.
+
+    Parties are looked up as clients by GovtID and, when they carry a
+    Producer aggregate, for licensing by CompanyProducerID; holdings by
+    PolNumber. Relations only refer to these by id and need no lookup.
+    """
+    for party in graph.aggregates('Party'):
+        govt_id = _key(party.get('GovtID'))
+        if govt_id is not None:
+            yield 'parties', govt_id, party
+        producer = party.get('Producer')
+        appointments = _as_list(producer.get('CarrierAppointment')) if isinstance(producer, dict) else []
+        for appointment in appointments:
+            producer_id = _key(appointment.get('CompanyProducerID')) if isinstance(appointment, dict) else None
+            if producer_id is not None:
+                yield 'licensing', producer_id, party
+    for holding in graph.aggregates('Holding'):
+        policy = holding.get('Policy')
+        pol_number = _key(policy.get('PolNumber')) if isinstance(policy, dict) else None
+        if pol_number is not None:
+            yield 'holdings', pol_number, holding
+
+
+async def resolve(graph, loaders):
+    """Merge what the back ends know of each Party and Holding of ``graph`` into them.
+
+    Every lookup is issued before any is awaited, so they reach each
+    loader in the same turn and go out as one bulk call per back end.
+    """
+    pending = [(aggregate, loaders[name].load(key)) for name, key, aggregate in lookups(graph)]
+    results = await asyncio.gather(*(awaitable for _, awaitable in pending))
+    for (aggregate, _), result in zip(pending, results):
+        if isinstance(result, dict):
+            merge(aggregate, result)
+    return graph
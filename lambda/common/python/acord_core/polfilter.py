@@ -0,0 +1,313 @@
+"""Bloom filter of the PolNumbers in the pending case store.
+
+A good share of 203 traffic names cases that are not ours (misrouted
+carrier traffic, typos). Where the case store is the only back end that
+could answer, ``KnownPolicies`` answers "definitely unknown" for those
+from memory, so they never reach the store; a PolNumber the filter has
+seen is always let through, and one it has not is let through with
+probability ``error_rate`` (a false positive costs only the lookup it
+would have cost anyway).
+
+The filter is sized when it is built: ``bits_per_policy`` bits for each
+of ``capacity`` policies, with ``ACORD_POLICY_FILTER_FPR`` (default 1%)
+or ``ACORD_POLICY_FILTER_BITS`` choosing between memory and false
+positives. At 1% that is about 1.2 MB per million policies; ``stats()``
+reports what the filter actually uses.
+
+Containers load their filter from a snapshot (``ACORD_POLICY_FILTER_SNAPSHOT``,
+a local path or ``s3://bucket/key``) and catch up on the cases written
+since with ``store.pol_numbers(since)``, which reads only those; nothing
+lists the whole store at init. Snapshots are written offline by
+``tools/build_policy_filter.py``. Local stores without a snapshot are
+read whole, and a DynamoDB store without one gets no filter.
+
+103 and 302 writes in the container add their PolNumbers at once. A
+PolNumber the filter does not have triggers the same catch-up first, at
+most once every ``ACORD_POLICY_FILTER_REFRESH`` seconds, so a case
+written by another container is only reported unknown within that long
+of being written.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from acord_core import casestore
+
+logger = logging.getLogger(__name__)
+
+CAPACITY = int(os.environ.get('ACORD_POLICY_FILTER_CAPACITY', '1000000'))
+ERROR_RATE = float(os.environ.get('ACORD_POLICY_FILTER_FPR', '0.01'))
+BITS_PER_POLICY = float(os.environ.get('ACORD_POLICY_FILTER_BITS', '0')) or None
+REFRESH = float(os.environ.get('ACORD_POLICY_FILTER_REFRESH', '1'))
+SNAPSHOT = os.environ.get('ACORD_POLICY_FILTER_SNAPSHOT')
+
+# Refreshes look back this far past the previous one, for writes in flight
+# and clock differences between containers
+REFRESH_OVERLAP = 5
+
+_FORMAT = 'acord-bloom-1'
+
+
+class BloomFilter:
+    """A Bloom filter of strings with ``hashes`` probes into ``bits`` bits.
+
+    Probe positions come from one 128-bit BLAKE2b digest split into two
+    hashes (Kirsch-Mitzenmacher double hashing).
+    """
+
+    def __init__(self, capacity=CAPACITY, error_rate=ERROR_RATE, bits_per_item=BITS_PER_POLICY):
+        self.capacity = max(1, int(capacity))
+        if bits_per_item is None:
+            bits_per_item = -math.log(error_rate) / math.log(2) ** 2
+        self.bits = max(8, int(math.ceil(self.capacity * bits_per_item)))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        bits = self.bits
+        # first + n * second, kept below ``bits`` so the arithmetic stays on small ints
+        position = int.from_bytes(digest[:8], 'little') % bits
+        step = (int.from_bytes(digest[8:], 'little') | 1) % bits
+        positions = [position]
+        for _ in range(self.hashes - 1):
+            position += step
+            if position >= bits:
+                position -= bits
+            positions.append(position)
+        return positions
+
+    def add(self, key):
+        """Add ``key``; returns False if it may already have been present."""
+        positions = self._positions(key)
+        array = self._array
+        with self._lock:
+            new = False
+            for position in positions:
+                mask = 1 << (position & 7)
+                if not array[position >> 3] & mask:
+                    array[position >> 3] |= mask
+                    new = True
+            if new:
+                self.count += 1
+        return new
+
+    def update(self, keys):
+        """Add every key in ``keys``, as one batch under the lock."""
+        array, positions = self._array, self._positions
+        added = 0
+        with self._lock:
+            for key in keys:
+                new = False
+                for position in positions(key):
+                    mask = 1 << (position & 7)
+                    if not array[position >> 3] & mask:
+                        array[position >> 3] |= mask
+                        new = True
+                added += new
+            self.count += added
+
+    def __contains__(self, key):
+        array = self._array
+        for position in self._positions(key):
+            if not array[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        """Keys added, not counting those that were already (or seemed) present."""
+        return self.count
+
+    @property
+    def size(self):
+        """Bytes taken by the bit array."""
+        return len(self._array)
+
+    def error_rate(self, count=None):
+        """Expected false-positive rate with ``count`` keys, by default those added."""
+        count = self.count if count is None else count
+        return (1 - math.exp(-self.hashes * count / self.bits)) ** self.hashes
+
+    def dumps(self):
+        header = {'format': _FORMAT, 'capacity': self.capacity, 'bits': self.bits, 'hashes': self.hashes,
+                  'count': self.count}
+        return json.dumps(header).encode('utf-8') + b'\n' + bytes(self._array)
+
+    @classmethod
+    def loads(cls, data):
+        header, _, array = data.partition(b'\n')
+        header = json.loads(header)
+        if header.get('format') != _FORMAT or len(array) != (header['bits'] + 7) // 8:
+            raise ValueError("Not a policy filter snapshot")
+        bloom = cls.__new__(cls)
+        bloom.capacity, bloom.bits, bloom.hashes, bloom.count = (
+            header['capacity'], header['bits'], header['hashes'], header['count'])
+        bloom._array = bytearray(array)
+        bloom._lock = threading.Lock()
+        return bloom
+
+
+def _watermark(seconds_ago=0):
+    # The case store's UpdatedAt format, so the two compare as strings
+    moment = datetime.now(timezone.utc) - timedelta(seconds=seconds_ago)
+    return moment.isoformat(timespec='microseconds')
+
+
+def _read(location):
+    if location.startswith('s3://'):
+        import boto3
+        bucket, _, key = location[len('s3://'):].partition('/')
+        return boto3.client('s3').get_object(Bucket=bucket, Key=key)['Body'].read()
+    with open(location, 'rb') as snapshot:
+        return snapshot.read()
+
+
+def _write(location, data):
+    if location.startswith('s3://'):
+        import boto3
+        bucket, _, key = location[len('s3://'):].partition('/')
+        boto3.client('s3').put_object(Bucket=bucket, Key=key, Body=data)
+        return
+    with open(location, 'wb') as snapshot:
+        snapshot.write(data)
+
+
+class KnownPolicies:
+    """The PolNumbers of the pending case store, as a ``BloomFilter``.
+
+    ``refresh`` is the least number of seconds between catch-ups from the
+    store, or None for none.
+    """
+
+    def __init__(self, store, capacity=CAPACITY, error_rate=ERROR_RATE, bits_per_policy=BITS_PER_POLICY,
+                 refresh=REFRESH):
+        self.store = store
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits_per_policy = bits_per_policy
+        self.refresh_interval = refresh
+        self.filter = None
+        # UpdatedAt the next refresh reads the store from
+        self.watermark = None
+        self._refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+        # Checks made, and PolNumbers reported unknown by them
+        self.checks = 0
+        self.rejected = 0
+
+    def build(self):
+        """Build the filter from every PolNumber in the store, which reads all of it."""
+        watermark = _watermark(REFRESH_OVERLAP)
+        started = time.monotonic()
+        pol_numbers = list(self.store.pol_numbers())
+        # Room to grow to twice the current book before the error rate suffers
+        bloom = BloomFilter(max(self.capacity, 2 * len(pol_numbers)), self.error_rate, self.bits_per_policy)
+        bloom.update(pol_numbers)
+        self.filter, self.watermark, self._refreshed_at = bloom, watermark, time.monotonic()
+        logger.info(f"Built policy filter in {time.monotonic() - started:.2f}s: {self.stats()}")
+        return self
+
+    def load(self, location):
+        """Load a snapshot written by ``save``, a path or S3 URI, and catch up from the store."""
+        header, _, data = _read(location).partition(b'\n')
+        self.filter = BloomFilter.loads(data)
+        self.watermark = json.loads(header)['watermark']
+        if not self.refresh(force=True):
+            raise RuntimeError(f"Could not catch up on the cases written since {self.watermark}")
+        logger.info(f"Loaded policy filter from {location}: {self.stats()}")
+        return self
+
+    def save(self, location):
+        header = json.dumps({'watermark': self.watermark}).encode('utf-8')
+        _write(location, header + b'\n' + self.filter.dumps())
+
+    def refresh(self, force=False):
+        """Add the PolNumbers written to the store since the last refresh.
+
+        Returns whether it did: not when one ran less than ``refresh``
+        seconds ago or is running in another thread, unless ``force``d.
+        """
+        if not force and (self.refresh_interval is None
+                          or time.monotonic() - self._refreshed_at < self.refresh_interval):
+            return False
+        # One container thread refreshes; the others go on with the filter as it is
+        if not self._refresh_lock.acquire(blocking=force):
+            return False
+        try:
+            watermark = _watermark(REFRESH_OVERLAP)
+            self.filter.update(self.store.pol_numbers(since=self.watermark))
+            self.watermark = watermark
+            return True
+        except Exception as e:
+            # Tried again on a later miss; the filter only lacks newer policies
+            logger.warning(f"Could not refresh policy filter: {e!r}")
+            return False
+        finally:
+            self._refreshed_at = time.monotonic()
+            self._refresh_lock.release()
+
+    def add(self, pol_number):
+        self.filter.add(pol_number)
+
+    def known(self, pol_number):
+        """False if ``pol_number`` is definitely not one of ours."""
+        self.checks += 1
+        if pol_number in self.filter:
+            return True
+        # It may have been written by another container since the last refresh
+        if self.refresh() and pol_number in self.filter:
+            return True
+        self.rejected += 1
+        return False
+
+    def stats(self):
+        bloom = self.filter
+        return {
+            'policies': len(bloom),
+            'capacity': bloom.capacity,
+            'hashes': bloom.hashes,
+            'bits_per_policy': round(bloom.bits / bloom.capacity, 2),
+            'memory_bytes': bloom.size,
+            'bytes_per_million': round(bloom.size / bloom.capacity * 1_000_000),
+            'error_rate': bloom.error_rate(),
+            'error_rate_at_capacity': bloom.error_rate(bloom.capacity),
+            'checks': self.checks,
+            'rejected': self.rejected,
+        }
+
+
+_default_policies = None
+
+
+def default_policies():
+    """The per-container filter over the pending case store, or None without one.
+
+    Loaded at container init, when the transactions are set up. A DynamoDB
+    store is only read whole offline, so without a snapshot it has no
+    filter. A filter that cannot be loaded is left out rather than failing
+    the container: every PolNumber is then looked up as before.
+    """
+    global _default_policies
+    store = casestore.default_store()
+    if _default_policies is None and store is not None:
+        if not SNAPSHOT and isinstance(store, casestore.DynamoCaseStore):
+            logger.info("No ACORD_POLICY_FILTER_SNAPSHOT, looking up every PolNumber")
+            return None
+        policies = KnownPolicies(store)
+        try:
+            if SNAPSHOT:
+                policies.load(SNAPSHOT)
+            else:
+                policies.build()
+        except Exception as e:
+            logger.warning(f"No policy filter, looking up every PolNumber: {e!r}")
+            return None
+        _default_policies = policies
+    return _default_policies
@@ -0,0 +1,175 @@
+"""Priming of per-container state during the Lambda INIT phase.
+
+Handler modules call ``prime(code)`` at import time, while Lambda still
+grants the INIT burst of CPU. It maps the typecode registry, creates the
+admission controller and the claim-check S3 client and then runs
+``warm_up``, so response templates, element-name caches, compression
+buffers and executor threads are in place before the first real request.
+Each step's time in milliseconds is kept in ``TIMINGS`` and logged.
+
+A warm-up event (``{"acordWarmup": true}``) runs the same synthetic
+requests on a warm container: JSON and XML responses, a projection, a
+conditional 304, a compressed body, a multi-request document and an
+inline claim-check reference (or, for the batch function, a batch). While
+it runs, business logic is replaced by the placeholder ``process``, the
+pending case store and policy filter by in-memory stand-ins holding only
+the warm-up case (``case_store``, ``known_policies``), and the downstream
+latency it would record is discarded, so a warm-up has no effect outside
+the container.
+
+Whether a call is a warm-up is a context variable rather than container
+state, so it follows the warm-up onto the worker threads it fans out to
+(see ``aio.carry_context``) and never onto a concurrent real request.
+"""
+import base64
+import contextvars
+import gzip
+import json
+import logging
+import time
+
+from acord_core import admission, casestore, claimcheck, polfilter, typecodes
+
+logger = logging.getLogger(__name__)
+
+WARMUP_KEY = 'acordWarmup'
+
+# Milliseconds spent in each priming step of this container
+TIMINGS = {}
+
+_warming = contextvars.ContextVar('acord_warming', default=False)
+
+# The in-memory case store and policy filter warm-ups use instead
+_stubs = None
+
+
+def is_warmup(event):
+    return isinstance(event, dict) and event.get(WARMUP_KEY) is True
+
+
+def warming():
+    """True in a warm-up call, where business logic and the real stores must not be called."""
+    return _warming.get()
+
+
+def sample_request(tc, guid='warmup-0'):
+    return {
+        'TXLife': {
+            'TXLifeRequest': {
+                'TransRefGUID': guid,
+                'TransType': {'tc': tc},
+                'OLifE': {'Holding': {'Policy': {'PolNumber': 'WARMUP'}}},
+            }
+        }
+    }
+
+
+def _stub_stores():
+    global _stubs
+    if _stubs is None:
+        # Imported here because the handler modules import this one
+        from acord_core import core
+        cases = casestore.MemoryCaseStore()
+        # With the warm-up case stored, inquiries for it warm the view path
+        olife = sample_request('302')['TXLife']['TXLifeRequest']['OLifE']
+        cases.update(casestore.case_from_olife(olife), merge=False, views=core.case_views)
+        _stubs = cases, polfilter.KnownPolicies(cases, refresh=None).build()
+    return _stubs
+
+
+def case_store(store):
+    """``store``, or in a warm-up call the in-memory stand-in for it."""
+    return _stub_stores()[0] if warming() else store
+
+
+def known_policies(policies):
+    """``policies``, or in a warm-up call a filter over the stand-in case store."""
+    return _stub_stores()[1] if warming() else policies
+
+
+def _gzip_base64(text):
+    return base64.b64encode(gzip.compress(text.encode('utf-8'))).decode('ascii')
+
+
+def _events(code):
+    body = json.dumps(sample_request(code))
+    parts = [sample_request(code, f'warmup-{n}')['TXLife']['TXLifeRequest'] for n in range(4)]
+    reference = {'ClaimCheck': {'Encoding': 'gzip', 'Data': _gzip_base64(body)}}
+    yield 'json', {'body': body, 'headers': {'Accept': 'application/json'}}
+    yield 'xml', {'body': body, 'headers': {'Accept': 'application/xml'}}
+    yield 'projection', {'body': body, 'headers': {}, 'queryStringParameters': {'fields': 'TransResult.ResultCode'}}
+    yield 'compressed', {'body': _gzip_base64(body), 'isBase64Encoded': True,
+                         'headers': {'Content-Encoding': 'gzip', 'Accept-Encoding': 'gzip'}}
+    yield 'multi', {'body': json.dumps({'TXLife': {'TXLifeRequest': parts}}), 'headers': {'Accept-Encoding': 'gzip'}}
+    yield 'claimcheck', {'body': json.dumps(reference), 'headers': {}}
+
+
+def _run(timings, name, handler, event, *args):
+    started = time.perf_counter()
+    response = handler(event, None, *args)
+    timings[name] = round((time.perf_counter() - started) * 1000, 3)
+    if response['statusCode'] >= 400:
+        logger.warning(f"Warm-up request {name} answered {response['statusCode']}: {response['body']}")
+    return response
+
+
+def warm_up(code):
+    """Run the synthetic requests for ``code`` (or ``'batch'``); returns their timings."""
+    # Imported here because the handler modules import this one
+    from acord_core import batch, core
+
+    controller = admission.default_controller()
+    latency = controller.latency
+    timings = {}
+    token = _warming.set(True)
+    try:
+        if code == 'batch':
+            documents = [sample_request(tc, f'warmup-{n}') for n, tc in enumerate(core.TRANSACTIONS)]
+            _run(timings, 'batch', batch.handle_batch_event, {'body': json.dumps(documents), 'headers': {}})
+            return timings
+        transaction = core.TRANSACTIONS[code]
+        for name, event in _events(code):
+            response = _run(timings, name, core.handle_api_event, event, transaction)
+            if name == 'json' and 'ETag' in response['headers']:
+                event = dict(event, headers={'If-None-Match': response['headers']['ETag']})
+                _run(timings, 'not-modified', core.handle_api_event, event, transaction)
+        return timings
+    finally:
+        _warming.reset(token)
+        controller.latency = latency
+
+
+def warm_up_response(code):
+    timings = warm_up(code)
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/json'
+        },
+        'body': json.dumps({'warmup': code, 'timings': timings})
+    }
+
+
+def _claim_check_client():
+    store = claimcheck.default_store()
+    if store is not None:
+        store.s3
+
+
+def prime(code):
+    """Build this container's caches for the ``code`` handler; never raises."""
+    steps = (
+        ('typecodes', typecodes.registry),
+        ('admission', admission.default_controller),
+        ('claimcheck', _claim_check_client),
+        ('warmup', lambda: warm_up(code)),
+    )
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"Priming step {name} failed: {e}")
+        TIMINGS[name] = round((time.perf_counter() - started) * 1000, 3)
+    logger.info(f"Primed ACORD {code} handler in {sum(TIMINGS.values()):.1f} ms: {TIMINGS}")
+    return TIMINGS
@@ -0,0 +1,83 @@
+"""Response projection for the ``fields`` query parameter.
+
+A selector lists the parts of each TXLifeResponse the caller wants, as
+comma-separated ACORD element paths with ``.`` or ``/`` between elements:
+
+    ?fields=TransResult.ResultCode,OLifE.Holding.Policy.PolNumber
+
+Paths are relative to TXLifeResponse; a leading ``TXLife/TXLifeResponse``
+is accepted and ignored. The TXLife envelope is always kept so projected
+responses parse like full ones, and lists (repeated elements) are
+projected item by item.
+"""
+import re
+from functools import lru_cache
+
+_ELEMENT = re.compile(r'[A-Za-z_][A-Za-z0-9_.\-]*\Z')
+_PREFIX = ('TXLife', 'TXLifeResponse')
+
+# Marks a selected element whose whole subtree is kept
+_ALL = None
+
+
+class InvalidSelector(ValueError):
+    pass
+
+
+class Projection:
+
+    def __init__(self, selector):
+        tree = {}
+        for path in selector.split(','):
+            elements = path.strip().replace('/', '.').split('.')
+            if tuple(elements[:2]) == _PREFIX:
+                elements = elements[2:]
+            if not elements or not all(_ELEMENT.match(element) for element in elements):
+                raise InvalidSelector(f"Invalid fields selector: {path.strip()!r}")
+            node = tree
+            for element in elements[:-1]:
+                child = node.get(element, {})
+                if child is _ALL:
+                    break
+                node = node.setdefault(element, child)
+            else:
+                # A shorter path selects the whole subtree and wins
+                node[elements[-1]] = _ALL
+        self.tree = tree
+        self.key = ','.join(sorted(_paths(tree)))
+
+    def prune(self, value, tree=None):
+        """Return ``value`` keeping only the selected elements."""
+        tree = self.tree if tree is None else tree
+        if isinstance(value, list):
+            return [self.prune(item, tree) for item in value]
+        if not isinstance(value, dict):
+            return value
+        pruned = {}
+        for key, item in value.items():
+            if key in tree:
+                subtree = tree[key]
+                pruned[key] = item if subtree is _ALL else self.prune(item, subtree)
+        return pruned
+
+    def apply(self, document):
+        """Project every TXLifeResponse in a ``build_txlife`` document."""
+        txlife = document.get('TXLife')
+        if not isinstance(txlife, dict) or 'TXLifeResponse' not in txlife:
+            return document
+        return {'TXLife': {'TXLifeResponse': self.prune(txlife['TXLifeResponse'])}}
+
+
+def _paths(tree, prefix=''):
+    for key, subtree in tree.items():
+        path = prefix + key
+        if subtree is _ALL:
+            yield path
+        else:
+            yield from _paths(subtree, path + '.')
+
+
+@lru_cache(maxsize=256)
+def compile_selector(selector):
+    """The compiled projection for a selector, cached per container."""
+    return Projection(selector)
@@ -0,0 +1,97 @@
+"""Precompiled response templates with per-request slot filling.
+
+Standard success responses differ only in a few values (``TransRefGUID``,
+``TransType``, ``PolNumber`` and the execution date and time). A template is
+built once per container and output format by serializing the response
+document with sentinel values in those slots and splitting the result at the
+sentinels; rendering then serializes just the slot values and joins the
+pieces, producing exactly the bytes the full build-and-serialize would.
+
+A compiled template can itself be stored (``dumps``/``loads``), which is how
+materialized 203 responses are kept with their pending case.
+"""
+import json
+import re
+
+from acord_core.xmlwriter import _write_content, escape
+
+_SENTINEL = '\x00slot:%s\x00'
+_JSON_SLOT = re.compile(r'"\\u0000slot:(\w+)\\u0000"')
+_XML_SLOT = re.compile('\x00slot:(\\w+)\x00')
+
+
+def _json_value(value):
+    return json.dumps(value)
+
+
+def _xml_value(value):
+    if isinstance(value, str):
+        return escape(value)
+    out = []
+    _write_content(out, value)
+    return ''.join(out)
+
+
+def _xml_safe(value):
+    # Lists become repeated sibling elements, which a slot inside a single
+    # element cannot reproduce
+    if isinstance(value, dict):
+        return all(_xml_safe(item) for item in value.values())
+    return not isinstance(value, (list, tuple))
+
+
+class ResponseTemplate:
+
+    def __init__(self, build, slots, fmt, serialize):
+        """Compile the template.
+
+        ``build`` maps a dict of slot values to the response document and
+        ``serialize`` turns a document into the output text or bytes.
+        """
+        self.slots = tuple(slots)
+        self.fmt = fmt
+        rendered = serialize(build({name: _SENTINEL % name for name in self.slots}))
+        self._compile(rendered)
+
+    def _compile(self, rendered):
+        self._bytes = isinstance(rendered, bytes)
+        if self._bytes:
+            rendered = rendered.decode('utf-8')
+        pattern = _XML_SLOT if self.fmt == 'xml' else _JSON_SLOT
+        # re.split alternates literal text and slot names
+        parts = pattern.split(rendered)
+        self._literals = parts[0::2]
+        self._order = parts[1::2]
+        # A slot may be missing from the output (a projection can prune it),
+        # but none may appear that was not asked for or appear twice
+        if len(set(self._order)) != len(self._order) or not set(self._order) <= set(self.slots):
+            raise ValueError(f"Template slots {self._order} do not match {self.slots}")
+
+    def dumps(self):
+        """The compiled template as JSON text, for ``loads``."""
+        return json.dumps([self.fmt, self._bytes, self.slots, self._literals, self._order],
+                          separators=(',', ':'))
+
+    @classmethod
+    def loads(cls, text):
+        template = cls.__new__(cls)
+        fmt, template._bytes, slots, template._literals, template._order = json.loads(text)
+        template.fmt = fmt
+        template.slots = tuple(slots)
+        return template
+
+    def render(self, values):
+        """Return the serialized response, or None if a value cannot be slotted."""
+        if self.fmt == 'xml':
+            if not all(_xml_safe(values[name]) for name in self._order):
+                return None
+            encode = _xml_value
+        else:
+            encode = _json_value
+        literals = self._literals
+        out = [literals[0]]
+        for index, name in enumerate(self._order, 1):
+            out.append(encode(values[name]))
+            out.append(literals[index])
+        rendered = ''.join(out)
+        return rendered.encode('utf-8') if self._bytes else rendered
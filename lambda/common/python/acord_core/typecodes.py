@@ -0,0 +1,208 @@
+"""ACORD typecode registry backed by a memory-mapped binary index.
+
+Typecode lists (TransType, ResultCode, PolicyStatus, LineOfBusiness, ...)
+are compiled from ``data/acord_typecodes.json`` into ``typecodes.bin``,
+which is memory-mapped when first used. Nothing is parsed into Python
+objects up front: lookups hash into open-addressing tables stored in the
+file, so opening the registry costs the same however many lists it holds,
+and only the codes actually used are decoded (and interned).
+
+Rebuild the index from the repository root after editing the source list:
+
+    PYTHONPATH=lambda/common/python python -m acord_core.typecodes \\
+        data/acord_typecodes.json lambda/common/python/acord_core/typecodes.bin
+
+Layout (little endian)::
+
+    header   magic "ACTC", version u16, reserved u16, entry count u32,
+             table size u32 (power of two), element map length u32
+    entries  entry count x (list offset u32, list length u16,
+                            tc offset u32, tc length u16,
+                            description offset u32, description length u16)
+    by_code  table size x u32 entry index + 1 (0 is empty), keyed on list + tc
+    by_desc  table size x u32 entry index + 1, keyed on list + lowercase description
+    elements JSON object mapping element names to list names
+    strings  UTF-8 string pool
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from functools import lru_cache
+
+MAGIC = b'ACTC'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sHHIII')
+_ENTRY = struct.Struct('<IHIHIH')
+_SLOT = struct.Struct('<I')
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'typecodes.bin')
+
+
+def _hash(list_name, key):
+    # 32-bit FNV-1a; stable across processes unlike hash()
+    h = 0x811c9dc5
+    for byte in list_name.encode('utf-8') + b'\x00' + key.encode('utf-8'):
+        h = ((h ^ byte) * 0x01000193) & 0xffffffff
+    return h
+
+
+def build_index(source):
+    """Compile ``{"lists": {name: {tc: description}}, "elements": {...}}`` to bytes."""
+    lists = source['lists']
+    elements = source.get('elements', {})
+    strings = bytearray()
+    offsets = {}
+
+    def intern_string(value):
+        if value not in offsets:
+            encoded = value.encode('utf-8')
+            offsets[value] = (len(strings), len(encoded))
+            strings.extend(encoded)
+        return offsets[value]
+
+    entries = []
+    for list_name in sorted(lists):
+        for tc, description in sorted(lists[list_name].items()):
+            entries.append((list_name, str(tc), description))
+
+    # Keep the load factor at or below 3/4 so probe chains stay short
+    size = 1
+    while size * 3 < len(entries) * 4:
+        size *= 2
+    by_code = [0] * size
+    by_desc = [0] * size
+    for index, (list_name, tc, description) in enumerate(entries):
+        for table, key in ((by_code, tc), (by_desc, description.lower())):
+            slot = _hash(list_name, key) & (size - 1)
+            while table[slot]:
+                slot = (slot + 1) & (size - 1)
+            table[slot] = index + 1
+
+    packed_entries = b''.join(
+        _ENTRY.pack(*intern_string(list_name), *intern_string(tc), *intern_string(description))
+        for list_name, tc, description in entries)
+    element_map = json.dumps(elements, sort_keys=True).encode('utf-8')
+    return b''.join([
+        _HEADER.pack(MAGIC, VERSION, 0, len(entries), size, len(element_map)),
+        packed_entries,
+        struct.pack(f'<{size}I', *by_code),
+        struct.pack(f'<{size}I', *by_desc),
+        element_map,
+        bytes(strings),
+    ])
+
+
+class TypeCodeRegistry:
+
+    def __init__(self, buffer):
+        magic, version, _, count, size, element_length = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not an ACORD typecode index")
+        self._buffer = buffer
+        self._count = count
+        self._mask = size - 1
+        self._entries = _HEADER.size
+        self._by_code = self._entries + count * _ENTRY.size
+        self._by_desc = self._by_code + size * _SLOT.size
+        elements_at = self._by_desc + size * _SLOT.size
+        self.elements = json.loads(bytes(buffer[elements_at:elements_at + element_length]))
+        self._strings = elements_at + element_length
+        self.description = lru_cache(maxsize=4096)(self._description)
+        self.code = lru_cache(maxsize=4096)(self._code)
+
+    @classmethod
+    def open(cls, path=DEFAULT_PATH):
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _string(self, offset, length):
+        start = self._strings + offset
+        return sys.intern(self._buffer[start:start + length].decode('utf-8'))
+
+    def _entry(self, index):
+        list_at, list_len, tc_at, tc_len, desc_at, desc_len = _ENTRY.unpack_from(
+            self._buffer, self._entries + index * _ENTRY.size)
+        return (self._string(list_at, list_len), self._string(tc_at, tc_len),
+                self._string(desc_at, desc_len))
+
+    def _probe(self, table, list_name, key, field):
+        slot = _hash(list_name, key) & self._mask
+        while True:
+            index = _SLOT.unpack_from(self._buffer, table + slot * _SLOT.size)[0]
+            if not index:
+                return None
+            entry = self._entry(index - 1)
+            if entry[0] == list_name and (entry[field] if field == 1 else entry[2].lower()) == key:
+                return entry
+            slot = (slot + 1) & self._mask
+
+    def _description(self, list_name, tc):
+        entry = self._probe(self._by_code, list_name, str(tc), 1)
+        return entry[2] if entry else None
+
+    def _code(self, list_name, description):
+        entry = self._probe(self._by_desc, list_name, description.lower(), 2)
+        return entry[1] if entry else None
+
+    def __len__(self):
+        return self._count
+
+    def list_for(self, element):
+        return self.elements.get(element, element)
+
+    def typecode(self, element, tc):
+        """Build ``{"tc": tc, "value": description}`` for an element."""
+        tc = str(tc)
+        return {"tc": tc, "value": self.description(self.list_for(element), tc)}
+
+    def fill(self, element, node):
+        """Return node with a missing ``value``/``#text`` filled in from its tc."""
+        if not isinstance(node, dict):
+            return node
+        for code_key, text_key in (("tc", "value"), ("@tc", "#text")):
+            if code_key in node and text_key not in node:
+                description = self.description(self.list_for(element), str(node[code_key]))
+                if description is not None:
+                    node = dict(node)
+                    node[text_key] = description
+        return node
+
+    def fill_document(self, document):
+        """Fill every known typecode element in a nested document, in place."""
+        if isinstance(document, dict):
+            for key, value in document.items():
+                if isinstance(value, dict) and ('tc' in value or '@tc' in value):
+                    document[key] = self.fill(key, value)
+                else:
+                    self.fill_document(value)
+        elif isinstance(document, list):
+            for item in document:
+                self.fill_document(item)
+        return document
+
+
+_registry = None
+
+
+def registry():
+    """The per-container registry, mapped on first use."""
+    global _registry
+    if _registry is None:
+        _registry = TypeCodeRegistry.open()
+    return _registry
+
+
+def main(argv):
+    source_path, target_path = argv
+    with open(source_path) as f:
+        data = build_index(json.load(f))
+    with open(target_path, 'wb') as f:
+        f.write(data)
+    print(f"Wrote {len(data)} bytes to {target_path}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
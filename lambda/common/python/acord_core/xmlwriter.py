@@ -0,0 +1,87 @@
+"""XML serialization of ACORD response documents.
+
+Produces the same bytes as ``dicttoxml(..., attr_type=False)`` for dicts and
+scalars, except that lists are written as repeated sibling elements
+(``<TXLifeResponse>..</TXLifeResponse><TXLifeResponse>..</TXLifeResponse>``)
+as ACORD expects, instead of a wrapper element holding ``<item>`` children.
+"""
+import numbers
+import re
+from functools import lru_cache
+
+from acord_core.errors import PayloadTooLarge
+
+# Element names that are valid XML as-is; anything else goes through
+# dicttoxml's own name fixing so the output stays identical.
+_VALID_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_.\-]*\Z')
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" ?>'
+
+
+def escape(value):
+    return (value.replace('&', '&amp;').replace('"', '&quot;').replace('\'', '&apos;')
+            .replace('<', '&lt;').replace('>', '&gt;'))
+
+
+def element_name(key):
+    if isinstance(key, str) and _VALID_NAME.match(key) and not key.lower().startswith('xml'):
+        return key, ''
+    return _fixed_name(key)
+
+
+@lru_cache(maxsize=1024)
+def _fixed_name(key):
+    # dicttoxml validates each name by parsing it with minidom, which is slow
+    from dicttoxml import make_valid_xml_name
+    name, attr = make_valid_xml_name(key, {})
+    attrstring = ' '.join('%s="%s"' % item for item in attr.items())
+    return name, (' ' + attrstring if attrstring else '')
+
+
+class _BoundedOutput(list):
+    # Output list that stops serialization once it holds too many elements
+    __slots__ = ('limit',)
+
+
+def _write(out, key, value):
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            _write(out, key, item)
+        return
+    name, attrs = element_name(key)
+    out.append('<%s%s>' % (name, attrs))
+    _write_content(out, value)
+    out.append('</%s>' % name)
+
+
+def _write_content(out, value):
+    if isinstance(value, dict):
+        if type(out) is _BoundedOutput and len(out) > out.limit:
+            raise PayloadTooLarge(f"Response exceeds {out.limit // 3} elements")
+        for key, item in value.items():
+            _write(out, key, item)
+    elif isinstance(value, str):
+        out.append(escape(value))
+    elif isinstance(value, bool):
+        out.append('true' if value else 'false')
+    elif value is None:
+        pass
+    elif isinstance(value, numbers.Number):
+        out.append(str(value))
+    elif hasattr(value, 'isoformat'):
+        out.append(escape(value.isoformat()))
+    elif hasattr(value, 'to_dict'):
+        # Models and spooled attachments write their compact form
+        _write_content(out, value.to_dict())
+    else:
+        raise TypeError('Unsupported data type: %s (%s)' % (value, type(value).__name__))
+
+
+def to_xml(document, root='TXLife', max_nodes=None):
+    out = [XML_DECLARATION]
+    if max_nodes is not None:
+        # Each element writes an opening tag, its content and a closing tag
+        out = _BoundedOutput(out)
+        out.limit = max_nodes * 3
+    _write(out, root, document)
+    return ''.join(out).encode('utf-8')
@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+# The shared acord_core package is deployed as a Lambda layer; make it
+# importable the same way /opt/python is on the Lambda runtime path.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "lambda", "common", "python"))
+
+
+def make_request(tc="103", guid="guid-1", pol_number="POL123", **olife):
+    """A TXLife document with one TXLifeRequest; keyword arguments are added to its OLifE."""
+    return {
+        "TXLife": {
+            "TXLifeRequest": {
+                "TransRefGUID": guid,
+                "TransType": {"tc": tc, "value": "x"},
+                "OLifE": dict({"Holding": {"Policy": {"PolNumber": pol_number}}}, **olife),
+            }
+        }
+    }
+
+
+def make_event(body, accept="application/json", if_none_match=None, selector=None):
+    """An API Gateway event posting ``body``, JSON-encoded unless it is already text."""
+    event = {"body": body if isinstance(body, str) else json.dumps(body), "headers": {"Accept": accept}}
+    if if_none_match is not None:
+        event["headers"]["if-none-match"] = if_none_match
+    if selector is not None:
+        event["queryStringParameters"] = {"fields": selector}
+    return event
+
+
+class FakeContext:
+    """Stands in for the Lambda context, counting down from ``budget_ms``."""
+
+    def __init__(self, budget_ms):
+        self.ends_at = time.monotonic() + budget_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self.ends_at - time.monotonic()) * 1000))
+
+
+class FakeClock:
+    """A monotonic clock that only moves when a test sets ``now``."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def serve(handler, **state):
+    """Run ``handler`` on a local threaded HTTP server, for a fixture to yield from.
+
+    The server gets a ``lock``, its ``url`` and each of ``state`` as attributes.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    for name, value in state.items():
+        setattr(server, name, value)
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+async def close(client):
+    # Pooled connections are closed on the loop that opened them
+    client.close()
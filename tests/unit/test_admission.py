@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from acord_core import admission, batch, core
+from acord_core.admission import AdmissionController, Overloaded
+from tests.conftest import FakeClock, make_event, make_request
+
+
+class PolicyAdminStandIn:
+    """Local stand-in for the policy administration system.
+
+    A call takes ``latency`` seconds of the fake clock, so the simulation
+    runs instantly.
+    """
+
+    def __init__(self, clock, latency):
+        self.clock = clock
+        self.latency = latency
+        self.calls = 0
+
+    def call(self):
+        self.calls += 1
+        self.clock.now += self.latency
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def controller(clock, monkeypatch):
+    controller = AdmissionController(slo=0.2, max_in_flight=4, probe_interval=1.0, clock=clock)
+    monkeypatch.setattr(admission, "_default_controller", controller)
+    return controller
+
+
+@pytest.fixture
+def downstream(clock, monkeypatch):
+    stand_in = PolicyAdminStandIn(clock, 0.05)
+    for transaction in core.TRANSACTIONS.values():
+        def process(request, transaction=transaction):
+            stand_in.call()
+            return core.Transaction.process(transaction, request)
+        monkeypatch.setattr(transaction, "process", process)
+    return stand_in
+
+
+def send(tc):
+    return core.handle_event(make_event(make_request(tc)), None, tc)
+
+
+def test_sheds_status_polls_before_new_business(clock, controller, downstream):
+    codes = ["203", "302", "1125", "103"]
+    first_shed = {}
+    for step in range(200):
+        # Requests arrive every 100ms; the downstream system degrades from step 20
+        clock.now += 0.1
+        if step >= 20:
+            downstream.latency = 0.05 + 0.005 * (step - 20)
+        code = codes[step % len(codes)]
+        calls = downstream.calls
+        response = send(code)
+        if response["statusCode"] == 503:
+            assert int(response["headers"]["Retry-After"]) >= 1
+            # Shed requests fail fast, without calling downstream
+            assert downstream.calls == calls
+            first_shed.setdefault(code, step)
+        else:
+            assert response["statusCode"] == 200
+            assert step >= 20 or step not in first_shed.values()
+
+    assert not any(step < 20 for step in first_shed.values())
+    assert first_shed["203"] < first_shed["302"] < first_shed["103"]
+    assert first_shed["203"] < first_shed["1125"] < first_shed["103"]
+
+
+def test_recovers_once_downstream_is_fast_again(clock, controller, downstream):
+    downstream.latency = 1.0
+    statuses = []
+    for _ in range(20):
+        clock.now += 0.1
+        statuses.append(send("203")["statusCode"])
+    assert controller.load() > 1
+    assert statuses.count(503) >= 10
+
+    downstream.latency = 0.02
+    statuses = []
+    for _ in range(300):
+        clock.now += 0.1
+        statuses.append(send("203")["statusCode"])
+    # Probes let enough samples through for the estimate to come back down
+    assert statuses[-50:] == [200] * 50
+    assert controller.load() < 0.75
+
+
+def test_in_flight_limit_sheds_by_priority(controller):
+    with controller.admit("103"), controller.admit("103"), controller.admit("103"):
+        # Load 0.75: polls are shed and updates still admitted
+        with pytest.raises(Overloaded):
+            with controller.admit("203"):
+                pass
+        with controller.admit("302"):
+            # Load 1.0: only new business gets through
+            with pytest.raises(Overloaded):
+                with controller.admit("1125"):
+                    pass
+            with controller.admit("103"):
+                assert controller.in_flight == 5
+    assert controller.in_flight == 0
+
+
+def test_queue_and_batch_work_shed_when_overloaded(controller):
+    controller.latency = 1.0
+
+    event = {"Records": [{"messageId": str(n), "body": json.dumps(make_request("203"))} for n in range(3)]}
+    result = core.handle_event(event, None, "203")
+    assert [failure["itemIdentifier"] for failure in result["batchItemFailures"]] == ["0", "1", "2"]
+
+    documents = [make_request("203", "guid-0"), make_request("103", "guid-1")]
+    response = batch.handle_batch_event(make_event(documents), None)
+    results = json.loads(response["body"])["results"]
+    assert [result["status"] for result in results] == [503, 503]
+    assert results[0]["retryAfter"] >= 1
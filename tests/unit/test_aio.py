@@ -0,0 +1,92 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from acord_core import aio, core
+from acord_core.deadline import Deadline
+from tests.conftest import FakeContext, make_event, make_request
+
+
+def async_process(monkeypatch, code, process):
+    transaction = core.TRANSACTIONS[code]
+    monkeypatch.setattr(transaction, "process", lambda request: process(transaction, request))
+
+
+def test_loop_persists_across_runs_and_threads():
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    loop = aio.run(current_loop())
+    assert aio.run(current_loop()) is loop
+    with ThreadPoolExecutor(4) as pool:
+        assert set(pool.map(lambda _: aio.run(current_loop()), range(8))) == {loop}
+
+
+def test_blocking_calls_run_off_the_loop():
+    def blocking(delay):
+        time.sleep(delay)
+        return threading.current_thread().name
+
+    async def main():
+        return await asyncio.gather(*(aio.run_blocking(blocking, 0.1) for _ in range(4)))
+
+    started = time.monotonic()
+    names = aio.run(main())
+    assert time.monotonic() - started < 0.3
+    assert all(name.startswith("acord-blocking") for name in names)
+
+
+def test_async_process_calls_run_concurrently(monkeypatch):
+    async def process(transaction, request):
+        # Three independent downstream calls of 100ms each
+        await asyncio.gather(*(asyncio.sleep(0.1) for _ in range(3)))
+        return core.Transaction.process(transaction, request)
+    async_process(monkeypatch, "302", process)
+
+    started = time.monotonic()
+    response = core.handle_event(make_event(make_request("302")), None, "302")
+    assert time.monotonic() - started < 0.25
+    assert json.loads(response["body"])["TXLife"]["TXLifeResponse"]["TransRefGUID"] == "guid-1"
+
+
+def test_async_process_bounded_by_deadline(monkeypatch):
+    async def process(transaction, request):
+        await asyncio.sleep(5)
+    async_process(monkeypatch, "302", process)
+
+    started = time.monotonic()
+    response = core.handle_event(make_event(make_request("302")), FakeContext(700), "302")
+    assert time.monotonic() - started < 1
+    # Cut short once started, so it may or may not have taken effect
+    assert response["statusCode"] == 504
+    assert "outcome unknown" in json.loads(response["body"])["message"]
+
+
+def test_multi_request_parts_cut_short_or_never_started(monkeypatch):
+    async def process(transaction, request):
+        await asyncio.sleep(1)
+    async_process(monkeypatch, "302", process)
+
+    parts = [make_request("302", guid=f"guid-{n}")["TXLife"]["TXLifeRequest"] for n in range(2)]
+    request = core.AcordRequest(json.dumps({"TXLife": {"TXLifeRequest": parts}}))
+    responses = core.respond(request, deadline=Deadline.after(0.05))["TXLife"]["TXLifeResponse"]
+    descriptions = [r["TransResult"]["ResultInfo"]["ResultInfoDesc"] for r in responses]
+    assert descriptions == ["Not finished before the invocation deadline; outcome unknown",
+                            "Not processed before the invocation deadline"]
+
+
+def test_multi_request_parts_overlap_on_the_loop(monkeypatch):
+    async def process(transaction, request):
+        await asyncio.sleep(0.1)
+        return core.Transaction.process(transaction, request)
+    async_process(monkeypatch, "302", process)
+
+    parts = [make_request("302", guid=f"guid-{n}")["TXLife"]["TXLifeRequest"] for n in range(6)]
+    started = time.monotonic()
+    response = core.handle_event(make_event({"TXLife": {"TXLifeRequest": parts}}),
+                                 None, "302")
+    assert time.monotonic() - started < 0.3
+    responses = json.loads(response["body"])["TXLife"]["TXLifeResponse"]
+    assert [r["TransRefGUID"] for r in responses] == [f"guid-{n}" for n in range(6)]
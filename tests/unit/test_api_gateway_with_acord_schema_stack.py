@@ -0,0 +1,211 @@
+import json
+
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from api_gateway_with_acord_schema_stack import ApiGatewayWithAcordSchemaStack
+
+
+@pytest.fixture(scope="module")
+def template():
+    app = core.App()
+    stack = ApiGatewayWithAcordSchemaStack(app, "acord")
+    return assertions.Template.from_stack(stack)
+
+
+def test_acord_functions_share_core_layer(template):
+    template.resource_count_is("AWS::Lambda::LayerVersion", 1)
+    for code in ("103", "1125", "203", "302"):
+        template.has_resource_properties("AWS::Lambda::Function", {
+            "Handler": f"handler_acord_{code}.handler",
+            "Layers": [{"Ref": assertions.Match.string_like_regexp("AcordCoreLayer")}],
+        })
+
+
+def test_batch_endpoint(template):
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "handler_acord_batch.handler",
+        "Timeout": 29,
+    })
+    template.has_resource_properties("AWS::ApiGateway::Resource", {"PathPart": "batch"})
+
+
+def test_claim_check_bucket_wired_to_functions(template):
+    template.has_resource_properties("AWS::S3::Bucket", {
+        "LifecycleConfiguration": {"Rules": [{"ExpirationInDays": 7, "Status": "Enabled"}]},
+    })
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "handler_acord_103.handler",
+        "Environment": {"Variables": {"ACORD_CLAIM_CHECK_BUCKET": assertions.Match.any_value()}},
+    })
+    template.has_resource_properties("AWS::ApiGateway::Resource", {"PathPart": "claimcheck"})
+
+
+def test_status_inquiry_declares_conditional_responses(template):
+    template.has_resource_properties("AWS::ApiGateway::Method", {
+        "HttpMethod": "POST",
+        "RequestParameters": {"method.request.header.If-None-Match": False},
+        "MethodResponses": assertions.Match.array_with([
+            assertions.Match.object_like({
+                "StatusCode": "304",
+                "ResponseParameters": assertions.Match.object_like({"method.response.header.ETag": True}),
+            }),
+        ]),
+    })
+    template.has_resource_properties("AWS::ApiGateway::Method", {
+        "HttpMethod": "OPTIONS",
+        "Integration": {"IntegrationResponses": [{
+            "ResponseParameters": assertions.Match.object_like({
+                "method.response.header.Access-Control-Allow-Headers": assertions.Match.string_like_regexp("If-None-Match"),
+                "method.response.header.Access-Control-Expose-Headers": "'ETag'",
+            }),
+        }]},
+    })
+
+
+def test_api_compresses_and_passes_binary_bodies(template):
+    template.has_resource_properties("AWS::ApiGateway::RestApi", {
+        "MinimumCompressionSize": 1024,
+        "BinaryMediaTypes": assertions.Match.array_with(["application/json", "application/xml"]),
+    })
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "handler_acord_203.handler",
+        "Environment": {"Variables": assertions.Match.object_like({
+            "ACORD_MIN_COMPRESSION_SIZE": "1024",
+            "ACORD_BINARY_MEDIA_TYPES": "application/json,application/xml,text/xml,application/gzip,"
+                                        "application/octet-stream",
+        })},
+    })
+
+
+def test_swagger_mock_converts_binary_payloads_to_text(template):
+    template.has_resource_properties("AWS::ApiGateway::Method", {
+        "HttpMethod": "GET",
+        "Integration": assertions.Match.object_like({
+            "Type": "MOCK",
+            "ContentHandling": "CONVERT_TO_TEXT",
+            "RequestTemplates": {"application/json": '{"statusCode": 200}'},
+            "IntegrationResponses": [assertions.Match.object_like({
+                "StatusCode": "200",
+                "ContentHandling": "CONVERT_TO_TEXT",
+            })],
+        }),
+    })
+
+
+def test_new_business_function_has_spool_storage(template):
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "handler_acord_103.handler",
+        "EphemeralStorage": {"Size": 2048},
+        "Environment": {"Variables": assertions.Match.object_like({"ACORD_SPOOL_DIR": "/tmp/acord-spool"})},
+    })
+
+
+def test_spool_storage_is_configurable():
+    app = core.App(context={"acordAttachmentSpoolMiB": "4096"})
+    stack = ApiGatewayWithAcordSchemaStack(app, "acord")
+    assertions.Template.from_stack(stack).has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "handler_acord_103.handler",
+        "EphemeralStorage": {"Size": 4096},
+    })
+
+
+def test_pending_case_table_with_indexes(template):
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "KeySchema": [{"AttributeName": "PolNumber", "KeyType": "HASH"}],
+        "BillingMode": "PAY_PER_REQUEST",
+        "GlobalSecondaryIndexes": [
+            {"IndexName": f"{attribute}Index",
+             "KeySchema": [{"AttributeName": attribute, "KeyType": "HASH"},
+                           {"AttributeName": "UpdatedAt", "KeyType": "RANGE"}],
+             "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": assertions.Match.array_with(
+                 ["Version", "Removed"])}}
+            for attribute in ("Producer", "CarrierCode", "Status")
+        ] + [
+            {"IndexName": "UpdatedDayIndex",
+             "KeySchema": [{"AttributeName": "UpdatedDay", "KeyType": "HASH"},
+                           {"AttributeName": "UpdatedAt", "KeyType": "RANGE"}],
+             "Projection": {"ProjectionType": "KEYS_ONLY"}}
+        ],
+    })
+    for index in template.find_resources("AWS::DynamoDB::Table").popitem()[1]["Properties"][
+            "GlobalSecondaryIndexes"]:
+        assert "Document" not in index["Projection"].get("NonKeyAttributes", [])
+    for handler in ("203", "302", "batch"):
+        template.has_resource_properties("AWS::Lambda::Function", {
+            "Handler": f"handler_acord_{handler}.handler",
+            "Environment": {"Variables": assertions.Match.object_like(
+                {"ACORD_CASE_TABLE": {"Ref": assertions.Match.string_like_regexp("AcordPendingCaseTable")}})},
+        })
+    policies = template.find_resources("AWS::IAM::Policy")
+    writers = [name for name, policy in policies.items()
+               if "dynamodb:PutItem" in json.dumps(policy) or "dynamodb:UpdateItem" in json.dumps(policy)]
+    assert sorted(name.split("ServiceRole")[0] for name in writers) == [
+        "Acord103Function", "Acord302Function", "AcordBatchFunction"]
+
+
+def test_policy_admin_url_from_context():
+    app = core.App(context={"acordPolicyAdminUrl": "https://policy-admin.example.com"})
+    template = assertions.Template.from_stack(ApiGatewayWithAcordSchemaStack(app, "acord"))
+    for handler in ("103", "1125", "203", "302", "batch"):
+        template.has_resource_properties("AWS::Lambda::Function", {
+            "Handler": f"handler_acord_{handler}.handler",
+            "Environment": {"Variables": assertions.Match.object_like(
+                {"ACORD_POLICY_ADMIN_URL": "https://policy-admin.example.com"})},
+        })
+
+
+def test_policy_filter_snapshot_from_context():
+    app = core.App(context={"acordPolicyFilterSnapshot": "s3://acord-filters/policies.bloom"})
+    template = assertions.Template.from_stack(ApiGatewayWithAcordSchemaStack(app, "acord"))
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "handler_acord_203.handler",
+        "Environment": {"Variables": assertions.Match.object_like(
+            {"ACORD_POLICY_FILTER_SNAPSHOT": "s3://acord-filters/policies.bloom"})},
+    })
+    readers = [name for name, policy in template.find_resources("AWS::IAM::Policy").items()
+               if "acord-filters/policies.bloom" in json.dumps(policy)]
+    assert sorted(name.split("ServiceRole")[0] for name in readers) == [
+        "Acord103Function", "Acord203Function", "Acord302Function", "AcordBatchFunction"]
+
+
+def test_status_inquiry_sources_from_context():
+    sources = [{"name": "workbench", "url": "https://workbench.example.com/status", "timeout": 1}]
+    app = core.App(context={"acord203Sources": sources})
+    stack = ApiGatewayWithAcordSchemaStack(app, "acord")
+    assertions.Template.from_stack(stack).has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "handler_acord_203.handler",
+        "Environment": {"Variables": assertions.Match.object_like({"ACORD_203_SOURCES": json.dumps(sources)})},
+    })
+
+
+def test_queue_consumers_report_partial_batch_failures(template):
+    mappings = template.find_resources("AWS::Lambda::EventSourceMapping")
+    assert len(mappings) == 4
+    for mapping in mappings.values():
+        assert mapping["Properties"]["FunctionResponseTypes"] == ["ReportBatchItemFailures"]
+
+
+def test_status_inquiry_declares_shed_response(template):
+    template.has_resource_properties("AWS::ApiGateway::Method", {
+        "HttpMethod": "POST",
+        "MethodResponses": assertions.Match.array_with([{
+            "StatusCode": "503",
+            "ResponseParameters": {"method.response.header.Retry-After": True},
+        }]),
+    })
+
+
+def test_status_inquiry_requires_a_signed_in_producer(template):
+    template.has_resource_properties("AWS::Cognito::UserPool", {
+        "Schema": assertions.Match.array_with([assertions.Match.object_like({"Name": "producer_id"})]),
+    })
+    template.has_resource_properties("AWS::Cognito::UserPoolClient", {
+        "WriteAttributes": ["email"],
+    })
+    template.has_resource_properties("AWS::ApiGateway::Method", {
+        "HttpMethod": "POST",
+        "AuthorizationType": "COGNITO_USER_POOLS",
+        "RequestParameters": {"method.request.header.If-None-Match": False},
+    })
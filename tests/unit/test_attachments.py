@@ -0,0 +1,107 @@
+import base64
+import gc
+import json
+import os
+
+import pytest
+
+from acord_core import attachments, core
+from acord_core.attachments import SpooledAttachment
+from tests.conftest import make_event, make_request
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(attachments, "SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(attachments, "SPOOL_THRESHOLD", 1024)
+    monkeypatch.setattr(attachments, "_CHUNK", 400)
+    return tmp_path
+
+
+def make_body(*payloads, escape_slashes=False):
+    data = [base64.b64encode(payload).decode("ascii") for payload in payloads]
+    request = make_request(Attachment=[{"AttachmentKey": str(n), "AttachmentData": item} for n, item in enumerate(data)])
+    text = json.dumps(request)
+    return text.replace("/", "\\/") if escape_slashes else text
+
+
+def test_large_attachments_are_spooled(spool_dir):
+    pdf = os.urandom(20000)
+    small = b"tiny"
+    document, handles = attachments.load(make_body(pdf, small))
+    items = document["TXLife"]["TXLifeRequest"]["OLifE"]["Attachment"]
+    assert isinstance(items[0]["AttachmentData"], SpooledAttachment)
+    assert items[0]["AttachmentData"].read() == pdf
+    assert items[0]["AttachmentData"].size == len(pdf)
+    assert items[1]["AttachmentData"] == base64.b64encode(small).decode("ascii")
+    assert handles == [items[0]["AttachmentData"]]
+    assert "".join(handles[0].iter_base64(300)) == base64.b64encode(pdf).decode("ascii")
+    assert len(os.listdir(spool_dir)) == 1
+
+
+def test_escaped_base64_is_spooled():
+    pdf = os.urandom(20000)
+    document, handles = attachments.load(make_body(pdf, escape_slashes=True))
+    assert handles[0].read() == pdf
+
+
+def test_spool_files_removed_on_close_and_collection(spool_dir):
+    document, handles = attachments.load(make_body(os.urandom(5000), os.urandom(5000)))
+    handles[0].close()
+    assert len(os.listdir(spool_dir)) == 1
+    del document, handles
+    gc.collect()
+    assert os.listdir(spool_dir) == []
+
+
+def test_placeholders_cannot_be_forged():
+    forged = json.dumps({"a": {"$spool": "0:0"}, "AttachmentData": base64.b64encode(os.urandom(5000)).decode()})
+    document, handles = attachments.load(forged)
+    assert document["a"] == {"$spool": "0:0"}
+
+
+def test_malformed_attachment_rejected(spool_dir):
+    text = make_body(os.urandom(5000)).replace('"AttachmentData": "', '"AttachmentData": "@@@@')
+    with pytest.raises(core.BadRequest):
+        attachments.load(text)
+    assert os.listdir(spool_dir) == []
+
+
+def test_serializers_write_references_not_bytes():
+    pdf = os.urandom(20000)
+    request = core.AcordRequest(make_body(pdf))
+    document = request.document
+    body, _ = core.serialize(document, "json")
+    assert json.loads(body)["TXLife"]["TXLifeRequest"]["OLifE"]["Attachment"][0]["AttachmentData"] == {
+        "SpooledAttachment": {"Size": len(pdf)}}
+    assert b"<AttachmentData><SpooledAttachment><Size>20000</Size>" in core.serialize(document, "xml")[0]
+    request.close()
+
+
+def test_json_body_streams_attachments_back():
+    pdfs = [os.urandom(20000), os.urandom(20001), os.urandom(5)]
+    request = core.AcordRequest(make_body(*pdfs))
+    body = attachments.JSONBody(request.document)
+    assert len(body.handles) == 2
+    # Read from the spool files a chunk at a time, and again for a retry
+    for _ in range(2):
+        data = b"".join(body)
+        assert len(data) == len(body)
+        assert json.loads(data) == json.loads(make_body(*pdfs))
+    request.close()
+
+
+def test_handler_removes_spool_files(spool_dir, monkeypatch):
+    seen = []
+
+    def process(request):
+        attachment = request.document["TXLife"]["TXLifeRequest"]["OLifE"]["Attachment"][0]["AttachmentData"]
+        seen.append(attachment.read())
+        return {"TransRefGUID": request.fields["TransRefGUID"]}
+    monkeypatch.setattr(core.TRANSACTIONS["103"], "process", process)
+
+    pdf = os.urandom(20000)
+    response = core.handle_event(make_event(make_body(pdf)), None, "103")
+    assert response["statusCode"] == 200
+    assert seen == [pdf]
+    assert os.listdir(spool_dir) == []
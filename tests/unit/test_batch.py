@@ -0,0 +1,50 @@
+import json
+import threading
+
+from acord_core import batch, core
+from tests.conftest import make_event, make_request
+
+
+def test_mixed_batch_returns_results_in_input_order():
+    documents = [make_request(tc, f"guid-{n}") for n, tc in enumerate(["302", "203", "103", "1125"] * 25)]
+    response = batch.handle_batch_event(make_event(documents), None)
+
+    assert response["statusCode"] == 207
+    results = json.loads(response["body"])["results"]
+    assert [result["index"] for result in results] == list(range(100))
+    assert [result["TransRefGUID"] for result in results] == [f"guid-{n}" for n in range(100)]
+    assert results[0]["body"]["TXLife"]["UserAuthResponse"]["TransResult"]["ResultInfo"]["ResultInfoDesc"] == \
+        "ACORD 302 request processed successfully"
+
+
+def test_element_failures_do_not_fail_the_batch():
+    missing_policy = make_request("203", "guid-1")
+    del missing_policy["TXLife"]["TXLifeRequest"]["OLifE"]
+    documents = [make_request("302", "guid-0"), missing_policy, make_request("999", "guid-2"), "junk"]
+
+    results = json.loads(batch.handle_batch_event(make_event(documents), None)["body"])["results"]
+
+    assert [result["status"] for result in results] == [200, 400, 400, 400]
+    assert "Unsupported TransType" in results[2]["body"]["message"]
+
+
+def test_elements_run_concurrently(monkeypatch):
+    barrier = threading.Barrier(4, timeout=5)
+    original = core.Transaction.process
+
+    def process(self, request):
+        barrier.wait()
+        return original(self, request)
+    monkeypatch.setattr(core.Transaction, "process", process)
+
+    documents = [make_request("302", f"guid-{n}") for n in range(4)]
+    results = json.loads(batch.handle_batch_event(make_event(documents), None)["body"])["results"]
+    assert all(result["status"] == 200 for result in results)
+
+
+def test_rejects_non_array_and_oversized_batches(monkeypatch):
+    assert batch.handle_batch_event(make_event(make_request("302", "g")), None)["statusCode"] == 400
+    assert batch.handle_batch_event(make_event("["), None)["statusCode"] == 400
+    monkeypatch.setattr(batch, "MAX_BATCH_SIZE", 2)
+    documents = [make_request("302", f"guid-{n}") for n in range(3)]
+    assert batch.handle_batch_event(make_event(documents), None)["statusCode"] == 413
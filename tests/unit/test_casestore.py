@@ -0,0 +1,727 @@
+import base64
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from acord_core import attachments, casestore, conditional, core, polfilter
+from acord_core.casestore import (DynamoCaseStore, MemoryCaseStore, SQLiteCaseStore, UnknownIndex,
+                                  VersionConflict, case_from_olife, merge_case)
+from acord_core.graph import ObjectGraph
+
+
+def make_olife(pol_number, status="12", carrier="CARRIER1", producer="AG-1"):
+    olife = {"Holding": {"id": "Holding_1", "Policy": {"PolNumber": pol_number, "CarrierCode": carrier,
+                                                       "PolicyStatus": {"tc": status}}}}
+    if producer is not None:
+        olife["Party"] = [{"id": "Party_1", "FullName": "Insured"},
+                          {"id": "Party_2", "Producer": {"CarrierAppointment": {"CompanyProducerID": producer}}}]
+    return olife
+
+
+def create_table(dynamodb, name="cases"):
+    indexes = [{
+        "IndexName": f"{attribute}Index",
+        "KeySchema": [{"AttributeName": attribute, "KeyType": "HASH"},
+                      {"AttributeName": "UpdatedAt", "KeyType": "RANGE"}],
+        "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["Version", "Removed"] + [
+            name for name in casestore.ATTRIBUTES if name != attribute]},
+    } for attribute in casestore.ATTRIBUTES]
+    indexes.append({
+        "IndexName": DynamoCaseStore.FEED_INDEX,
+        "KeySchema": [{"AttributeName": "UpdatedDay", "KeyType": "HASH"},
+                      {"AttributeName": "UpdatedAt", "KeyType": "RANGE"}],
+        "Projection": {"ProjectionType": "KEYS_ONLY"},
+    })
+    dynamodb.create_table(
+        TableName=name,
+        KeySchema=[{"AttributeName": "PolNumber", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": name, "AttributeType": "S"}
+                              for name in ("PolNumber", "UpdatedAt", "UpdatedDay") + casestore.ATTRIBUTES],
+        GlobalSecondaryIndexes=indexes,
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        yield
+
+
+@pytest.fixture(params=["memory", "sqlite", "dynamodb"])
+def store(request):
+    if request.param == "memory":
+        yield MemoryCaseStore()
+    elif request.param == "sqlite":
+        store = SQLiteCaseStore()
+        yield store
+        store.close()
+    else:
+        request.getfixturevalue("aws")
+        dynamodb = boto3.client("dynamodb")
+        create_table(dynamodb)
+        yield DynamoCaseStore("cases", dynamodb)
+
+
+# moto does not serialize concurrent updates of an item the way DynamoDB does
+@pytest.fixture(params=["memory", "sqlite"])
+def local_store(request):
+    store = MemoryCaseStore() if request.param == "memory" else SQLiteCaseStore()
+    yield store
+    if request.param == "sqlite":
+        store.close()
+
+
+def test_case_from_olife():
+    case = case_from_olife(make_olife("POL1"))
+    assert {key: case[key] for key in ("PolNumber", "Producer", "CarrierCode", "Status")} == {
+        "PolNumber": "POL1", "Producer": "AG-1", "CarrierCode": "CARRIER1", "Status": "12"}
+    assert case_from_olife(make_olife("POL1", producer=None))["Producer"] is None
+    assert case_from_olife({"Holding": [{"Policy": {"PolNumber": "POL2"}}]})["Status"] is None
+    assert case_from_olife({"Party": {"id": "Party_1"}}) is None
+
+
+def test_case_producer_is_the_policys():
+    olife = make_olife("POL1")
+    olife["Party"].append({"id": "Party_3", "Producer": {"CarrierAppointment": {"CompanyProducerID": "AG-3"}}})
+    olife["Relation"] = [{"OriginatingObjectID": "Holding_1", "RelatedObjectID": "Party_3",
+                          "RelationRoleCode": {"tc": "37"}}]
+    assert case_from_olife(olife)["Producer"] == "AG-3"
+    assert case_from_olife(olife, ObjectGraph.from_olife(olife))["Producer"] == "AG-3"
+
+
+def test_upsert_and_get(store):
+    assert store.get("POL1") is None
+    first = store.put(case_from_olife(make_olife("POL1")))
+    assert first["Version"] == 1
+    stored = store.get("POL1")
+    assert stored == first
+    assert stored["OLifE"] == make_olife("POL1")
+
+    second = store.put(case_from_olife(make_olife("POL1", status="21", producer=None)))
+    assert second["Version"] == 2
+    assert second["UpdatedAt"] > first["UpdatedAt"]
+    assert (second["Status"], second["Producer"]) == ("21", None)
+    assert store.get("POL1") == second
+
+
+def test_indexed_queries(store):
+    for n in range(6):
+        store.put(case_from_olife(make_olife(f"POL{n}", status="12" if n % 2 else "21", producer=f"AG-{n % 3}")))
+    assert [case["PolNumber"] for case in store.query("producer", "AG-1")] == ["POL4", "POL1"]
+    assert [case["PolNumber"] for case in store.query("status", "12")] == ["POL5", "POL3", "POL1"]
+    assert [case["PolNumber"] for case in store.query("status", "12", limit=2)] == ["POL5", "POL3"]
+    assert len(store.query("carrier", "CARRIER1")) == 6
+    assert store.query("producer", "AG-9") == []
+
+    # An update moves the case between index entries and to the front
+    store.put(case_from_olife(make_olife("POL1", status="21", producer="AG-2")))
+    assert [case["PolNumber"] for case in store.query("producer", "AG-1")] == ["POL4"]
+    assert [case["PolNumber"] for case in store.query("producer", "AG-2")] == ["POL1", "POL5", "POL2"]
+    assert [case["PolNumber"] for case in store.query("status", "12")] == ["POL5", "POL3"]
+
+    # Cases without the attribute are not in its index
+    store.put(case_from_olife(make_olife("POL9", producer=None)))
+    assert "POL9" not in [case["PolNumber"] for index in ("AG-0", "AG-1", "AG-2")
+                          for case in store.query("producer", index)]
+
+    with pytest.raises(UnknownIndex):
+        store.query("FullName", "Insured")
+
+
+def test_concurrent_upserts_each_get_a_version(local_store):
+    store = local_store
+    versions = []
+    lock = threading.Lock()
+
+    def update(n):
+        for _ in range(10):
+            case = store.put(case_from_olife(make_olife("POL1", status=str(n))))
+            with lock:
+                versions.append(case["Version"])
+
+    threads = [threading.Thread(target=update, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(versions) == list(range(1, 41))
+    assert store.get("POL1")["Version"] == 40
+
+
+def test_pol_numbers_since(store):
+    store.put(case_from_olife(make_olife("POL1")))
+    since = store.put(case_from_olife(make_olife("POL2")))["UpdatedAt"]
+    store.put(case_from_olife(make_olife("POL3")))
+    store.put(case_from_olife(make_olife("POL1", status="21")))
+    assert sorted(store.pol_numbers()) == ["POL1", "POL2", "POL3"]
+    assert sorted(store.pol_numbers(since=since)) == ["POL1", "POL3"]
+
+
+def test_dynamodb_pol_numbers_since_query_the_day_index(aws, monkeypatch):
+    dynamodb = boto3.client("dynamodb")
+    create_table(dynamodb)
+    store = DynamoCaseStore("cases", dynamodb)
+    since = store.put(case_from_olife(make_olife("POL0")))["UpdatedAt"]
+    for n in range(1, 21):
+        store.put(case_from_olife(make_olife(f"POL{n}")))
+    monkeypatch.setattr(dynamodb, "scan", lambda **kwargs: pytest.fail("scanned the table"))
+    assert sorted(store.pol_numbers(since=since)) == sorted(f"POL{n}" for n in range(1, 21))
+    # A snapshot from days ago reads each day since
+    days_ago = (datetime.now(timezone.utc) - timedelta(days=3)).isoformat(timespec="microseconds")
+    assert len(list(store.pol_numbers(since=days_ago))) == 21
+    shards = {casestore.feed_partition(f"POL{n}", since) for n in range(21)}
+    assert len(shards) == casestore.FEED_SHARDS
+
+
+def pol_numbers(cases):
+    return [case["PolNumber"] for case in cases]
+
+
+def test_change_feed_per_producer(store, monkeypatch):
+    monkeypatch.setattr(casestore, "CHANGE_SETTLE", 0)
+    for n in range(5):
+        store.put(case_from_olife(make_olife(f"POL{n}")))
+    store.put(case_from_olife(make_olife("POL9", producer="AG-2")))
+    cases, position, more = store.changes("AG-1")
+    assert (pol_numbers(cases), more) == (["POL0", "POL1", "POL2", "POL3", "POL4"], False)
+    assert store.changes("AG-1", position) == ([], position, False)
+
+    store.put(case_from_olife(make_olife("POL3", status="21")))
+    store.put(case_from_olife(make_olife("POL1", status="21")))
+    # Moved to another producer: a removal in this feed, the case in that one
+    store.put(case_from_olife(make_olife("POL2", producer="AG-2")))
+    cases, position, more = store.changes("AG-1", position)
+    assert pol_numbers(cases) == ["POL3", "POL1", "POL2"]
+    assert cases[1]["Status"] == "21" and cases[1]["Version"] == 2
+    assert {key: cases[2][key] for key in ("Producer", "Version", "Removed")} == {
+        "Producer": "AG-1", "Version": 2, "Removed": True}
+    assert "OLifE" not in cases[2]
+    assert pol_numbers(store.changes("AG-2")[0]) == ["POL9", "POL2"]
+    assert store.changes("AG-9") == ([], None, False)
+    # Removals are not cases of the producer
+    assert "POL2" not in pol_numbers(store.query("producer", "AG-1"))
+
+    # Pages of ``limit`` changes, each read on from the last
+    cases, page, more = store.changes("AG-1", limit=3)
+    assert (pol_numbers(cases), more) == (["POL0", "POL4", "POL3"], True)
+    cases, page, more = store.changes("AG-1", page, limit=3)
+    assert (pol_numbers(cases), more) == (["POL1", "POL2"], False)
+    assert page == position
+
+    # Moved back: the case replaces its removal
+    store.put(case_from_olife(make_olife("POL2")))
+    cases, position, more = store.changes("AG-1", position)
+    assert pol_numbers(cases) == ["POL2"] and not cases[0].get("Removed")
+    assert pol_numbers(store.changes("AG-1")[0]) == ["POL0", "POL4", "POL3", "POL1", "POL2"]
+    assert [case.get("Removed", False) for case in store.changes("AG-2")[0]] == [False, True]
+
+
+def test_dynamodb_feed_waits_for_updates_to_settle(aws, monkeypatch):
+    dynamodb = boto3.client("dynamodb")
+    create_table(dynamodb)
+    store = DynamoCaseStore("cases", dynamodb)
+    store.put(case_from_olife(make_olife("POL1")))
+    monkeypatch.setattr(casestore, "CHANGE_SETTLE", 60)
+    assert store.changes("AG-1") == ([], None, False)
+    monkeypatch.setattr(casestore, "CHANGE_SETTLE", 0)
+    assert pol_numbers(store.changes("AG-1")[0]) == ["POL1"]
+
+
+def test_cursors_are_opaque_positions():
+    for position in (0, 123456789, "2026-10-19T08:15:00.000001+00:00"):
+        cursor = casestore.encode_cursor(position)
+        assert "=" not in cursor and str(position) not in cursor
+        assert casestore.decode_cursor(cursor) == position
+    for cursor in ("", "not a cursor", casestore.encode_cursor(None), casestore.encode_cursor(True)):
+        with pytest.raises(casestore.InvalidCursor):
+            casestore.decode_cursor(cursor)
+
+
+def test_sqlite_queries_use_the_indexes():
+    store = SQLiteCaseStore()
+    for index in casestore.INDEXES:
+        assert f"USING INDEX cases_{index}" in store.explain(index)
+    assert "USING INDEX cases_changes" in store.explain("changes")
+    store.put_many(case_from_olife(make_olife(f"POL{n}", producer=f"AG-{n % 10}")) for n in range(100))
+    assert len(store.query("producer", "AG-3")) == 10
+    store.close()
+
+
+def test_dynamodb_queries_page_through_results(aws):
+    dynamodb = boto3.client("dynamodb")
+    create_table(dynamodb)
+    store = DynamoCaseStore("cases", dynamodb)
+    olife = make_olife("POL0")
+    # Large documents, read from the table rather than the index
+    olife["Holding"]["Attachment"] = {"Description": base64.b64encode(os.urandom(150_000)).decode("ascii")}
+    for n in range(12):
+        olife["Holding"]["Policy"]["PolNumber"] = f"POL{n}"
+        store.put(case_from_olife(olife))
+    cases = store.query("producer", "AG-1")
+    assert len(cases) == 12
+    assert cases[0]["OLifE"]["Holding"]["Attachment"] == olife["Holding"]["Attachment"]
+    assert len(store.query("producer", "AG-1", limit=7)) == 7
+
+
+def test_dynamodb_items_stay_under_the_size_limit(aws, monkeypatch, caplog):
+    monkeypatch.setattr(casestore, "CHANGE_SETTLE", 0)
+    dynamodb = boto3.client("dynamodb")
+    create_table(dynamodb)
+    store = DynamoCaseStore("cases", dynamodb)
+    olife = make_olife("POL1")
+    olife["Holding"]["Attachment"] = {"Description": "x" * 100_000}
+    case = case_from_olife(olife)
+    case["Views"] = {"json": "v" * 1000}
+    store.put(case)
+    # Stored compressed, and read back whole
+    item = dynamodb.get_item(TableName="cases", Key={"PolNumber": {"S": "POL1"}})["Item"]
+    assert "B" in item["Document"] and len(item["Document"]["B"]) < 10_000
+    assert store.get("POL1")["OLifE"] == olife
+    assert store.changes("AG-1")[0][0]["OLifE"] == olife
+    assert store.view("POL1", "json") == (1, "v" * 1000)
+
+    # Over the limit with its views, the case is stored without them
+    monkeypatch.setattr(casestore, "MAX_ITEM_SIZE", 5000)
+    case["Views"] = {"json": "v" * 5000}
+    assert store.put(case)["Version"] == 2
+    assert store.view("POL1", "json") is None
+    assert "without its views" in caplog.text
+    # Over it without, not at all
+    olife["Holding"]["Attachment"] = {"Description": base64.b64encode(os.urandom(5000)).decode("ascii")}
+    with pytest.raises(casestore.CaseTooLarge):
+        store.put(case_from_olife(olife))
+    assert store.get("POL1")["Version"] == 2
+
+
+def test_default_store_from_environment(monkeypatch):
+    monkeypatch.setattr(casestore, "_default_store", None)
+    monkeypatch.setattr(casestore, "TABLE", None)
+    monkeypatch.setattr(casestore, "DATABASE", None)
+    assert casestore.default_store() is None
+    monkeypatch.setattr(casestore, "DATABASE", ":memory:")
+    assert isinstance(casestore.default_store(), SQLiteCaseStore)
+    monkeypatch.setattr(casestore, "_default_store", None)
+    monkeypatch.setattr(casestore, "TABLE", "cases")
+    assert isinstance(casestore.default_store(), DynamoCaseStore)
+
+
+@pytest.fixture
+def cases(monkeypatch):
+    store = MemoryCaseStore()
+    monkeypatch.setattr(casestore, "_default_store", store)
+    # Unknown PolNumbers reach the store (see test_polfilter)
+    monkeypatch.setattr(polfilter, "default_policies", lambda: None)
+    monkeypatch.delenv("ACORD_203_SOURCES", raising=False)
+    update = core.make_transaction("302", "Pending Case Status Update")
+    inquiry = core.status_inquiry()
+    assert isinstance(update, core.CaseUpdate)
+    monkeypatch.setitem(core.TRANSACTIONS, "302", update)
+    monkeypatch.setitem(core.TRANSACTIONS, "203", inquiry)
+    return store
+
+
+def send(code, olife, guid="guid-1", headers=None):
+    body = {"TXLife": {"TXLifeRequest": {"TransRefGUID": guid, "TransType": {"tc": code}, "OLifE": olife}}}
+    return core.handle_event({"body": json.dumps(body), "headers": headers or {}}, None, code)
+
+
+def call(code, olife, guid="guid-1"):
+    response = send(code, olife, guid)
+    assert response["statusCode"] == 200
+    return json.loads(response["body"])["TXLife"]["TXLifeResponse"]
+
+
+def inquiry(pol_number):
+    return {"Holding": {"Policy": {"PolNumber": pol_number}}}
+
+
+def test_status_update_then_inquiry(cases):
+    call("302", make_olife("POL1", status="21"))
+    assert cases.get("POL1")["Status"] == "21"
+
+    response = call("203", inquiry("POL1"))
+    assert response["TransResult"]["ResultCode"]["tc"] == "1"
+    assert response["OLifE"]["Holding"]["Policy"]["PolicyStatus"] == {"tc": "21"}
+    assert response["OLifE"]["Party"][1]["Producer"]["CarrierAppointment"]["CompanyProducerID"] == "AG-1"
+
+
+def test_inquiry_for_unknown_case(cases):
+    response = call("203", inquiry("POL404"))
+    assert response["TransResult"]["ResultCode"]["tc"] == "5"
+    assert response["TransResult"]["ResultInfo"][0]["ResultInfoDesc"] == "casestore: failed: No pending case POL404"
+
+
+def test_spooled_attachments_not_stored(cases, monkeypatch, tmp_path):
+    monkeypatch.setattr(attachments, "SPOOL_DIR", str(tmp_path))
+    monkeypatch.setitem(core.TRANSACTIONS, "103", core.make_transaction("103", "New Business Submission"))
+    olife = make_olife("POL1")
+    olife["Attachment"] = [{"id": "Attachment_1", "AttachmentData": base64.b64encode(
+        os.urandom(attachments.SPOOL_THRESHOLD)).decode()}, {"id": "Attachment_2", "AttachmentData": "c21hbGw="}]
+    call("103", olife)
+    assert cases.get("POL1")["OLifE"]["Attachment"] == [{"id": "Attachment_1"}, olife["Attachment"][1]]
+    assert os.listdir(tmp_path) == []
+
+
+def test_status_only_update_keeps_the_case(cases):
+    call("302", make_olife("POL1"))
+    call("302", status_only("POL1", "21"), guid="guid-2")
+    case = cases.get("POL1")
+    assert {key: case[key] for key in ("Producer", "CarrierCode", "Status", "Version")} == {
+        "Producer": "AG-1", "CarrierCode": "CARRIER1", "Status": "21", "Version": 2}
+    assert [party["id"] for party in case["OLifE"]["Party"]] == ["Party_1", "Party_2"]
+    response = call("203", inquiry("POL1"), guid="guid-3")
+    assert response["OLifE"]["Holding"]["Policy"]["PolicyStatus"] == {"tc": "21"}
+    assert response["OLifE"]["Party"][1]["Producer"]["CarrierAppointment"]["CompanyProducerID"] == "AG-1"
+
+
+def test_nothing_stored_when_the_update_fails(cases, monkeypatch):
+    update = core.TRANSACTIONS["302"]
+    monkeypatch.setattr(update.base, "process", lambda request: 1 / 0)
+    assert send("302", make_olife("POL1"))["statusCode"] == 500
+    assert cases.get("POL1") is None
+    assert cases.changes("AG-1") == ([], None, False)
+
+
+class Submitted(core.PolicyAdminTransaction):
+    # Stands in for a transaction the policy administration service carried out
+
+    def __init__(self, code):
+        core.Transaction.__init__(self, code, "New Business Submission")
+
+    async def process(self, request):
+        return core.Transaction.process(self, request)
+
+
+def test_case_write_failures_logged_once_submitted(cases, monkeypatch, caplog):
+    monkeypatch.setattr(cases, "update", lambda *args, **kwargs: 1 / 0)
+    monkeypatch.setitem(core.TRANSACTIONS, "103", core.CaseUpdate(Submitted("103"), cases))
+    assert send("103", make_olife("POL1"))["statusCode"] == 200
+    assert "ACORD 103 for POL1 was submitted but not recorded" in caplog.text
+    # Nothing was submitted without a policy administration service
+    monkeypatch.setitem(core.TRANSACTIONS, "103", core.CaseUpdate(core.Transaction("103", "New Business"), cases))
+    assert send("103", make_olife("POL1"))["statusCode"] == 500
+
+
+def status_only(pol_number, status):
+    return {"Holding": {"Policy": {"PolNumber": pol_number, "PolicyStatus": {"tc": status}}}}
+
+
+def test_merge_keeps_what_the_update_leaves_out():
+    stored = case_from_olife(make_olife("POL1"))
+    update = make_olife("POL1", status="21", producer=None)
+    update["Holding"]["Policy"].pop("CarrierCode")
+    update["Party"] = {"id": "Party_1", "GovtID": "123"}
+    merged = merge_case(stored, case_from_olife(update))
+    assert {key: merged[key] for key in ("Producer", "CarrierCode", "Status")} == {
+        "Producer": "AG-1", "CarrierCode": "CARRIER1", "Status": "21"}
+    assert merged["OLifE"]["Party"][0] == {"id": "Party_1", "FullName": "Insured", "GovtID": "123"}
+    assert len(merged["OLifE"]["Party"]) == 2
+    # A Holding without an id is matched by its PolNumber
+    merged = merge_case(stored, case_from_olife(status_only("POL1", "22")))
+    assert merged["OLifE"]["Holding"]["id"] == "Holding_1"
+    assert merged["OLifE"]["Holding"]["Policy"]["PolicyStatus"] == {"tc": "22"}
+
+
+def test_update_merges_into_the_stored_case(store):
+    store.update(case_from_olife(make_olife("POL1")), merge=False)
+    case = store.update(case_from_olife(status_only("POL1", "21")),
+                        views=lambda case: {"json": case["Status"]})
+    assert case["Version"] == 2
+    stored = store.get("POL1")
+    assert {key: stored[key] for key in ("Producer", "CarrierCode", "Status", "Version")} == {
+        "Producer": "AG-1", "CarrierCode": "CARRIER1", "Status": "21", "Version": 2}
+    assert store.view("POL1", "json") == (2, "21")
+    assert [case["PolNumber"] for case in store.query("producer", "AG-1")] == ["POL1"]
+
+
+def test_put_checks_the_version(store):
+    case = case_from_olife(make_olife("POL1"))
+    assert store.put(case, 0)["Version"] == 1
+    with pytest.raises(VersionConflict):
+        store.put(case, 0)
+    assert store.put(case, 1)["Version"] == 2
+    with pytest.raises(VersionConflict):
+        store.put(case, 1)
+    assert store.get("POL1")["Version"] == 2
+
+
+def test_update_retries_after_a_conflict(local_store, monkeypatch):
+    store = local_store
+    store.put(case_from_olife(make_olife("POL1")))
+    get = store.get
+
+    def racing_get(pol_number):
+        # Another writer changes the producer between the read and the write
+        case = get(pol_number)
+        if case["Version"] == 1:
+            store.put(case_from_olife(make_olife("POL1", producer="AG-2")))
+        return case
+
+    monkeypatch.setattr(store, "get", racing_get)
+    case = store.update(case_from_olife(status_only("POL1", "21")))
+    assert (case["Version"], case["Producer"], case["Status"]) == (3, "AG-2", "21")
+
+
+def test_views_stored_with_their_version(store):
+    case = case_from_olife(make_olife("POL1"))
+    case["Views"] = {"json": "json-1", "xml": "xml-1"}
+    store.put(case)
+    assert store.view("POL1", "json") == (1, "json-1")
+    assert store.view("POL1", "xml") == (1, "xml-1")
+    # Views are not part of the case itself
+    assert "Views" not in store.get("POL1")
+
+    case["Views"] = {"json": "json-2"}
+    store.put(case)
+    assert store.view("POL1", "json") == (2, "json-2")
+    assert store.view("POL1", "xml") is None
+    assert store.view("POL2", "json") is None
+    assert store.view("POL1", "yaml") is None
+
+
+def test_concurrent_writers_never_expose_a_view_of_another_version(local_store):
+    store = local_store
+    written = {}
+    seen = []
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def write(writer):
+        for n in range(25):
+            case = case_from_olife(make_olife("POL1", status=f"{writer}-{n}"))
+            case["Views"] = {"json": case["Status"]}
+            version = store.put(case)["Version"]
+            with lock:
+                written[version] = case["Status"]
+
+    def read():
+        while not stop.is_set():
+            view = store.view("POL1", "json")
+            if view is not None:
+                seen.append(view)
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    writers = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+    assert sorted(written) == list(range(1, 101))
+    assert seen and all(written[version] == view for version, view in seen)
+    assert store.view("POL1", "json") == (100, written[100])
+
+
+def test_inquiry_answered_from_the_view(cases, monkeypatch):
+    call("302", make_olife("POL1", status="21"))
+    transaction = core.TRANSACTIONS["203"]
+    assert isinstance(transaction, core.CaseViewInquiry)
+    from_view = call("203", inquiry("POL1"), guid="guid-2")
+
+    # Without a view the fan-out to the case store builds the same response
+    monkeypatch.setattr(cases, "view", lambda pol_number, fmt: None)
+    built = call("203", inquiry("POL1"), guid="guid-2")
+    assert conditional.canonical(from_view) == conditional.canonical(built)
+    assert from_view["TransRefGUID"] == "guid-2"
+    assert from_view["TransResult"]["ResultInfo"][0]["ResultInfoDesc"] == "casestore: answered"
+
+
+def test_views_only_answer_when_the_case_store_is_the_only_source(cases, monkeypatch):
+    monkeypatch.setenv("ACORD_203_SOURCES", json.dumps([{"name": "workbench", "url": "http://127.0.0.1:9/"}]))
+    inquiry = core.status_inquiry()
+    assert isinstance(inquiry, core.StatusInquiry)
+    # The feed is still read from the case store
+    call("302", make_olife("POL1"))
+    assert pol_numbers(inquiry.changes("AG-1")[0]) == ["POL1"]
+
+
+def test_views_of_an_older_format_are_not_used(cases, monkeypatch):
+    call("302", make_olife("POL1", status="21"))
+    assert cases.view("POL1", "json")[1].startswith(f"{core.VIEW_FORMAT}\n")
+    monkeypatch.setattr(core, "VIEW_FORMAT", "3")
+    monkeypatch.setattr(core.ResponseTemplate, "loads", lambda text: pytest.fail("an old view was used"))
+    # Built from the case instead, by the fan-out
+    response = call("203", inquiry("POL1"))
+    assert response["OLifE"]["Holding"]["Policy"]["PolicyStatus"] == {"tc": "21"}
+    assert response["TransResult"]["ResultInfo"][0]["ResultInfoDesc"] == "casestore: answered"
+
+
+def test_view_bytes_returned_without_processing(cases, monkeypatch):
+    call("302", make_olife("POL1", status="21"))
+    transaction = core.TRANSACTIONS["203"]
+    monkeypatch.setattr(transaction.base, "process", lambda request: pytest.fail("inquiry was processed"))
+    response = send("203", inquiry("POL1"), headers={"Accept": "application/xml"})
+    assert response["headers"]["Content-Type"] == "application/xml"
+    body = response["body"].decode("utf-8") if isinstance(response["body"], bytes) else response["body"]
+    assert "<TransRefGUID>guid-1</TransRefGUID>" in body
+    assert "<PolicyStatus><tc>21</tc></PolicyStatus>" in body
+
+
+def test_view_version_is_the_etag(cases):
+    call("302", make_olife("POL1", status="21"))
+    first = send("203", inquiry("POL1"))
+    etag = first["headers"]["ETag"]
+    assert send("203", inquiry("POL1"), guid="guid-2")["headers"]["ETag"] == etag
+    assert send("203", inquiry("POL1"), headers={"If-None-Match": etag})["statusCode"] == 304
+    assert send("203", inquiry("POL1"), headers={"Accept": "application/xml"})["headers"]["ETag"] != etag
+
+    call("302", make_olife("POL1", status="22"))
+    changed = send("203", inquiry("POL1"), headers={"If-None-Match": etag})
+    assert changed["statusCode"] == 200
+    assert changed["headers"]["ETag"] != etag
+    assert json.loads(changed["body"])["TXLife"]["TXLifeResponse"]["OLifE"]["Holding"]["Policy"][
+        "PolicyStatus"] == {"tc": "22"}
+
+
+def test_concurrent_updates_keep_etags_consistent(cases):
+    statuses = {}
+    stop = threading.Event()
+
+    def update(writer):
+        for n in range(15):
+            call("302", make_olife("POL1", status=f"{writer}-{n}"), guid=f"guid-{writer}-{n}")
+
+    def poll():
+        while not stop.is_set():
+            response = send("203", inquiry("POL1"))
+            if response["statusCode"] != 200:
+                continue
+            status = json.loads(response["body"])["TXLife"]["TXLifeResponse"]["OLifE"]["Holding"]["Policy"][
+                "PolicyStatus"]["tc"]
+            statuses.setdefault(response["headers"]["ETag"], set()).add(status)
+
+    call("302", make_olife("POL1", status="start"))
+    pollers = [threading.Thread(target=poll) for _ in range(2)]
+    writers = [threading.Thread(target=update, args=(n,)) for n in range(3)]
+    for thread in pollers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in pollers:
+        thread.join()
+
+    # An ETag always stands for the same response
+    assert statuses and all(len(seen) == 1 for seen in statuses.values())
+    latest = cases.get("POL1")
+    assert latest["Version"] == 46
+    final = send("203", inquiry("POL1"))
+    assert json.loads(final["body"])["TXLife"]["TXLifeResponse"]["OLifE"]["Holding"]["Policy"][
+        "PolicyStatus"]["tc"] == latest["Status"]
+
+
+def delta(cursor=None, producer="AG-1", fmt="json", guid="guid-1", caller="AG-1"):
+    body = {"TXLife": {"TXLifeRequest": {"TransRefGUID": guid, "TransType": {"tc": "203"}}}}
+    parameters = {"producer": producer}
+    if cursor is not None:
+        parameters["cursor"] = cursor
+    event = {"body": json.dumps(body), "headers": {"Accept": f"application/{fmt}"},
+             "queryStringParameters": parameters}
+    if caller is not None:
+        event["requestContext"] = {"authorizer": {"claims": {core.PRODUCER_CLAIM: caller}}}
+    return core.handle_event(event, None, "203")
+
+
+def delta_cases(response):
+    assert response["statusCode"] == 200
+    responses = json.loads(response["body"])["TXLife"]["TXLifeResponse"]
+    return [item["OLifE"]["Holding"]["Policy"]["PolNumber"] for item in responses]
+
+
+def test_delta_inquiries(cases):
+    for n in range(3):
+        call("302", make_olife(f"POL{n}"))
+    first = delta()
+    assert delta_cases(first) == ["POL0", "POL1", "POL2"]
+    assert first["headers"][core.MORE_CHANGES_HEADER] == "false"
+    cursor = first["headers"][core.CURSOR_HEADER]
+    assert "ETag" not in first["headers"]
+
+    unchanged = delta(cursor)
+    assert delta_cases(unchanged) == []
+    assert unchanged["headers"][core.CURSOR_HEADER] == cursor
+
+    call("302", make_olife("POL1", status="21"))
+    changed = delta(cursor, guid="guid-2")
+    response, = json.loads(changed["body"])["TXLife"]["TXLifeResponse"]
+    assert response["TransRefGUID"] == "guid-2"
+    assert response["OLifE"]["Holding"]["Policy"]["PolicyStatus"] == {"tc": "21"}
+    assert response["TransResult"]["ResultCode"]["tc"] == "1"
+    assert delta_cases(delta(changed["headers"][core.CURSOR_HEADER])) == []
+
+    xml = delta(cursor, fmt="xml")
+    body = xml["body"].decode("utf-8") if isinstance(xml["body"], bytes) else xml["body"]
+    assert xml["headers"]["Content-Type"] == "application/xml"
+    assert body.count("<TXLifeResponse>") == 1 and "<PolNumber>POL1</PolNumber>" in body
+
+
+def test_delta_inquiries_answer_moved_cases_with_a_removal(cases):
+    call("302", make_olife("POL1"))
+    cursor = delta()["headers"][core.CURSOR_HEADER]
+    # A status-only update keeps the case with its producer
+    call("302", status_only("POL1", "21"))
+    assert delta_cases(delta(cursor)) == ["POL1"]
+
+    call("302", make_olife("POL1", producer="AG-2"))
+    response, = json.loads(delta(cursor)["body"])["TXLife"]["TXLifeResponse"]
+    assert response["OLifE"] == {"Holding": {"Policy": {"PolNumber": "POL1"}}}
+    assert response["TransResult"]["ResultInfo"]["ResultInfoSysMessageCode"] == "removed"
+    assert delta_cases(delta(producer="AG-2", caller="AG-2")) == ["POL1"]
+
+
+def test_delta_inquiries_read_only_the_callers_feed(cases):
+    call("302", make_olife("POL1"))
+    assert delta(caller=None)["statusCode"] == 403
+    assert delta(producer="AG-1", caller="AG-2")["statusCode"] == 403
+    assert delta_cases(delta()) == ["POL1"]
+
+
+def test_delta_pages_and_work_proportional_to_changes(monkeypatch):
+    store = SQLiteCaseStore()
+    store.put_many(case_from_olife(make_olife(f"POL{n:05d}")) for n in range(5000))
+    monkeypatch.setattr(casestore, "_default_store", store)
+    monkeypatch.setattr(polfilter, "default_policies", lambda: None)
+    monkeypatch.setattr(core, "CHANGES_LIMIT", 2000)
+    monkeypatch.setitem(core.TRANSACTIONS, "203", core.status_inquiry())
+
+    pages = []
+    cursor = None
+    while True:
+        response = delta(cursor)
+        pages.append(len(delta_cases(response)))
+        cursor = response["headers"][core.CURSOR_HEADER]
+        if response["headers"][core.MORE_CHANGES_HEADER] == "false":
+            break
+    assert pages == [2000, 2000, 1000]
+
+    for pol_number in ("POL00007", "POL04000", "POL00123"):
+        store.put(case_from_olife(make_olife(pol_number, status="21")))
+    monkeypatch.setattr(store, "get", lambda pol_number: pytest.fail("read a case that did not change"))
+    response = delta(cursor)
+    assert delta_cases(response) == ["POL00007", "POL04000", "POL00123"]
+    assert len(response["body"]) < 3000
+
+
+def test_invalid_delta_inquiries(cases, monkeypatch):
+    assert delta(cursor="not a cursor")["statusCode"] == 400
+    assert delta(producer="")["statusCode"] == 400
+    body = {"TXLife": {"TXLifeRequest": {"TransType": {"tc": "203"}}}}
+    response = core.handle_event({"body": json.dumps(body), "queryStringParameters": {"producer": "AG-1"},
+                                  "requestContext": {"authorizer": {"claims": {core.PRODUCER_CLAIM: "AG-1"}}}},
+                                 None, "203")
+    assert response["statusCode"] == 400
+    assert "TransRefGUID" in json.loads(response["body"])["message"]
+    # Without a case store there is no change feed
+    monkeypatch.setitem(core.TRANSACTIONS, "203", core.Transaction("203", "Pending Case Status Inquiry"))
+    assert delta()["statusCode"] == 400
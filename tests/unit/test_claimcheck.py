@@ -0,0 +1,157 @@
+import base64
+import gzip
+import json
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from acord_core import claimcheck, core
+from tests.conftest import make_event, make_request
+
+BUCKET = "acord-claim-check"
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        s3 = boto3.client("s3")
+        s3.create_bucket(Bucket=BUCKET)
+        store = claimcheck.ClaimCheckStore(BUCKET, s3=s3, compress_threshold=1024, offload_threshold=4096)
+        monkeypatch.setattr(claimcheck, "_default_store", store)
+        yield store
+
+
+def make_attachment(size):
+    return {"AttachmentData": "".join(f"{n:08x}" for n in range(size // 8))}
+
+
+def test_small_messages_pass_through(store):
+    body = json.dumps(make_request())
+    assert store.check_in(body) == body
+
+
+def test_medium_messages_are_compressed_inline(store):
+    body = json.dumps(make_request(Attachment=make_attachment(2000)))
+    checked = store.check_in(body)
+    assert claimcheck.is_reference(checked)
+    assert "Data" in json.loads(checked)["ClaimCheck"]
+    assert store.s3.list_objects_v2(Bucket=BUCKET)["KeyCount"] == 0
+    loader, fields = claimcheck.resolve(checked)
+    assert loader() == body
+
+
+def test_large_messages_are_offloaded(store):
+    body = json.dumps(make_request(Attachment=make_attachment(100_000)))
+    fields = {"TransRefGUID": "guid-1", "TransType": {"tc": "103"}, "PolNumber": "POL123"}
+    checked = store.check_in(body, fields)
+
+    reference = json.loads(checked)["ClaimCheck"]
+    assert len(checked) < 1024
+    assert reference["Key"].startswith("messages/")
+    loader, resolved_fields = claimcheck.resolve(checked)
+    assert resolved_fields == fields
+    assert loader() == body
+
+
+def test_sqs_consumer_routes_without_fetching(store, monkeypatch):
+    body = json.dumps(make_request(Attachment=make_attachment(100_000)))
+    fields = {"TransRefGUID": "guid-1", "TransType": {"tc": "103", "value": "x"}, "PolNumber": "POL123"}
+    checked = store.check_in(body, fields)
+    fetches = []
+    original_fetch = store.fetch
+    monkeypatch.setattr(store, "fetch", lambda reference: fetches.append(reference) or original_fetch(reference))
+
+    core.handle_event({"Records": [{"messageId": "1", "body": checked}]}, None, "103")
+
+    assert fetches == []
+
+
+def test_api_request_uploaded_through_presigned_slot(store):
+    upload = json.loads(claimcheck.handle_upload_event({}, None)["body"])
+    key = upload["ClaimCheck"]["Key"]
+    assert key.startswith("incoming/") and upload["UploadUrl"]
+    # Stand-in for the client's PUT to the presigned URL, gzip-compressed
+    body = json.dumps(make_request(Attachment=make_attachment(50_000)))
+    store.s3.put_object(Bucket=BUCKET, Key=key, Body=gzip.compress(body.encode()))
+
+    response = core.handle_event({"body": json.dumps({"ClaimCheck": {"Key": key}}), "headers": {}}, None, "103")
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["TXLife"]["TXLifeResponse"]["TransRefGUID"] == "guid-1"
+
+
+def test_api_reference_fields_checked_against_the_payload(store):
+    body = json.dumps(make_request(Attachment=make_attachment(100_000)))
+    fields = {"TransRefGUID": "guid-1", "TransType": {"tc": "103"}, "PolNumber": "POL123"}
+    reference = json.loads(store.check_in(body, fields))
+
+    # The payload is fetched and routed on its own fields
+    response = core.handle_event({"body": json.dumps(reference), "headers": {}}, None, "103")
+    assert response["statusCode"] == 200
+    reference["ClaimCheck"]["Fields"] = dict(fields, PolNumber="SOMEONE-ELSES")
+    response = core.handle_event({"body": json.dumps(reference), "headers": {}}, None, "103")
+    assert response["statusCode"] == 400
+    assert "PolNumber does not match" in json.loads(response["body"])["message"]
+
+
+def test_malformed_inline_data_rejected(store):
+    for data in ("not base64!", 12345, ["a"]):
+        body = json.dumps({"ClaimCheck": {"Data": data}})
+        with pytest.raises(claimcheck.InvalidReference):
+            claimcheck.resolve(body)[0]()
+        assert core.handle_event({"body": body, "headers": {}}, None, "103")["statusCode"] == 400
+
+
+def test_upload_slots_cap_the_size(store):
+    upload = store.create_upload()
+    policy = json.loads(base64.b64decode(upload["UploadFields"]["policy"]))
+    assert ["content-length-range", 1, claimcheck.MAX_UPLOAD_SIZE] in policy["conditions"]
+    assert upload["UploadFields"]["key"] == upload["ClaimCheck"]["Key"]
+
+
+def test_compressed_payloads_expand_only_to_the_body_limit(store):
+    # 1125 bodies are limited to 1 MB; this expands to 50 MB from 50 KB
+    bomb = base64.b64encode(gzip.compress(b" " * (50 * 1024 * 1024))).decode()
+    body = json.dumps({"ClaimCheck": {"Data": bomb}})
+    response = core.handle_event({"body": body, "headers": {}}, None, "1125")
+    assert response["statusCode"] == 413
+    with pytest.raises(claimcheck.PayloadTooLarge):
+        claimcheck.resolve(body, limit=1024 * 1024)[0]()
+
+
+def test_stored_payloads_checked_by_size_before_reading(store, monkeypatch):
+    upload = store.create_upload()
+    key = upload["ClaimCheck"]["Key"]
+    store.s3.put_object(Bucket=BUCKET, Key=key, Body=os.urandom(2 * 1024 * 1024))
+    get_object = store.s3.get_object
+
+    def unread(**kwargs):
+        obj = get_object(**kwargs)
+        obj["Body"].read = lambda *args: pytest.fail("read an oversized payload")
+        return obj
+    monkeypatch.setattr(store.s3, "get_object", unread)
+    response = core.handle_event({"body": json.dumps({"ClaimCheck": {"Key": key}}), "headers": {}}, None, "1125")
+    assert response["statusCode"] == 413
+
+
+def test_unknown_or_foreign_keys_rejected(store):
+    for key in ["incoming/" + "0" * 32, "../secrets", "other/" + "0" * 32]:
+        response = core.handle_event({"body": json.dumps({"ClaimCheck": {"Key": key}}), "headers": {}}, None, "103")
+        assert response["statusCode"] == 400
+
+
+def test_large_responses_offloaded(store, monkeypatch):
+    monkeypatch.setattr(claimcheck, "RESPONSE_OFFLOAD_THRESHOLD", 100)
+    event = make_event(make_request())
+
+    response = core.handle_event(event, None, "103")
+
+    assert response["statusCode"] == 303
+    key = json.loads(response["body"])["ClaimCheck"]["Key"]
+    stored = store.s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+    assert json.loads(gzip.decompress(stored))["TXLife"]["TXLifeResponse"]["TransRefGUID"] == "guid-1"
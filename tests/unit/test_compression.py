@@ -0,0 +1,197 @@
+import base64
+import gzip
+import json
+import zlib
+
+import pytest
+
+from acord_core import batch, claimcheck, compression, core
+from acord_core.errors import BadRequest, PayloadTooLarge, UnsupportedMediaType
+from acord_core.limits import Limits
+from tests.conftest import make_request
+
+
+def gzipped_event(body, accept_encoding=None, encoding="gzip"):
+    data = json.dumps(body).encode("utf-8")
+    data = gzip.compress(data) if encoding == "gzip" else zlib.compress(data)
+    headers = {"Accept": "application/json", "Content-Encoding": encoding}
+    if accept_encoding:
+        headers["Accept-Encoding"] = accept_encoding
+    return {"body": base64.b64encode(data).decode("ascii"), "isBase64Encoded": True, "headers": headers}
+
+
+def decoded_body(response):
+    assert response["isBase64Encoded"] is True
+    data = base64.b64decode(response["body"])
+    coding = response["headers"]["Content-Encoding"]
+    return json.loads(gzip.decompress(data) if coding == "gzip" else zlib.decompress(data))
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_compressed_request_body_is_decompressed(encoding):
+    response = core.handle_event(gzipped_event(make_request(Attachment="A" * 10), encoding=encoding), None, "103")
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["TXLife"]["TXLifeResponse"]["TransRefGUID"] == "guid-1"
+
+
+def test_raw_deflate_request_body():
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    data = compressor.compress(b'{"a": 1}') + compressor.flush()
+    assert compression.decompress(data, "deflate") == b'{"a": 1}'
+
+
+def test_decompression_bomb_rejected_with_413():
+    bomb = gzip.compress(b" " * (65 * 1024 * 1024))
+    assert len(bomb) < 100 * 1024
+    with pytest.raises(PayloadTooLarge):
+        compression.decompress(bomb, "gzip")
+
+    event = {"body": base64.b64encode(bomb).decode("ascii"), "isBase64Encoded": True,
+             "headers": {"Content-Encoding": "gzip"}}
+    response = core.handle_event(event, None, "103")
+    assert response["statusCode"] == 413
+    # Other transactions stop at their own, smaller limit
+    with pytest.raises(PayloadTooLarge, match=str(Limits.for_type("1125").max_body_size)):
+        compression.request_body(event, Limits.for_type("1125").max_body_size)
+
+
+def test_compressed_103_up_to_its_body_limit_accepted():
+    # Between the 1125 and the 103 body limits, and past the old 20 MiB cap
+    request = make_request(Attachment={"AttachmentData": "A" * (30 * 1024 * 1024)})
+    event = gzipped_event(request)
+    assert len(event["body"]) < 1024 * 1024
+    response = core.handle_event(event, None, "103")
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["TXLife"]["TXLifeResponse"]["TransRefGUID"] == "guid-1"
+
+
+def test_one_setting_bounds_body_decompression_and_uploads():
+    assert compression.MAX_DECOMPRESSED_SIZE == Limits.largest_body_size() == Limits.for_type("103").max_body_size
+    assert claimcheck.MAX_UPLOAD_SIZE == Limits.largest_body_size()
+
+
+def test_request_errors():
+    with pytest.raises(UnsupportedMediaType):
+        compression.request_body({"body": "", "isBase64Encoded": True, "headers": {"Content-Encoding": "br"}})
+    with pytest.raises(BadRequest):
+        compression.request_body({"body": base64.b64encode(gzip.compress(b"x" * 100))[:-8].decode(),
+                                  "isBase64Encoded": True, "headers": {"content-encoding": "gzip"}})
+    with pytest.raises(BadRequest):
+        compression.request_body({"body": "not base64!", "isBase64Encoded": True, "headers": {}})
+
+
+def test_unsupported_encoding_rejected_with_415():
+    event = gzipped_event(make_request())
+    event["headers"]["Content-Encoding"] = "br"
+    response = core.handle_event(event, None, "103")
+    assert response["statusCode"] == 415
+
+
+@pytest.mark.parametrize("accept_encoding, coding", [
+    ("gzip, deflate, br", "gzip"),
+    ("deflate", "deflate"),
+    ("gzip;q=0, deflate;q=0.5", "deflate"),
+    ("*", "gzip"),
+    ("br", None),
+    ("identity", None),
+    (None, None),
+])
+def test_negotiate(accept_encoding, coding):
+    assert compression.negotiate(accept_encoding) == coding
+
+
+def test_large_responses_compressed_for_accepting_clients():
+    response = core.handle_event(gzipped_event(make_request(), accept_encoding="gzip"), None, "203")
+    # A small status response stays uncompressed
+    assert "Content-Encoding" not in response["headers"]
+
+    response = compression.encode_response(
+        {"statusCode": 200, "headers": {"Vary": "Accept"}, "body": "x" * 4096}, "deflate", accept="application/json")
+    assert response["headers"]["Vary"] == "Accept, Accept-Encoding"
+    assert zlib.decompress(base64.b64decode(response["body"])) == b"x" * 4096
+
+
+@pytest.mark.parametrize("accept", [None, "", "text/html", "text/plain, application/json"])
+def test_responses_left_as_text_when_gateway_would_not_decode_them(accept):
+    response = compression.encode_response(
+        {"statusCode": 200, "headers": {}, "body": "x" * 4096}, "gzip", accept=accept)
+    assert response["body"] == "x" * 4096
+    assert "isBase64Encoded" not in response
+    assert "Content-Encoding" not in response["headers"]
+
+
+@pytest.mark.parametrize("accept, binary", [
+    ("application/json", True),
+    ("Application/XML; charset=utf-8", True),
+    ("text/xml, text/html", True),
+    ("text/html, application/json", False),
+    ("*/*", False),
+])
+def test_binary_accepted(accept, binary):
+    assert compression.binary_accepted(accept) is binary
+
+
+def test_batch_without_accept_answered_uncompressed():
+    documents = [make_request("103", f"guid-{n}") for n in range(50)]
+    event = gzipped_event(documents, accept_encoding="gzip")
+    del event["headers"]["Accept"]
+    response = batch.handle_batch_event(event, None)
+    assert response["statusCode"] == 207
+    assert "Content-Encoding" not in response["headers"]
+    assert len(json.loads(response["body"])["results"]) == 50
+
+
+def test_xml_response_compressed(monkeypatch):
+    monkeypatch.setattr(compression, "MIN_COMPRESSION_SIZE", 256)
+    event = gzipped_event(make_request(), accept_encoding="gzip")
+    event["headers"]["Accept"] = "application/xml"
+    response = core.handle_event(event, None, "103")
+    text = gzip.decompress(base64.b64decode(response["body"]))
+    assert b"<PolNumber>POL123</PolNumber>" in text
+    assert response["headers"]["Content-Encoding"] == "gzip"
+
+
+def test_batch_accepts_and_returns_compressed_bodies():
+    documents = [make_request("103", f"guid-{n}") for n in range(50)]
+    response = batch.handle_batch_event(gzipped_event(documents, accept_encoding="gzip"), None)
+    assert response["statusCode"] == 207
+    body = decoded_body(response)
+    assert [result["TransRefGUID"] for result in body["results"]] == [f"guid-{n}" for n in range(50)]
+
+
+def test_base64_decoded_into_reused_buffer():
+    first = compression.b64decode_view(base64.b64encode(b"x" * 1000).decode("ascii"))
+    second = compression.b64decode_view(base64.b64encode(b"yz" * 10).decode("ascii"))
+    assert second.obj is first.obj
+    assert bytes(second) == b"yz" * 10
+
+
+@pytest.mark.parametrize("encoding", [None, "gzip"])
+def test_base64_body_matches_naive_decode(encoding, monkeypatch):
+    # Small chunks so the body spans many of them
+    monkeypatch.setattr(compression, "_CHUNK", 64)
+    text = json.dumps(make_request(Attachment="A" * 5000)).replace("AAAA", "é☃")
+    data = text.encode("utf-8")
+    headers = {}
+    if encoding:
+        data = gzip.compress(data)
+        headers["Content-Encoding"] = encoding
+    event = {"body": base64.b64encode(data).decode("ascii"), "isBase64Encoded": True, "headers": headers}
+    assert compression.request_body(event) == text
+
+
+def test_base64_body_peak_memory_below_naive_decode():
+    import tracemalloc
+    body = base64.b64encode(json.dumps(make_request(Attachment="A" * 4 * 1024 * 1024)).encode("utf-8")).decode("ascii")
+    event = {"body": body, "isBase64Encoded": True, "headers": {}}
+    compression.request_body(event)
+
+    def peak(decode):
+        tracemalloc.start()
+        decode()
+        result = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result
+    naive = peak(lambda: base64.b64decode(body, validate=True).decode("utf-8"))
+    buffered = peak(lambda: compression.request_body(event))
+    assert buffered < naive * 0.6
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from acord_core import conditional, core
+from tests.conftest import make_event, make_request
+
+
+def poll(code="203", **kwargs):
+    body = kwargs.pop("body", None) or make_request(tc=code)
+    return core.handle_event(make_event(body, **kwargs), None, code)
+
+
+def test_etag_is_stable_across_polls(monkeypatch):
+    first = poll()
+    assert first["statusCode"] == 200
+    etag = first["headers"]["ETag"]
+    assert etag.startswith('W/"')
+    assert first["headers"]["Access-Control-Expose-Headers"] == "ETag"
+    # The execution time changes between polls but is not part of the ETag
+    monkeypatch.setattr(core.AcordRequest, "trans_exe_time", property(lambda self: "23:59:59"))
+    assert poll()["headers"]["ETag"] == etag
+
+
+def test_new_trans_ref_guid_per_poll_keeps_the_etag(monkeypatch):
+    etag = poll()["headers"]["ETag"]
+    response = poll(body=make_request("203", guid="guid-2"), if_none_match=etag)
+    assert response["statusCode"] == 304
+
+    # Also when the ETag is computed from the built response
+    transaction = core.TRANSACTIONS["203"]
+    monkeypatch.setattr(transaction, "process", lambda request: {
+        "TransRefGUID": request.fields["TransRefGUID"], "PolicyStatus": "Pending"})
+    for selector in (None, "TransRefGUID,PolicyStatus"):
+        etag = poll(selector=selector)["headers"]["ETag"]
+        assert poll(body=make_request("203", guid="guid-3"), selector=selector, if_none_match=etag)["statusCode"] == 304
+
+
+def test_etag_varies_with_content_format_and_projection():
+    etags = {
+        poll()["headers"]["ETag"],
+        poll(body=make_request("203", pol_number="POL999"))["headers"]["ETag"],
+        poll(accept="application/xml")["headers"]["ETag"],
+        poll(selector="TransResult")["headers"]["ETag"],
+    }
+    assert len(etags) == 4
+
+
+def test_matching_if_none_match_returns_304_without_building_response(monkeypatch):
+    etag = poll()["headers"]["ETag"]
+
+    def fail(*args):
+        raise AssertionError("response built")
+    monkeypatch.setattr(core, "build_txlife", fail)
+    monkeypatch.setattr(core.AcordRequest, "document", property(fail))
+
+    for header in (etag, etag[2:], f'"other", {etag}', "*"):
+        response = poll(if_none_match=header)
+        assert response["statusCode"] == 304
+        assert response["body"] == ""
+        assert response["headers"]["ETag"] == etag
+
+
+def test_stale_if_none_match_returns_full_response():
+    response = poll(if_none_match='W/"0123"')
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["TXLife"]["TXLifeResponse"]["TransRefGUID"] == "guid-1"
+
+
+def test_customised_process_is_hashed_from_response(monkeypatch):
+    transaction = core.TRANSACTIONS["203"]
+    status = {"value": "Pending"}
+    monkeypatch.setattr(transaction, "process", lambda request: {
+        "TransRefGUID": request.fields["TransRefGUID"],
+        "TransExeTime": request.trans_exe_time,
+        "PolicyStatus": status["value"],
+    })
+    etag = poll()["headers"]["ETag"]
+    assert poll(if_none_match=etag)["statusCode"] == 304
+    status["value"] = "Issued"
+    changed = poll(if_none_match=etag)
+    assert changed["statusCode"] == 200
+    assert changed["headers"]["ETag"] != etag
+
+
+def test_version_answers_without_processing(monkeypatch):
+    transaction = core.TRANSACTIONS["203"]
+    monkeypatch.setattr(transaction, "version", lambda request: 7)
+    etag = poll()["headers"]["ETag"]
+
+    def fail(request):
+        raise AssertionError("processed")
+    monkeypatch.setattr(transaction, "process", fail)
+    assert poll(if_none_match=etag)["statusCode"] == 304
+
+
+@pytest.mark.parametrize("code", ["103", "302"])
+def test_writes_are_not_conditional(code):
+    response = poll(code, if_none_match="*")
+    assert response["statusCode"] == 200
+    assert "ETag" not in response["headers"]
+
+
+def test_matches():
+    assert conditional.matches('W/"a", "b"', 'W/"b"')
+    assert not conditional.matches('"a"', 'W/"b"')
+    assert not conditional.matches(None, 'W/"b"')
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from acord_core import core
+from acord_core.errors import BadRequest
+from tests.conftest import make_event, make_request
+
+
+def test_json_response_does_not_parse_full_document(monkeypatch):
+    def fail(self):
+        raise AssertionError("full document parsed")
+    monkeypatch.setattr(core.AcordRequest, "document", property(fail))
+
+    response = core.handle_event(make_event(make_request()), None, "103")
+
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert body["TXLife"]["TXLifeResponse"]["TransRefGUID"] == "guid-1"
+    assert body["TXLife"]["TXLifeResponse"]["OLifE"]["Holding"]["Policy"]["PolNumber"] == "POL123"
+
+
+def test_xml_response():
+    response = core.handle_event(make_event(make_request(), accept="application/xml"), None, "203")
+    assert response["headers"]["Content-Type"] == "application/xml"
+    assert b"<PolNumber>POL123</PolNumber>" in response["body"]
+
+
+def test_missing_fields_rejected_with_400():
+    request = make_request()
+    del request["TXLife"]["TXLifeRequest"]["OLifE"]
+    response = core.handle_event(make_event(request), None, "103")
+    assert response["statusCode"] == 400
+    assert "PolNumber" in json.loads(response["body"])["message"]
+
+
+def test_malformed_body_rejected_with_400():
+    response = core.handle_event(make_event('{"TXLife": '), None, "103")
+    assert response["statusCode"] == 400
+
+
+def test_routing_key_repeated_after_the_scan_rejected():
+    # The scan stops at PolNumber and never sees the second TransRefGUID
+    body = json.dumps(make_request())[:-3] + ', "TransRefGUID": "guid-2"}}}'
+    request = core.AcordRequest(body)
+    assert request.fields["TransRefGUID"] == "guid-1"
+    with pytest.raises(BadRequest, match="duplicate routing fields"):
+        request.document
+
+
+def test_sqs_records_routed_by_trans_type(monkeypatch):
+    processed = []
+    for code, transaction in core.TRANSACTIONS.items():
+        monkeypatch.setattr(transaction, "process", lambda request, code=code: processed.append(code))
+
+    event = {"Records": [
+        {"messageId": "1", "body": json.dumps(make_request(tc="302"))},
+        {"messageId": "2", "body": "not json"},
+        {"messageId": "3", "body": json.dumps(make_request(tc="203"))},
+    ]}
+    core.handle_event(event, None, "203")
+
+    assert processed == ["302", "203"]
+
+
+def make_multi_request(tcs):
+    requests = [make_request(tc=tc, pol_number=f"POL{n}")["TXLife"]["TXLifeRequest"] for n, tc in enumerate(tcs)]
+    for n, request in enumerate(requests):
+        request["TransRefGUID"] = f"guid-{n}"
+    return {"TXLife": {"TXLifeRequest": requests}}
+
+
+def test_multiple_txlife_requests_answered_in_order():
+    body = make_multi_request(["103"] * 20)
+    del body["TXLife"]["TXLifeRequest"][3]["OLifE"]
+
+    response = core.handle_event(make_event(body), None, "103")
+
+    assert response["statusCode"] == 200
+    responses = json.loads(response["body"])["TXLife"]["TXLifeResponse"]
+    assert [r["TransRefGUID"] for r in responses] == [f"guid-{n}" for n in range(20)]
+    assert responses[0]["OLifE"]["Holding"]["Policy"]["PolNumber"] == "POL0"
+    assert responses[3]["TransResult"]["ResultCode"]["tc"] == "5"
+    assert "PolNumber" in responses[3]["TransResult"]["ResultInfo"]["ResultInfoDesc"]
+
+
+def test_multiple_txlife_requests_as_repeated_xml_elements():
+    response = core.handle_event(make_event(make_multi_request(["302", "302"]), accept="application/xml"), None, "302")
+    assert response["body"].count(b"<TXLifeResponse>") == 2
+    assert b"<item>" not in response["body"]
+
+
+def test_empty_txlife_request_list_rejected():
+    response = core.handle_event(make_event({"TXLife": {"TXLifeRequest": []}}), None, "302")
+    assert response["statusCode"] == 400
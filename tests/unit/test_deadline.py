@@ -0,0 +1,153 @@
+import json
+import time
+
+import pytest
+
+from acord_core import batch, claimcheck, core, deadline
+from acord_core.deadline import Deadline, DeadlineExceeded
+from tests.conftest import FakeClock, FakeContext, make_event, make_request
+
+
+@pytest.fixture(autouse=True)
+def no_reserve(monkeypatch):
+    monkeypatch.setattr(deadline, "RESERVE_MS", 0)
+
+
+def slow_process(monkeypatch, seconds, processed=None, fail=()):
+    def process(request, transaction):
+        guid = request.fields["TransRefGUID"]
+        if guid in fail:
+            raise RuntimeError("downstream unavailable")
+        time.sleep(seconds)
+        if processed is not None:
+            processed.append(guid)
+        return core.Transaction.process(transaction, request)
+    for transaction in core.TRANSACTIONS.values():
+        monkeypatch.setattr(transaction, "process", lambda request, t=transaction: process(request, t))
+
+
+def test_deadline_from_context():
+    clock = FakeClock(100.0)
+    context = type("Context", (), {"get_remaining_time_in_millis": lambda self: 3000})()
+    limit = Deadline.from_context(context, reserve_ms=500, clock=clock)
+    assert limit.remaining() == 2.5
+    assert limit.timeout(10) == 2.5
+    assert limit.timeout(1) == 1
+    clock.now += 3
+    assert limit.expired() and limit.remaining() == 0
+    with pytest.raises(DeadlineExceeded):
+        limit.check()
+
+    unbounded = Deadline.from_context(None)
+    assert not unbounded.expired()
+    assert unbounded.timeout() is None and unbounded.timeout(5) == 5
+
+
+def test_sqs_batch_stops_early_and_reports_the_rest(monkeypatch):
+    processed = []
+    slow_process(monkeypatch, 0.05, processed)
+    event = {"Records": [{"messageId": str(n), "body": json.dumps(make_request("302", guid=f"guid-{n}"))}
+                         for n in range(10)]}
+
+    start = time.monotonic()
+    result = core.handle_event(event, FakeContext(180), "302")
+    assert time.monotonic() - start < 0.18
+
+    failed = [failure["itemIdentifier"] for failure in result["batchItemFailures"]]
+    assert 1 <= len(processed) < 10
+    # Only the unprocessed tail is returned to the queue, in order
+    assert failed == [str(n) for n in range(len(processed), 10)]
+
+
+def test_sqs_failure_returns_it_and_later_messages(monkeypatch):
+    slow_process(monkeypatch, 0, fail=("guid-2",))
+    event = {"Records": [
+        {"messageId": "0", "body": json.dumps(make_request("302", guid="guid-0"))},
+        {"messageId": "1", "body": "not json"},
+        {"messageId": "2", "body": json.dumps(make_request("302", guid="guid-2"))},
+        {"messageId": "3", "body": json.dumps(make_request("302", guid="guid-3"))},
+    ]}
+    result = core.handle_event(event, FakeContext(10000), "302")
+    # The invalid message is dropped rather than redelivered
+    assert result == {"batchItemFailures": [{"itemIdentifier": "2"}, {"itemIdentifier": "3"}]}
+
+
+def test_sqs_record_with_unprocessed_parts_is_redelivered(monkeypatch):
+    processed = []
+    slow_process(monkeypatch, 0.1, processed)
+    # More parts than request workers, so the last ones start after the deadline
+    parts = [make_request("302", guid=f"guid-{n}")["TXLife"]["TXLifeRequest"] for n in range(core.MAX_WORKERS + 3)]
+    event = {"Records": [{"messageId": "0", "body": json.dumps({"TXLife": {"TXLifeRequest": parts}})}]}
+    result = core.handle_event(event, FakeContext(50), "302")
+    assert 1 <= len(processed) < len(parts)
+    assert result == {"batchItemFailures": [{"itemIdentifier": "0"}]}
+
+
+def test_sqs_record_with_a_failing_part_is_redelivered(monkeypatch):
+    slow_process(monkeypatch, 0, fail=("guid-1",))
+    parts = [make_request("302", guid=f"guid-{n}")["TXLife"]["TXLifeRequest"] for n in range(3)]
+    invalid = {"TXLife": {"TXLifeRequest": [parts[0], {"TransType": {"tc": "302"}}]}}
+    event = {"Records": [{"messageId": "0", "body": json.dumps({"TXLife": {"TXLifeRequest": parts}})},
+                         {"messageId": "1", "body": json.dumps(invalid)}]}
+    result = core.handle_event(event, FakeContext(10000), "302")
+    assert result == {"batchItemFailures": [{"itemIdentifier": "0"}, {"itemIdentifier": "1"}]}
+    # An invalid part is answered, not retried
+    event["Records"].pop(0)
+    assert core.handle_event(event, FakeContext(10000), "302") == {"batchItemFailures": []}
+
+
+def test_sqs_batch_without_deadline_processes_everything():
+    event = {"Records": [{"messageId": "0", "body": json.dumps(make_request("302"))}]}
+    assert core.handle_event(event, None, "302") == {"batchItemFailures": []}
+
+
+def test_batch_reports_unfinished_elements(monkeypatch):
+    slow_process(monkeypatch, 0.1)
+    documents = [make_request("302", guid=f"guid-{n}") for n in range(40)]
+    event = make_event(documents)
+
+    start = time.monotonic()
+    response = batch.handle_batch_event(event, FakeContext(150))
+    assert time.monotonic() - start < 0.3
+
+    assert response["statusCode"] == 207
+    results = json.loads(response["body"])["results"]
+    statuses = [result["status"] for result in results]
+    assert statuses.count(200) >= 1
+    # Those running at the deadline may have taken effect; those queued did not
+    assert 504 in statuses
+    assert statuses[-1] == 503
+    assert set(statuses) == {200, 503, 504}
+    assert statuses.index(504) < statuses.index(503)
+    assert "outcome unknown" in results[statuses.index(504)]["body"]["message"]
+
+
+def test_multi_request_parts_after_deadline_fail():
+    body = {"TXLife": {"TXLifeRequest": [make_request("302", guid=f"guid-{n}")["TXLife"]["TXLifeRequest"]
+                                         for n in range(3)]}}
+    request = core.AcordRequest(json.dumps(body))
+    responses = core.respond(request, deadline=Deadline.after(-1))["TXLife"]["TXLifeResponse"]
+    assert [r["TransResult"]["ResultCode"]["tc"] for r in responses] == ["5", "5", "5"]
+    assert "deadline" in responses[0]["TransResult"]["ResultInfo"]["ResultInfoDesc"]
+
+
+def test_api_request_out_of_time_answers_503(monkeypatch):
+    monkeypatch.setattr(claimcheck, "_default_store", claimcheck.ClaimCheckStore("bucket", s3=object()))
+    body = json.dumps({"ClaimCheck": {"Key": "incoming/" + "0" * 32}})
+    response = core.handle_event(make_event(body), FakeContext(0), "103")
+    assert response["statusCode"] == 503
+
+
+def test_s3_timeouts_capped_to_deadline(monkeypatch):
+    store = claimcheck.ClaimCheckStore("bucket", timeout=10)
+    built = []
+    monkeypatch.setattr(store, "_client", lambda timeout, max_attempts=None: built.append((timeout, max_attempts))
+                        or object())
+
+    clock = FakeClock(100.0)
+    assert store.client(Deadline(clock() + 30, clock)) is store.client()
+    capped = store.client(Deadline(clock() + 3.5, clock))
+    assert store.client(Deadline(clock() + 3.9, clock)) is capped
+    assert built == [(10, None), (3, 1)]
+    with pytest.raises(DeadlineExceeded):
+        store.client(Deadline(clock() - 1, clock))
@@ -0,0 +1,208 @@
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from acord_core import aio, core, downstream, httpclient
+from acord_core.deadline import Deadline
+from acord_core.downstream import Endpoint, PolicyAdminClient, PolicyAdminError
+from acord_core.httpclient import AsyncHTTPClient, HTTPTimeout
+from tests.conftest import close, make_event, make_request, serve
+
+
+class PolicyAdminStub(BaseHTTPRequestHandler):
+    """Local stand-in for the policy administration service."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def answer(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        with self.server.lock:
+            self.server.calls.append((self.command, self.path, body))
+            failing = self.server.failures > 0
+            self.server.failures -= failing
+        if self.path.startswith("/slow"):
+            time.sleep(0.2)
+        status = 503 if failing else 200
+        payload = json.dumps({
+            "OLifE": {"Holding": {"Policy": {"PolicyStatus": {"tc": "12"}}}},
+            "TransResult": {"ResultCode": {"tc": "5"}},
+        }).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_PUT = do_POST = answer
+
+
+@pytest.fixture
+def server():
+    yield from serve(PolicyAdminStub, connections=0, failures=0, calls=[])
+
+
+@pytest.fixture
+def http(monkeypatch):
+    client = AsyncHTTPClient(pool_size=4, timeout=2)
+    monkeypatch.setattr(httpclient, "_default_client", client)
+    yield client
+    aio.run(close(client))
+
+
+@pytest.fixture
+def policy_admin(server, http, monkeypatch):
+    monkeypatch.setattr(downstream, "URL", server.url)
+    monkeypatch.setattr(downstream, "_default_client", None)
+    monkeypatch.delenv("ACORD_203_SOURCES", raising=False)
+    return downstream.default_client()
+
+
+def test_every_transaction_shares_connections_across_warm_invocations(server, policy_admin, monkeypatch):
+    names = {code: transaction.name for code, transaction in core.TRANSACTIONS.items()}
+    for code in ("103", "1125", "302"):
+        monkeypatch.setitem(core.TRANSACTIONS, code, core.make_transaction(code, names[code]))
+    monkeypatch.setitem(core.TRANSACTIONS, "203", core.status_inquiry())
+
+    for n in range(3):
+        for code in ("103", "1125", "203", "302"):
+            event = make_event(make_request(code, f"guid-{n}", "POL 123"))
+            response = core.handle_event(event, None, code)
+            assert response["statusCode"] == 200
+            answer = json.loads(response["body"])["TXLife"]["TXLifeResponse"]
+            assert answer["OLifE"]["Holding"]["Policy"] == {"PolNumber": "POL 123", "PolicyStatus": {"tc": "12"}}
+            assert answer["TransResult"]["ResultCode"]["tc"] == "1"
+
+    assert [(method, path) for method, path, _ in server.calls[:5]] == [
+        ("POST", "/policies/lookup"),
+        ("POST", "/cases"),
+        ("PUT", "/policies/POL%20123"),
+        ("GET", "/cases/POL%20123/status"),
+        ("PUT", "/cases/POL%20123/status"),
+    ]
+    assert server.calls[0][2] == {"keys": ["POL 123"]}
+    assert server.calls[1][2] == make_request("103", "guid-0", "POL 123")
+    # One connection, opened by the first invocation, serves all fifteen calls
+    assert server.connections == 1
+    metrics = policy_admin.metrics()
+    assert (metrics["requests"], metrics["opened"], metrics["reused"]) == (15, 1, 14)
+    assert metrics["reuse_ratio"] == pytest.approx(14 / 15)
+
+
+def test_submission_streams_spooled_attachments(server, policy_admin, monkeypatch):
+    monkeypatch.setitem(core.TRANSACTIONS, "103", core.make_transaction("103", "New Business Submission"))
+    data = os.urandom(100 * 1024)
+    document = make_request("103", pol_number="POL 123")
+    document["TXLife"]["TXLifeRequest"]["OLifE"]["Attachment"] = {
+        "id": "Attachment_1", "AttachmentData": base64.b64encode(data).decode()}
+    response = core.handle_event(make_event(document), None, "103")
+    assert response["statusCode"] == 200
+
+    method, path, submitted = server.calls[-1]
+    assert (method, path) == ("POST", "/cases")
+    attachment = submitted["TXLife"]["TXLifeRequest"]["OLifE"]["Attachment"]
+    assert base64.b64decode(attachment["AttachmentData"]) == data
+    assert submitted == document
+
+
+def test_without_service_transactions_keep_the_template(monkeypatch):
+    monkeypatch.setattr(downstream, "URL", None)
+    monkeypatch.setattr(downstream, "_default_client", None)
+    transaction = core.make_transaction("1125", "Policy Change")
+    assert not isinstance(transaction, core.PolicyAdminTransaction)
+    assert core.response_template(transaction, "json") is not None
+
+
+def test_per_endpoint_timeouts(server, http):
+    client = PolicyAdminClient(server.url, {
+        "quick": Endpoint("quick", "GET", "/slow/{PolNumber}", 0.05),
+        "patient": Endpoint("patient", "GET", "/slow/{PolNumber}", 1),
+    })
+    started = time.monotonic()
+    with pytest.raises(HTTPTimeout):
+        aio.run(client.call("quick", {"PolNumber": "POL1"}))
+    assert time.monotonic() - started < 0.15
+    assert aio.run(client.call("patient", {"PolNumber": "POL1"}))["OLifE"]
+
+
+def test_endpoint_overrides_from_environment(monkeypatch):
+    monkeypatch.setenv("ACORD_POLICY_ADMIN_STATUS_TIMEOUT", "0.5")
+    monkeypatch.setenv("ACORD_POLICY_ADMIN_STATUS_RETRIES", "4")
+    endpoint = Endpoint.configured("status", "GET", "/cases/{PolNumber}/status", 2, retries=2)
+    assert (endpoint.timeout, endpoint.retries) == (0.5, 4)
+
+
+def test_transient_failures_retried(server, http, monkeypatch):
+    monkeypatch.setattr(httpclient, "RETRY_BASE", 0.01)
+    client = PolicyAdminClient(server.url, {"status": Endpoint("status", "GET", "/status", 1, retries=2)})
+    server.failures = 2
+    assert aio.run(client.call("status", {}))["OLifE"]
+    assert len(server.calls) == 3
+    assert http.metrics()["retries"] == 2
+
+
+def test_retries_are_bounded(server, http, monkeypatch):
+    monkeypatch.setattr(httpclient, "RETRY_BASE", 0.01)
+    client = PolicyAdminClient(server.url, {
+        "status": Endpoint("status", "GET", "/status", 1, retries=2),
+        "submit": Endpoint("submit", "POST", "/cases", 1),
+    })
+    server.failures = 10
+    with pytest.raises(PolicyAdminError, match="status answered 503"):
+        aio.run(client.call("status", {}))
+    assert len(server.calls) == 3
+    # Submissions are never repeated
+    with pytest.raises(PolicyAdminError):
+        aio.run(client.call("submit", {}, body="{}"))
+    assert len(server.calls) == 4
+
+
+def test_no_retry_past_the_deadline(server, http, monkeypatch):
+    monkeypatch.setattr(httpclient, "backoff", lambda attempt: 5)
+    client = PolicyAdminClient(server.url, {"status": Endpoint("status", "GET", "/status", 1, retries=3)})
+    server.failures = 10
+    started = time.monotonic()
+    with pytest.raises(PolicyAdminError):
+        aio.run(client.call("status", {}, deadline=Deadline.after(1)))
+    assert time.monotonic() - started < 0.5
+    assert len(server.calls) == 1
+
+
+def test_backoff_has_full_jitter():
+    random.seed(7)
+    for attempt in range(1, 8):
+        ceiling = min(1.0, 0.05 * 2 ** (attempt - 1))
+        delays = [httpclient.backoff(attempt, 0.05, 1.0) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        # Spread over the whole range rather than clustered at the ceiling
+        assert min(delays) < ceiling * 0.2 and max(delays) > ceiling * 0.8
+
+
+def test_pool_wait_time(server):
+    client = AsyncHTTPClient(pool_size=1)
+
+    async def calls():
+        await asyncio.gather(*(client.get(f"{server.url}/slow") for _ in range(2)))
+        client.close()
+
+    aio.run(calls())
+    metrics = client.metrics()
+    assert metrics["requests"] == 2
+    # The second call waited for the first to return the only connection
+    assert metrics["max_wait"] >= 0.15
+    assert metrics["mean_wait"] == pytest.approx(metrics["max_wait"] / 2, abs=0.01)
+    assert metrics["reuse_ratio"] == 0.5
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from acord_core.extract import PathExtractor, extract_routing_fields
+
+
+def make_body(pol_number="POL123", filler=0):
+    return json.dumps({
+        "TXLife": {
+            "UserAuthRequest": {"UserLoginName": "agent", "VendorApp": {"AppName": "x"}},
+            "TXLifeRequest": {
+                "TransRefGUID": "guid-1",
+                "TransType": {"tc": "103", "value": "New Business Submission"},
+                "OLifE": {
+                    "Party": [{"id": f"Party_{n}", "Notes": "a\"}]{[" * 3} for n in range(filler)],
+                    "Holding": {"Policy": {"PolNumber": pol_number}},
+                },
+            },
+        }
+    })
+
+
+def test_extracts_routing_fields():
+    fields = extract_routing_fields(make_body(filler=50))
+    assert fields == {
+        "TransRefGUID": "guid-1",
+        "TransType": {"tc": "103", "value": "New Business Submission"},
+        "PolNumber": "POL123",
+    }
+
+
+def test_matches_full_parse():
+    body = make_body(pol_number="Pé\\\"9", filler=5)
+    parsed = json.loads(body)["TXLife"]["TXLifeRequest"]
+    fields = extract_routing_fields(body)
+    assert fields["PolNumber"] == parsed["OLifE"]["Holding"]["Policy"]["PolNumber"]
+
+
+def test_missing_paths_are_omitted():
+    body = json.dumps({"TXLife": {"TXLifeRequest": {"TransRefGUID": "g"}}})
+    assert extract_routing_fields(body) == {"TransRefGUID": "g"}
+
+
+def test_stops_once_all_paths_found():
+    # Everything after the last wanted value is never scanned
+    body = make_body()[:-2] + ', "Trailer": [1, 2,'
+    assert extract_routing_fields(body)["PolNumber"] == "POL123"
+
+
+def test_accepts_bytes_and_escaped_keys():
+    extractor = PathExtractor({"a": ("kéy", "a")})
+    assert extractor.extract(b'{"k\\u00e9y": {"a": 1}}') == {"a": 1}
+
+
+@pytest.mark.parametrize("body", ['{"TXLife": ', '{"TXLife" {}}', '{"TXLife": {"TXLifeRequest": {"TransRefGUID": x}}}', '[1] 2'])
+def test_malformed_json_raises_value_error(body):
+    with pytest.raises(ValueError):
+        extract_routing_fields(body)
+
+
+@pytest.mark.parametrize("old, new", [
+    ('"TransRefGUID": "guid-1",', '"TransRefGUID": "guid-0", "TransRefGUID": "guid-1",'),
+    ('"TXLifeRequest": {', '"TXLifeRequest": {"TransRefGUID": "guid-0"}, "TXLifeRequest": {'),
+])
+def test_repeated_routing_keys_rejected(old, new):
+    # json.loads keeps the last value; the scan would take the first
+    body = make_body().replace(old, new, 1)
+    assert body != make_body()
+    with pytest.raises(ValueError, match="Duplicate key"):
+        extract_routing_fields(body)
+
+
+def test_repeated_keys_off_the_paths_allowed():
+    body = make_body().replace('"TransRefGUID": "guid-1",', '"Note": 1, "Note": 2, "TransRefGUID": "guid-1",')
+    assert extract_routing_fields(body)["TransRefGUID"] == "guid-1"
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from acord_core import aio, core, fanout, httpclient
+from acord_core.deadline import Deadline
+from acord_core.fanout import FanOut, HTTPSource, Source, SourceError
+from tests.conftest import FakeContext, make_event, make_request, serve
+
+
+def answering(delay, fragment=None, error=None):
+    async def fetch(request):
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return fragment or {}
+    return fetch
+
+
+def use_sources(monkeypatch, *sources, quorum=None, grace=0.1):
+    transaction = core.StatusInquiry("203", "Pending Case Status Inquiry", FanOut(sources, quorum, grace),
+                                     conditional=True)
+    monkeypatch.setitem(core.TRANSACTIONS, "203", transaction)
+    return transaction
+
+
+def inquire(context=None):
+    response = core.handle_event(make_event(make_request("203")), context, "203")
+    assert response["statusCode"] == 200
+    return json.loads(response["body"])["TXLife"]["TXLifeResponse"]
+
+
+def source_codes(response):
+    return {info["ResultInfoSysMessageCode"]: info["ResultInfoCode"]["tc"]
+            for info in response["TransResult"]["ResultInfo"]}
+
+
+def test_sources_queried_concurrently_and_merged(monkeypatch):
+    use_sources(
+        monkeypatch,
+        Source("workbench", answering(0.1, {"OLifE": {"Holding": {"Policy": {"PolicyStatus": {"tc": "12"}}}}})),
+        Source("underwriting", answering(0.1, {"OLifE": {"Holding": {"Policy": {"UnderwritingClass": "1"}},
+                                                         "Party": [{"id": "Party_1"}]}})),
+        Source("requirements", answering(0.1, {"OLifE": {"Party": [{"id": "Party_2"}]},
+                                               "TransResult": {"ResultCode": {"tc": "5"}}})),
+    )
+    started = time.monotonic()
+    response = inquire()
+    assert time.monotonic() - started < 0.25
+
+    policy = response["OLifE"]["Holding"]["Policy"]
+    assert policy == {"PolNumber": "POL123", "PolicyStatus": {"tc": "12"}, "UnderwritingClass": "1"}
+    assert response["OLifE"]["Party"] == [{"id": "Party_1"}, {"id": "Party_2"}]
+    assert response["TransResult"]["ResultCode"]["tc"] == "1"
+    assert source_codes(response) == {"workbench": "1", "underwriting": "1", "requirements": "1"}
+
+
+def test_slow_and_failing_sources_give_partial_response(monkeypatch):
+    use_sources(
+        monkeypatch,
+        Source("workbench", answering(0.01, {"OLifE": {"Holding": {"Policy": {"PolicyStatus": {"tc": "12"}}}}})),
+        Source("underwriting", answering(5), timeout=0.1),
+        Source("requirements", answering(0.01, error=SourceError("vendor answered 502"))),
+    )
+    started = time.monotonic()
+    response = inquire()
+    assert time.monotonic() - started < 0.3
+
+    assert response["TransResult"]["ResultCode"]["tc"] == "2"
+    assert source_codes(response) == {"workbench": "1", "underwriting": "5", "requirements": "5"}
+    descriptions = [info["ResultInfoDesc"] for info in response["TransResult"]["ResultInfo"]]
+    assert descriptions == ["workbench: answered", "underwriting: timed out: No answer within 0.1s",
+                            "requirements: failed: vendor answered 502"]
+    assert response["OLifE"]["Holding"]["Policy"]["PolicyStatus"] == {"tc": "12"}
+
+
+def test_no_answers_is_a_failure(monkeypatch):
+    use_sources(monkeypatch, Source("workbench", answering(5), timeout=0.05))
+    response = inquire()
+    assert response["TransResult"]["ResultCode"]["tc"] == "5"
+    assert response["OLifE"]["Holding"]["Policy"] == {"PolNumber": "POL123"}
+
+
+def test_sources_bounded_by_the_deadline(monkeypatch):
+    use_sources(monkeypatch, Source("workbench", answering(0.01)), Source("underwriting", answering(5), timeout=5))
+    started = time.monotonic()
+    # 500ms are reserved from the remaining time, leaving about 300ms
+    response = inquire(FakeContext(800))
+    assert time.monotonic() - started < 0.5
+    assert source_codes(response) == {"workbench": "1", "underwriting": "5"}
+
+
+def test_quorum_stops_waiting_for_the_slowest(monkeypatch):
+    use_sources(
+        monkeypatch,
+        Source("workbench", answering(0.01)),
+        Source("underwriting", answering(0.02)),
+        Source("requirements", answering(2)),
+        quorum=2, grace=0.05,
+    )
+    started = time.monotonic()
+    response = inquire()
+    assert time.monotonic() - started < 0.2
+    assert response["TransResult"]["ResultCode"]["tc"] == "2"
+    assert source_codes(response) == {"workbench": "1", "underwriting": "1", "requirements": "5"}
+
+
+def test_quorum_grace_lets_late_sources_answer(monkeypatch):
+    use_sources(
+        monkeypatch,
+        Source("workbench", answering(0.01)),
+        Source("underwriting", answering(0.05)),
+        quorum=1, grace=0.2,
+    )
+    assert inquire()["TransResult"]["ResultCode"]["tc"] == "1"
+
+
+def test_hedged_request_after_p95():
+    delays = iter([0.01] * fanout.MIN_SAMPLES + [1.0, 0.01])
+    calls = []
+
+    async def fetch(request):
+        calls.append(request)
+        await asyncio.sleep(next(delays))
+        return {"attempt": len(calls)}
+
+    source = Source("underwriting", fetch)
+
+    async def run(request):
+        return await source.call(request)
+
+    for n in range(fanout.MIN_SAMPLES):
+        aio.run(run(n))
+    assert source.hedged == 0
+    assert source.latency.p95() < 0.05
+
+    started = time.monotonic()
+    # The first attempt stalls; the hedge sent after the p95 answers first
+    assert aio.run(run("slow")) == {"attempt": fanout.MIN_SAMPLES + 2}
+    assert time.monotonic() - started < 0.2
+    assert (source.hedged, source.hedge_wins) == (1, 1)
+
+
+def test_no_hedge_before_enough_samples_or_when_disabled():
+    calls = []
+
+    async def fetch(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return {}
+
+    source = Source("underwriting", fetch, hedge=False)
+    for _ in range(fanout.MIN_SAMPLES):
+        source.latency.record(0.001)
+    aio.run(source.call("request"))
+    assert calls == ["request"]
+    assert source.hedged == 0
+
+
+def test_hedge_failure_falls_back_to_first_attempt():
+    attempts = iter([(0.1, None), (0.0, SourceError("down"))])
+
+    async def fetch(request):
+        delay, error = next(attempts)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return {"first": True}
+
+    source = Source("underwriting", fetch)
+    for _ in range(fanout.MIN_SAMPLES):
+        source.latency.record(0.01)
+    assert aio.run(source.call("request")) == {"first": True}
+    assert (source.hedged, source.hedge_wins) == (1, 0)
+
+
+def test_hedges_limited_to_budget(monkeypatch):
+    monkeypatch.setattr(fanout, "HEDGE_BUDGET", 0.1)
+
+    async def fetch(request):
+        await asyncio.sleep(0.02)
+        return {}
+
+    source = Source("underwriting", fetch)
+    # Every request outlasts the p95
+    monkeypatch.setattr(fanout.LatencyTracker, "p95", lambda self: 0.001)
+    for n in range(20):
+        aio.run(source.call(n))
+    # The free hedge, then one per ten requests
+    assert source.hedged == 2
+
+
+def test_timed_out_and_cancelled_attempts_recorded():
+    async def fetch(request):
+        await asyncio.sleep(request)
+        return {}
+
+    source = Source("underwriting", fetch, hedge=False)
+
+    async def timed_out():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(source.call(1.0), 0.05)
+
+    aio.run(timed_out())
+    assert len(source.latency.samples) == 1
+    assert 0.04 <= source.latency.samples[0] < 0.5
+
+    # With every other request timing out the p95 is a timed-out one
+    for _ in range(fanout.MIN_SAMPLES // 2):
+        aio.run(source.call(0.0))
+        aio.run(timed_out())
+    assert source.latency.p95() >= 0.04
+
+
+def test_losing_hedge_not_recorded():
+    delays = iter([0.1, 0.0])
+
+    async def fetch(request):
+        await asyncio.sleep(next(delays))
+        return {}
+
+    source = Source("underwriting", fetch)
+    for _ in range(fanout.MIN_SAMPLES):
+        source.latency.record(0.01)
+    aio.run(source.call("request"))
+    # The hedge's answer, and the first attempt cut short by it
+    assert len(source.latency.samples) == fanout.MIN_SAMPLES + 2
+    assert source.latency.samples[-1] >= 0.01
+
+
+def test_expired_deadline_queries_nothing():
+    calls = []
+
+    async def fetch(request):
+        calls.append(request)
+        return {}
+
+    outcomes = aio.run(FanOut([Source("workbench", fetch)]).query("request", Deadline.after(0)))
+    assert outcomes == {"workbench": (fanout.TIMED_OUT, "Not queried before the deadline")}
+    assert calls == []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        fields = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path == "/down":
+            status, body = 502, b"{}"
+        else:
+            status = 200
+            body = json.dumps({"OLifE": {"Holding": {"Policy": {"PolicyStatus": {"tc": "12"},
+                                                                 "CarrierCode": fields["PolNumber"]}}}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    yield from serve(StubHandler)
+
+
+def test_http_sources_from_environment(server, monkeypatch):
+    monkeypatch.setattr(httpclient, "_default_client", httpclient.AsyncHTTPClient())
+    monkeypatch.setenv("ACORD_203_SOURCES", json.dumps([
+        {"name": "workbench", "url": f"{server.url}/status", "timeout": 1},
+        {"name": "vendor", "url": f"{server.url}/down", "hedge": False},
+    ]))
+    sources = fanout.sources_from_environment()
+    assert all(isinstance(source, HTTPSource) for source in sources)
+    assert (sources[0].timeout, sources[1].hedge) == (1.0, False)
+
+    transaction = core.status_inquiry()
+    assert isinstance(transaction, core.StatusInquiry)
+    monkeypatch.setitem(core.TRANSACTIONS, "203", transaction)
+    response = inquire()
+    assert response["OLifE"]["Holding"]["Policy"]["CarrierCode"] == "POL123"
+    assert source_codes(response) == {"workbench": "1", "vendor": "5"}
+    assert response["TransResult"]["ResultInfo"][1]["ResultInfoDesc"] == "vendor: failed: vendor answered 502"
+
+
+def test_without_sources_203_keeps_the_template(monkeypatch):
+    monkeypatch.delenv("ACORD_203_SOURCES", raising=False)
+    transaction = core.status_inquiry()
+    assert not isinstance(transaction, core.StatusInquiry)
+    assert core.response_template(transaction, "json") is not None
@@ -0,0 +1,99 @@
+import json
+
+from acord_core.core import AcordRequest
+from acord_core.graph import BENEFICIARY, INSURED, OWNER, ObjectGraph
+
+
+def relation(originating, related, role):
+    return {"id": f"Relation_{originating}_{related}_{role}", "OriginatingObjectID": originating,
+            "RelatedObjectID": related, "RelationRoleCode": {"tc": role}}
+
+
+def make_olife():
+    return {
+        "Holding": [
+            {"id": "Holding_1", "Policy": {"PolNumber": "POL1"}},
+            {"id": "Holding_2", "Policy": {"PolNumber": "POL2"}},
+        ],
+        "Party": [
+            {"id": "Party_1", "FullName": "Ann Insured"},
+            {"id": "Party_2", "FullName": "Bob Owner"},
+            {"id": "Party_3", "FullName": "Cy Beneficiary"},
+        ],
+        "Relation": [
+            relation("Holding_1", "Party_1", INSURED),
+            relation("Holding_1", "Party_2", OWNER),
+            relation("Holding_1", "Party_3", BENEFICIARY),
+            relation("Holding_2", "Party_2", INSURED),
+            relation("Holding_2", "Party_2", OWNER),
+            # A producer relation between parties, and one to a missing object
+            relation("Party_2", "Party_1", "37"),
+            relation("Holding_2", "Party_9", BENEFICIARY),
+        ],
+    }
+
+
+def names(aggregates):
+    return [aggregate.get("FullName") or aggregate["id"] for aggregate in aggregates]
+
+
+def test_lookups_by_id_and_pol_number():
+    graph = ObjectGraph.from_olife(make_olife())
+    assert len(graph) == 5
+    assert graph.get("Party_3")["FullName"] == "Cy Beneficiary"
+    assert graph.kinds["Holding_2"] == "Holding"
+    assert graph.holding("POL2")["id"] == "Holding_2"
+    assert graph.holding("POL9") is None
+    assert graph.get("Party_9") is None
+
+
+def test_traversals_by_role():
+    graph = ObjectGraph.from_olife(make_olife())
+    assert names(graph.policy_parties("POL1", INSURED)) == ["Ann Insured"]
+    assert names(graph.parties("Holding_1", OWNER)) == ["Bob Owner"]
+    assert names(graph.parties("Holding_1")) == ["Ann Insured", "Bob Owner", "Cy Beneficiary"]
+    assert names(graph.holdings("Party_2", OWNER)) == ["Holding_1", "Holding_2"]
+    assert names(graph.holdings("Party_2")) == ["Holding_1", "Holding_2", "Holding_2"]
+    # Relations to objects not in the document are kept but not returned
+    assert graph.parties("Holding_2", BENEFICIARY) == []
+    assert len(graph.relations) == 7
+    assert graph.policy_parties("POL9", INSURED) == []
+
+
+def test_relations_between_parties_and_role_forms():
+    olife = make_olife()
+    olife["Relation"].append({"OriginatingObjectID": "Party_2", "RelatedObjectID": "Party_3", "RelationRoleCode": 37})
+    graph = ObjectGraph.from_olife(olife)
+    assert names(graph.related("Party_2", "37")) == ["Ann Insured", "Cy Beneficiary"]
+    assert names(graph.related("Party_2", 37, kind="Party")) == ["Ann Insured", "Cy Beneficiary"]
+    assert names(graph.originating("Party_1", INSURED)) == ["Holding_1"]
+    assert graph.holdings("Party_1", "37") == []
+
+
+def test_single_aggregates_and_malformed_entries_tolerated():
+    graph = ObjectGraph.from_olife({
+        "Holding": {"id": "Holding_1", "Policy": {"PolNumber": "POL1"}},
+        "Party": [{"id": "Party_1"}, {"FullName": "No id"}, "text"],
+        "Relation": {"OriginatingObjectID": "Holding_1", "RelatedObjectID": "Party_1",
+                     "RelationRoleCode": {"tc": "32", "value": "Insured"}},
+    })
+    assert len(graph) == 2
+    assert names(graph.policy_parties("POL1", INSURED)) == ["Party_1"]
+    assert len(ObjectGraph.from_olife({})) == 0
+
+
+def test_request_graph_built_once_from_the_document():
+    body = json.dumps({"TXLife": {"TXLifeRequest": {"TransRefGUID": "guid-1", "TransType": {"tc": "103"},
+                                                    "OLifE": make_olife()}}})
+    request = AcordRequest(body)
+    graph = request.graph
+    assert request.graph is graph
+    assert names(graph.policy_parties("POL1", INSURED)) == ["Ann Insured"]
+    # The graph indexes the document's own aggregates
+    assert graph.get("Party_1") is request.olife["Party"][0]
+
+
+def test_request_without_olife_has_empty_graph():
+    request = AcordRequest(json.dumps({"TXLife": {"TXLifeRequest": [{"TransRefGUID": "a"}]}}))
+    assert request.olife is None
+    assert len(request.graph) == 0
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from acord_core import aio, core, httpclient
+from acord_core.httpclient import AsyncHTTPClient, HTTPTimeout
+from tests.conftest import close, serve
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a downstream service; keeps connections alive."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, body, status=200, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if not any(name == "Transfer-Encoding" for name, _ in headers):
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/delay/"):
+            time.sleep(int(self.path.rsplit("/", 1)[1]) / 1000)
+            self.reply(json.dumps({"path": self.path}).encode())
+        elif self.path == "/chunked":
+            self.reply(b"5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n", headers=[("Transfer-Encoding", "chunked")])
+        elif self.path == "/close":
+            self.reply(b"bye", headers=[("Connection", "close")])
+            self.close_connection = True
+        elif self.path == "/drop":
+            # Closes after answering without saying so, like an idle timeout
+            self.reply(b"dropped")
+            self.close_connection = True
+        else:
+            self.reply(b"ok")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.reply(json.dumps({"received": json.loads(body), "type": self.headers["Content-Type"]}).encode(),
+                   status=201)
+
+
+@pytest.fixture
+def server():
+    yield from serve(StubHandler, connections=0)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = AsyncHTTPClient(pool_size=4, timeout=2)
+    monkeypatch.setattr(httpclient, "_default_client", client)
+    yield client
+    aio.run(close(client))
+
+
+def test_keep_alive_connection_reused(server, client):
+    async def calls():
+        return [await client.get(f"{server.url}/delay/0") for _ in range(5)]
+    responses = aio.run(calls())
+    assert [response.status for response in responses] == [200] * 5
+    assert responses[0].json() == {"path": "/delay/0"}
+    assert server.connections == 1
+    assert client.idle_connections() == 1
+
+
+def test_bodies(server, client):
+    async def calls():
+        return (await client.get(f"{server.url}/chunked"),
+                await client.post(f"{server.url}/echo", {"PolNumber": "POL1"}),
+                await client.request("HEAD", f"{server.url}/"))
+    chunked, posted, head = aio.run(calls())
+    assert chunked.body == b"hello world"
+    assert posted.status == 201
+    assert posted.json() == {"received": {"PolNumber": "POL1"}, "type": "application/json"}
+    assert head.body == b""
+    assert server.connections == 1
+
+
+def test_connection_close_not_pooled(server, client):
+    async def calls():
+        await client.get(f"{server.url}/close")
+        return await client.get(f"{server.url}/")
+    assert aio.run(calls()).body == b"ok"
+    assert server.connections == 2
+
+
+def test_stale_connection_retried_for_idempotent_requests(server, client):
+    async def calls():
+        await client.get(f"{server.url}/drop")
+        await asyncio.sleep(0.05)
+        return await client.get(f"{server.url}/")
+    assert aio.run(calls()).body == b"ok"
+    assert server.connections == 2
+
+
+def test_expired_idle_connections_discarded(server):
+    client = AsyncHTTPClient(keepalive_timeout=0)
+
+    async def calls():
+        await client.get(f"{server.url}/")
+        await client.get(f"{server.url}/")
+        client.close()
+    aio.run(calls())
+    assert server.connections == 2
+
+
+def test_timeout(server, client):
+    with pytest.raises(HTTPTimeout):
+        aio.run(client.get(f"{server.url}/delay/500", timeout=0.05))
+    # The timed-out connection is discarded, not returned to the pool
+    assert client.idle_connections() == 0
+
+
+def test_concurrent_calls_bounded_by_pool(server, client):
+    async def calls():
+        return await asyncio.gather(*(client.get(f"{server.url}/delay/100") for _ in range(8)))
+    started = time.monotonic()
+    aio.run(calls())
+    # Eight calls over four connections take two rounds
+    assert 0.2 <= time.monotonic() - started < 0.35
+    assert server.connections == 4
+
+
+def test_warm_invocations_share_connections(server, client, monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    transaction = core.TRANSACTIONS["103"]
+
+    with mock_aws():
+        s3 = boto3.client("s3")
+        s3.create_bucket(Bucket="underwriting")
+
+        def slow_put(**kwargs):
+            time.sleep(0.1)
+            return s3.put_object(**kwargs)
+
+        async def process(request):
+            # Underwriting, a requirements vendor and an S3 archive in parallel
+            http = httpclient.default_client()
+            await asyncio.gather(
+                http.get(f"{server.url}/delay/100"),
+                http.get(f"{server.url}/delay/100"),
+                aio.run_blocking(slow_put, Bucket="underwriting", Key=request.fields["TransRefGUID"], Body=b"x"),
+            )
+            return core.Transaction.process(transaction, request)
+        monkeypatch.setattr(transaction, "process", process)
+
+        for n in range(3):
+            body = json.dumps({"TXLife": {"TXLifeRequest": {
+                "TransRefGUID": f"guid-{n}", "TransType": {"tc": "103"},
+                "OLifE": {"Holding": {"Policy": {"PolNumber": "POL1"}}}}}})
+            started = time.monotonic()
+            response = core.handle_event({"body": body, "headers": {}}, None, "103")
+            assert time.monotonic() - started < 0.2
+            assert response["statusCode"] == 200
+        assert s3.list_objects_v2(Bucket="underwriting")["KeyCount"] == 3
+    # Two connections opened by the first invocation serve the later ones
+    assert server.connections == 2
@@ -0,0 +1,126 @@
+import base64
+import json
+import time
+
+import pytest
+
+from acord_core import batch, core
+from acord_core.errors import BadRequest, PayloadTooLarge
+from acord_core.limits import Limits, check_text
+from acord_core.xmlwriter import to_xml
+
+# Generous bounds; the unbounded paths these guard take seconds
+WORST_CASE_SECONDS = 0.1
+
+
+def request_text(extra="", tc="203"):
+    return ('{"TXLife": {"TXLifeRequest": {"TransRefGUID": "guid-1", "TransType": {"tc": "%s"}, '
+            '"OLifE": {"Holding": {"Policy": {"PolNumber": "POL123"}}}%s}}}' % (tc, extra))
+
+
+def timed_call(code, body):
+    start = time.perf_counter()
+    response = core.handle_event({"body": body, "headers": {}}, None, code)
+    return response, time.perf_counter() - start
+
+
+def deep_nesting(levels):
+    return ', "Deep": ' + "[" * levels + "]" * levels
+
+
+def many_keys(count):
+    return ', "Wide": {' + ", ".join('"k%d": %d' % (n, n) for n in range(count)) + "}"
+
+
+def many_nodes(count):
+    return ', "Long": [' + ", ".join('"v"' for _ in range(count)) + "]"
+
+
+@pytest.mark.parametrize("extra, status", [
+    (deep_nesting(200000), 400),
+    (many_keys(50000), 400),
+    (many_nodes(200000), 413),
+    (', "Note": "%s"' % ("x" * 500000), 413),
+], ids=["depth", "keys", "nodes", "string"])
+def test_adversarial_bodies_rejected_quickly(extra, status):
+    response, elapsed = timed_call("203", request_text(extra))
+    assert response["statusCode"] == status
+    assert elapsed < WORST_CASE_SECONDS
+
+
+def test_oversized_body_rejected_before_decoding():
+    body = base64.b64encode(b" " * (2 * 1024 * 1024)).decode("ascii")
+    start = time.perf_counter()
+    response = core.handle_event({"body": body, "isBase64Encoded": True, "headers": {}}, None, "302")
+    assert time.perf_counter() - start < WORST_CASE_SECONDS
+    assert response["statusCode"] == 413
+
+
+def test_limits_are_per_transaction_type():
+    extra = many_nodes(20000)
+    assert timed_call("203", request_text(extra))[0]["statusCode"] == 413
+    assert timed_call("103", request_text(extra, tc="103"))[0]["statusCode"] == 200
+
+
+def test_attachment_data_exempt_from_string_limit():
+    extra = ', "Attachment": {"AttachmentData": "%s"}' % ("QUFB" * 100000)
+    assert timed_call("103", request_text(extra, tc="103"))[0]["statusCode"] == 200
+    # Only as a value; a key that long is still too long
+    with pytest.raises(PayloadTooLarge):
+        check_text('{"AttachmentData": {"%s": 1}}' % ("x" * 100000), Limits())
+
+
+def test_structure_inside_strings_is_ignored():
+    text = json.dumps({"a": "[[[[{{{{" * 100 + '\\"' * 10, "b": ["]"] * 10})
+    check_text(text, Limits(max_depth=2, max_attributes=2))
+
+
+def test_environment_overrides(monkeypatch):
+    monkeypatch.setenv("ACORD_MAX_DEPTH", "10")
+    monkeypatch.setenv("ACORD_203_MAX_DEPTH", "5")
+    assert Limits.for_type("203").max_depth == 5
+    assert Limits.for_type("302").max_depth == 10
+    assert Limits.for_type("103").max_body_size == 64 * 1024 * 1024
+    with pytest.raises(TypeError):
+        Limits(max_widgets=1)
+
+
+def test_largest_body_size_follows_the_per_type_settings(monkeypatch):
+    assert Limits.largest_body_size() == 64 * 1024 * 1024
+    monkeypatch.setenv("ACORD_103_MAX_BODY_SIZE", str(8 * 1024 * 1024))
+    assert Limits.largest_body_size() == 8 * 1024 * 1024
+    monkeypatch.setenv("ACORD_1125_MAX_BODY_SIZE", str(96 * 1024 * 1024))
+    assert Limits.largest_body_size() == 96 * 1024 * 1024
+
+
+def test_depth_limit_checked_before_routing_field_scan():
+    # The partial scan would otherwise recurse through the nesting
+    body = '{"TXLife": {"Deep": ' + "[" * 100000 + "]" * 100000 + "}}"
+    request = core.AcordRequest(body, limits=Limits())
+    with pytest.raises(BadRequest):
+        request.fields
+
+
+def test_serialization_node_budget():
+    document = {"Items": [{"Name": str(n)} for n in range(10000)]}
+    start = time.perf_counter()
+    with pytest.raises(PayloadTooLarge):
+        to_xml(document, max_nodes=1000)
+    assert time.perf_counter() - start < WORST_CASE_SECONDS
+    assert to_xml(document, max_nodes=30000) == to_xml(document)
+
+
+def test_invalid_element_names_are_cached():
+    document = {"Items": [{"bad name": n} for n in range(2000)]}
+    start = time.perf_counter()
+    output = to_xml(document)
+    assert time.perf_counter() - start < WORST_CASE_SECONDS * 5
+    assert output.count(b"<bad_name>") == 2000
+
+
+def test_batch_limits():
+    body = "[" + ", ".join([request_text()] * 10) + "," + "[" * 1000 + "]" * 1000 + "]"
+    start = time.perf_counter()
+    response = batch.handle_batch_event({"body": body, "headers": {}}, None)
+    assert time.perf_counter() - start < WORST_CASE_SECONDS
+    assert response["statusCode"] == 400
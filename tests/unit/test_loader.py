@@ -0,0 +1,241 @@
+import asyncio
+import json
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from acord_core import aio, core, downstream, httpclient
+from acord_core.graph import ObjectGraph
+from acord_core.httpclient import AsyncHTTPClient
+from acord_core.loader import DataLoader, Loaders, lookups, resolve
+from tests.conftest import close, serve
+
+
+class FakeBackEnd:
+
+    def __init__(self, known=None, delay=0.01, error=None):
+        self.known = known
+        self.delay = delay
+        self.error = error
+        self.batches = []
+
+    async def __call__(self, keys):
+        self.batches.append(list(keys))
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {key: {"found": key} for key in keys if self.known is None or key in self.known}
+
+
+def test_loads_in_one_turn_are_one_batch():
+    back_end = FakeBackEnd(known={"a", "b"})
+    loader = DataLoader(back_end)
+
+    async def lookups():
+        return await asyncio.gather(*(loader.load(key) for key in ["a", "b", "c", "a", "b"]))
+
+    assert aio.run(lookups()) == [{"found": "a"}, {"found": "b"}, None, {"found": "a"}, {"found": "b"}]
+    # Deduplicated within the batch
+    assert back_end.batches == [["a", "b", "c"]]
+
+
+def test_loads_from_concurrent_coroutines_coalesce():
+    back_end = FakeBackEnd()
+    loader = DataLoader(back_end)
+
+    async def one(key):
+        return await loader.load(key)
+
+    async def lookups():
+        return await asyncio.gather(*(one(f"key-{n}") for n in range(20)))
+
+    assert len(aio.run(lookups())) == 20
+    assert len(back_end.batches) == 1
+    assert loader.calls == 1 and loader.fetched == 20
+
+
+def test_results_memoized_for_the_loader():
+    back_end = FakeBackEnd()
+    loader = DataLoader(back_end)
+
+    async def lookups():
+        first = await loader.load_many(["a", "b"])
+        second = await loader.load_many(["b", "a", "c"])
+        return first, second
+
+    first, second = aio.run(lookups())
+    assert second[:2] == first[::-1]
+    assert back_end.batches == [["a", "b"], ["c"]]
+
+
+def test_batches_split_at_max_size():
+    back_end = FakeBackEnd()
+    loader = DataLoader(back_end, max_batch_size=4)
+    aio.run(loader.load_many([str(n) for n in range(10)]))
+    assert [len(batch) for batch in back_end.batches] == [4, 4, 2]
+
+
+def test_failures_reach_every_waiter_and_are_not_memoized():
+    back_end = FakeBackEnd(error=RuntimeError("lookup down"))
+    loader = DataLoader(back_end)
+
+    async def lookups():
+        return await asyncio.gather(loader.load("a"), loader.load("b"), return_exceptions=True)
+
+    results = aio.run(lookups())
+    assert [str(result) for result in results] == ["lookup down", "lookup down"]
+    back_end.error = None
+    assert aio.run(loader.load_many(["a"])) == [{"found": "a"}]
+    assert len(back_end.batches) == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_lookup():
+    back_end = FakeBackEnd(delay=0.05)
+    loader = DataLoader(back_end)
+
+    async def lookups():
+        impatient = asyncio.ensure_future(asyncio.wait_for(loader.load("a"), 0.01))
+        patient = loader.load("a")
+        with pytest.raises(asyncio.TimeoutError):
+            await impatient
+        return await patient
+
+    assert aio.run(lookups()) == {"found": "a"}
+    assert back_end.batches == [["a"]]
+
+
+def test_lookups_of_a_submission():
+    olife = {
+        "Party": [
+            {"id": "Party_1", "GovtID": "111223333"},
+            {"id": "Party_2", "GovtID": "444556666",
+             "Producer": {"CarrierAppointment": [{"CompanyProducerID": "AG-1"}, {"CompanyProducerID": "AG-2"}]}},
+            {"id": "Party_3"},
+        ],
+        "Holding": {"id": "Holding_1", "Policy": {"PolNumber": "POL1"}},
+        "Relation": [{"OriginatingObjectID": "Holding_1", "RelatedObjectID": "Party_1"}],
+    }
+    assert [(name, key, aggregate.get("id")) for name, key, aggregate in lookups(ObjectGraph.from_olife(olife))] == [
+        ("parties", "111223333", "Party_1"),
+        ("parties", "444556666", "Party_2"),
+        ("licensing", "AG-1", "Party_2"),
+        ("licensing", "AG-2", "Party_2"),
+        ("holdings", "POL1", "Holding_1"),
+    ]
+
+
+def test_resolve_merges_answers_into_aggregates():
+    back_ends = {"parties": FakeBackEnd(known={"111223333"}), "holdings": FakeBackEnd(), "licensing": FakeBackEnd()}
+    loaders = Loaders(lambda name: DataLoader(back_ends[name]))
+    olife = {
+        "Party": [{"id": "Party_1", "GovtID": "111223333"}, {"id": "Party_2", "GovtID": "999"}],
+        "Holding": [{"id": "Holding_1", "Policy": {"PolNumber": "POL1"}}],
+    }
+    aio.run(resolve(ObjectGraph.from_olife(olife), loaders))
+    assert olife["Party"][0] == {"id": "Party_1", "GovtID": "111223333", "found": "111223333"}
+    assert "found" not in olife["Party"][1]
+    assert olife["Holding"][0]["found"] == "POL1"
+    assert [len(back_end.batches) for back_end in back_ends.values()] == [1, 1, 0]
+
+
+class LookupStub(BaseHTTPRequestHandler):
+    """Local stand-in for the policy administration bulk endpoints."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.calls.append((self.path, body))
+        if self.path == "/parties/lookup":
+            answer = {"results": {key: {"PartyKey": f"client-{key}"} for key in body["keys"]}}
+        elif self.path == "/producers/licensing":
+            answer = {"results": {key: {"Producer": {"LicenseStatus": "Active"}} for key in body["keys"]}}
+        elif self.path == "/policies/lookup":
+            answer = {"results": {}}
+        else:
+            answer = {}
+        payload = json.dumps(answer).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def server():
+    yield from serve(LookupStub, calls=[])
+
+
+@pytest.fixture
+def submission(server, monkeypatch):
+    client = AsyncHTTPClient()
+    monkeypatch.setattr(httpclient, "_default_client", client)
+    monkeypatch.setattr(downstream, "URL", server.url)
+    monkeypatch.setattr(downstream, "_default_client", None)
+    transaction = core.make_transaction("103", "New Business Submission")
+    assert isinstance(transaction, core.NewBusinessSubmission)
+    monkeypatch.setitem(core.TRANSACTIONS, "103", transaction)
+    yield transaction
+    aio.run(close(client))
+
+
+def make_submission(guid, parties=40):
+    return {
+        "TransRefGUID": guid,
+        "TransType": {"tc": "103"},
+        "OLifE": {
+            "Holding": {"id": "Holding_0", "Policy": {"PolNumber": f"POL-{guid}"}},
+            # Every other party repeats a client; every fourth is a producer
+            "Party": [dict({"id": f"Party_{n}", "GovtID": f"{n // 2:09d}"},
+                           **({"Producer": {"CarrierAppointment": {"CompanyProducerID": f"AG-{n}"}}}
+                              if n % 4 == 0 else {}))
+                      for n in range(parties)],
+            "Relation": [{"OriginatingObjectID": "Holding_0", "RelatedObjectID": f"Party_{n}"}
+                         for n in range(parties)],
+        },
+    }
+
+
+def paths(server):
+    return [path for path, _ in server.calls]
+
+
+def test_submission_makes_one_call_per_back_end(server, submission):
+    event = {"body": json.dumps({"TXLife": {"TXLifeRequest": make_submission("guid-1")}}), "headers": {}}
+    assert core.handle_event(event, None, "103")["statusCode"] == 200
+
+    # 40 parties, 10 producers and a holding: three lookups and the submission
+    assert sorted(paths(server)) == ["/cases", "/parties/lookup", "/policies/lookup", "/producers/licensing"]
+    lookups = dict(server.calls[:3])
+    assert len(lookups["/parties/lookup"]["keys"]) == 20
+    assert len(lookups["/producers/licensing"]["keys"]) == 10
+    assert lookups["/policies/lookup"]["keys"] == ["POL-guid-1"]
+
+    submitted = server.calls[-1][1]["TXLife"]["TXLifeRequest"]["OLifE"]["Party"]
+    assert submitted[3]["PartyKey"] == "client-000000001"
+    assert submitted[4]["Producer"] == {"CarrierAppointment": {"CompanyProducerID": "AG-4"},
+                                        "LicenseStatus": "Active"}
+
+
+def test_lookups_memoized_across_parts_of_one_invocation(server, submission):
+    parts = [make_submission(f"guid-{n}") for n in range(3)]
+    event = {"body": json.dumps({"TXLife": {"TXLifeRequest": parts}}), "headers": {}}
+    response = core.handle_event(event, None, "103")
+    assert response["statusCode"] == 200
+    results = json.loads(response["body"])["TXLife"]["TXLifeResponse"]
+    assert [result["TransResult"]["ResultCode"]["tc"] for result in results] == ["1", "1", "1"]
+
+    # The parts share clients and producers, each fetched once
+    assert paths(server).count("/cases") == 3
+    fetched = [key for path, body in server.calls if path != "/cases" for key in body["keys"]]
+    assert len(fetched) == len(set(fetched)) == 20 + 10 + 3
+
+    # A later invocation starts with fresh loaders
+    server.calls.clear()
+    event = {"body": json.dumps({"TXLife": {"TXLifeRequest": make_submission("guid-9")}}), "headers": {}}
+    core.handle_event(event, None, "103")
+    assert len(server.calls) == 4
@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from acord_core import core
+from acord_core.xmlwriter import to_xml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from generate_models import load, main
+
+models = load()
+ChangeInfo, Policy, TransResult = models.ChangeInfo, models.Policy, models.TransResult
+TXLifeRequest, TXLifeResponse, TypeCode = models.TXLifeRequest, models.TXLifeResponse, models.TypeCode
+
+REQUEST = {
+    "TransRefGUID": "abc-123",
+    "TransType": {"tc": "1125", "value": "Policy Change"},
+    "TransExeDate": "2024-01-31",
+    "TransExeTime": "10:00:00",
+    "OLifE": {
+        "Holding": {
+            "Policy": {
+                "PolNumber": "POL-1",
+                "PolicyStatus": {"tc": "1", "value": "Active"},
+                "ChangeInfo": {"ChangeType": {"tc": "5"}, "ChangeEffDate": "2024-02-01"},
+            }
+        }
+    },
+}
+
+
+def test_models_not_shipped_in_the_layer():
+    assert not os.path.exists(os.path.join(ROOT, "lambda", "common", "python", "acord_core", "models.py"))
+
+
+def test_generator_writes_an_importable_module(tmp_path, monkeypatch):
+    main(["generate_models.py", str(tmp_path / "acord_models.py")])
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import acord_models
+    assert acord_models.TXLifeRequest.from_json(REQUEST).to_dict() == REQUEST
+
+
+def test_json_round_trip():
+    model = TXLifeRequest.from_json(REQUEST)
+    policy = model.OLifE.Holding.Policy
+    assert isinstance(policy, Policy)
+    assert policy.PolNumber == "POL-1"
+    assert policy.PolicyStatus == TypeCode("1", "Active")
+    assert isinstance(policy.ChangeInfo, ChangeInfo)
+    assert model.to_dict() == REQUEST
+
+
+def test_slots_leave_no_instance_dict():
+    model = TXLifeRequest.from_json(REQUEST)
+    assert not hasattr(model, "__dict__")
+    with pytest.raises(AttributeError):
+        model.Unknown = 1
+
+
+def test_unknown_properties_are_kept():
+    data = dict(REQUEST, Vendor={"Name": "Acme"})
+    model = TXLifeRequest.from_json(data)
+    assert model.extra == {"Vendor": {"Name": "Acme"}}
+    assert model.to_dict() == data
+    assert list(model.to_dict()) == list(data)
+
+
+def test_lists_become_lists_of_models():
+    data = {"OLifE": {"Holding": [{"Policy": {"PolNumber": "A"}}, {"Policy": {"PolNumber": "B"}}]}}
+    model = TXLifeRequest.from_json(data)
+    assert [holding.Policy.PolNumber for holding in model.OLifE.Holding] == ["A", "B"]
+    assert model.to_dict() == data
+
+
+def test_xml_output_matches_xmlwriter():
+    model = TXLifeRequest.from_json(dict(REQUEST, Vendor={"Name": "A & B"}))
+    expected = to_xml(model.to_dict(), root="TXLifeRequest").decode("utf-8")
+    assert '<?xml version="1.0" encoding="UTF-8" ?>' + model.to_xml() == expected
+
+
+def test_from_xml_reads_attribute_typecodes():
+    element = ET.fromstring(
+        '<TXLifeRequest><TransRefGUID>abc</TransRefGUID><TransType tc="203">Pending Case Status Inquiry</TransType>'
+        '<OLifE><Holding><Policy><PolNumber>A</PolNumber></Policy></Holding>'
+        '<Holding><Policy><PolNumber>B</PolNumber></Policy></Holding></OLifE>'
+        '<Vendor code="9"><Name>Acme</Name></Vendor></TXLifeRequest>')
+    model = TXLifeRequest.from_xml(element)
+    assert model.TransType == TypeCode("203", "Pending Case Status Inquiry")
+    assert [holding.Policy.PolNumber for holding in model.OLifE.Holding] == ["A", "B"]
+    assert model.extra == {"Vendor": {"@code": "9", "Name": "Acme"}}
+
+
+def test_from_xml_reads_serialized_responses():
+    request = core.AcordRequest(json.dumps({"TXLife": {"TXLifeRequest": REQUEST}}))
+    document = core.build_txlife("1125", core.TRANSACTIONS["1125"].process(request))
+    element = ET.fromstring(core.serialize(document, "xml")[0])
+    model = TXLifeResponse.from_xml(element.find("TXLife/TXLifeResponse"))
+    assert model.TransRefGUID == "abc-123"
+    assert model.TransType.tc == "1125"
+    assert isinstance(model.TransResult, TransResult)
+    assert model.OLifE.Holding.Policy.PolNumber == "POL-1"
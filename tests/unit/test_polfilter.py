@@ -0,0 +1,227 @@
+import json
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from acord_core import casestore, core, polfilter
+from acord_core.casestore import MemoryCaseStore, SQLiteCaseStore, case_from_olife
+from acord_core.polfilter import BloomFilter, KnownPolicies
+
+
+def make_olife(pol_number, status="12"):
+    return {"Holding": {"id": "Holding_1", "Policy": {"PolNumber": pol_number, "PolicyStatus": {"tc": status}}}}
+
+
+def seeded_store(count, store=None):
+    store = store or MemoryCaseStore()
+    for n in range(count):
+        store.put(case_from_olife(make_olife(f"POL{n:06d}")))
+    return store
+
+
+def test_no_false_negatives_and_configured_error_rate():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    for n in range(10_000):
+        bloom.add(f"POL{n:06d}")
+    assert all(f"POL{n:06d}" in bloom for n in range(10_000))
+    false_positives = sum(f"XYZ{n:06d}" in bloom for n in range(50_000))
+    assert 0.005 < false_positives / 50_000 < 0.015
+    assert bloom.error_rate() == pytest.approx(0.01, rel=0.1)
+    assert bloom.hashes == 7
+
+
+def test_sized_by_error_rate_or_bits_per_item():
+    # About 9.6 bits, 1.2 MB, per million policies at 1%
+    assert BloomFilter(capacity=1_000_000, error_rate=0.01).size == pytest.approx(1_198_132, rel=0.001)
+    assert BloomFilter(capacity=1_000_000, error_rate=0.001).size == pytest.approx(1_797_198, rel=0.001)
+    bloom = BloomFilter(capacity=1_000_000, bits_per_item=8)
+    assert bloom.size == 1_000_000
+    assert bloom.hashes == 6
+    assert bloom.error_rate(1_000_000) == pytest.approx(0.0216, abs=0.001)
+
+
+def test_filter_round_trips_through_bytes():
+    bloom = BloomFilter(capacity=1000)
+    for n in range(500):
+        bloom.add(f"POL{n}")
+    loaded = BloomFilter.loads(bloom.dumps())
+    assert (loaded.bits, loaded.hashes, len(loaded)) == (bloom.bits, bloom.hashes, 500)
+    assert all(f"POL{n}" in loaded for n in range(500))
+    with pytest.raises(ValueError):
+        BloomFilter.loads(b'{"format": "other"}\n')
+
+
+def test_built_from_the_store_and_refreshed():
+    store = seeded_store(100)
+    policies = KnownPolicies(store, capacity=1000, refresh=None).build()
+    assert policies.known("POL000042")
+    assert not policies.known("NOT-OURS")
+
+    # Written by another container; seen after the next refresh
+    store.put(case_from_olife(make_olife("POL-NEW")))
+    assert not policies.known("POL-NEW")
+    assert policies.refresh(force=True)
+    assert policies.known("POL-NEW")
+    # Added by a write in this container
+    policies.add("POL-LOCAL")
+    assert policies.known("POL-LOCAL")
+
+    stats = policies.stats()
+    assert (stats["policies"], stats["checks"], stats["rejected"]) == (102, 5, 2)
+    assert stats["capacity"] == 1000
+    assert stats["bytes_per_million"] == pytest.approx(1_198_000, rel=0.01)
+    assert stats["error_rate"] < stats["error_rate_at_capacity"] == pytest.approx(0.01, rel=0.1)
+
+
+def test_misses_refresh_at_most_once_an_interval():
+    store = seeded_store(10)
+    policies = KnownPolicies(store, capacity=1000, refresh=0.05).build()
+    reads = []
+    pol_numbers = store.pol_numbers
+    store.pol_numbers = lambda since=None: reads.append(since) or pol_numbers(since)
+    store.put(case_from_olife(make_olife("POL-NEW")))
+    assert not policies.known("POL-NEW")
+    time.sleep(0.06)
+    # Known PolNumbers never wait for a refresh; a miss catches up first
+    assert policies.known("POL000001")
+    assert reads == []
+    assert policies.known("POL-NEW")
+    assert not policies.known("NOT-OURS")
+    assert not policies.known("NOT-OURS-EITHER")
+    assert len(reads) == 1 and reads[0] is not None
+
+
+def test_capacity_grows_with_the_book():
+    policies = KnownPolicies(seeded_store(300), capacity=100).build()
+    assert policies.filter.capacity == 600
+
+
+def test_snapshot_loaded_and_caught_up(tmp_path):
+    store = seeded_store(50, SQLiteCaseStore())
+    path = str(tmp_path / "policies.bloom")
+    KnownPolicies(store, capacity=1000).build().save(path)
+    store.put(case_from_olife(make_olife("POL-AFTER")))
+
+    loaded = KnownPolicies(store, capacity=1000, refresh=0).load(path)
+    assert loaded.known("POL000007")
+    assert loaded.known("POL-AFTER")
+    assert not loaded.known("NOT-OURS")
+
+
+def test_snapshot_in_s3(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        boto3.client("s3").create_bucket(Bucket="filters")
+        store = seeded_store(20)
+        KnownPolicies(store, capacity=1000).build().save("s3://filters/policies.bloom")
+        loaded = KnownPolicies(store, capacity=1000).load("s3://filters/policies.bloom")
+        assert loaded.known("POL000019")
+
+
+def test_no_filter_without_a_store_or_when_the_build_fails(monkeypatch):
+    monkeypatch.setattr(polfilter, "_default_policies", None)
+    monkeypatch.setattr(casestore, "_default_store", None)
+    monkeypatch.setattr(casestore, "TABLE", None)
+    monkeypatch.setattr(casestore, "DATABASE", None)
+    assert polfilter.default_policies() is None
+
+    store = MemoryCaseStore()
+    monkeypatch.setattr(casestore, "_default_store", store)
+    monkeypatch.setattr(store, "pol_numbers", lambda since=None: 1 / 0)
+    assert polfilter.default_policies() is None
+
+    monkeypatch.setattr(polfilter, "SNAPSHOT", "/nonexistent/policies.bloom")
+    monkeypatch.setattr(casestore, "_default_store", seeded_store(5))
+    assert polfilter.default_policies() is None
+
+    monkeypatch.undo()
+    monkeypatch.setattr(polfilter, "_default_policies", None)
+    monkeypatch.setattr(casestore, "_default_store", seeded_store(5))
+    assert polfilter.default_policies().known("POL000004")
+    assert polfilter.default_policies() is polfilter.default_policies()
+
+
+def test_dynamodb_store_never_read_whole_by_containers(monkeypatch, tmp_path):
+    store = casestore.DynamoCaseStore("cases", dynamodb=object())
+    monkeypatch.setattr(store, "pol_numbers", lambda since=None: pytest.fail("read the table") if since is None
+                        else ["POL-SINCE"])
+    monkeypatch.setattr(polfilter, "_default_policies", None)
+    monkeypatch.setattr(casestore, "_default_store", store)
+    monkeypatch.setattr(polfilter, "SNAPSHOT", None)
+    assert polfilter.default_policies() is None
+
+    path = str(tmp_path / "policies.bloom")
+    KnownPolicies(seeded_store(5), capacity=1000).build().save(path)
+    monkeypatch.setattr(polfilter, "SNAPSHOT", path)
+    policies = polfilter.default_policies()
+    assert policies.known("POL000004") and policies.known("POL-SINCE")
+
+
+@pytest.fixture
+def service(monkeypatch):
+    store = seeded_store(20)
+    monkeypatch.setattr(casestore, "_default_store", store)
+    monkeypatch.setattr(polfilter, "_default_policies", None)
+    monkeypatch.delenv("ACORD_203_SOURCES", raising=False)
+    for code, name in (("103", "New Business Submission"), ("302", "Pending Case Status Update")):
+        monkeypatch.setitem(core.TRANSACTIONS, code, core.make_transaction(code, name))
+    monkeypatch.setitem(core.TRANSACTIONS, "203", core.status_inquiry())
+    return store
+
+
+def call(code, pol_number, olife=None):
+    body = {"TXLife": {"TXLifeRequest": {"TransRefGUID": "guid-1", "TransType": {"tc": code},
+                                         "OLifE": olife or make_olife(pol_number)}}}
+    response = core.handle_event({"body": json.dumps(body), "headers": {}}, None, code)
+    assert response["statusCode"] == 200
+    return json.loads(response["body"])["TXLife"]["TXLifeResponse"]
+
+
+def test_unknown_policies_answered_without_lookups(service, monkeypatch):
+    assert isinstance(core.TRANSACTIONS["203"], core.KnownPolicyCheck)
+    lookups = []
+    monkeypatch.setattr(service, "view", lambda *args: lookups.append(args))
+    monkeypatch.setattr(service, "get", lambda *args: lookups.append(args))
+
+    response = call("203", "NOT-OURS")
+    assert response["TransResult"]["ResultCode"]["tc"] == "5"
+    assert response["TransResult"]["ResultInfo"]["ResultInfoDesc"] == "Unknown policy NOT-OURS"
+    assert lookups == []
+    assert polfilter.default_policies().stats()["rejected"] == 1
+
+
+def test_only_inquiries_the_case_store_alone_answers_are_checked(service, monkeypatch):
+    # In-force policies the case store has never seen can still be changed
+    change = core.make_transaction("1125", "Policy Change")
+    assert not isinstance(change, core.KnownPolicyCheck)
+    monkeypatch.setitem(core.TRANSACTIONS, "1125", change)
+    assert call("1125", "NOT-OURS")["TransResult"]["ResultCode"]["tc"] == "1"
+    # Other back ends may know the case
+    monkeypatch.setenv("ACORD_203_SOURCES", json.dumps([{"name": "workbench", "url": "http://127.0.0.1:9/"}]))
+    assert not isinstance(core.status_inquiry(), core.KnownPolicyCheck)
+
+
+def test_cases_written_elsewhere_are_found(service, monkeypatch):
+    # Once the refresh interval has passed since the filter was loaded
+    monkeypatch.setattr(polfilter.default_policies(), "refresh_interval", 0)
+    service.put(case_from_olife(make_olife("POL-ELSEWHERE")))
+    assert call("203", "POL-ELSEWHERE")["TransResult"]["ResultCode"]["tc"] == "1"
+
+
+def test_known_policies_still_looked_up(service):
+    # Seeded without views, so the fan-out answers from the case store
+    response = call("203", "POL000003")
+    assert response["TransResult"]["ResultInfo"][0]["ResultInfoDesc"] == "casestore: answered"
+
+
+def test_writes_add_their_policies(service):
+    assert call("203", "POL-NEW")["TransResult"]["ResultInfo"]["ResultInfoDesc"] == "Unknown policy POL-NEW"
+    call("103", "POL-NEW")
+    assert service.get("POL-NEW")["Version"] == 1
+    assert call("203", "POL-NEW")["TransResult"]["ResultCode"]["tc"] == "1"
+    call("302", "POL-302", make_olife("POL-302", status="21"))
+    assert call("203", "POL-302")["OLifE"]["Holding"]["Policy"]["PolicyStatus"] == {"tc": "21"}
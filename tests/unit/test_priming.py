@@ -0,0 +1,113 @@
+import importlib.util
+import json
+import os
+import threading
+
+import pytest
+
+from acord_core import admission, batch, casestore, core, polfilter, priming, typecodes
+
+HANDLERS = os.path.join(os.path.dirname(__file__), "..", "..", "lambda")
+
+
+@pytest.fixture
+def business_logic(monkeypatch):
+    calls = []
+    for transaction in core.TRANSACTIONS.values():
+        def process(request, transaction=transaction):
+            calls.append(transaction.code)
+            return core.Transaction.process(transaction, request)
+        monkeypatch.setattr(transaction, "process", process)
+    return calls
+
+
+@pytest.mark.parametrize("code", ["103", "1125", "203", "302"])
+def test_warmup_event_runs_every_path_without_side_effects(code, business_logic, monkeypatch):
+    controller = admission.AdmissionController()
+    controller.latency = 0.5
+    monkeypatch.setattr(admission, "_default_controller", controller)
+
+    response = core.handle_event({"acordWarmup": True}, None, code)
+
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert body["warmup"] == code
+    assert {"json", "xml", "projection", "compressed", "multi", "claimcheck"} <= set(body["timings"])
+    assert ("not-modified" in body["timings"]) == core.TRANSACTIONS[code].conditional
+    assert business_logic == []
+    assert controller.latency == 0.5
+    assert not priming.warming()
+
+
+def test_warmup_reads_stand_ins_for_the_case_store(monkeypatch):
+    store = casestore.MemoryCaseStore()
+    calls = []
+    for name in ("get", "put", "update", "view", "pol_numbers", "changes"):
+        monkeypatch.setattr(store, name, lambda *args, name=name, **kwargs: calls.append(name))
+    policies = polfilter.KnownPolicies(store, refresh=None)
+    monkeypatch.setattr(policies, "known", lambda pol_number: calls.append("known"))
+    inquiry = core.CaseViewInquiry(core.Transaction("203", "Pending Case Status Inquiry", conditional=True), store)
+    monkeypatch.setitem(core.TRANSACTIONS, "203", core.KnownPolicyCheck(inquiry, policies))
+
+    response = core.handle_event({"acordWarmup": True}, None, "203")
+
+    assert response["statusCode"] == 200
+    assert calls == []
+    # The stand-ins hold the warm-up case, so its view was rendered
+    assert priming._stub_stores()[1].checks > 0
+    assert priming.case_store(store) is store
+
+
+def test_warming_is_per_call(monkeypatch):
+    seen = {}
+    run = priming._run
+
+    def observe(timings, name, *args):
+        if name == "json":
+            # A request on another thread is not part of the warm-up
+            thread = threading.Thread(target=lambda: seen.setdefault("other", priming.warming()))
+            thread.start()
+            thread.join()
+            seen["warm-up"] = priming.warming()
+        return run(timings, name, *args)
+    monkeypatch.setattr(priming, "_run", observe)
+
+    priming.warm_up("103")
+    assert seen == {"warm-up": True, "other": False}
+    assert not priming.warming()
+
+
+def test_batch_warmup(business_logic):
+    response = batch.handle_batch_event({"acordWarmup": True}, None)
+    assert json.loads(response["body"])["timings"]["batch"] >= 0
+    assert business_logic == []
+
+
+def test_prime_builds_templates_and_records_timings(monkeypatch):
+    monkeypatch.setattr(priming, "TIMINGS", {})
+    monkeypatch.setattr(core, "_templates", {})
+    timings = priming.prime("302")
+    assert set(timings) == {"typecodes", "admission", "claimcheck", "warmup"}
+    assert ("302", "json", None) in core._templates
+    assert ("302", "xml", None) in core._templates
+
+
+def test_prime_never_raises(monkeypatch, caplog):
+    def fail():
+        raise OSError("typecodes.bin missing")
+    monkeypatch.setattr(typecodes, "registry", fail)
+    monkeypatch.setattr(priming, "TIMINGS", {})
+    timings = priming.prime("103")
+    assert "typecodes" in timings
+    assert "typecodes.bin missing" in caplog.text
+
+
+@pytest.mark.parametrize("name", ["103", "1125", "203", "302", "batch"])
+def test_handlers_prime_at_import(name, monkeypatch):
+    monkeypatch.setattr(priming, "TIMINGS", {})
+    path = os.path.join(HANDLERS, f"acord_{name}", f"handler_acord_{name}.py")
+    spec = importlib.util.spec_from_file_location(f"handler_acord_{name}", path)
+    handler = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(handler)
+    assert "warmup" in priming.TIMINGS
+    assert handler.handler({"acordWarmup": True}, None)["statusCode"] == 200
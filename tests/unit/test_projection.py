@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from acord_core import core
+from acord_core.projection import InvalidSelector, Projection, compile_selector
+from tests.conftest import make_event, make_request
+
+
+def test_prune_keeps_selected_paths_in_document_order():
+    projection = Projection("OLifE/Holding/Policy/PolNumber, TXLife.TXLifeResponse.TransRefGUID")
+    response = {
+        "TransRefGUID": "g",
+        "TransType": {"tc": "103"},
+        "OLifE": {"Holding": {"Policy": {"PolNumber": "P", "PolicyStatus": {"tc": "1"}}}},
+    }
+    assert projection.prune(response) == {"TransRefGUID": "g", "OLifE": {"Holding": {"Policy": {"PolNumber": "P"}}}}
+
+
+def test_shorter_path_selects_whole_subtree():
+    assert Projection("TransResult.ResultCode,TransResult").tree == {"TransResult": None}
+    assert Projection("TransResult,TransResult.ResultCode").tree == {"TransResult": None}
+
+
+def test_selectors_are_compiled_once():
+    assert compile_selector("TransResult") is compile_selector("TransResult")
+    assert Projection("B,A").key == Projection("A, B").key
+
+
+@pytest.mark.parametrize("selector", ["", "TransResult,,PolNumber", "OLifE..Holding", "Trans Result", "1st"])
+def test_invalid_selectors(selector):
+    with pytest.raises(InvalidSelector):
+        Projection(selector)
+
+
+def test_projected_json_response():
+    response = core.handle_event(make_event(make_request(), selector="TransResult.ResultCode"), None, "203")
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {
+        "TXLife": {"TXLifeResponse": {"TransResult": {"ResultCode": {"tc": "1", "value": "Success"}}}}
+    }
+
+
+def test_projected_response_matches_pruned_full_response():
+    selector = "TransRefGUID,OLifE.Holding.Policy.PolNumber"
+    for accept in ("application/json", "application/xml"):
+        response = core.handle_event(make_event(make_request(), accept, selector=selector), None, "103")
+        request = core.AcordRequest(json.dumps(make_request()))
+        document = compile_selector(selector).apply(core.respond(request, core.TRANSACTIONS["103"]))
+        expected = core.serialize(document, core.response_format(accept))[0]
+        assert response["body"] == expected
+
+
+def test_projection_applies_to_each_txlife_response():
+    requests = [make_request(tc, f"guid-{n}")["TXLife"]["TXLifeRequest"] for n, tc in enumerate(["103", "203"])]
+    body = {"TXLife": {"TXLifeRequest": requests}}
+    response = core.handle_event(make_event(body, selector="TransType.tc"), None, "103")
+    body = json.loads(response["body"])
+    assert body["TXLife"]["TXLifeResponse"] == [{"TransType": {"tc": "103"}}, {"TransType": {"tc": "203"}}]
+
+
+def test_invalid_selector_rejected_with_400():
+    response = core.handle_event(make_event(make_request(), selector="OLifE..Holding"), None, "203")
+    assert response["statusCode"] == 400
+    assert "fields" in json.loads(response["body"])["message"]
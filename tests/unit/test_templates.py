@@ -0,0 +1,57 @@
+import pytest
+
+from acord_core import core
+from acord_core.templates import ResponseTemplate
+
+
+class FakeRequest:
+    trans_exe_date = "2026-10-19"
+    trans_exe_time = "08:15:00"
+
+    def __init__(self, **fields):
+        self.fields = fields
+
+
+VALUES = [
+    {"TransRefGUID": "guid-1", "TransType": {"tc": "103", "value": "New Business"}, "PolNumber": "POL123"},
+    {"TransRefGUID": "a&b <c> \"d\" 'e' é ☃", "TransType": "103", "PolNumber": 42},
+    {"TransRefGUID": "", "TransType": {"tc": "302", "#text": "x", "nested": {"deep": None}}, "PolNumber": True},
+]
+
+
+@pytest.mark.parametrize("fmt", ["json", "xml"])
+@pytest.mark.parametrize("code", sorted(core.TRANSACTIONS))
+@pytest.mark.parametrize("fields", VALUES)
+def test_template_output_is_byte_identical(fmt, code, fields):
+    transaction = core.TRANSACTIONS[code]
+    request = FakeRequest(**fields)
+
+    expected, _ = core.serialize(core.build_txlife(code, transaction.process(request)), fmt)
+    rendered = core.response_template(transaction, fmt).render(core.slot_values(request))
+
+    assert rendered == expected
+
+
+def test_list_values_fall_back_to_full_build():
+    request = FakeRequest(TransRefGUID=["a", "b"], TransType="103", PolNumber="P")
+    template = core.response_template(core.TRANSACTIONS["103"], "xml")
+    assert template.render(core.slot_values(request)) is None
+
+
+def test_templates_compiled_once_per_container():
+    transaction = core.TRANSACTIONS["203"]
+    assert core.response_template(transaction, "json") is core.response_template(transaction, "json")
+
+
+def test_customised_process_is_not_templated(monkeypatch):
+    transaction = core.TRANSACTIONS["302"]
+    monkeypatch.setattr(transaction, "process", lambda request: {"Custom": True})
+    assert core.response_template(transaction, "json") is None
+
+
+@pytest.mark.parametrize("fmt", ["json", "xml"])
+def test_compiled_template_survives_storage(fmt):
+    request = FakeRequest(**VALUES[1])
+    template = core.response_template(core.TRANSACTIONS["103"], fmt)
+    stored = ResponseTemplate.loads(template.dumps())
+    assert stored.render(core.slot_values(request)) == template.render(core.slot_values(request))
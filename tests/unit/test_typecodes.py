@@ -0,0 +1,104 @@
+import json
+import os
+
+import pytest
+
+from acord_core import core
+from acord_core.typecodes import DEFAULT_PATH, TypeCodeRegistry, build_index
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SOURCE = os.path.join(ROOT, "data", "acord_typecodes.json")
+
+
+@pytest.fixture
+def large_registry(tmp_path):
+    source = {
+        "lists": {f"OLI_LU_{n}": {str(tc): f"List {n} code {tc}" for tc in range(1, 200)} for n in range(50)},
+        "elements": {"PolicyStatus": "OLI_LU_7"},
+    }
+    path = tmp_path / "typecodes.bin"
+    path.write_bytes(build_index(source))
+    return TypeCodeRegistry.open(str(path))
+
+
+def test_lookups_in_both_directions(large_registry):
+    assert len(large_registry) == 50 * 199
+    for n in (0, 17, 49):
+        for tc in (1, 99, 199):
+            description = large_registry.description(f"OLI_LU_{n}", str(tc))
+            assert description == f"List {n} code {tc}"
+            assert large_registry.code(f"OLI_LU_{n}", description.upper()) == str(tc)
+    assert large_registry.description("OLI_LU_0", "200") is None
+    assert large_registry.description("OLI_LU_99", "1") is None
+    assert large_registry.code("OLI_LU_0", "no such code") is None
+
+
+def test_strings_are_interned(large_registry):
+    first = large_registry.description("OLI_LU_3", "5")
+    large_registry.description.cache_clear()
+    assert large_registry.description("OLI_LU_3", "5") is first
+
+
+def test_fill_from_tc(large_registry):
+    assert large_registry.fill("PolicyStatus", {"tc": "12"}) == {"tc": "12", "value": "List 7 code 12"}
+    assert large_registry.fill("PolicyStatus", {"@tc": "3"}) == {"@tc": "3", "#text": "List 7 code 3"}
+    assert large_registry.fill("PolicyStatus", {"tc": "12", "value": "kept"}) == {"tc": "12", "value": "kept"}
+    document = {"Holding": {"Policy": {"PolicyStatus": {"tc": "1"}, "Other": [{"PolicyStatus": {"tc": "2"}}]}}}
+    large_registry.fill_document(document)
+    assert document["Holding"]["Policy"]["PolicyStatus"]["value"] == "List 7 code 1"
+    assert document["Holding"]["Policy"]["Other"][0]["PolicyStatus"]["value"] == "List 7 code 2"
+
+
+def test_shipped_index_matches_source():
+    with open(SOURCE) as f:
+        expected = build_index(json.load(f))
+    with open(DEFAULT_PATH, "rb") as f:
+        assert f.read() == expected, "typecodes.bin is stale; rebuild it from data/acord_typecodes.json"
+
+
+def test_response_fills_trans_type_value():
+    body = {
+        "TXLife": {
+            "TXLifeRequest": {
+                "TransRefGUID": "guid-1",
+                "TransType": {"tc": "103"},
+                "OLifE": {"Holding": {"Policy": {"PolNumber": "POL123"}}},
+            }
+        }
+    }
+    response = core.handle_event({"body": json.dumps(body), "headers": {}}, None, "103")
+    assert json.loads(response["body"])["TXLife"]["TXLifeResponse"]["TransType"] == {
+        "tc": "103", "value": "New Business Submission"}
+
+
+class PolicyLookup(core.Transaction):
+    # Answers with typecodes as a back end would, by tc alone
+
+    def process(self, request):
+        response = core.Transaction.process(self, request)
+        response["OLifE"] = {"Holding": {"Policy": {"PolNumber": "POL123", "ProductType": {"tc": "2"},
+                                                    "ChangeInfo": [{"ChangeType": {"tc": "2"}}]}}}
+        return response
+
+
+def test_response_documents_filled_before_serialization(monkeypatch):
+    monkeypatch.setitem(core.TRANSACTIONS, "1125", PolicyLookup("1125", "Policy Change"))
+    body = {"TXLife": {"TXLifeRequest": {"TransRefGUID": "guid-1", "TransType": {"tc": "1125"},
+                                         "OLifE": {"Holding": {"Policy": {"PolNumber": "POL123"}}}}}}
+    response = core.handle_event({"body": json.dumps(body), "headers": {}}, None, "1125")
+    policy = json.loads(response["body"])["TXLife"]["TXLifeResponse"]["OLifE"]["Holding"]["Policy"]
+    assert policy["ProductType"] == {"tc": "2", "value": "Term"}
+    assert policy["ChangeInfo"] == [{"ChangeType": {"tc": "2", "value": "Beneficiary Change"}}]
+
+    xml = core.handle_event({"body": json.dumps(body), "headers": {"Accept": "application/xml"}}, None, "1125")
+    text = xml["body"].decode("utf-8") if isinstance(xml["body"], bytes) else xml["body"]
+    assert "<ProductType><tc>2</tc><value>Term</value></ProductType>" in text
+
+
+def test_shipped_lists_fill_product_and_change_types():
+    registry = TypeCodeRegistry.open()
+    policy = {"ProductType": {"tc": "2"}, "ChangeInfo": {"ChangeType": {"tc": "2"}}}
+    registry.fill_document(policy)
+    assert policy["ProductType"] == {"tc": "2", "value": "Term"}
+    assert policy["ChangeInfo"]["ChangeType"] == {"tc": "2", "value": "Beneficiary Change"}
+    assert registry.code(registry.list_for("ProductType"), "universal life") == "3"
@@ -0,0 +1,34 @@
+import datetime
+
+from dicttoxml import dicttoxml
+
+from acord_core.xmlwriter import to_xml
+
+
+def test_matches_dicttoxml_for_dicts_and_scalars():
+    document = {
+        "TXLife": {
+            "TXLifeResponse": {
+                "TransRefGUID": "a&b <c> \"d\" 'e'",
+                "Count": 3,
+                "Amount": 1.5,
+                "Flag": True,
+                "Missing": None,
+                "Date": datetime.date(2024, 8, 30),
+                "1125": "numeric key",
+                "bad key": "space",
+                "Empty": {},
+            }
+        }
+    }
+    assert to_xml(document) == dicttoxml(document, custom_root='TXLife', attr_type=False)
+
+
+def test_lists_become_repeated_elements():
+    document = {"TXLifeResponse": [{"TransRefGUID": "1"}, {"TransRefGUID": "2"}]}
+    assert to_xml(document) == (
+        b'<?xml version="1.0" encoding="UTF-8" ?><TXLife>'
+        b'<TXLifeResponse><TransRefGUID>1</TransRefGUID></TXLifeResponse>'
+        b'<TXLifeResponse><TransRefGUID>2</TransRefGUID></TXLifeResponse>'
+        b'</TXLife>'
+    )
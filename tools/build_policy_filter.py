@@ -0,0 +1,55 @@
+"""Write the PolNumber filter snapshot the ACORD functions load at init.
+
+Run on a schedule (daily is plenty) with the stack's case store and the
+snapshot location in the environment, as the functions see them:
+
+    ACORD_CASE_TABLE=<table> python tools/build_policy_filter.py s3://bucket/policies.bloom
+
+An existing snapshot is loaded and caught up on the cases written since,
+which reads only those. The first snapshot, or one built with --rebuild,
+reads every PolNumber in the store: for DynamoDB a full table scan, run
+here rather than in every container. So does a snapshot whose filter the
+book has outgrown.
+"""
+import argparse
+import logging
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "lambda", "common", "python"))
+
+from acord_core import casestore
+from acord_core.polfilter import KnownPolicies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("snapshot", help="path or s3://bucket/key of the snapshot")
+    parser.add_argument("--rebuild", action="store_true", help="read every PolNumber instead of catching up")
+    arguments = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    store = casestore.default_store()
+    if store is None:
+        parser.error("set ACORD_CASE_TABLE or ACORD_CASE_DATABASE")
+    policies = KnownPolicies(store, refresh=None)
+    if arguments.rebuild:
+        policies.build()
+    else:
+        try:
+            policies.load(arguments.snapshot)
+        except Exception as e:
+            logging.warning(f"No snapshot to catch up ({e!r}), reading every PolNumber")
+            policies.build()
+        else:
+            # Rebuilt larger once the book outgrows the filter's capacity
+            if len(policies.filter) > policies.filter.capacity:
+                logging.info("Policy filter is over capacity, reading every PolNumber")
+                policies.build()
+    policies.save(arguments.snapshot)
+    print(policies.stats())
+
+
+if __name__ == "__main__":
+    main()
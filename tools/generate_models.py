@@ -0,0 +1,304 @@
+"""Generate slotted TXLife models from the OpenAPI schemas in acord_swagger.
+
+Nothing in the Lambda layer uses the models yet, so they are not shipped
+in it: ``load()`` builds them in memory for the tests and benchmarks, and
+
+    python tools/generate_models.py [path]
+
+writes the module to ``path`` (or stdout) for a consumer to vendor.
+"""
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from acord_swagger import SWAGGER_DEFINITION
+
+sys.path.insert(0, os.path.join(ROOT, "lambda", "common", "python"))
+
+# Generated classes and the JSON schema each one is derived from
+MODELS = [
+    ("TXLifeRequest", "TXLifeRequestJSON"),
+    ("TXLifeResponse", "TXLifeResponseJSON"),
+    ("OLifE", "OLifEJSON"),
+    ("Holding", "HoldingJSON"),
+    ("Policy", "PolicyJSON"),
+    ("ChangeInfo", "ChangeInfoJSON"),
+    ("TransResult", "TransResultJSON"),
+]
+
+# Schemas with this shape are ACORD typecodes and map to the TypeCode class
+TYPECODE_PROPERTIES = ["tc", "value"]
+
+HEADER = '''"""Slotted models for ACORD TXLife documents.
+
+GENERATED by tools/generate_models.py from the OpenAPI schemas in
+acord_swagger.py - do not edit by hand.
+
+Each model stores its known properties in ``__slots__``; properties the
+schema does not describe are kept in ``extra`` so documents round-trip.
+A property that occurs more than once (a JSON list or repeated XML
+elements) holds a list of values.
+"""
+from acord_core.xmlwriter import _write
+
+
+def _append(current, value):
+    if current is None:
+        return value
+    if type(current) is list:
+        current.append(value)
+        return current
+    return [current, value]
+
+
+def _dump(value):
+    if type(value) is list:
+        return [_dump(item) for item in value]
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    return value
+
+
+def _xml_value(element):
+    # Generic conversion for elements the schema does not describe
+    if len(element) == 0 and not element.attrib:
+        return element.text
+    value = {'@' + key: item for key, item in element.attrib.items()}
+    for child in element:
+        value[child.tag] = _append(value.get(child.tag), _xml_value(child))
+    if element.text and element.text.strip():
+        value['#text'] = element.text
+    return value
+
+
+def _write_value(out, name, value):
+    if type(value) is list:
+        for item in value:
+            _write_value(out, name, item)
+    elif hasattr(value, 'write_xml'):
+        value.write_xml(out, name)
+    else:
+        _write(out, name, value)
+
+
+class TypeCode:
+    """An ACORD typecode, ``{"tc": .., "value": ..}``.
+
+    XML input may use either ACORD's attribute form ``<X tc="..">value</X>``
+    or child elements; output matches ``xmlwriter`` for the JSON form.
+    """
+
+    __slots__ = ('tc', 'value')
+
+    def __init__(self, tc=None, value=None):
+        self.tc = tc
+        self.value = value
+
+    @classmethod
+    def from_json(cls, data):
+        if data is None:
+            return None
+        if type(data) is list:
+            return [cls.from_json(item) for item in data]
+        if type(data) is not dict:
+            return cls(data)
+        return cls(data.get('tc'), data.get('value'))
+
+    @classmethod
+    def from_xml(cls, element):
+        if len(element):
+            return cls(element.findtext('tc'), element.findtext('value'))
+        return cls(element.get('tc'), element.text)
+
+    def to_dict(self):
+        data = {}
+        if self.tc is not None:
+            data['tc'] = self.tc
+        if self.value is not None:
+            data['value'] = self.value
+        return data
+
+    def write_xml(self, out, name):
+        _write(out, name, self.to_dict())
+
+    def __eq__(self, other):
+        return type(other) is TypeCode and self.tc == other.tc and self.value == other.value
+
+    def __repr__(self):
+        return 'TypeCode(tc=%r, value=%r)' % (self.tc, self.value)
+'''
+
+
+def resolve(schema):
+    ref = schema.get("$ref")
+    if ref:
+        return ref.rsplit("/", 1)[-1]
+    return None
+
+
+def property_kind(schemas, names, name, schema):
+    """Return (kind, class_name) for one property: scalar, typecode or model."""
+    ref = resolve(schema)
+    if ref is not None:
+        target = schemas[ref]
+        if list(target.get("properties", {})) == TYPECODE_PROPERTIES:
+            return "typecode", "TypeCode"
+        return "model", names[ref]
+    if schema.get("type") == "object":
+        # Inline object schemas get a class named after the property
+        return "model", name
+    return "scalar", None
+
+
+def generate_class(schemas, names, class_name, schema, out):
+    fields = []
+    for name, prop in schema["properties"].items():
+        kind, target = property_kind(schemas, names, name, prop)
+        fields.append((name, kind, target))
+
+    slots = ", ".join(repr(name) for name, _, _ in fields) + ", 'extra'"
+    args = ", ".join(f"{name}=None" for name, _, _ in fields)
+    lines = [
+        "",
+        "",
+        f"class {class_name}:",
+        "",
+        f"    __slots__ = ({slots})",
+        f"    _known = frozenset(({', '.join(repr(name) for name, _, _ in fields)},))",
+        "",
+        f"    def __init__(self, {args}, extra=None):",
+    ]
+    lines += [f"        self.{name} = {name}" for name, _, _ in fields]
+    lines += [
+        "        self.extra = extra",
+        "",
+        "    @classmethod",
+        "    def from_json(cls, data):",
+        "        if data is None:",
+        "            return None",
+        "        if type(data) is list:",
+        "            return [cls.from_json(item) for item in data]",
+        "        get = data.get",
+        "        obj = cls(",
+    ]
+    for name, kind, target in fields:
+        if kind == "scalar":
+            lines.append(f"            get({name!r}),")
+        else:
+            lines.append(f"            {target}.from_json(get({name!r})),")
+    lines += [
+        "        )",
+        "        if not cls._known.issuperset(data):",
+        "            obj.extra = {key: value for key, value in data.items() if key not in cls._known}",
+        "        return obj",
+        "",
+        "    @classmethod",
+        "    def from_xml(cls, element):",
+        "        obj = cls()",
+        "        for child in element:",
+        "            tag = child.tag",
+    ]
+    for index, (name, kind, target) in enumerate(fields):
+        keyword = "if" if index == 0 else "elif"
+        loader = "child.text" if kind == "scalar" else f"{target}.from_xml(child)"
+        lines += [
+            f"            {keyword} tag == {name!r}:",
+            f"                obj.{name} = _append(obj.{name}, {loader})",
+        ]
+    lines += [
+        "            else:",
+        "                if obj.extra is None:",
+        "                    obj.extra = {}",
+        "                obj.extra[tag] = _append(obj.extra.get(tag), _xml_value(child))",
+        "        return obj",
+        "",
+        "    def to_dict(self):",
+        "        data = {}",
+    ]
+    for name, kind, _ in fields:
+        lines += [
+            f"        value = self.{name}",
+            "        if value is not None:",
+            f"            data[{name!r}] = {'value' if kind == 'scalar' else '_dump(value)'}",
+        ]
+    lines += [
+        "        if self.extra:",
+        "            data.update(self.extra)",
+        "        return data",
+        "",
+        f"    def write_xml(self, out, name={class_name!r}):",
+        "        out.append('<%s>' % name)",
+    ]
+    for name, _, _ in fields:
+        lines += [
+            f"        if self.{name} is not None:",
+            f"            _write_value(out, {name!r}, self.{name})",
+        ]
+    lines += [
+        "        if self.extra:",
+        "            for key, value in self.extra.items():",
+        "                _write_value(out, key, value)",
+        "        out.append('</%s>' % name)",
+        "",
+        "    def to_xml(self):",
+        "        out = []",
+        "        self.write_xml(out)",
+        "        return ''.join(out)",
+        "",
+        "    def __eq__(self, other):",
+        f"        return type(other) is {class_name} and all(",
+        "            getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)",
+        "",
+        "    def __repr__(self):",
+        "        values = ', '.join('%s=%r' % (slot, getattr(self, slot)) for slot in self.__slots__",
+        "                           if getattr(self, slot) is not None)",
+        f"        return '{class_name}(%s)' % values",
+    ]
+    out.extend(lines)
+
+
+def generate():
+    schemas = SWAGGER_DEFINITION["components"]["schemas"]
+    names = {schema: name for name, schema in MODELS}
+    out = [HEADER.rstrip("\n")]
+    emitted = set()
+
+    def emit(class_name, schema):
+        # Dependencies first so class names resolve at import time
+        if class_name in emitted:
+            return
+        emitted.add(class_name)
+        for name, prop in schema["properties"].items():
+            kind, target = property_kind(schemas, names, name, prop)
+            if kind == "model":
+                ref = resolve(prop)
+                emit(target, schemas[ref] if ref else prop)
+        generate_class(schemas, names, class_name, schema, out)
+
+    for class_name, schema_name in MODELS:
+        emit(class_name, schemas[schema_name])
+    return "\n".join(out) + "\n"
+
+
+def load(name="acord_models"):
+    """Return the generated models as a module, without writing them out."""
+    module = types.ModuleType(name)
+    exec(compile(generate(), f"<{name}>", "exec"), module.__dict__)
+    return module
+
+
+def main(argv):
+    source = generate()
+    if len(argv) < 2:
+        sys.stdout.write(source)
+        return
+    with open(argv[1], "w") as f:
+        f.write(source)
+    print(f"Wrote {argv[1]}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)